@@ -26,12 +26,84 @@ CREATE TABLE subjects (
     withdrawn BOOLEAN DEFAULT FALSE,
     family_id VARCHAR REFERENCES family(family_id),
     flagged_for_review BOOLEAN DEFAULT FALSE,
-    review_notes TEXT,
     created_by VARCHAR(100) DEFAULT 'system',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- GSIDs minted ahead of use (bulk pre-allocation); 'assigned' once a subject
+-- takes the ID, 'void' if it must never be handed out
+CREATE TABLE gsid_registry (
+    gsid VARCHAR(21) PRIMARY KEY,
+    status VARCHAR(20) NOT NULL DEFAULT 'reserved'
+        CHECK (status IN ('reserved', 'assigned', 'void')),
+    reserved_by VARCHAR(100),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    assigned_at TIMESTAMP
+);
+
+-- gsid-service claims pre-minted IDs from its reservoir in gsid order
+CREATE INDEX idx_gsid_registry_reserved ON gsid_registry(reserved_by, gsid)
+    WHERE status = 'reserved';
+
+-- Progress of streamed registrations (gsid-service POST /register/stream).
+-- committed_lines advances in the same transaction as each chunk, so a
+-- dropped stream resumes right after the last committed chunk.
+CREATE TABLE registration_imports (
+    import_id VARCHAR(100) PRIMARY KEY,
+    created_by VARCHAR(100),
+    committed_lines BIGINT NOT NULL DEFAULT 0,
+    summary JSONB NOT NULL DEFAULT '{}',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Responses of registrations sent with an Idempotency-Key (gsid-service).
+-- The key is claimed and its response stored in the registering transaction,
+-- so a retried request replays the response instead of registering again.
+-- Rows expire after IDEMPOTENCY_TTL_SECONDS and are purged by later claims.
+CREATE TABLE idempotency_keys (
+    endpoint VARCHAR(100) NOT NULL,
+    idempotency_key VARCHAR(255) NOT NULL,
+    request_hash CHAR(64) NOT NULL,
+    response JSONB,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (endpoint, idempotency_key)
+);
+
+CREATE INDEX idx_idempotency_keys_expires ON idempotency_keys(expires_at);
+
+-- Incremental sync watermarks of the REDCap pipeline, one row per project.
+-- Times are REDCap server local time, as REDCap's dateRangeBegin/End expect.
+-- last_synced_at is the end of the export window of the last run that
+-- finished without errors; the next run exports records modified since then.
+CREATE TABLE redcap_sync_state (
+    project_key VARCHAR(50) PRIMARY KEY,
+    last_synced_at TIMESTAMP NOT NULL,
+    last_full_sync_at TIMESTAMP,
+    last_mode VARCHAR(20) NOT NULL CHECK (last_mode IN ('full', 'incremental')),
+    last_record_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Review notes of subjects (conflicts, center updates, withdrawals), one row
+-- per note. Append-only: rows are never updated or deleted, so flagging a
+-- subject is a small fixed-size write instead of rewriting an ever-growing
+-- text column on subjects. v_subject_review_notes rebuilds the combined text.
+CREATE TABLE subject_review_events (
+    event_id BIGSERIAL PRIMARY KEY,
+    global_subject_id VARCHAR(21) NOT NULL REFERENCES subjects(global_subject_id),
+    event_type VARCHAR(30) NOT NULL
+        CHECK (event_type IN (
+            'center_update', 'center_conflict', 'multi_gsid_conflict',
+            'withdrawal', 'note', 'legacy'
+        )),
+    note TEXT NOT NULL,
+    created_by VARCHAR(100),
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
 CREATE TABLE subject_alias (
     alias VARCHAR(14) NOT NULL,
     global_subject_id VARCHAR(21) REFERENCES subjects(global_subject_id),
@@ -126,6 +198,42 @@ CREATE TABLE data_change_audit (
     source_fragment VARCHAR(500) -- S3 path to source file
 );
 
+-- ============================================================================
+-- REGISTRY CHANGE FEED - gsid-service GET /changes
+-- ============================================================================
+-- One row per inserted, updated or deleted row of subjects / local_subject_ids,
+-- written by the record_registry_change() triggers. txid is the writing
+-- transaction; readers page by (txid, change_id) and only read transactions
+-- older than every one still running, so a page never skips a row that
+-- commits later.
+CREATE TABLE registry_changes (
+    change_id BIGSERIAL PRIMARY KEY,
+    txid XID8 NOT NULL DEFAULT pg_current_xact_id(),
+    table_name VARCHAR(50) NOT NULL,
+    operation VARCHAR(10) NOT NULL
+        CHECK (operation IN ('insert', 'update', 'delete', 'truncate')),
+    row_key JSONB,   -- Primary key columns: {"global_subject_id": "GSID-..."}
+    row_data JSONB,  -- Whole row after insert/update; NULL for delete/truncate
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_registry_changes_position ON registry_changes(txid, change_id);
+CREATE INDEX idx_registry_changes_key ON registry_changes(table_name, row_key, txid, change_id);
+
+-- Compaction progress of registry_changes (gsid-service CHANGE_FEED_RETENTION_DAYS).
+-- One row. compacted_*: feed position compaction has processed up to.
+-- expired_*: newest compacted delete/truncate; cursors before it are expired.
+CREATE TABLE registry_changes_retention (
+    singleton BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (singleton),
+    compacted_txid XID8 NOT NULL DEFAULT '0',
+    compacted_change_id BIGINT NOT NULL DEFAULT 0,
+    expired_txid XID8 NOT NULL DEFAULT '0',
+    expired_change_id BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO registry_changes_retention (singleton) VALUES (TRUE);
+
 -- ============================================================================
 -- SAMPLE TABLES
 -- ============================================================================
@@ -294,6 +402,7 @@ CREATE INDEX idx_subjects_family ON subjects(family_id);
 CREATE INDEX idx_subjects_withdrawn ON subjects(withdrawn) WHERE withdrawn = TRUE;
 CREATE INDEX idx_subjects_flagged ON subjects(flagged_for_review) WHERE flagged_for_review = TRUE;
 CREATE INDEX idx_subjects_created_by ON subjects(created_by);
+CREATE INDEX idx_subject_review_events_subject ON subject_review_events(global_subject_id, event_id);
 
 -- Local subject IDs indexes
 CREATE INDEX idx_local_ids_gsid ON local_subject_ids(global_subject_id);
@@ -303,6 +412,9 @@ CREATE INDEX idx_local_ids_composite ON local_subject_ids(global_subject_id, ide
 CREATE INDEX idx_local_ids_created_by ON local_subject_ids(created_by);
 -- NEW: Center-agnostic lookup (for matching on local_subject_id alone)
 CREATE INDEX idx_local_ids_subject_only ON local_subject_ids(local_subject_id, identifier_type);
+-- Case-insensitive lookup key used by identity resolution, the table-loader
+-- and the conflict helper functions: lower(local_subject_id) [, identifier_type]
+CREATE INDEX idx_local_ids_lower ON local_subject_ids(lower(local_subject_id), identifier_type);
 
 -- Identity resolutions indexes
 CREATE INDEX idx_resolutions_review ON identity_resolutions(requires_review) WHERE requires_review = TRUE;
@@ -363,6 +475,167 @@ CREATE TRIGGER local_subject_ids_updated_at
     FOR EACH ROW
     EXECUTE FUNCTION update_updated_at();
 
+-- gsid-service keeps an in-process identifier -> GSID cache; these triggers
+-- tell it (LISTEN gsid_cache_invalidate) which entries a committed write
+-- made stale. Payloads: 'id:<lower(local_subject_id)>', 'gsid:<gsid>', 'all'.
+-- Notifications serialize committing writers, and the cache is only read
+-- without identifier locks, so the triggers fire only when
+-- idhub.gsid_cache_notify is 'on' (ALTER DATABASE idhub SET ... = on).
+CREATE OR REPLACE FUNCTION notify_gsid_cache_invalidate()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_LEVEL = 'STATEMENT' THEN
+        PERFORM pg_notify('gsid_cache_invalidate', 'all');
+    ELSIF TG_TABLE_NAME = 'local_subject_ids' THEN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM pg_notify('gsid_cache_invalidate', 'id:' || lower(OLD.local_subject_id));
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM pg_notify('gsid_cache_invalidate', 'id:' || lower(NEW.local_subject_id));
+        END IF;
+    ELSE
+        PERFORM pg_notify('gsid_cache_invalidate', 'gsid:' || OLD.global_subject_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER local_subject_ids_cache_invalidate
+    AFTER INSERT OR UPDATE OR DELETE ON local_subject_ids
+    FOR EACH ROW
+    WHEN (current_setting('idhub.gsid_cache_notify', true) = 'on')
+    EXECUTE FUNCTION notify_gsid_cache_invalidate();
+
+CREATE TRIGGER local_subject_ids_cache_truncate
+    AFTER TRUNCATE ON local_subject_ids
+    FOR EACH STATEMENT
+    WHEN (current_setting('idhub.gsid_cache_notify', true) = 'on')
+    EXECUTE FUNCTION notify_gsid_cache_invalidate();
+
+-- Only the columns the cache holds; review flags and notes do not notify
+CREATE TRIGGER subjects_cache_invalidate
+    AFTER UPDATE OF global_subject_id, center_id, created_at, withdrawn OR DELETE
+    ON subjects
+    FOR EACH ROW
+    WHEN (current_setting('idhub.gsid_cache_notify', true) = 'on')
+    EXECUTE FUNCTION notify_gsid_cache_invalidate();
+
+CREATE TRIGGER subjects_cache_truncate
+    AFTER TRUNCATE ON subjects
+    FOR EACH STATEMENT
+    WHEN (current_setting('idhub.gsid_cache_notify', true) = 'on')
+    EXECUTE FUNCTION notify_gsid_cache_invalidate();
+
+-- Change feed capture. Statement-level triggers with transition tables write
+-- one INSERT ... SELECT per statement, not one per row; trigger arguments
+-- name the table's primary key columns.
+CREATE OR REPLACE FUNCTION registry_change_key(row_data JSONB, key_columns TEXT[])
+RETURNS JSONB AS $$
+    SELECT jsonb_object_agg(c, row_data -> c) FROM unnest(key_columns) AS c;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION record_registry_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    key_columns TEXT[] := TG_ARGV;
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        INSERT INTO registry_changes (table_name, operation)
+        VALUES (TG_TABLE_NAME, 'truncate');
+        RETURN NULL;
+    END IF;
+
+    -- Each statement below only references transition tables its trigger has
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO registry_changes (table_name, operation, row_key)
+        SELECT TG_TABLE_NAME, 'delete', registry_change_key(to_jsonb(o), key_columns)
+        FROM old_rows o;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'UPDATE' THEN
+        -- An update that changes the key removes the row under its old key
+        INSERT INTO registry_changes (table_name, operation, row_key)
+        SELECT TG_TABLE_NAME, 'delete', registry_change_key(to_jsonb(o), key_columns)
+        FROM old_rows o
+        WHERE registry_change_key(to_jsonb(o), key_columns) NOT IN (
+            SELECT registry_change_key(to_jsonb(n), key_columns) FROM new_rows n
+        );
+    END IF;
+
+    INSERT INTO registry_changes (table_name, operation, row_key, row_data)
+    SELECT TG_TABLE_NAME, lower(TG_OP), registry_change_key(to_jsonb(n), key_columns), to_jsonb(n)
+    FROM new_rows n;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER subjects_change_insert
+    AFTER INSERT ON subjects
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION record_registry_change('global_subject_id');
+
+CREATE TRIGGER subjects_change_update
+    AFTER UPDATE ON subjects
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION record_registry_change('global_subject_id');
+
+CREATE TRIGGER subjects_change_delete
+    AFTER DELETE ON subjects
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION record_registry_change('global_subject_id');
+
+CREATE TRIGGER subjects_change_truncate
+    AFTER TRUNCATE ON subjects
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION record_registry_change();
+
+CREATE TRIGGER local_subject_ids_change_insert
+    AFTER INSERT ON local_subject_ids
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION record_registry_change('center_id', 'local_subject_id', 'identifier_type');
+
+CREATE TRIGGER local_subject_ids_change_update
+    AFTER UPDATE ON local_subject_ids
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION record_registry_change('center_id', 'local_subject_id', 'identifier_type');
+
+CREATE TRIGGER local_subject_ids_change_delete
+    AFTER DELETE ON local_subject_ids
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION record_registry_change('center_id', 'local_subject_id', 'identifier_type');
+
+CREATE TRIGGER local_subject_ids_change_truncate
+    AFTER TRUNCATE ON local_subject_ids
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION record_registry_change();
+
+-- DELETE/TRUNCATE are allowed only in a session or transaction that sets
+-- idhub.allow_review_event_delete = 'on' (maintenance, e.g. deleting a subject)
+CREATE OR REPLACE FUNCTION reject_review_event_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('DELETE', 'TRUNCATE')
+       AND current_setting('idhub.allow_review_event_delete', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    RAISE EXCEPTION 'subject_review_events is append-only (% rejected)', TG_OP
+        USING HINT = 'To delete events during maintenance, first run '
+                     'SET LOCAL idhub.allow_review_event_delete = on';
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER subject_review_events_append_only
+    BEFORE UPDATE OR DELETE OR TRUNCATE ON subject_review_events
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION reject_review_event_change();
+
 -- ============================================================================
 -- HELPER FUNCTIONS
 -- ============================================================================
@@ -408,14 +681,14 @@ BEGIN
             c.name as center_name
         FROM local_subject_ids l
         JOIN centers c ON l.center_id = c.center_id
-        WHERE l.local_subject_id = p_local_subject_id
+        WHERE lower(l.local_subject_id) = lower(p_local_subject_id)
           AND l.identifier_type = p_identifier_type
     )
     SELECT 
         ic.global_subject_id,
         ic.center_id,
         ic.center_name,
-        COUNT(DISTINCT ic.center_id) OVER () > 1 as conflict_detected
+        (SELECT COUNT(DISTINCT x.center_id) FROM id_centers x) > 1 as conflict_detected
     FROM id_centers ic;
 END;
 $$ LANGUAGE plpgsql;
@@ -437,18 +710,26 @@ BEGIN
             (value->>'local_subject_id')::VARCHAR as local_id,
             (value->>'identifier_type')::VARCHAR as id_type
         FROM jsonb_array_elements(p_candidate_ids)
+    ),
+    matches AS (
+        SELECT 
+            c.local_id,
+            c.id_type,
+            l.global_subject_id,
+            l.center_id
+        FROM candidate_list c
+        JOIN local_subject_ids l 
+            ON lower(l.local_subject_id) = lower(c.local_id)
+            AND l.identifier_type = c.id_type
+        WHERE l.global_subject_id IS NOT NULL
     )
     SELECT 
-        c.local_id,
-        c.id_type,
-        l.global_subject_id,
-        l.center_id,
-        COUNT(DISTINCT l.global_subject_id) OVER () > 1 as conflict_detected
-    FROM candidate_list c
-    LEFT JOIN local_subject_ids l 
-        ON l.local_subject_id = c.local_id
-        AND l.identifier_type = c.id_type
-    WHERE l.global_subject_id IS NOT NULL;
+        m.local_id,
+        m.id_type,
+        m.global_subject_id,
+        m.center_id,
+        (SELECT COUNT(DISTINCT x.global_subject_id) FROM matches x) > 1 as conflict_detected
+    FROM matches m;
 END;
 $$ LANGUAGE plpgsql;
 
@@ -623,6 +904,17 @@ $$ LANGUAGE plpgsql;
 -- ============================================================================
 -- VIEWS
 -- ============================================================================
+-- Review notes per subject as the single newline-separated text they used
+-- to be stored as (subjects.review_notes)
+CREATE OR REPLACE VIEW v_subject_review_notes AS
+SELECT
+    e.global_subject_id,
+    string_agg(e.note, E'\n' ORDER BY e.event_id) AS review_notes,
+    COUNT(*) AS review_events,
+    MAX(e.created_at) AS last_review_event_at
+FROM subject_review_events e
+GROUP BY e.global_subject_id;
+
 -- View for subjects with review flags
 CREATE OR REPLACE VIEW v_subjects_requiring_review AS
 SELECT 
@@ -630,7 +922,7 @@ SELECT
     s.center_id,
     c.name as center_name,
     s.flagged_for_review,
-    s.review_notes,
+    n.review_notes,
     s.withdrawn,
     s.created_by,
     COUNT(DISTINCT l.identifier_type) as num_identifier_types,
@@ -640,9 +932,10 @@ SELECT
 FROM subjects s
 LEFT JOIN centers c ON s.center_id = c.center_id
 LEFT JOIN local_subject_ids l ON s.global_subject_id = l.global_subject_id
+LEFT JOIN v_subject_review_notes n ON s.global_subject_id = n.global_subject_id
 WHERE s.flagged_for_review = TRUE OR s.withdrawn = TRUE
 GROUP BY s.global_subject_id, s.center_id, c.name, s.flagged_for_review, 
-         s.review_notes, s.withdrawn, s.created_by, s.created_at, s.updated_at
+         n.review_notes, s.withdrawn, s.created_by, s.created_at, s.updated_at
 ORDER BY s.updated_at DESC;
 
 -- View for multi-GSID conflicts
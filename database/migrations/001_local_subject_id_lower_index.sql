@@ -0,0 +1,87 @@
+-- database/migrations/001_local_subject_id_lower_index.sql
+-- Case-insensitive local_subject_id lookups for existing databases
+--
+-- Identity resolution matches identifiers on lower(local_subject_id). Without
+-- an index on that expression every registration scans local_subject_ids.
+-- New databases get the same objects from init-scripts/01-schema.sql.
+--
+-- CREATE INDEX CONCURRENTLY cannot run inside a transaction block, so run
+-- this file with psql's default autocommit (no --single-transaction):
+--
+--   psql -h <host> -U idhub_user -d idhub -f database/migrations/001_local_subject_id_lower_index.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_local_ids_lower
+    ON local_subject_ids(lower(local_subject_id), identifier_type);
+
+ANALYZE local_subject_ids;
+
+-- Helper functions match case-insensitively (same definitions as 01-schema.sql;
+-- this also replaces the COUNT(DISTINCT ...) OVER () form Postgres rejects)
+CREATE OR REPLACE FUNCTION check_center_conflicts(
+    p_local_subject_id VARCHAR,
+    p_identifier_type VARCHAR)
+RETURNS TABLE (
+    global_subject_id VARCHAR,
+    center_id INT,
+    center_name VARCHAR,
+    conflict_detected BOOLEAN
+) AS $$
+BEGIN
+    RETURN QUERY
+    WITH id_centers AS (
+        SELECT 
+            l.global_subject_id,
+            l.center_id,
+            c.name as center_name
+        FROM local_subject_ids l
+        JOIN centers c ON l.center_id = c.center_id
+        WHERE lower(l.local_subject_id) = lower(p_local_subject_id)
+          AND l.identifier_type = p_identifier_type
+    )
+    SELECT 
+        ic.global_subject_id,
+        ic.center_id,
+        ic.center_name,
+        (SELECT COUNT(DISTINCT x.center_id) FROM id_centers x) > 1 as conflict_detected
+    FROM id_centers ic;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION check_multi_gsid_conflicts(
+    p_candidate_ids JSONB)
+RETURNS TABLE (
+    local_subject_id VARCHAR,
+    identifier_type VARCHAR,
+    global_subject_id VARCHAR,
+    center_id INT,
+    conflict_detected BOOLEAN
+) AS $$
+BEGIN
+    RETURN QUERY
+    WITH candidate_list AS (
+        SELECT 
+            (value->>'local_subject_id')::VARCHAR as local_id,
+            (value->>'identifier_type')::VARCHAR as id_type
+        FROM jsonb_array_elements(p_candidate_ids)
+    ),
+    matches AS (
+        SELECT 
+            c.local_id,
+            c.id_type,
+            l.global_subject_id,
+            l.center_id
+        FROM candidate_list c
+        JOIN local_subject_ids l 
+            ON lower(l.local_subject_id) = lower(c.local_id)
+            AND l.identifier_type = c.id_type
+        WHERE l.global_subject_id IS NOT NULL
+    )
+    SELECT 
+        m.local_id,
+        m.id_type,
+        m.global_subject_id,
+        m.center_id,
+        (SELECT COUNT(DISTINCT x.global_subject_id) FROM matches x) > 1 as conflict_detected
+    FROM matches m;
+END;
+$$ LANGUAGE plpgsql;
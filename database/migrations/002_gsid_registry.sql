@@ -0,0 +1,21 @@
+-- database/migrations/002_gsid_registry.sql
+-- Registry of minted GSIDs used by gsid-service bulk minting
+--
+-- gsid_generator reserves IDs here with multi-row INSERT ... ON CONFLICT DO
+-- NOTHING, so the primary key is what guarantees uniqueness. New databases
+-- get the same table from init-scripts/01-schema.sql.
+--
+--   psql -h <host> -U idhub_user -d idhub -f database/migrations/002_gsid_registry.sql
+
+CREATE TABLE IF NOT EXISTS gsid_registry (
+    gsid VARCHAR(21) PRIMARY KEY,
+    status VARCHAR(20) NOT NULL DEFAULT 'reserved'
+        CHECK (status IN ('reserved', 'assigned', 'void')),
+    reserved_by VARCHAR(100),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    assigned_at TIMESTAMP
+);
+
+-- Databases that created gsid_registry by hand may lack the newer columns
+ALTER TABLE gsid_registry ADD COLUMN IF NOT EXISTS reserved_by VARCHAR(100);
+ALTER TABLE gsid_registry ADD COLUMN IF NOT EXISTS assigned_at TIMESTAMP;
@@ -0,0 +1,14 @@
+-- database/migrations/003_gsid_reservoir_index.sql
+-- Partial index backing the gsid-service GSID reservoir
+--
+-- New-subject registrations claim pre-minted rows with
+--   WHERE status = 'reserved' AND reserved_by = <reservoir owner>
+--   ORDER BY gsid LIMIT n FOR UPDATE SKIP LOCKED
+-- and the refill task counts the same rows. Assigned rows drop out of the
+-- index, so it stays the size of the reservoir.
+--
+--   psql -h <host> -U idhub_user -d idhub -f database/migrations/003_gsid_reservoir_index.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_gsid_registry_reserved
+    ON gsid_registry(reserved_by, gsid)
+    WHERE status = 'reserved';
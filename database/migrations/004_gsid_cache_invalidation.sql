@@ -0,0 +1,51 @@
+-- database/migrations/004_gsid_cache_invalidation.sql
+-- LISTEN/NOTIFY invalidation for the gsid-service identifier cache
+--
+-- Requires PostgreSQL 14+ (CREATE OR REPLACE TRIGGER). Safe to re-run.
+--
+--   psql -h <host> -U idhub_user -d idhub -f database/migrations/004_gsid_cache_invalidation.sql
+
+-- gsid-service keeps an in-process identifier -> GSID cache; these triggers
+-- tell it (LISTEN gsid_cache_invalidate) which entries a committed write
+-- made stale. Payloads: 'id:<lower(local_subject_id)>', 'gsid:<gsid>', 'all'.
+-- Migration 011 makes these triggers conditional on idhub.gsid_cache_notify.
+CREATE OR REPLACE FUNCTION notify_gsid_cache_invalidate()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_LEVEL = 'STATEMENT' THEN
+        PERFORM pg_notify('gsid_cache_invalidate', 'all');
+    ELSIF TG_TABLE_NAME = 'local_subject_ids' THEN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM pg_notify('gsid_cache_invalidate', 'id:' || lower(OLD.local_subject_id));
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM pg_notify('gsid_cache_invalidate', 'id:' || lower(NEW.local_subject_id));
+        END IF;
+    ELSE
+        PERFORM pg_notify('gsid_cache_invalidate', 'gsid:' || OLD.global_subject_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER local_subject_ids_cache_invalidate
+    AFTER INSERT OR UPDATE OR DELETE ON local_subject_ids
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_gsid_cache_invalidate();
+
+CREATE OR REPLACE TRIGGER local_subject_ids_cache_truncate
+    AFTER TRUNCATE ON local_subject_ids
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_gsid_cache_invalidate();
+
+-- Only the columns the cache holds; review flags and notes do not notify
+CREATE OR REPLACE TRIGGER subjects_cache_invalidate
+    AFTER UPDATE OF global_subject_id, center_id, created_at, withdrawn OR DELETE
+    ON subjects
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_gsid_cache_invalidate();
+
+CREATE OR REPLACE TRIGGER subjects_cache_truncate
+    AFTER TRUNCATE ON subjects
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_gsid_cache_invalidate();
@@ -0,0 +1,17 @@
+-- database/migrations/005_registration_imports.sql
+-- Resumable streamed registrations for gsid-service POST /register/stream
+--
+-- One row per import_id; committed_lines is updated in the same transaction
+-- as each registered chunk. New databases get the same table from
+-- init-scripts/01-schema.sql.
+--
+--   psql -h <host> -U idhub_user -d idhub -f database/migrations/005_registration_imports.sql
+
+CREATE TABLE IF NOT EXISTS registration_imports (
+    import_id VARCHAR(100) PRIMARY KEY,
+    created_by VARCHAR(100),
+    committed_lines BIGINT NOT NULL DEFAULT 0,
+    summary JSONB NOT NULL DEFAULT '{}',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,147 @@
+-- database/migrations/006_registry_changes.sql
+-- Change feed of subjects and local_subject_ids for gsid-service GET /changes
+--
+-- Requires PostgreSQL 14+ (CREATE OR REPLACE TRIGGER, xid8). New databases
+-- get the same objects from init-scripts/01-schema.sql. Existing rows are
+-- recorded as inserts, so a client reading the feed from the start builds a
+-- complete mirror.
+--
+-- The table grows by one row per changed row, forever, until
+-- 010_registry_changes_retention.sql is applied; gsid-service then compacts
+-- changes older than CHANGE_FEED_RETENTION_DAYS.
+--
+--   psql -h <host> -U idhub_user -d idhub -f database/migrations/006_registry_changes.sql
+
+BEGIN;
+
+-- One row per inserted, updated or deleted row of subjects / local_subject_ids,
+-- written by the record_registry_change() triggers. txid is the writing
+-- transaction; readers page by (txid, change_id) and only read transactions
+-- older than every one still running, so a page never skips a row that
+-- commits later.
+CREATE TABLE IF NOT EXISTS registry_changes (
+    change_id BIGSERIAL PRIMARY KEY,
+    txid XID8 NOT NULL DEFAULT pg_current_xact_id(),
+    table_name VARCHAR(50) NOT NULL,
+    operation VARCHAR(10) NOT NULL
+        CHECK (operation IN ('insert', 'update', 'delete', 'truncate')),
+    row_key JSONB,   -- Primary key columns: {"global_subject_id": "GSID-..."}
+    row_data JSONB,  -- Whole row after insert/update; NULL for delete/truncate
+    changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_registry_changes_position ON registry_changes(txid, change_id);
+
+-- Backfill current rows once, before the triggers exist; the lock keeps
+-- writes from slipping in between the backfill and the triggers
+LOCK TABLE subjects, local_subject_ids IN SHARE MODE;
+
+INSERT INTO registry_changes (table_name, operation, row_key, row_data)
+SELECT 'subjects', 'insert', jsonb_build_object('global_subject_id', s.global_subject_id), to_jsonb(s)
+FROM subjects s
+WHERE NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'subjects_change_insert')
+ORDER BY s.global_subject_id;
+
+INSERT INTO registry_changes (table_name, operation, row_key, row_data)
+SELECT 'local_subject_ids', 'insert',
+       jsonb_build_object(
+           'center_id', l.center_id,
+           'local_subject_id', l.local_subject_id,
+           'identifier_type', l.identifier_type
+       ),
+       to_jsonb(l)
+FROM local_subject_ids l
+WHERE NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'subjects_change_insert')
+ORDER BY l.center_id, l.local_subject_id, l.identifier_type;
+
+-- Change feed capture. Statement-level triggers with transition tables write
+-- one INSERT ... SELECT per statement, not one per row; trigger arguments
+-- name the table's primary key columns.
+CREATE OR REPLACE FUNCTION registry_change_key(row_data JSONB, key_columns TEXT[])
+RETURNS JSONB AS $$
+    SELECT jsonb_object_agg(c, row_data -> c) FROM unnest(key_columns) AS c;
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION record_registry_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    key_columns TEXT[] := TG_ARGV;
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        INSERT INTO registry_changes (table_name, operation)
+        VALUES (TG_TABLE_NAME, 'truncate');
+        RETURN NULL;
+    END IF;
+
+    -- Each statement below only references transition tables its trigger has
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO registry_changes (table_name, operation, row_key)
+        SELECT TG_TABLE_NAME, 'delete', registry_change_key(to_jsonb(o), key_columns)
+        FROM old_rows o;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'UPDATE' THEN
+        -- An update that changes the key removes the row under its old key
+        INSERT INTO registry_changes (table_name, operation, row_key)
+        SELECT TG_TABLE_NAME, 'delete', registry_change_key(to_jsonb(o), key_columns)
+        FROM old_rows o
+        WHERE registry_change_key(to_jsonb(o), key_columns) NOT IN (
+            SELECT registry_change_key(to_jsonb(n), key_columns) FROM new_rows n
+        );
+    END IF;
+
+    INSERT INTO registry_changes (table_name, operation, row_key, row_data)
+    SELECT TG_TABLE_NAME, lower(TG_OP), registry_change_key(to_jsonb(n), key_columns), to_jsonb(n)
+    FROM new_rows n;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER subjects_change_insert
+    AFTER INSERT ON subjects
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION record_registry_change('global_subject_id');
+
+CREATE OR REPLACE TRIGGER subjects_change_update
+    AFTER UPDATE ON subjects
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION record_registry_change('global_subject_id');
+
+CREATE OR REPLACE TRIGGER subjects_change_delete
+    AFTER DELETE ON subjects
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION record_registry_change('global_subject_id');
+
+CREATE OR REPLACE TRIGGER subjects_change_truncate
+    AFTER TRUNCATE ON subjects
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION record_registry_change();
+
+CREATE OR REPLACE TRIGGER local_subject_ids_change_insert
+    AFTER INSERT ON local_subject_ids
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION record_registry_change('center_id', 'local_subject_id', 'identifier_type');
+
+CREATE OR REPLACE TRIGGER local_subject_ids_change_update
+    AFTER UPDATE ON local_subject_ids
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION record_registry_change('center_id', 'local_subject_id', 'identifier_type');
+
+CREATE OR REPLACE TRIGGER local_subject_ids_change_delete
+    AFTER DELETE ON local_subject_ids
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION record_registry_change('center_id', 'local_subject_id', 'identifier_type');
+
+CREATE OR REPLACE TRIGGER local_subject_ids_change_truncate
+    AFTER TRUNCATE ON local_subject_ids
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION record_registry_change();
+
+COMMIT;
@@ -0,0 +1,18 @@
+-- database/migrations/007_idempotency_keys.sql
+-- Stored responses for gsid-service registrations sent with an
+-- Idempotency-Key header. New databases get the same table from
+-- init-scripts/01-schema.sql.
+--
+--   psql -h <host> -U idhub_user -d idhub -f database/migrations/007_idempotency_keys.sql
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    endpoint VARCHAR(100) NOT NULL,
+    idempotency_key VARCHAR(255) NOT NULL,
+    request_hash CHAR(64) NOT NULL,
+    response JSONB,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL,
+    PRIMARY KEY (endpoint, idempotency_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires ON idempotency_keys(expires_at);
@@ -0,0 +1,118 @@
+-- database/migrations/008_subject_review_events.sql
+-- Move subjects.review_notes into the append-only subject_review_events table
+--
+-- Requires PostgreSQL 14+ (CREATE OR REPLACE TRIGGER). New databases get the
+-- same objects from init-scripts/01-schema.sql. Existing notes become one
+-- 'legacy' event per subject holding the old text unchanged, so
+-- v_subject_review_notes shows exactly what subjects.review_notes did.
+-- Deploy the matching gsid-service together with this migration: older
+-- versions still write subjects.review_notes, which no longer exists.
+--
+-- Events cannot be updated or deleted, and global_subject_id is a plain
+-- foreign key to subjects, so a subject that has events cannot be deleted
+-- either. Maintenance that must delete a subject removes its events first,
+-- in a transaction that opts out of the append-only trigger:
+--
+--   BEGIN;
+--   SET LOCAL idhub.allow_review_event_delete = on;
+--   DELETE FROM subject_review_events WHERE global_subject_id = 'GSID-...';
+--   DELETE FROM local_subject_ids WHERE global_subject_id = 'GSID-...';
+--   DELETE FROM subjects WHERE global_subject_id = 'GSID-...';
+--   COMMIT;
+--
+--   psql -h <host> -U idhub_user -d idhub -f database/migrations/008_subject_review_events.sql
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS subject_review_events (
+    event_id BIGSERIAL PRIMARY KEY,
+    global_subject_id VARCHAR(21) NOT NULL REFERENCES subjects(global_subject_id),
+    event_type VARCHAR(30) NOT NULL
+        CHECK (event_type IN (
+            'center_update', 'center_conflict', 'multi_gsid_conflict',
+            'withdrawal', 'note', 'legacy'
+        )),
+    note TEXT NOT NULL,
+    created_by VARCHAR(100),
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_subject_review_events_subject
+    ON subject_review_events(global_subject_id, event_id);
+
+-- DELETE/TRUNCATE are allowed only in a session or transaction that sets
+-- idhub.allow_review_event_delete = 'on' (maintenance, e.g. deleting a subject)
+CREATE OR REPLACE FUNCTION reject_review_event_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('DELETE', 'TRUNCATE')
+       AND current_setting('idhub.allow_review_event_delete', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    RAISE EXCEPTION 'subject_review_events is append-only (% rejected)', TG_OP
+        USING HINT = 'To delete events during maintenance, first run '
+                     'SET LOCAL idhub.allow_review_event_delete = on';
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER subject_review_events_append_only
+    BEFORE UPDATE OR DELETE OR TRUNCATE ON subject_review_events
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION reject_review_event_change();
+
+-- Existing notes, oldest subject update first; blocks writers until COMMIT
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_name = 'subjects' AND column_name = 'review_notes'
+    ) THEN
+        LOCK TABLE subjects IN SHARE ROW EXCLUSIVE MODE;
+        INSERT INTO subject_review_events (global_subject_id, event_type, note, created_at)
+        SELECT global_subject_id, 'legacy', review_notes, COALESCE(updated_at, created_at, CURRENT_TIMESTAMP)
+        FROM subjects
+        WHERE review_notes IS NOT NULL AND review_notes <> ''
+        ORDER BY updated_at, global_subject_id;
+
+        DROP VIEW IF EXISTS v_subjects_requiring_review;
+        ALTER TABLE subjects DROP COLUMN review_notes;
+    END IF;
+END
+$$;
+
+CREATE OR REPLACE VIEW v_subject_review_notes AS
+SELECT
+    e.global_subject_id,
+    string_agg(e.note, E'\n' ORDER BY e.event_id) AS review_notes,
+    COUNT(*) AS review_events,
+    MAX(e.created_at) AS last_review_event_at
+FROM subject_review_events e
+GROUP BY e.global_subject_id;
+
+CREATE OR REPLACE VIEW v_subjects_requiring_review AS
+SELECT
+    s.global_subject_id,
+    s.center_id,
+    c.name as center_name,
+    s.flagged_for_review,
+    n.review_notes,
+    s.withdrawn,
+    s.created_by,
+    COUNT(DISTINCT l.identifier_type) as num_identifier_types,
+    COUNT(DISTINCT l.local_subject_id) as num_local_ids,
+    s.created_at,
+    s.updated_at
+FROM subjects s
+LEFT JOIN centers c ON s.center_id = c.center_id
+LEFT JOIN local_subject_ids l ON s.global_subject_id = l.global_subject_id
+LEFT JOIN v_subject_review_notes n ON s.global_subject_id = n.global_subject_id
+WHERE s.flagged_for_review = TRUE OR s.withdrawn = TRUE
+GROUP BY s.global_subject_id, s.center_id, c.name, s.flagged_for_review,
+         n.review_notes, s.withdrawn, s.created_by, s.created_at, s.updated_at
+ORDER BY s.updated_at DESC;
+
+COMMIT;
+
+-- Dropping the column leaves the old note text in place until rows are
+-- rewritten; reclaim it outside the transaction when convenient:
+--   VACUUM (FULL, ANALYZE) subjects;
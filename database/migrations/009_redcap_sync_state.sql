@@ -0,0 +1,16 @@
+-- database/migrations/009_redcap_sync_state.sql
+-- Per-project watermarks for incremental REDCap pipeline runs
+--
+-- Until this table exists the pipeline runs full exports, as before. New
+-- databases get the same table from init-scripts/01-schema.sql.
+--
+--   psql -h <host> -U idhub_user -d idhub -f database/migrations/009_redcap_sync_state.sql
+
+CREATE TABLE IF NOT EXISTS redcap_sync_state (
+    project_key VARCHAR(50) PRIMARY KEY,
+    last_synced_at TIMESTAMP NOT NULL,
+    last_full_sync_at TIMESTAMP,
+    last_mode VARCHAR(20) NOT NULL CHECK (last_mode IN ('full', 'incremental')),
+    last_record_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
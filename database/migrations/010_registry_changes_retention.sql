@@ -0,0 +1,38 @@
+-- database/migrations/010_registry_changes_retention.sql
+-- Retention for registry_changes (gsid-service GET /changes)
+--
+-- registry_changes gets a row for every changed row of subjects and
+-- local_subject_ids, on top of the one-off backfill, so without pruning it
+-- grows for as long as the registry is written to. gsid-service compacts
+-- changes older than CHANGE_FEED_RETENTION_DAYS: a change superseded by a
+-- later change of the same row (or by a truncate of its table) is deleted,
+-- and so are old delete and truncate changes themselves. What is left is at
+-- most one change per live row, so reading the feed from the start still
+-- builds a complete mirror. A cursor from before the newest compacted delete
+-- or truncate would miss it and is answered with 410 Gone.
+--
+-- New databases get the same objects from init-scripts/01-schema.sql.
+--
+--   psql -h <host> -U idhub_user -d idhub -f database/migrations/010_registry_changes_retention.sql
+
+BEGIN;
+
+-- Finds the earlier changes of a row when a later change of it is compacted
+CREATE INDEX IF NOT EXISTS idx_registry_changes_key
+    ON registry_changes(table_name, row_key, txid, change_id);
+
+-- One row. compacted_*: feed position compaction has processed up to.
+-- expired_*: newest compacted delete/truncate; cursors before it are expired.
+CREATE TABLE IF NOT EXISTS registry_changes_retention (
+    singleton BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (singleton),
+    compacted_txid XID8 NOT NULL DEFAULT '0',
+    compacted_change_id BIGINT NOT NULL DEFAULT 0,
+    expired_txid XID8 NOT NULL DEFAULT '0',
+    expired_change_id BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO registry_changes_retention (singleton) VALUES (TRUE)
+ON CONFLICT (singleton) DO NOTHING;
+
+COMMIT;
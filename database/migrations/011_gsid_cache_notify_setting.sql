@@ -0,0 +1,44 @@
+-- database/migrations/011_gsid_cache_notify_setting.sql
+-- Gate the gsid-service cache invalidation triggers behind a setting
+--
+-- Requires PostgreSQL 14+ (CREATE OR REPLACE TRIGGER). Safe to re-run.
+--
+--   psql -h <host> -U idhub_user -d idhub -f database/migrations/011_gsid_cache_notify_setting.sql
+
+-- Every pg_notify queues a notification that is written at commit under a
+-- cluster-wide lock, so the per-row triggers from migration 004 serialize all
+-- writers on local_subject_ids and subjects. The identifier cache they feed is
+-- only read when gsid-service runs with IDENTIFIER_LOCKS_ENABLED=false, so the
+-- triggers now fire only when idhub.gsid_cache_notify is 'on'.
+--
+-- To use the cache, enable the setting for every writer (gsid-service,
+-- table-loader, direct SQL) and reconnect them, e.g.:
+--
+--   ALTER DATABASE idhub SET idhub.gsid_cache_notify = on;
+--
+-- gsid-service's cache listener checks the setting and stays disabled while
+-- it is off, since writes would not invalidate its entries.
+CREATE OR REPLACE TRIGGER local_subject_ids_cache_invalidate
+    AFTER INSERT OR UPDATE OR DELETE ON local_subject_ids
+    FOR EACH ROW
+    WHEN (current_setting('idhub.gsid_cache_notify', true) = 'on')
+    EXECUTE FUNCTION notify_gsid_cache_invalidate();
+
+CREATE OR REPLACE TRIGGER local_subject_ids_cache_truncate
+    AFTER TRUNCATE ON local_subject_ids
+    FOR EACH STATEMENT
+    WHEN (current_setting('idhub.gsid_cache_notify', true) = 'on')
+    EXECUTE FUNCTION notify_gsid_cache_invalidate();
+
+CREATE OR REPLACE TRIGGER subjects_cache_invalidate
+    AFTER UPDATE OF global_subject_id, center_id, created_at, withdrawn OR DELETE
+    ON subjects
+    FOR EACH ROW
+    WHEN (current_setting('idhub.gsid_cache_notify', true) = 'on')
+    EXECUTE FUNCTION notify_gsid_cache_invalidate();
+
+CREATE OR REPLACE TRIGGER subjects_cache_truncate
+    AFTER TRUNCATE ON subjects
+    FOR EACH STATEMENT
+    WHEN (current_setting('idhub.gsid_cache_notify', true) = 'on')
+    EXECUTE FUNCTION notify_gsid_cache_invalidate();
@@ -10,12 +10,16 @@ logger = logging.getLogger(__name__)
 class ConflictDetector:
     """Detects data conflicts between incoming fragments and existing database state"""
 
-    def __init__(self, nocodb_client):
+    def __init__(self, nocodb_client, gsid_client=None):
         """
         Args:
             nocodb_client: NocoDBClient instance
+            gsid_client: Optional GSIDClient; when given, existing records are
+                fetched with one read-only lookup instead of paging through
+                NocoDB's local_subject_ids table
         """
         self.nocodb_client = nocodb_client
+        self.gsid_client = gsid_client
 
     def detect_conflicts(
         self,
@@ -107,6 +111,27 @@ class ConflictDetector:
         self, local_ids: List[str], id_types: List[str]
     ) -> List[Dict]:
         """Fetch ALL existing records (including duplicates)"""
+        if self.gsid_client is not None:
+            pairs = sorted(set(zip(local_ids, id_types)))
+            try:
+                records = self.gsid_client.lookup_identifiers(
+                    [
+                        {"local_subject_id": local_id, "identifier_type": id_type}
+                        for local_id, id_type in pairs
+                    ]
+                )
+                # Same exact-match semantics as the NocoDB scan below
+                pairs_set = set(pairs)
+                return [
+                    r
+                    for r in records
+                    if (r["local_subject_id"], r["identifier_type"]) in pairs_set
+                ]
+            except Exception as e:
+                logger.warning(
+                    f"GSID service lookup failed ({e}), falling back to NocoDB scan"
+                )
+
         try:
             all_records = self.nocodb_client.get_all_records("local_subject_ids")
 
@@ -1,20 +1,73 @@
 # fragment-validator/services/gsid_client.py
 import logging
+import time
+import uuid
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 import requests
 
 logger = logging.getLogger(__name__)
 
+# Times a request the service turned away (429/503 with Retry-After) is resent
+ADMISSION_RETRIES = 5
+
+# Attempts per bulk chunk on timeouts and 5xx (safe to repeat: each chunk has
+# an Idempotency-Key)
+BULK_ATTEMPTS = 2
+
+# Answers from a proxy in front of the service, which may still be running
+# (and commit) the request
+GATEWAY_STATUSES = (502, 504)
+
 
 class GSIDClient:
     """Client for GSID service API"""
 
-    def __init__(self, service_url: str, api_key: str):
+    def __init__(
+        self, service_url: str, api_key: str, client_name: str = "fragment_validator"
+    ):
         self.service_url = service_url.rstrip("/")
         self.api_key = api_key
-        self.headers = {"x-api-key": api_key, "Content-Type": "application/json"}
+        # X-Created-By is the client the service queues this one's requests under
+        self.headers = {
+            "x-api-key": api_key,
+            "Content-Type": "application/json",
+            "X-Created-By": client_name,
+        }
+
+    def _post(
+        self,
+        path: str,
+        payload: Dict,
+        timeout: int,
+        idempotency_key: Optional[str] = None,
+    ):
+        """
+        POST to the service, waiting out admission control rejections.
+
+        A 429 or 503 with Retry-After means the service did not start on the
+        request, so it is resent after the advised delay (other responses,
+        including a 503 without Retry-After, are returned as they are).
+        Registrations pass an `idempotency_key`, sent as Idempotency-Key.
+        """
+        headers = self.headers
+        if idempotency_key:
+            headers = {**headers, "Idempotency-Key": idempotency_key}
+        for attempt in range(ADMISSION_RETRIES + 1):
+            response = requests.post(
+                f"{self.service_url}{path}",
+                json=payload,
+                headers=headers,
+                timeout=timeout,
+            )
+            retry_after = _retry_after(response)
+            if retry_after is None or attempt == ADMISSION_RETRIES:
+                return response
+            logger.warning(
+                f"GSID service busy ({response.status_code}), retrying {path} in {retry_after:g}s"
+            )
+            time.sleep(retry_after)
 
     def register_subject(
         self,
@@ -23,6 +76,7 @@ class GSIDClient:
         registration_year: Optional[str] = None,
         control: bool = False,
         created_by: str = "system",
+        idempotency_key: Optional[str] = None,
     ) -> Dict:
         """
         Register a subject with one or more identifiers.
@@ -33,6 +87,8 @@ class GSIDClient:
             registration_year: Optional registration year
             control: Whether subject is a control
             created_by: Source system identifier
+            idempotency_key: Optional Idempotency-Key; pass the same key when
+                retrying this registration so it is not registered twice
 
         Returns:
             {
@@ -53,11 +109,8 @@ class GSIDClient:
         }
 
         try:
-            response = requests.post(
-                f"{self.service_url}/register/subject",
-                json=payload,
-                headers=self.headers,
-                timeout=30,
+            response = self._post(
+                "/register/subject", payload, 30, idempotency_key=idempotency_key
             )
             response.raise_for_status()
             result = response.json()
@@ -159,3 +212,264 @@ class GSIDClient:
         )
 
         return results
+
+    def register_bulk(
+        self,
+        requests_list: List[Dict],
+        chunk_size: int = 1000,
+        batch_size: int = 20,
+        timeout: int = 120,
+    ) -> List[Optional[Dict]]:
+        """
+        Register many subjects through the bulk endpoint.
+
+        Subjects are sent in chunks to POST /register/subjects, which resolves
+        each chunk in one transaction. A chunk the service rejected is retried
+        subject by subject with register_batch so one bad request does not drop
+        the rest. A chunk whose last attempt got no answer from the service
+        (timeout, connection error, 502/504) may have committed, so it is not
+        registered again under new keys; its results are None.
+
+        Args:
+            requests_list: List of registration request dicts
+            chunk_size: Number of subjects per bulk request
+            batch_size: Number of parallel workers for the per-subject fallback
+            timeout: Timeout per bulk request in seconds
+
+        Returns:
+            List of results (same order as input)
+        """
+        logger.info(
+            f"Starting bulk registration of {len(requests_list)} subjects "
+            f"(chunk size {chunk_size})..."
+        )
+
+        results = []
+        stats = {"created": 0, "existing": 0, "conflicts": 0, "errors": 0}
+
+        for start in range(0, len(requests_list), chunk_size):
+            chunk = requests_list[start : start + chunk_size]
+            payload = {
+                "subjects": [
+                    {
+                        "center_id": req["center_id"],
+                        "identifiers": req["identifiers"],
+                        "registration_year": req.get("registration_year"),
+                        "control": req.get("control", False),
+                        "created_by": req.get("created_by", "fragment_validator"),
+                    }
+                    for req in chunk
+                ]
+            }
+
+            chunk_results, answered = self._register_chunk(
+                payload, timeout, f"subjects {start}-{start + len(chunk) - 1}"
+            )
+
+            if chunk_results is None and answered:
+                logger.info("Falling back to per-subject registration for this chunk")
+                chunk_results = self.register_batch(
+                    chunk, batch_size=batch_size, timeout=timeout
+                )
+            elif chunk_results is None:
+                logger.error(
+                    f"Not registering subjects {start}-{start + len(chunk) - 1} again: "
+                    f"the chunk may have committed without an answer; rerun to pick "
+                    f"them up"
+                )
+                chunk_results = [None] * len(chunk)
+
+            for result in chunk_results:
+                if result:
+                    action = result.get("action", "unknown")
+                    if action == "create_new":
+                        stats["created"] += 1
+                    elif action == "link_existing":
+                        stats["existing"] += 1
+                    if result.get("conflicts"):
+                        stats["conflicts"] += 1
+                        logger.warning(
+                            f"Multi-GSID conflict: {result['gsid']} "
+                            f"(conflicts: {result['conflicts']})"
+                        )
+                    for warning in result.get("warnings") or []:
+                        logger.warning(f"GSID warning: {warning}")
+                else:
+                    stats["errors"] += 1
+
+            results.extend(chunk_results)
+            logger.info(
+                f"Progress: {len(results)}/{len(requests_list)} subjects processed "
+                f"(created={stats['created']}, existing={stats['existing']}, "
+                f"conflicts={stats['conflicts']}, errors={stats['errors']})"
+            )
+
+        logger.info(
+            f"✓ Bulk registration complete: {len(results)}/{len(requests_list)} subjects processed "
+            f"(created={stats['created']}, existing={stats['existing']}, "
+            f"conflicts={stats['conflicts']}, errors={stats['errors']})"
+        )
+
+        return results
+
+    def _register_chunk(
+        self, payload: Dict, timeout: int, label: str
+    ) -> Tuple[Optional[List[Dict]], bool]:
+        """
+        POST one chunk to /register/subjects, resending it with the same
+        Idempotency-Key on timeouts and 5xx.
+
+        A resend with the key waits for a still-running original and replays
+        it if it committed, so an answer to the last attempt is final.
+
+        Returns:
+            (results, answered): results is None if the chunk was not
+            registered; answered is False when the last attempt got no answer
+            from the service itself, so the chunk may have committed
+        """
+        idempotency_key = str(uuid.uuid4())
+        answered = False
+        for attempt in range(1, BULK_ATTEMPTS + 1):
+            try:
+                response = self._post(
+                    "/register/subjects",
+                    payload,
+                    timeout,
+                    idempotency_key=idempotency_key,
+                )
+                response.raise_for_status()
+                return response.json()["results"], True
+            except requests.exceptions.RequestException as e:
+                logger.error(
+                    f"Bulk registration failed for {label} "
+                    f"(attempt {attempt}/{BULK_ATTEMPTS}): {e}"
+                )
+                response = getattr(e, "response", None)
+                answered = (
+                    response is not None and response.status_code not in GATEWAY_STATUSES
+                )
+                if response is not None:
+                    logger.error(f"Response: {response.text}")
+                    if response.status_code < 500:
+                        break
+        return None, answered
+
+    def lookup_identifiers(
+        self,
+        identifiers: List[Dict[str, Optional[str]]],
+        chunk_size: int = 10000,
+        timeout: int = 120,
+    ) -> List[Dict]:
+        """
+        Fetch existing local_subject_ids rows for many identifiers (read-only).
+
+        Uses POST /lookup, which matches case-insensitively and across centers
+        and writes nothing. Identifiers are sent in chunks of `chunk_size`.
+
+        Args:
+            identifiers: List of {"local_subject_id": str, "identifier_type": str | None}
+            chunk_size: Number of identifiers per lookup request
+            timeout: Timeout per request in seconds
+
+        Returns:
+            Every matching row as {"local_subject_id", "identifier_type",
+            "center_id", "global_subject_id"} (duplicates across centers included)
+
+        Raises:
+            requests.exceptions.RequestException: If a lookup request fails
+        """
+        records = []
+        for start in range(0, len(identifiers), chunk_size):
+            chunk = identifiers[start : start + chunk_size]
+            try:
+                response = self._post("/lookup", {"identifiers": chunk}, timeout)
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Identifier lookup failed: {e}")
+                if hasattr(e, "response") and e.response is not None:
+                    logger.error(f"Response: {e.response.text}")
+                raise
+
+            for result in response.json()["identifiers"]:
+                for match in result["matches"]:
+                    records.append(
+                        {
+                            "local_subject_id": match["local_subject_id"],
+                            "identifier_type": match["identifier_type"],
+                            "center_id": match["center_id"],
+                            "global_subject_id": match["gsid"],
+                        }
+                    )
+
+        # An identifier listed twice (or matched by two case variants) returns
+        # the same row twice
+        unique = {
+            (r["center_id"], r["local_subject_id"], r["identifier_type"]): r
+            for r in records
+        }
+        logger.info(
+            f"Looked up {len(identifiers)} identifiers: {len(unique)} existing rows"
+        )
+        return list(unique.values())
+
+    def validate_ids(
+        self,
+        identifiers: List[Dict[str, Optional[str]]],
+        chunk_size: int = 100000,
+        timeout: int = 120,
+    ) -> List[Dict]:
+        """
+        Check identifiers against the GSID service's ID rules (read-only).
+
+        Uses POST /validate/ids, which validates a whole chunk in one call and
+        answers only for IDs with warnings or errors. IDs are sent as columns
+        (one list of IDs, one of types) in chunks of `chunk_size`.
+
+        Args:
+            identifiers: List of {"local_subject_id": str, "identifier_type": str}
+            chunk_size: Number of identifiers per request (service limit 200000)
+            timeout: Timeout per request in seconds
+
+        Returns:
+            One {"index", "local_subject_id", "identifier_type", "valid",
+            "severity", "warnings"} per flagged identifier, where index is its
+            position in `identifiers`
+
+        Raises:
+            requests.exceptions.RequestException: If a request fails
+        """
+        flagged = []
+        for start in range(0, len(identifiers), chunk_size):
+            chunk = identifiers[start : start + chunk_size]
+            payload = {
+                "local_subject_ids": [i["local_subject_id"] for i in chunk],
+                "identifier_types": [i.get("identifier_type") or "primary" for i in chunk],
+            }
+            try:
+                response = self._post("/validate/ids", payload, timeout)
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                logger.error(f"ID validation failed: {e}")
+                if hasattr(e, "response") and e.response is not None:
+                    logger.error(f"Response: {e.response.text}")
+                raise
+
+            for result in response.json()["results"]:
+                flagged.append({**result, "index": start + result["index"]})
+
+        invalid = sum(1 for r in flagged if not r["valid"])
+        logger.info(
+            f"Validated {len(identifiers)} identifiers: {invalid} invalid, "
+            f"{len(flagged) - invalid} with warnings"
+        )
+        return flagged
+
+
+def _retry_after(response) -> Optional[float]:
+    """Seconds to wait before resending, if the service turned the request away"""
+    if response.status_code not in (429, 503):
+        return None
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, TypeError, ValueError):
+        return None
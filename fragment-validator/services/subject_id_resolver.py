@@ -3,6 +3,7 @@ import logging
 from typing import Dict, List, Optional
 
 import pandas as pd
+import requests
 
 from .center_resolver import CenterResolver
 from .gsid_client import GSIDClient
@@ -28,7 +29,7 @@ class SubjectIDResolver:
         subject_id_type_field: Optional[str] = None,
     ) -> Dict:
         """
-        Resolve subject IDs for entire dataset with parallel processing.
+        Resolve subject IDs for entire dataset through the bulk endpoint.
 
         Returns dict with:
             - gsids: List of resolved GSIDs (one per row)
@@ -103,9 +104,14 @@ class SubjectIDResolver:
 
         logger.info(f"Prepared {len(requests_list)} registration requests")
 
-        # Parallel register with GSID service
-        logger.info(f"Calling GSID service with {batch_size} parallel workers...")
-        results = self.gsid_client.register_batch(
+        # Drop IDs the GSID service would reject before registering anything
+        requests_list, row_to_request_map = self._prescreen(
+            requests_list, row_to_request_map
+        )
+
+        # Bulk register with GSID service (falls back to parallel per-subject calls)
+        logger.info("Calling GSID service bulk registration...")
+        results = self.gsid_client.register_bulk(
             requests_list, batch_size=batch_size, timeout=120
         )
 
@@ -185,4 +191,61 @@ class SubjectIDResolver:
             "gsids": gsids,
             "local_id_records": local_id_records,
             "summary": summary,
-        }
\ No newline at end of file
+        }
+
+    def _prescreen(self, requests_list: List[Dict], row_to_request_map: List):
+        """
+        Validate every identifier of every request in one pass through the
+        GSID service and remove the invalid ones; requests left without
+        identifiers are skipped. If validation is unavailable, everything is
+        sent to registration as before.
+        """
+        flat = [
+            (i, identifier)
+            for i, request in enumerate(requests_list)
+            for identifier in request["identifiers"]
+        ]
+        if not flat:
+            return requests_list, row_to_request_map
+
+        try:
+            flagged = self.gsid_client.validate_ids([identifier for _, identifier in flat])
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"ID pre-screen unavailable, registering without it: {e}")
+            return requests_list, row_to_request_map
+
+        invalid = set()
+        for result in flagged:
+            i, identifier = flat[result["index"]]
+            message = (
+                f"Row {row_to_request_map[i]}: {identifier['identifier_type']}="
+                f"'{identifier['local_subject_id']}': {', '.join(result['warnings'])}"
+            )
+            if result["valid"]:
+                logger.warning(f"ID warning: {message}")
+            else:
+                logger.warning(f"Invalid ID dropped: {message}")
+                invalid.add(result["index"])
+
+        if not invalid:
+            return requests_list, row_to_request_map
+
+        kept_requests, kept_rows = [], []
+        position = 0
+        for request, row_idx in zip(requests_list, row_to_request_map):
+            identifiers = []
+            for identifier in request["identifiers"]:
+                if position not in invalid:
+                    identifiers.append(identifier)
+                position += 1
+            if not identifiers:
+                logger.warning(f"Row {row_idx}: No valid subject IDs after pre-screen")
+                continue
+            kept_requests.append({**request, "identifiers": identifiers})
+            kept_rows.append(row_idx)
+
+        logger.info(
+            f"Pre-screen dropped {len(invalid)} invalid IDs; "
+            f"{len(kept_requests)} registration requests remain"
+        )
+        return kept_requests, kept_rows
\ No newline at end of file
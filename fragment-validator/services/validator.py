@@ -28,7 +28,9 @@ class FragmentValidator:
         self.nocodb_client = nocodb_client
         self.subject_id_resolver = subject_id_resolver
         self.schema_validator = SchemaValidator(nocodb_client)
-        self.conflict_detector = ConflictDetector(nocodb_client)
+        self.conflict_detector = ConflictDetector(
+            nocodb_client, subject_id_resolver.gsid_client
+        )
 
     def process_local_file(
         self,
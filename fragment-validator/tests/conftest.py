@@ -227,6 +227,9 @@ def mock_gsid_client():
         return results
 
     mock.register_batch.side_effect = mock_register_batch
+    mock.register_bulk.side_effect = mock_register_batch
+    mock.lookup_identifiers.return_value = []
+    mock.validate_ids.return_value = []
     return mock
 
 
@@ -0,0 +1,75 @@
+# fragment-validator/tests/test_conflict_detector.py
+from unittest.mock import Mock
+
+import pandas as pd
+import pytest
+from services.conflict_detector import ConflictDetector
+
+
+@pytest.fixture
+def incoming():
+    return pd.DataFrame(
+        {
+            "local_subject_id": ["ID001", "ID002"],
+            "identifier_type": ["consortium_id", "consortium_id"],
+            "center_id": [1, 1],
+            "global_subject_id": ["GSID-A", "GSID-B"],
+        }
+    )
+
+
+class TestConflictDetector:
+    """Unit tests for ConflictDetector"""
+
+    def test_uses_gsid_lookup_instead_of_nocodb_scan(self, incoming):
+        """Test existing rows come from one GSID service lookup"""
+        nocodb_client = Mock()
+        gsid_client = Mock()
+        gsid_client.lookup_identifiers.return_value = [
+            {
+                "local_subject_id": "ID001",
+                "identifier_type": "consortium_id",
+                "center_id": 2,
+                "global_subject_id": "GSID-A",
+            },
+            {
+                "local_subject_id": "ID002",
+                "identifier_type": "consortium_id",
+                "center_id": 1,
+                "global_subject_id": "GSID-OTHER",
+            },
+        ]
+
+        conflicts, summary = ConflictDetector(nocodb_client, gsid_client).detect_conflicts(
+            "batch_1", incoming
+        )
+
+        nocodb_client.get_all_records.assert_not_called()
+        gsid_client.lookup_identifiers.assert_called_once_with(
+            [
+                {"local_subject_id": "ID001", "identifier_type": "consortium_id"},
+                {"local_subject_id": "ID002", "identifier_type": "consortium_id"},
+            ]
+        )
+        assert summary["by_type"] == {"center_mismatch": 1, "multi_gsid": 1}
+
+    def test_falls_back_to_nocodb_when_lookup_fails(self, incoming):
+        """Test the NocoDB scan is used if the GSID service is unavailable"""
+        nocodb_client = Mock()
+        nocodb_client.get_all_records.return_value = [
+            {
+                "local_subject_id": "ID001",
+                "identifier_type": "consortium_id",
+                "center_id": 2,
+                "global_subject_id": "GSID-A",
+            }
+        ]
+        gsid_client = Mock()
+        gsid_client.lookup_identifiers.side_effect = Exception("down")
+
+        conflicts, _ = ConflictDetector(nocodb_client, gsid_client).detect_conflicts(
+            "batch_1", incoming
+        )
+
+        nocodb_client.get_all_records.assert_called_once_with("local_subject_ids")
+        assert [c["conflict_type"] for c in conflicts] == ["center_mismatch"]
@@ -29,6 +29,21 @@ class TestGSIDClient:
             assert result["gsid"] == "GSID-001"
             assert result["action"] == "create_new"
             mock_post.assert_called_once()
+            assert "Idempotency-Key" not in mock_post.call_args.kwargs["headers"]
+
+    def test_register_subject_forwards_idempotency_key(self, client):
+        """Test a caller's key is sent so its retry is replayed, not re-registered"""
+        with patch("requests.post") as mock_post:
+            mock_post.return_value.status_code = 200
+            mock_post.return_value.json.return_value = {"gsid": "GSID-001"}
+
+            client.register_subject(
+                center_id=1,
+                identifiers=[{"local_subject_id": "LOCAL001", "identifier_type": "consortium_id"}],
+                idempotency_key="row-17",
+            )
+
+            assert mock_post.call_args.kwargs["headers"]["Idempotency-Key"] == "row-17"
 
     def test_register_batch_success(self, client):
         """Test batch registration with single batch"""
@@ -51,9 +66,226 @@ class TestGSIDClient:
             assert results[1]["gsid"] == "GSID-002"
             assert mock_register_subject.call_count == 2
 
+    def test_register_bulk_chunks_requests(self, client):
+        """Test bulk registration posts chunks and keeps input order"""
+        requests_list = [
+            {"center_id": 1, "identifiers": [{"local_subject_id": f"ID00{i}", "identifier_type": "consortium_id"}]}
+            for i in range(3)
+        ]
+
+        def fake_post(url, json, headers, timeout):
+            response = Mock()
+            response.raise_for_status = Mock()
+            response.json.return_value = {
+                "results": [
+                    {"gsid": f"GSID-{s['identifiers'][0]['local_subject_id']}", "action": "create_new"}
+                    for s in json["subjects"]
+                ]
+            }
+            return response
+
+        with patch("requests.post", side_effect=fake_post) as mock_post:
+            results = client.register_bulk(requests_list, chunk_size=2)
+
+        assert [r["gsid"] for r in results] == ["GSID-ID000", "GSID-ID001", "GSID-ID002"]
+        assert mock_post.call_count == 2
+        assert mock_post.call_args_list[0][0][0] == "http://test-gsid-service/register/subjects"
+        assert len(mock_post.call_args_list[0][1]["json"]["subjects"]) == 2
+
+    def test_register_bulk_falls_back_on_failure(self, client):
+        """Test a chunk the service rejected is retried per subject"""
+        requests_list = [
+            {"center_id": 1, "identifiers": [{"local_subject_id": "ID001", "identifier_type": "consortium_id"}]},
+        ]
+        rejected = Mock(status_code=422, text="bad subject")
+        rejected.raise_for_status.side_effect = requests.exceptions.HTTPError(
+            "422", response=rejected
+        )
+
+        with patch("requests.post", return_value=rejected) as mock_post, patch.object(
+            client, "register_batch"
+        ) as mock_register_batch:
+            mock_register_batch.return_value = [{"gsid": "GSID-001", "action": "create_new"}]
+
+            results = client.register_bulk(requests_list)
+
+        assert results == [{"gsid": "GSID-001", "action": "create_new"}]
+        assert mock_post.call_count == 1
+        mock_register_batch.assert_called_once()
+
+    def test_register_bulk_falls_back_after_server_error(self, client):
+        """Test a chunk the service answered with 500 to its last resend is retried per subject"""
+        requests_list = [
+            {"center_id": 1, "identifiers": [{"local_subject_id": "ID001", "identifier_type": "consortium_id"}]},
+        ]
+        failed = Mock(status_code=500, text="error")
+        failed.raise_for_status.side_effect = requests.exceptions.HTTPError(
+            "500", response=failed
+        )
+
+        with patch(
+            "requests.post", side_effect=[requests.exceptions.ReadTimeout("slow"), failed]
+        ), patch.object(client, "register_batch") as mock_register_batch:
+            mock_register_batch.return_value = [{"gsid": "GSID-001", "action": "create_new"}]
+
+            client.register_bulk(requests_list)
+
+        mock_register_batch.assert_called_once()
+
+    def test_register_bulk_unanswered_chunk_is_not_reregistered(self, client):
+        """Test a chunk that may have committed is reported failed, not re-registered"""
+        requests_list = [
+            {"center_id": 1, "identifiers": [{"local_subject_id": f"ID00{i}", "identifier_type": "consortium_id"}]}
+            for i in range(2)
+        ]
+        gateway = Mock(status_code=504, text="gateway timeout")
+        gateway.raise_for_status.side_effect = requests.exceptions.HTTPError(
+            "504", response=gateway
+        )
+
+        for last in (requests.exceptions.ReadTimeout("slow"), requests.exceptions.ConnectionError("reset"), gateway):
+            with patch(
+                "requests.post", side_effect=[requests.exceptions.ReadTimeout("slow"), last]
+            ) as mock_post, patch.object(client, "register_batch") as mock_register_batch:
+                results = client.register_bulk(requests_list)
+
+            assert results == [None, None]
+            mock_register_batch.assert_not_called()
+            keys = {c.kwargs["headers"]["Idempotency-Key"] for c in mock_post.call_args_list}
+            assert mock_post.call_count == 2 and len(keys) == 1
+
+    def test_register_bulk_resends_chunk_with_same_key(self, client):
+        """Test a timed-out chunk is resent once with its Idempotency-Key"""
+        requests_list = [
+            {"center_id": 1, "identifiers": [{"local_subject_id": "ID001", "identifier_type": "consortium_id"}]},
+        ]
+        ok = Mock(status_code=200)
+        ok.json.return_value = {"results": [{"gsid": "GSID-001", "action": "create_new"}]}
+
+        with patch(
+            "requests.post", side_effect=[requests.exceptions.ReadTimeout("slow"), ok]
+        ) as mock_post, patch.object(client, "register_batch") as mock_register_batch:
+            results = client.register_bulk(requests_list)
+
+        assert results == [{"gsid": "GSID-001", "action": "create_new"}]
+        mock_register_batch.assert_not_called()
+        keys = [c.kwargs["headers"]["Idempotency-Key"] for c in mock_post.call_args_list]
+        assert len(keys) == 2 and keys[0] == keys[1]
+
+    def test_lookup_identifiers_flattens_matches(self, client):
+        """Test lookup posts chunks to /lookup and returns existing rows"""
+        identifiers = [
+            {"local_subject_id": f"ID00{i}", "identifier_type": "consortium_id"}
+            for i in range(3)
+        ]
+
+        def fake_post(url, json, headers, timeout):
+            response = Mock()
+            response.raise_for_status = Mock()
+            response.json.return_value = {
+                "identifiers": [
+                    {
+                        "local_subject_id": i["local_subject_id"],
+                        "matches": [
+                            {
+                                "local_subject_id": i["local_subject_id"],
+                                "identifier_type": "consortium_id",
+                                "center_id": 1,
+                                "gsid": f"GSID-{i['local_subject_id']}",
+                            }
+                        ]
+                        if i["local_subject_id"] != "ID001"
+                        else [],
+                    }
+                    for i in json["identifiers"]
+                ]
+            }
+            return response
+
+        with patch("requests.post", side_effect=fake_post) as mock_post:
+            records = client.lookup_identifiers(identifiers, chunk_size=2)
+
+        assert mock_post.call_count == 2
+        assert mock_post.call_args_list[0][0][0] == "http://test-gsid-service/lookup"
+        assert [r["global_subject_id"] for r in records] == ["GSID-ID000", "GSID-ID002"]
+        assert records[0] == {
+            "local_subject_id": "ID000",
+            "identifier_type": "consortium_id",
+            "center_id": 1,
+            "global_subject_id": "GSID-ID000",
+        }
+
+    def test_lookup_identifiers_raises_on_failure(self, client):
+        """Test lookup errors propagate to the caller"""
+        with patch(
+            "requests.post", side_effect=requests.exceptions.ConnectionError("down")
+        ):
+            with pytest.raises(requests.exceptions.ConnectionError):
+                client.lookup_identifiers([{"local_subject_id": "ID001"}])
+
+    def test_validate_ids_sends_columns(self, client):
+        """Test IDs are validated in chunks and flagged indexes are global"""
+        identifiers = [
+            {"local_subject_id": "IBDGC001", "identifier_type": "consortium_id"},
+            {"local_subject_id": "test1", "identifier_type": None},
+            {"local_subject_id": "IBDGC003", "identifier_type": "consortium_id"},
+        ]
+
+        def fake_post(url, json, headers, timeout):
+            response = Mock()
+            response.raise_for_status = Mock()
+            response.json.return_value = {
+                "results": [
+                    {"index": i, "local_subject_id": value, "valid": False,
+                     "severity": "error", "warnings": ["ID matches error pattern: ^test"]}
+                    for i, value in enumerate(json["local_subject_ids"])
+                    if value.startswith("test")
+                ]
+            }
+            return response
+
+        with patch("requests.post", side_effect=fake_post) as mock_post:
+            flagged = client.validate_ids(identifiers, chunk_size=2)
+
+        assert mock_post.call_count == 2
+        assert mock_post.call_args_list[0][0][0] == "http://test-gsid-service/validate/ids"
+        assert mock_post.call_args_list[0][1]["json"] == {
+            "local_subject_ids": ["IBDGC001", "test1"],
+            "identifier_types": ["consortium_id", "primary"],
+        }
+        assert [(r["index"], r["valid"]) for r in flagged] == [(1, False)]
+
+    def test_validate_ids_raises_on_failure(self, client):
+        """Test validation errors propagate to the caller"""
+        with patch("requests.post", side_effect=requests.exceptions.Timeout("slow")):
+            with pytest.raises(requests.exceptions.Timeout):
+                client.validate_ids([{"local_subject_id": "ID001"}])
+
+    def test_waits_out_admission_rejection(self, client):
+        """Test 429 with Retry-After is retried; 503 without it is not"""
+        busy = Mock(status_code=429, headers={"Retry-After": "1"})
+        ok = Mock(status_code=200, headers={})
+        ok.json.return_value = {"identifiers": []}
+        with (
+            patch("requests.post", side_effect=[busy, ok]) as mock_post,
+            patch("services.gsid_client.time.sleep") as mock_sleep,
+        ):
+            client.lookup_identifiers([{"local_subject_id": "ID001"}])
+
+        assert mock_post.call_count == 2
+        mock_sleep.assert_called_once_with(1.0)
+
+        failed = Mock(status_code=503, headers={})
+        failed.raise_for_status.side_effect = requests.exceptions.HTTPError("503")
+        with patch("requests.post", return_value=failed) as mock_post:
+            with pytest.raises(requests.exceptions.HTTPError):
+                client.lookup_identifiers([{"local_subject_id": "ID001"}])
+        assert mock_post.call_count == 1
+
     def test_headers_include_api_key(self, client):
         """Test that API key is included in headers"""
         assert client.headers["x-api-key"] == "test-key"
+        assert client.headers["X-Created-By"] == "fragment_validator"
 
     def test_service_url_trailing_slash_removed(self):
         """Test that trailing slash is removed from service URL"""
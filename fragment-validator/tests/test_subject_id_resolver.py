@@ -119,7 +119,7 @@ class TestSubjectIDResolver:
         
         # Check that the correct center IDs were used in the request to gsid_client
         # The mock CenterResolver in conftest maps "MSSM" -> 1 and "Cedars-Sinai" -> 2
-        gsid_requests = mock_gsid_client.register_batch.call_args[0][0]
+        gsid_requests = mock_gsid_client.register_bulk.call_args[0][0]
         assert gsid_requests[0]['center_id'] == 1
         assert gsid_requests[1]['center_id'] == 2
 
@@ -147,3 +147,44 @@ class TestSubjectIDResolver:
             assert "identifier_type" in record
             assert "global_subject_id" in record
             assert "created_by" in record
+
+    def test_prescreen_drops_invalid_ids(self, mock_gsid_client, center_resolver):
+        """Test invalid IDs are removed before registration and empty rows skipped"""
+        resolver = SubjectIDResolver(mock_gsid_client, center_resolver)
+        mock_gsid_client.validate_ids.return_value = [
+            {"index": 1, "valid": False, "severity": "error", "warnings": ["ID matches error pattern: ^test"]},
+            {"index": 2, "valid": False, "severity": "error", "warnings": ["ID matches error pattern: ^demo"]},
+            {"index": 3, "valid": True, "severity": "warning", "warnings": ["ID contains special characters"]},
+        ]
+
+        data = pd.DataFrame(
+            {"consortium_id": ["ID001", "DEMO2", "ID#3"], "local_id": ["TEST1", None, None]}
+        )
+
+        result = resolver.resolve_batch(
+            data, candidate_fields=["consortium_id", "local_id"], default_center_id=0
+        )
+
+        screened = mock_gsid_client.validate_ids.call_args[0][0]
+        assert [i["local_subject_id"] for i in screened] == ["ID001", "TEST1", "DEMO2", "ID#3"]
+        gsid_requests = mock_gsid_client.register_bulk.call_args[0][0]
+        assert [[i["local_subject_id"] for i in r["identifiers"]] for r in gsid_requests] == [
+            ["ID001"],
+            ["ID#3"],
+        ]
+        assert result["gsids"][1] is None
+        assert result["gsids"][2] == "GSID-NEW-ID#3"
+
+    def test_prescreen_unavailable_registers_all(self, mock_gsid_client, center_resolver):
+        """Test a failed pre-screen falls back to registering every ID"""
+        import requests
+
+        resolver = SubjectIDResolver(mock_gsid_client, center_resolver)
+        mock_gsid_client.validate_ids.side_effect = requests.exceptions.ConnectionError("down")
+
+        data = pd.DataFrame({"consortium_id": ["ID001", "TEST1"]})
+
+        result = resolver.resolve_batch(data, candidate_fields=["consortium_id"])
+
+        assert len(mock_gsid_client.register_bulk.call_args[0][0]) == 2
+        assert result["summary"]["resolved"] == 2
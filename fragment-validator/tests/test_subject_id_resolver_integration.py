@@ -33,6 +33,8 @@ class TestMultiCandidateIntegration:
             return results
 
         client.register_batch = mock_register_batch
+        client.register_bulk = mock_register_batch
+        client.validate_ids.return_value = []
         return client
 
     def test_resolve_batch_with_multiple_candidates(self, mock_gsid_client, center_resolver):
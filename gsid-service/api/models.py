@@ -1,8 +1,9 @@
 # gsid-service/api/models.py
 from datetime import date
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
+from services.gsid_generator import MAX_GSIDS_PER_REQUEST
 
 
 class IdentifierInput(BaseModel):
@@ -58,11 +59,135 @@ class SubjectRegistrationResponse(BaseModel):
     identifiers_linked: int
     conflicts: Optional[List[str]] = None
     conflict_resolution: Optional[str] = None
+    warnings: Optional[List[str]] = None
     message: Optional[str] = None
 
 
+# Upper bound for one bulk registration call (one DB transaction)
+MAX_BATCH_SUBJECTS = 5000
+
+
+# Longest accepted Idempotency-Key header (idempotency_keys.idempotency_key)
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
+
+
+# Most GSIDs per GET /subjects?gsid=... request (they travel in the URL)
+MAX_SUBJECT_DETAIL_GSIDS = 500
+
+
+# Longest accepted line of a POST /register/stream body
+MAX_STREAM_LINE_BYTES = 64 * 1024
+
+
+class BatchSubjectRegistrationRequest(BaseModel):
+    """Register many subjects in one request"""
+
+    subjects: List[SubjectRegistrationRequest] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_SUBJECTS
+    )
+
+
+class BatchSubjectRegistrationResponse(BaseModel):
+    """Response for bulk registration (results in input order)"""
+
+    results: List[SubjectRegistrationResponse]
+    summary: Dict[str, int]
+
+
+class GSIDReservationRequest(BaseModel):
+    """Pre-allocate a number of GSIDs (e.g. for legacy imports)"""
+
+    count: int = Field(..., ge=1, le=MAX_GSIDS_PER_REQUEST)
+    reserved_by: Optional[str] = Field(default=None, max_length=100)
+
+
+# Upper bound for each list of one lookup call
+MAX_LOOKUP_ITEMS = 50_000
+
+
+class LookupIdentifier(BaseModel):
+    """Identifier to look up (identifier_type omitted = any type)"""
+
+    local_subject_id: str = Field(..., min_length=1, max_length=255)
+    identifier_type: Optional[str] = Field(default=None, max_length=50)
+
+    @field_validator("local_subject_id")
+    @classmethod
+    def validate_local_id(cls, v):
+        if not v or not v.strip():
+            raise ValueError("local_subject_id cannot be empty")
+        return v.strip()
+
+
+class LookupRequest(BaseModel):
+    """Read-only lookup of many identifiers and/or GSIDs"""
+
+    identifiers: List[LookupIdentifier] = Field(
+        default_factory=list, max_length=MAX_LOOKUP_ITEMS
+    )
+    gsids: List[str] = Field(default_factory=list, max_length=MAX_LOOKUP_ITEMS)
+
+    @model_validator(mode="after")
+    def require_something(self):
+        if not self.identifiers and not self.gsids:
+            raise ValueError("Provide at least one identifier or GSID")
+        return self
+
+
+class LookupResponse(BaseModel):
+    """Lookup results, each list in input order"""
+
+    identifiers: List[Dict[str, Any]]
+    subjects: List[Dict[str, Any]]
+    summary: Dict[str, int]
+
+
+# Most IDs per POST /validate/ids call (a large fragment in one request)
+MAX_VALIDATE_IDS = 200_000
+
+
+class ValidateIDsRequest(BaseModel):
+    """IDs to pre-screen, as columns: one type for all, or one type per ID"""
+
+    local_subject_ids: List[Optional[str]] = Field(..., max_length=MAX_VALIDATE_IDS)
+    identifier_types: Optional[List[Optional[str]]] = None
+    identifier_type: str = "primary"
+
+    @model_validator(mode="after")
+    def types_align(self):
+        if self.identifier_types is not None and len(self.identifier_types) != len(
+            self.local_subject_ids
+        ):
+            raise ValueError("identifier_types must have one entry per local_subject_id")
+        return self
+
+
+class ValidateIDsResponse(BaseModel):
+    """Only IDs with warnings or errors are listed, by input index"""
+
+    results: List[Dict[str, Any]]
+    summary: Dict[str, int]
+
+
+# Largest page of GET /changes
+MAX_CHANGE_FEED_PAGE = 10_000
+
+
+class ChangeFeedResponse(BaseModel):
+    """One page of the subject / local ID change feed, oldest first"""
+
+    changes: List[Dict[str, Any]]
+    next_cursor: str
+    has_more: bool
+
+
 class HealthResponse(BaseModel):
     """Health check response"""
 
     status: str
     database: str = "connected"
+    pool: Optional[Dict[str, Any]] = None
+    reservoir: Optional[Dict[str, Any]] = None
+    cache: Optional[Dict[str, Any]] = None
+    audit: Optional[Dict[str, Any]] = None
+    admission: Optional[Dict[str, Any]] = None
@@ -1,14 +1,43 @@
 # gsid-service/api/routes.py
+import hashlib
+import itertools
+import json
 import logging
+import uuid
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, List, Optional
 
-from core.database import get_db_connection
+from core.admission import get_admission_stats
+from core.config import settings
+from core.database import PoolTimeoutError, get_pool_stats, pooled_connection
 from core.security import verify_api_key
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+from services.audit_writer import get_audit_writer_stats
+from services.gsid_reservoir import get_reservoir_stats
+from services.identifier_cache import get_cache_stats
 
 from .models import (
+    BatchSubjectRegistrationRequest,
+    BatchSubjectRegistrationResponse,
+    ChangeFeedResponse,
+    GSIDReservationRequest,
     HealthResponse,
+    LookupRequest,
+    LookupResponse,
+    MAX_CHANGE_FEED_PAGE,
+    MAX_IDEMPOTENCY_KEY_LENGTH,
+    MAX_STREAM_LINE_BYTES,
+    MAX_SUBJECT_DETAIL_GSIDS,
     SubjectRegistrationRequest,
     SubjectRegistrationResponse,
+    ValidateIDsRequest,
+    ValidateIDsResponse,
 )
 
 logger = logging.getLogger(__name__)
@@ -16,8 +45,9 @@ router = APIRouter()
 
 
 @router.post("/register/subject", dependencies=[Depends(verify_api_key)])
-async def register_subject(
+def register_subject(
     request: SubjectRegistrationRequest,
+    idempotency_key: Optional[str] = Header(None, max_length=MAX_IDEMPOTENCY_KEY_LENGTH),
 ) -> SubjectRegistrationResponse:
     """
     Register ONE subject with one or more identifiers.
@@ -29,6 +59,9 @@ async def register_subject(
     - If multiple GSIDs found → flags conflict, uses oldest
     - Links ALL identifiers to chosen GSID
 
+    With an Idempotency-Key header, a repeated request returns the stored
+    response of the first one instead of registering again.
+
     Example request:
     {
         "center_id": 24,
@@ -41,9 +74,10 @@ async def register_subject(
         "created_by": "redcap_pipeline"
     }
     """
+    from services import idempotency
     from services.identity_resolution import resolve_subject_with_multiple_ids
 
-    conn = get_db_connection()
+    endpoint = "/register/subject"
     try:
         # Convert Pydantic models to dicts
         identifiers = [
@@ -54,125 +88,782 @@ async def register_subject(
             for id in request.identifiers
         ]
 
-        result = resolve_subject_with_multiple_ids(
-            conn=conn,
-            center_id=request.center_id,
+        with pooled_connection() as conn:
+            before_commit = None
+            if idempotency_key:
+                stored = idempotency.claim(
+                    conn,
+                    endpoint,
+                    idempotency_key,
+                    idempotency.request_fingerprint(request.model_dump(mode="json")),
+                )
+                if stored is not None:
+                    return _replayed(stored)
+
+                def before_commit(cursor, result):
+                    idempotency.store(
+                        cursor,
+                        endpoint,
+                        idempotency_key,
+                        _subject_response(result).model_dump(mode="json"),
+                    )
+
+            result = resolve_subject_with_multiple_ids(
+                conn=conn,
+                center_id=request.center_id,
+                identifiers=identifiers,
+                registration_year=request.registration_year,
+                control=request.control,
+                created_by=request.created_by,
+                before_commit=before_commit,
+            )
+
+        return _subject_response(result)
+
+    except idempotency.IdempotencyKeyReusedError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except PoolTimeoutError as e:
+        logger.error(f"Error registering subject: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error registering subject: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _subject_response(result: dict) -> SubjectRegistrationResponse:
+    return SubjectRegistrationResponse(
+        gsid=result["gsid"],
+        action=result["action"],
+        identifiers_linked=result["identifiers_linked"],
+        conflicts=result["conflicts"],
+        conflict_resolution=result["conflict_resolution"],
+        warnings=result.get("warnings"),
+        message=f"Successfully registered subject with {result['identifiers_linked']} identifier(s)",
+    )
+
+
+def _replayed(stored: dict) -> JSONResponse:
+    """Stored response of an Idempotency-Key, marked as a replay"""
+    return JSONResponse(content=stored, headers={"Idempotent-Replayed": "true"})
+
+
+def _subject_dict(subject: SubjectRegistrationRequest) -> dict:
+    return {
+        "center_id": subject.center_id,
+        "identifiers": [
+            {
+                "local_subject_id": id.local_subject_id,
+                "identifier_type": id.identifier_type,
+            }
+            for id in subject.identifiers
+        ],
+        "registration_year": subject.registration_year,
+        "control": subject.control,
+        "created_by": subject.created_by,
+    }
+
+
+@router.post("/register/subjects", dependencies=[Depends(verify_api_key)])
+def register_subjects(
+    request: BatchSubjectRegistrationRequest,
+    idempotency_key: Optional[str] = Header(None, max_length=MAX_IDEMPOTENCY_KEY_LENGTH),
+) -> BatchSubjectRegistrationResponse:
+    """
+    Register MANY subjects in one call (bulk variant of /register/subject).
+
+    All subjects are resolved in a single transaction with set-based queries.
+    Subjects are processed in input order, so later subjects see identifiers
+    linked by earlier ones exactly as with consecutive single calls.
+
+    Results are returned in input order with the same action, conflict and
+    warning semantics as /register/subject. If the transaction fails, nothing
+    is written and the whole request fails. Idempotency-Key works as for
+    /register/subject.
+
+    Example request:
+    {
+        "subjects": [
+            {
+                "center_id": 24,
+                "identifiers": [{"local_subject_id": "IBDGC-013", "identifier_type": "local_id"}],
+                "created_by": "fragment_validator"
+            },
+            ...
+        ]
+    }
+    """
+    from services import idempotency
+    from services.identity_resolution import resolve_subjects_batch
+
+    endpoint = "/register/subjects"
+    subjects = [_subject_dict(subject) for subject in request.subjects]
+
+    try:
+        with pooled_connection() as conn:
+            before_commit = None
+            if idempotency_key:
+                stored = idempotency.claim(
+                    conn,
+                    endpoint,
+                    idempotency_key,
+                    idempotency.request_fingerprint(request.model_dump(mode="json")),
+                )
+                if stored is not None:
+                    return _replayed(stored)
+
+                def before_commit(cursor, results):
+                    idempotency.store(
+                        cursor,
+                        endpoint,
+                        idempotency_key,
+                        _batch_response(results).model_dump(mode="json"),
+                    )
+
+            results = resolve_subjects_batch(
+                conn=conn, subjects=subjects, before_commit=before_commit
+            )
+
+        return _batch_response(results)
+
+    except idempotency.IdempotencyKeyReusedError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except PoolTimeoutError as e:
+        logger.error(f"Error registering subject batch: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error registering subject batch: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _batch_response(results: List[dict]) -> BatchSubjectRegistrationResponse:
+    summary = {"total": len(results)}
+    for result in results:
+        summary[result["action"]] = summary.get(result["action"], 0) + 1
+
+    return BatchSubjectRegistrationResponse(
+        results=[
+            SubjectRegistrationResponse(
+                gsid=result["gsid"],
+                action=result["action"],
+                identifiers_linked=result["identifiers_linked"],
+                conflicts=result["conflicts"],
+                conflict_resolution=result["conflict_resolution"],
+                warnings=result["warnings"],
+            )
+            for result in results
+        ],
+        summary=summary,
+    )
+
+
+class _RequestBodyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse for handlers that keep reading the request body while
+    the response streams.
+
+    Starlette's StreamingResponse listens for disconnects by consuming
+    receive() messages, which would swallow unread body chunks. Here a dropped
+    client surfaces through request.stream() / send() instead.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+
+def _ndjson(event: dict) -> bytes:
+    return (json.dumps(event, default=str) + "\n").encode()
+
+
+async def _iter_body_lines(request: Request):
+    """Yield the non-blank lines of the request body as they arrive"""
+    buffer = b""
+    async for data in request.stream():
+        buffer += data
+        *lines, buffer = buffer.split(b"\n")
+        if len(buffer) > MAX_STREAM_LINE_BYTES:
+            raise ValueError(f"Line longer than {MAX_STREAM_LINE_BYTES} bytes")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+
+def _commit_stream_chunk(import_id, subjects, first_line, end_line, summary, invalid_lines):
+    from services.registration_stream import commit_chunk
+
+    with pooled_connection() as conn:
+        return commit_chunk(
+            conn, import_id, subjects, first_line, end_line, summary, invalid_lines
+        )
+
+
+def _start_stream_import(import_id, created_by, offset):
+    from services.registration_stream import start_import
+
+    with pooled_connection() as conn:
+        return start_import(conn, import_id, created_by, offset)
+
+
+@router.post("/register/stream", dependencies=[Depends(verify_api_key)])
+async def register_stream(
+    request: Request,
+    import_id: Optional[str] = Query(None, min_length=1, max_length=100),
+    offset: int = Query(0, ge=0),
+    created_by: str = Query("system", max_length=100),
+) -> StreamingResponse:
+    """
+    Register an unbounded stream of subjects sent as newline-delimited JSON.
+
+    Each line is one /register/subject request body. Lines are registered in
+    chunks of REGISTRATION_STREAM_CHUNK_SIZE, one transaction per chunk, and
+    results stream back (application/x-ndjson) as each chunk commits, so
+    memory stays flat however large the upload is:
+
+        {"event": "start", "import_id": "...", "resume_from": 0}
+        {"line": 0, "gsid": "...", "action": "create_new", ...}
+        {"line": 1, "error": "..."}                  # invalid line, not retried
+        {"event": "chunk_committed", "committed_lines": 1000}
+        ...
+        {"event": "complete", "import_id": "...", "committed_lines": N, "summary": {...}}
+
+    If the stream fails part-way, an {"event": "error", ...} line reports the
+    committed_lines to resume from. To resume after a drop, re-send with the
+    same import_id: either the whole file again (offset=0), or only the lines
+    from `offset` on (offset must not exceed committed_lines). Already
+    committed lines are skipped. Line numbers are 0-based and count non-blank
+    lines. GET /register/stream/{import_id} reports progress.
+    """
+    from services.registration_stream import ImportConflictError
+
+    import_id = import_id or uuid.uuid4().hex
+    try:
+        progress = await run_in_threadpool(
+            _start_stream_import, import_id, created_by, offset
+        )
+    except ImportConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except PoolTimeoutError as e:
+        logger.error(f"Error starting import {import_id}: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error starting import {import_id}: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    chunk_size = settings.REGISTRATION_STREAM_CHUNK_SIZE
+
+    async def stream():
+        committed = progress["committed_lines"]
+        summary = dict(progress["summary"] or {})
+        yield _ndjson({"event": "start", "import_id": import_id, "resume_from": committed})
+
+        line_no = offset
+        subjects, output = [], []
+
+        async def flush():
+            nonlocal committed, summary, subjects, output
+            results, summary = await run_in_threadpool(
+                _commit_stream_chunk,
+                import_id,
+                [subject for _, subject in subjects],
+                committed,
+                line_no,
+                summary,
+                len(output),
+            )
+            events = output + [
+                {"line": n, **result} for (n, _), result in zip(subjects, results)
+            ]
+            events.sort(key=lambda event: event["line"])
+            committed = line_no
+            subjects, output = [], []
+            return events
+
+        try:
+            async for line in _iter_body_lines(request):
+                if line_no >= committed:
+                    try:
+                        subject = SubjectRegistrationRequest.model_validate_json(line)
+                        subjects.append((line_no, _subject_dict(subject)))
+                    except ValidationError as e:
+                        output.append({"line": line_no, "error": str(e)})
+                line_no += 1
+
+                if line_no - committed >= chunk_size:
+                    for event in await flush():
+                        yield _ndjson(event)
+                    yield _ndjson({"event": "chunk_committed", "committed_lines": committed})
+
+            if line_no > committed:
+                for event in await flush():
+                    yield _ndjson(event)
+                yield _ndjson({"event": "chunk_committed", "committed_lines": committed})
+
+        except ClientDisconnect:
+            logger.warning(f"Import {import_id}: client disconnected at line {committed}")
+            return
+        except Exception as e:
+            logger.error(f"Import {import_id} stopped at line {committed}: {e}", exc_info=True)
+            yield _ndjson({"event": "error", "detail": str(e), "committed_lines": committed})
+            return
+
+        logger.info(f"Import {import_id} complete: {committed} line(s), {summary}")
+        yield _ndjson(
+            {
+                "event": "complete",
+                "import_id": import_id,
+                "committed_lines": committed,
+                "summary": summary,
+            }
+        )
+
+    return _RequestBodyStreamingResponse(
+        stream(),
+        media_type="application/x-ndjson",
+        headers={"X-Import-Id": import_id},
+    )
+
+
+@router.get("/register/stream/{import_id}", dependencies=[Depends(verify_api_key)])
+def get_stream_import(import_id: str):
+    """Progress of a streamed registration: committed_lines and per-action summary"""
+    from services.registration_stream import get_import
+
+    try:
+        with pooled_connection() as conn:
+            progress = get_import(conn, import_id)
+    except PoolTimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error fetching import {import_id}: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if not progress:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return progress
+
+
+@router.post("/gsids/reserve", dependencies=[Depends(verify_api_key)])
+def reserve_new_gsids(request: GSIDReservationRequest) -> StreamingResponse:
+    """
+    Mint and reserve `count` new GSIDs in gsid_registry.
+
+    The response streams one GSID per line (text/plain) while IDs are minted
+    and committed in chunks, so 100k+ ID requests keep memory bounded. IDs
+    streamed before an error remain reserved.
+    """
+    from services.gsid_generator import iter_unique_gsids
+
+    def stream():
+        with pooled_connection() as conn:
+            lines = []
+            for gsid in iter_unique_gsids(
+                request.count, conn=conn, reserved_by=request.reserved_by
+            ):
+                lines.append(gsid)
+                if len(lines) == 1000:
+                    yield "\n".join(lines) + "\n"
+                    lines = []
+            if lines:
+                yield "\n".join(lines) + "\n"
+
+    return StreamingResponse(stream(), media_type="text/plain")
+
+
+@router.post("/lookup", dependencies=[Depends(verify_api_key)])
+def lookup(request: LookupRequest) -> LookupResponse:
+    """
+    Read-only batch lookup: which GSIDs do these identifiers map to, and what
+    do these GSIDs look like? Nothing is registered or written.
+
+    Identifiers are matched like registration (case-insensitive,
+    center-agnostic); omit identifier_type to match any type. Each list is
+    answered with one set-based query.
+
+    Example request:
+    {
+        "identifiers": [{"local_subject_id": "IBDGC-013", "identifier_type": "consortium_id"}],
+        "gsids": ["GSID-1M535BGMJ9VTP2XP"]
+    }
+    """
+    from services.subject_lookup import lookup_gsids, lookup_identifiers
+
+    try:
+        with pooled_connection() as conn:
+            identifiers = lookup_identifiers(
+                conn,
+                [
+                    {
+                        "local_subject_id": id.local_subject_id,
+                        "identifier_type": id.identifier_type,
+                    }
+                    for id in request.identifiers
+                ],
+            )
+            subjects = lookup_gsids(conn, request.gsids)
+
+        return LookupResponse(
             identifiers=identifiers,
-            registration_year=request.registration_year,
-            control=request.control,
-            created_by=request.created_by,
+            subjects=subjects,
+            summary={
+                "identifiers_requested": len(identifiers),
+                "identifiers_found": sum(1 for r in identifiers if r["found"]),
+                "identifiers_multi_gsid": sum(1 for r in identifiers if len(r["gsids"]) > 1),
+                "gsids_requested": len(subjects),
+                "gsids_found": sum(1 for r in subjects if r["found"]),
+            },
         )
 
-        return SubjectRegistrationResponse(
-            gsid=result["gsid"],
-            action=result["action"],
-            identifiers_linked=result["identifiers_linked"],
-            conflicts=result["conflicts"],
-            conflict_resolution=result["conflict_resolution"],
-            message=f"Successfully registered subject with {result['identifiers_linked']} identifier(s)",
+    except PoolTimeoutError as e:
+        logger.error(f"Error looking up subjects: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error looking up subjects: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post(
+    "/validate/ids",
+    dependencies=[Depends(verify_api_key)],
+    response_model=ValidateIDsResponse,
+)
+def validate_ids(request: ValidateIDsRequest) -> JSONResponse:
+    """
+    Pre-screen many IDs with the registration ID rules in one call, without
+    touching the database. Results list only IDs with warnings or errors.
+    """
+    import numpy as np
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    from services.id_validator import IDValidator
+
+    types = request.identifier_types or request.identifier_type
+    table = IDValidator.validate_array(request.local_subject_ids, types)
+
+    # Only flagged rows leave Arrow; the response is encoded directly because
+    # FastAPI's per-field encoding of tens of thousands of results takes
+    # longer than validating them
+    flagged = pc.not_equal(table.column("severity"), "info").to_numpy()
+    indices = np.flatnonzero(flagged).tolist()
+    results = [
+        {
+            "index": i,
+            "local_subject_id": request.local_subject_ids[i],
+            "identifier_type": types[i] if request.identifier_types else types,
+            **result,
+        }
+        for i, result in zip(indices, table.take(pa.array(indices, pa.int64())).to_pylist())
+    ]
+
+    invalid = len(table) - (pc.sum(table.column("valid")).as_py() or 0)
+    return JSONResponse(
+        content={
+            "results": results,
+            "summary": {
+                "total": len(table),
+                "valid": len(table) - invalid,
+                "invalid": invalid,
+                "warnings": len(results) - invalid,
+            },
+        }
+    )
+
+
+@router.get("/changes", dependencies=[Depends(verify_api_key)])
+def get_changes(
+    since: Optional[str] = None,
+    limit: int = Query(1000, ge=1, le=MAX_CHANGE_FEED_PAGE),
+) -> ChangeFeedResponse:
+    """
+    Inserts, updates and deletes of subjects and local_subject_ids after the
+    `since` cursor (omitted: from the start of the feed), oldest first.
+
+    Pass next_cursor back as `since` for the next page; while has_more is
+    false the feed is caught up and next_cursor is the cursor to poll with.
+    A cursor older than the compacted part of the feed gets 410; the client
+    rebuilds its mirror by reading from the start.
+    """
+    from services import change_feed
+
+    try:
+        position = change_feed.decode_cursor(since) if since else change_feed.START
+    except change_feed.InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        with pooled_connection() as conn:
+            page = change_feed.get_changes(conn, position, limit)
+    except change_feed.CursorExpiredError as e:
+        logger.warning(f"Expired change feed cursor: {e}")
+        raise HTTPException(
+            status_code=410,
+            detail="Cursor is older than the retained change feed; "
+            "clear the mirror and read again without `since`",
         )
+    except PoolTimeoutError as e:
+        logger.error(f"Error reading change feed: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error reading change feed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return ChangeFeedResponse(
+        changes=page["changes"],
+        next_cursor=change_feed.encode_cursor(page["next_position"]),
+        has_more=page["has_more"],
+    )
+
+
+@router.get("/export/registry", dependencies=[Depends(verify_api_key)])
+def export_registry(export_format: str = Query("parquet", alias="format")) -> StreamingResponse:
+    """
+    Stream the full GSID <-> local ID mapping as Parquet, Arrow IPC stream or
+    gzipped CSV (one row per local ID), read through a server-side cursor
+    and encoded batch by batch in constant memory.
 
+    Holds one pooled connection for the duration of the download.
+    """
+    from services.registry_export import EXPORT_FORMATS, export_chunks
+
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"format must be one of: {', '.join(sorted(EXPORT_FORMATS))}",
+        )
+    media_type, extension = EXPORT_FORMATS[export_format]
+
+    def stream():
+        with pooled_connection() as conn:
+            yield from export_chunks(conn, export_format, settings.EXPORT_BATCH_ROWS)
+
+    # Borrow the connection and read the first batch before responding, so
+    # pool timeouts and query errors still get a status code
+    chunks = stream()
+    try:
+        first = next(chunks, b"")
+    except PoolTimeoutError as e:
+        logger.error(f"Error exporting registry: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        logger.error(f"Error registering subject: {e}", exc_info=True)
+        logger.error(f"Error exporting registry: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
+
+    filename = f"gsid-registry-{datetime.now(timezone.utc):%Y%m%d}.{extension}"
+    return StreamingResponse(
+        itertools.chain([first], chunks),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 @router.get("/health")
-async def health() -> HealthResponse:
+def health() -> HealthResponse:
     """Health check endpoint (public access)"""
-    conn = None
     try:
-        conn = get_db_connection()
-        conn.cursor().execute("SELECT 1")
-        return HealthResponse(status="healthy", database="connected")
+        with pooled_connection() as conn:
+            conn.cursor().execute("SELECT 1")
+        return HealthResponse(
+            status="healthy",
+            database="connected",
+            pool=get_pool_stats(),
+            reservoir=get_reservoir_stats(),
+            cache=get_cache_stats(),
+            audit=get_audit_writer_stats(),
+            admission=get_admission_stats(),
+        )
     except Exception as e:
         logger.error(f"Health check failed: {e}")
         raise HTTPException(status_code=503, detail="Database connection failed")
-    finally:
-        if conn:
-            conn.close()
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics() -> Response:
+    """Prometheus metrics in text exposition format (public access, like /health)"""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+def _not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Evaluate If-None-Match (weak comparison, wins if present) or If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def _is_conditional(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def _set_version(gsids: List[str], versions: Dict[str, str]) -> str:
+    """One version for a multi-subject response, in request order, missing ones included"""
+    parts = "\n".join(f"{gsid}:{versions.get(gsid, '')}" for gsid in dict.fromkeys(gsids))
+    return hashlib.sha256(parts.encode()).hexdigest()[:32]
+
+
+def _cache_headers(version: str, last_modified: Optional[datetime]) -> Dict[str, str]:
+    headers = {"ETag": f'"{version}"', "Cache-Control": "private, no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(
+            last_modified.astimezone(timezone.utc), usegmt=True
+        )
+    return headers
+
+
+def _revalidate(
+    request: Request, version: str, last_modified: Optional[datetime]
+) -> Optional[Response]:
+    """304 Not Modified when the client's copy is current, else None"""
+    if _not_modified(request, f'"{version}"', last_modified):
+        return Response(status_code=304, headers=_cache_headers(version, last_modified))
+    return None
+
+
+def _conditional_json(
+    request: Request, content: Any, version: str, last_modified: Optional[datetime]
+) -> Response:
+    """
+    JSON response with a strong ETag (the subject version) and Last-Modified,
+    or 304 Not Modified when the client's copy is current.
+
+    Cache-Control: no-cache lets clients and proxies keep the body but makes
+    them revalidate. Conditional requests are first checked against
+    get_subject_versions, so a poll of an unchanged subject costs one small
+    indexed query and an empty 304; the body is only built when it changed.
+    """
+    not_modified = _revalidate(request, version, last_modified)
+    if not_modified is not None:
+        return not_modified
+    return JSONResponse(content=content, headers=_cache_headers(version, last_modified))
 
 
 @router.get("/subjects/{gsid}")
-async def get_subject(gsid: str, _: str = Depends(verify_api_key)):
-    """Get subject details by GSID"""
-    conn = get_db_connection()
+def get_subject(gsid: str, request: Request, _: str = Depends(verify_api_key)) -> Response:
+    """
+    Get subject details by GSID (one query).
+
+    Responses carry ETag and Last-Modified; send them back as
+    If-None-Match / If-Modified-Since to get 304 Not Modified while the
+    subject, its local IDs and its review events are unchanged.
+    """
+    from services.subject_lookup import get_subject_details, get_subject_versions
+
     try:
-        cur = conn.cursor()
+        with pooled_connection() as conn:
+            if _is_conditional(request):
+                current = get_subject_versions(conn, [gsid]).get(gsid)
+                if current is not None:
+                    not_modified = _revalidate(
+                        request, current["version"], current["last_modified"]
+                    )
+                    if not_modified is not None:
+                        return not_modified
+            subjects = get_subject_details(conn, [gsid])
+    except PoolTimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
-        # Get subject
-        cur.execute(
-            """
-            SELECT s.*, c.name as center_name
-            FROM subjects s
-            JOIN centers c ON s.center_id = c.center_id
-            WHERE s.global_subject_id = %s
-            """,
-            (gsid,),
-        )
-        subject = cur.fetchone()
+    if not subjects:
+        raise HTTPException(status_code=404, detail="Subject not found")
 
-        if not subject:
-            raise HTTPException(status_code=404, detail="Subject not found")
+    subject = subjects[0]
+    version = subject.pop("version")
+    last_modified = subject.pop("last_modified")
+    return _conditional_json(request, subject, version, last_modified)
 
-        # Get all local IDs
-        cur.execute(
-            """
-            SELECT center_id, local_subject_id, identifier_type, created_by, created_at
-            FROM local_subject_ids
-            WHERE global_subject_id = %s
-            ORDER BY created_at ASC
-            """,
-            (gsid,),
+
+@router.get("/subjects", dependencies=[Depends(verify_api_key)])
+def get_subjects(
+    request: Request,
+    gsid: List[str] = Query([]),
+) -> Response:
+    """
+    Details of several subjects in one query: GET /subjects?gsid=A&gsid=B
+
+    Returns {"subjects": [...in request order...], "missing": [...]}, with
+    ETag / Last-Modified / 304 handling over the whole set.
+    """
+    from services.subject_lookup import get_subject_details, get_subject_versions
+
+    if not gsid or len(gsid) > MAX_SUBJECT_DETAIL_GSIDS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Pass 1 to {MAX_SUBJECT_DETAIL_GSIDS} gsid query parameters",
         )
-        local_ids = cur.fetchall()
-
-        return {
-            "gsid": subject[0],
-            "center_id": subject[1],
-            "center_name": subject[7],
-            "registration_year": subject[2].isoformat() if subject[2] else None,
-            "control": subject[3],
-            "withdrawn": subject[4],
-            "flagged_for_review": subject[6],
-            "review_notes": subject[7],
-            "created_by": subject[8],
-            "created_at": subject[9].isoformat(),
-            "local_ids": [
-                {
-                    "center_id": lid[0],
-                    "local_subject_id": lid[1],
-                    "identifier_type": lid[2],
-                    "created_by": lid[3],
-                    "created_at": lid[4].isoformat(),
-                }
-                for lid in local_ids
-            ],
-        }
 
-    finally:
-        conn.close()
+    try:
+        with pooled_connection() as conn:
+            if _is_conditional(request):
+                current = get_subject_versions(conn, gsid)
+                not_modified = _revalidate(
+                    request,
+                    _set_version(gsid, {g: v["version"] for g, v in current.items()}),
+                    max(
+                        (v["last_modified"] for v in current.values() if v["last_modified"]),
+                        default=None,
+                    ),
+                )
+                if not_modified is not None:
+                    return not_modified
+            subjects = get_subject_details(conn, gsid)
+    except PoolTimeoutError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    versions = {subject["gsid"]: subject.pop("version") for subject in subjects}
+    modified = [subject.pop("last_modified") for subject in subjects]
+    return _conditional_json(
+        request,
+        {
+            "subjects": subjects,
+            "missing": [g for g in dict.fromkeys(gsid) if g not in versions],
+        },
+        _set_version(gsid, versions),
+        max((m for m in modified if m is not None), default=None),
+    )
 
 
 @router.post("/subjects/{gsid}/withdraw", dependencies=[Depends(verify_api_key)])
-async def withdraw_subject(gsid: str, reason: str = None):
-    """Withdraw a subject"""
-    conn = get_db_connection()
-    try:
+def withdraw_subject(
+    gsid: str,
+    reason: str = None,
+    created_by: Optional[str] = Query(None, max_length=100),
+    x_created_by: Optional[str] = Header(None, max_length=100),
+):
+    """
+    Withdraw a subject.
+
+    The review event records `created_by`, else the X-Created-By header,
+    else "system", as registrations do.
+    """
+    actor = created_by or x_created_by or "system"
+    with pooled_connection() as conn:
         cur = conn.cursor()
         cur.execute(
             """
-            UPDATE subjects 
-            SET withdrawn = TRUE,
-                review_notes = COALESCE(review_notes || E'\n', '') || 
-                              'Withdrawn on ' || CURRENT_TIMESTAMP::TEXT ||
-                              CASE WHEN %s IS NOT NULL THEN '. Reason: ' || %s ELSE '' END
-            WHERE global_subject_id = %s
+            WITH withdrawn AS (
+                UPDATE subjects
+                SET withdrawn = TRUE
+                WHERE global_subject_id = %s
+                RETURNING global_subject_id
+            )
+            INSERT INTO subject_review_events (global_subject_id, event_type, note, created_by)
+            SELECT global_subject_id, 'withdrawal',
+                   'Withdrawn on ' || CURRENT_TIMESTAMP::TEXT ||
+                   CASE WHEN %s IS NOT NULL THEN '. Reason: ' || %s ELSE '' END,
+                   %s
+            FROM withdrawn
             RETURNING global_subject_id
             """,
-            (reason, reason, gsid),
+            (gsid, reason, reason, actor),
         )
 
         if cur.fetchone() is None:
@@ -180,6 +871,3 @@ async def withdraw_subject(gsid: str, reason: str = None):
 
         conn.commit()
         return {"status": "withdrawn", "gsid": gsid}
-
-    finally:
-        conn.close()
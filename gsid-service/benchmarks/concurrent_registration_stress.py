@@ -0,0 +1,158 @@
+# gsid-service/benchmarks/concurrent_registration_stress.py
+"""
+Register the same subjects from many threads at once and count duplicate GSIDs.
+
+Every subject is registered --copies times back to back, so its copies are in
+flight together on different connections. Each copy carries the subject's
+primary ID (in a random case) and, sometimes, a secondary ID. A correct run
+ends with exactly one GSID per subject; without identifier locks
+(--no-locks) racing copies each see no match and mint their own GSID.
+
+Exits non-zero if any subject ended up with more than one GSID.
+
+Usage (uses the service's DB_* environment variables; writes real rows
+with IDs prefixed STRESS-<run>- that are deleted again unless --keep):
+    python benchmarks/concurrent_registration_stress.py --subjects 500 --copies 4 --workers 64
+    python benchmarks/concurrent_registration_stress.py --no-locks
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.config import settings  # noqa: E402
+from core.database import get_db_connection  # noqa: E402
+from services.identity_resolution import (  # noqa: E402
+    resolve_subject_with_multiple_ids,
+)
+
+
+def random_case(value: str) -> str:
+    return "".join(c.lower() if random.random() < 0.5 else c for c in value)
+
+
+def build_requests(prefix: str, subjects: int, copies: int):
+    requests = []
+    for i in range(subjects):
+        for _ in range(copies):
+            identifiers = [
+                {"local_subject_id": random_case(f"{prefix}{i}-A"), "identifier_type": "primary"}
+            ]
+            if random.random() < 0.5:
+                identifiers.append(
+                    {"local_subject_id": f"{prefix}{i}-B", "identifier_type": "alias"}
+                )
+            random.shuffle(identifiers)
+            requests.append((i, identifiers))
+    return requests
+
+
+def run(requests, workers: int):
+    local = threading.local()
+    connections = []
+    connections_lock = threading.Lock()
+
+    def register(request):
+        if not hasattr(local, "conn"):
+            local.conn = get_db_connection()
+            with connections_lock:
+                connections.append(local.conn)
+        _, identifiers = request
+        resolve_subject_with_multiple_ids(
+            local.conn, center_id=1, identifiers=identifiers, created_by="stress_test"
+        )
+
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for future in [executor.submit(register, r) for r in requests]:
+                future.result()
+    finally:
+        for conn in connections:
+            conn.close()
+    return time.perf_counter() - started
+
+
+def count_duplicates(conn, prefix: str):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT split_part(lower(local_subject_id), '-', 3) AS subject,
+                   COUNT(DISTINCT global_subject_id) AS gsids
+            FROM local_subject_ids
+            WHERE lower(local_subject_id) LIKE lower(%s) || '%%'
+            GROUP BY 1
+            """,
+            (prefix,),
+        )
+        rows = cur.fetchall()
+    conn.rollback()
+    return len(rows), sum(gsids - 1 for _, gsids in rows)
+
+
+def cleanup(conn, prefix: str):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT DISTINCT global_subject_id FROM local_subject_ids
+            WHERE lower(local_subject_id) LIKE lower(%s) || '%%'
+            """,
+            (prefix,),
+        )
+        gsids = [row[0] for row in cur.fetchall()]
+        cur.execute(
+            "DELETE FROM identity_resolutions WHERE gsid = ANY(%s) OR matched_gsid = ANY(%s)",
+            (gsids, gsids),
+        )
+        cur.execute("DELETE FROM local_subject_ids WHERE global_subject_id = ANY(%s)", (gsids,))
+        # Review events are append-only and reference subjects (migration 008)
+        cur.execute("SET LOCAL idhub.allow_review_event_delete = on")
+        cur.execute(
+            "DELETE FROM subject_review_events WHERE global_subject_id = ANY(%s)", (gsids,)
+        )
+        cur.execute("DELETE FROM subjects WHERE global_subject_id = ANY(%s)", (gsids,))
+        cur.execute("DELETE FROM gsid_registry WHERE gsid = ANY(%s)", (gsids,))
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--subjects", type=int, default=500)
+    parser.add_argument("--copies", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=64)
+    parser.add_argument("--no-locks", action="store_true", help="disable identifier locks")
+    parser.add_argument("--keep", action="store_true", help="keep the registered rows")
+    args = parser.parse_args()
+
+    settings.IDENTIFIER_LOCKS_ENABLED = not args.no_locks
+    prefix = f"STRESS-{uuid.uuid4().hex[:8]}-"
+    requests = build_requests(prefix, args.subjects, args.copies)
+
+    elapsed = run(requests, args.workers)
+
+    conn = get_db_connection()
+    try:
+        subjects, duplicates = count_duplicates(conn, prefix)
+        print(
+            f"locks={'off' if args.no_locks else 'on'} workers={args.workers} "
+            f"registrations={len(requests)} in {elapsed:.1f}s "
+            f"({len(requests) / elapsed:.0f}/s)"
+        )
+        print(f"subjects={subjects} duplicate_gsids={duplicates}")
+        if not args.keep:
+            cleanup(conn, prefix)
+    finally:
+        conn.close()
+
+    sys.exit(1 if duplicates else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# gsid-service/benchmarks/gsid_index_benchmark.py
+"""
+Compare insert throughput and primary-key index size for the legacy and
+bucketed GSID layouts.
+
+Each run creates a scratch table per layout shaped like subjects'
+primary key, pre-fills it with IDs spread over the last --history-days
+(so legacy IDs cover many 9.3-hour wrap cycles), then times inserting
+--count fresh IDs in --batch-size transactions using the real generators.
+
+Usage (uses the service's DB_* environment variables):
+    python benchmarks/gsid_index_benchmark.py --history 200000 --count 100000
+"""
+
+import argparse
+import secrets
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.database import get_db_connection  # noqa: E402
+from psycopg2.extras import execute_values  # noqa: E402
+from services.gsid_generator import (  # noqa: E402
+    GSID_BODY_LENGTH,
+    GSID_PREFIX,
+    LEGACY_TIMESTAMP_CHARS,
+    BUCKETED_BUCKET_MS,
+    BUCKETED_EPOCH_MS,
+    BUCKETED_RANDOM_CHARS,
+    BUCKETED_TIMESTAMP_CHARS,
+    encode_base32,
+    generate_legacy_gsid,
+    generate_bucketed_gsid,
+)
+
+GENERATORS = {
+    "legacy": generate_legacy_gsid,
+    "bucketed": generate_bucketed_gsid,
+}
+
+
+def historical_gsid(mode: str, timestamp_ms: int) -> str:
+    """Build a GSID as it would have been minted at timestamp_ms"""
+    if mode == "legacy":
+        random_length = GSID_BODY_LENGTH - LEGACY_TIMESTAMP_CHARS
+        return (
+            GSID_PREFIX
+            + encode_base32(
+                timestamp_ms % (32**LEGACY_TIMESTAMP_CHARS), LEGACY_TIMESTAMP_CHARS
+            )
+            + encode_base32(secrets.randbelow(32**random_length), random_length)
+        )
+    return (
+        GSID_PREFIX
+        + encode_base32(
+            max(timestamp_ms - BUCKETED_EPOCH_MS, 0) // BUCKETED_BUCKET_MS,
+            BUCKETED_TIMESTAMP_CHARS,
+        )
+        + encode_base32(
+            secrets.randbelow(32**BUCKETED_RANDOM_CHARS), BUCKETED_RANDOM_CHARS
+        )
+    )
+
+
+def run(conn, mode: str, history: int, history_days: int, count: int, batch_size: int):
+    table = f"gsid_bench_{mode}"
+    with conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {table}")
+        cur.execute(f"CREATE TABLE {table} (gsid VARCHAR(21) PRIMARY KEY)")
+        conn.commit()
+
+        now_ms = int(time.time() * 1000)
+        span_ms = history_days * 86_400_000
+        # Loaded in creation order, as the table would have grown
+        timestamps = sorted(
+            now_ms - span_ms + secrets.randbelow(span_ms) for _ in range(history)
+        )
+        rows = [(historical_gsid(mode, ts),) for ts in timestamps]
+        execute_values(cur, f"INSERT INTO {table} VALUES %s", rows, page_size=10_000)
+        conn.commit()
+        cur.execute(f"SELECT pg_relation_size('{table}_pkey')")
+        size_before = cur.fetchone()[0]
+
+        generate = GENERATORS[mode]
+        started = time.perf_counter()
+        for done in range(0, count, batch_size):
+            batch = [(generate(),) for _ in range(min(batch_size, count - done))]
+            # Row-at-a-time inserts, like subject registration
+            for row in batch:
+                cur.execute(f"INSERT INTO {table} VALUES (%s)", row)
+            conn.commit()
+        elapsed = time.perf_counter() - started
+
+        cur.execute(f"SELECT pg_relation_size('{table}_pkey')")
+        size_after = cur.fetchone()[0]
+        cur.execute(f"DROP TABLE {table}")
+        conn.commit()
+
+    return {
+        "mode": mode,
+        "rows_per_sec": count / elapsed,
+        "index_mb_before": size_before / 1024**2,
+        "index_mb_after": size_after / 1024**2,
+        "index_growth_bytes_per_row": (size_after - size_before) / count,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--history", type=int, default=200_000)
+    parser.add_argument("--history-days", type=int, default=365)
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=1_000)
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        print(
+            f"{'mode':<10} {'rows/s':>10} {'idx MB before':>14} "
+            f"{'idx MB after':>13} {'bytes/row':>10}"
+        )
+        for mode in GENERATORS:
+            r = run(
+                conn, mode, args.history, args.history_days, args.count, args.batch_size
+            )
+            print(
+                f"{r['mode']:<10} {r['rows_per_sec']:>10.0f} {r['index_mb_before']:>14.1f} "
+                f"{r['index_mb_after']:>13.1f} {r['index_growth_bytes_per_row']:>10.1f}"
+            )
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
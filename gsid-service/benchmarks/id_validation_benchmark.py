@@ -0,0 +1,88 @@
+# gsid-service/benchmarks/id_validation_benchmark.py
+"""
+Time ID validation: the per-ID loop against the vectorized engine.
+
+Generates a fragment-like mix of IDs (mostly clean, some numeric, short,
+whitespace, special-character, test/demo and non-ASCII IDs) and validates it
+with IDValidator.validate_id one ID at a time and with
+IDValidator.validate_array in one call, checking both give the same results.
+
+Usage:
+    python benchmarks/id_validation_benchmark.py --ids 100000
+"""
+
+import argparse
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from services.id_validator import IDValidator  # noqa: E402
+
+ID_TYPES = ["primary", "consortium_id", "niddk_no", "record_id", "alias"]
+
+
+def make_ids(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    ids, types = [], []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.70:
+            value = "IBDGC" + "".join(rng.choices(string.digits, k=6))
+        elif kind < 0.80:
+            value = "".join(rng.choices(string.digits, k=rng.randint(1, 9)))
+        elif kind < 0.85:
+            value = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(1, 3)))
+        elif kind < 0.90:
+            value = f" S{rng.randint(1, 999)} {rng.randint(1, 99)}"
+        elif kind < 0.94:
+            value = f"ID#{rng.randint(1, 9999)}/{rng.choice('ab')}"
+        elif kind < 0.97:
+            value = rng.choice(["test", "Demo", "EXAMPLE", "000", "999", "xx"]) + str(
+                rng.randint(0, 9)
+            ) * rng.randint(0, 1)
+        elif kind < 0.99:
+            value = "Müller-" + str(rng.randint(1, 999))
+        else:
+            value = rng.choice(["", "   ", None])
+        ids.append(value)
+        types.append(rng.choice(ID_TYPES))
+    return ids, types
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ids", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    ids, types = make_ids(args.ids)
+
+    loop_best = float("inf")
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        expected = [IDValidator.validate_id(i, t) for i, t in zip(ids, types)]
+        loop_best = min(loop_best, time.perf_counter() - started)
+    print(f"per-ID loop:  {loop_best:.3f}s ({args.ids / loop_best:,.0f} IDs/s)")
+
+    if not hasattr(IDValidator, "validate_array"):
+        return
+
+    array_best = float("inf")
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        table = IDValidator.validate_array(ids, types)
+        array_best = min(array_best, time.perf_counter() - started)
+    print(f"validate_array: {array_best:.3f}s ({args.ids / array_best:,.0f} IDs/s)")
+    print(f"speedup: {loop_best / array_best:.1f}x")
+
+    if table.to_pylist() != expected:
+        print("MISMATCH between validate_array and validate_id")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
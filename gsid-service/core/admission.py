@@ -0,0 +1,236 @@
+# gsid-service/core/admission.py
+"""
+Admission control: a bounded number of requests in flight, fair queuing per
+client for the rest, and fast rejections with Retry-After when saturated.
+
+Every admitted request can hold a pooled database connection, so by default
+no more requests are served at once than the pool has connections. Requests
+over the budget wait in one FIFO queue per client and are admitted
+round-robin across clients, so a bulk job with hundreds of queued requests
+delays an interactive client by at most one request per free slot instead of
+its whole backlog.
+
+Clients are named by the X-Created-By header (the caller's created_by) only
+when it is one of ADMISSION_CLIENTS. The header is set by the caller, so any
+other value falls back to the peer address; sending a new value with every
+request therefore cannot buy a fresh queue and escape the 429 limit.
+
+Rejections, all with Retry-After:
+    429  the client already has ADMISSION_CLIENT_QUEUE_MAX requests queued
+    503  the queue is full, or the request waited ADMISSION_QUEUE_TIMEOUT
+
+Everything runs on the event loop, so the controller needs no locks.
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+
+from starlette.responses import JSONResponse
+
+from .config import settings
+from .metrics import ADMISSION_REJECTIONS, ADMISSION_WAIT_SECONDS
+
+logger = logging.getLogger(__name__)
+
+CLIENT_HEADER = "x-created-by"
+
+# Monitoring and docs stay reachable under load
+EXEMPT_PATHS = ("/health", "/metrics", "/docs", "/redoc", "/openapi.json")
+
+_controller = None
+
+
+class AdmissionRejected(Exception):
+    """Raised by AdmissionController.acquire when a request is not admitted"""
+
+    def __init__(self, status_code: int, reason: str, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.reason = reason
+        self.detail = detail
+
+
+class AdmissionController:
+    """In-flight budget with per-client FIFO queues served round-robin"""
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        queue_max: int,
+        client_queue_max: int,
+        queue_timeout: float,
+    ):
+        self.max_in_flight = max_in_flight
+        self.queue_max = queue_max
+        self.client_queue_max = client_queue_max
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.queued = 0
+        # client -> waiting futures; order is the round-robin order
+        self._queues = OrderedDict()
+        self._stats = {
+            "admitted": 0,
+            "queued_total": 0,
+            "rejected_client_queue_full": 0,
+            "rejected_queue_full": 0,
+            "rejected_queue_timeout": 0,
+        }
+
+    async def acquire(self, client: str):
+        """
+        Wait for an in-flight slot; call release() once the request is done.
+
+        Raises:
+            AdmissionRejected: If the request is not admitted (see module docs)
+        """
+        if self.in_flight < self.max_in_flight and not self.queued:
+            self._admit()
+            return
+
+        waiting = self._queues.get(client)
+        if waiting is not None and len(waiting) >= self.client_queue_max:
+            raise self._reject(
+                429,
+                "client_queue_full",
+                f"Too many queued requests for client '{client}'",
+            )
+        if self.queued >= self.queue_max:
+            raise self._reject(503, "queue_full", "Service is at capacity")
+
+        future = asyncio.get_running_loop().create_future()
+        if waiting is None:
+            waiting = self._queues[client] = deque()
+        waiting.append(future)
+        self.queued += 1
+        self._stats["queued_total"] += 1
+
+        started = time.perf_counter()
+        try:
+            await asyncio.wait({future}, timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            # Client went away while queued: give back a slot granted meanwhile
+            if future.done():
+                self.release()
+            else:
+                future.cancel()
+                self._forget(client, future)
+            raise
+        finally:
+            ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - started)
+
+        if not future.done():
+            future.cancel()
+            self._forget(client, future)
+            raise self._reject(
+                503,
+                "queue_timeout",
+                f"No capacity within {self.queue_timeout:g}s",
+            )
+
+    def release(self):
+        """Free a slot and hand it to the next client in round-robin order"""
+        self.in_flight -= 1
+        while self._queues and self.in_flight < self.max_in_flight:
+            client, waiting = next(iter(self._queues.items()))
+            future = waiting.popleft()
+            self.queued -= 1
+            if waiting:
+                self._queues.move_to_end(client)
+            else:
+                del self._queues[client]
+            if not future.done():
+                future.set_result(None)
+                self._admit()
+
+    def _admit(self):
+        self.in_flight += 1
+        self._stats["admitted"] += 1
+
+    def _forget(self, client: str, future):
+        waiting = self._queues.get(client)
+        if waiting is not None and future in waiting:
+            waiting.remove(future)
+            self.queued -= 1
+            if not waiting:
+                del self._queues[client]
+
+    def _reject(self, status_code: int, reason: str, detail: str) -> AdmissionRejected:
+        self._stats[f"rejected_{reason}"] += 1
+        ADMISSION_REJECTIONS.labels(reason=reason).inc()
+        return AdmissionRejected(status_code, reason, detail)
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "queued_clients": len(self._queues),
+            "max_in_flight": self.max_in_flight,
+        }
+
+
+def client_name(scope) -> str:
+    """The X-Created-By header if it names a known client, else the peer address"""
+    known = {name.strip() for name in settings.ADMISSION_CLIENTS.split(",")}
+    for name, value in scope.get("headers", ()):
+        if name == CLIENT_HEADER.encode():
+            value = value.decode("latin-1").strip()
+            if value and value in known:
+                return value
+            break
+    client = scope.get("client")
+    return client[0] if client else "anonymous"
+
+
+class AdmissionMiddleware:
+    """
+    Apply admission control to every HTTP request except EXEMPT_PATHS.
+
+    A slot is held until the response is fully sent, since streamed
+    responses keep their connection until the last chunk.
+    """
+
+    def __init__(self, app):
+        global _controller
+        self.app = app
+        self.controller = AdmissionController(
+            max_in_flight=settings.ADMISSION_MAX_IN_FLIGHT,
+            queue_max=settings.ADMISSION_QUEUE_MAX,
+            client_queue_max=settings.ADMISSION_CLIENT_QUEUE_MAX,
+            queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+        )
+        _controller = self.controller
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or not settings.ADMISSION_ENABLED
+            or scope["path"].startswith(EXEMPT_PATHS)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        client = client_name(scope)
+        try:
+            await self.controller.acquire(client)
+        except AdmissionRejected as e:
+            logger.warning(f"Rejected {scope['method']} {scope['path']} from {client}: {e.reason}")
+            response = JSONResponse(
+                {"detail": e.detail},
+                status_code=e.status_code,
+                headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER_SECONDS)},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release()
+
+
+def get_admission_stats() -> dict:
+    """Snapshot of admission counters (empty before the app is built)"""
+    return _controller.stats() if _controller is not None else {}
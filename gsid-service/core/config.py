@@ -14,9 +14,99 @@ class Settings(BaseSettings):
     DB_PASSWORD: str = os.getenv("DB_PASSWORD", "")
     DB_PORT: int = int(os.getenv("DB_PORT", "5432"))
 
+    # Connection pool (per process). psycopg2 closes connections returned
+    # while MIN_SIZE are already idle, so MIN_SIZE is the warm steady state.
+    DB_POOL_MIN_SIZE: int = int(os.getenv("DB_POOL_MIN_SIZE", "10"))
+    DB_POOL_MAX_SIZE: int = int(os.getenv("DB_POOL_MAX_SIZE", "20"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+    DB_POOL_RECYCLE_SECONDS: int = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "300"))
+
+    # Admission control (core/admission.py): at most ADMISSION_MAX_IN_FLIGHT
+    # requests are served at once (default: one per pooled connection); the
+    # rest queue per client and are admitted round-robin, or get 429/503 with
+    # Retry-After when a queue is full or the wait exceeds QUEUE_TIMEOUT
+    ADMISSION_ENABLED: bool = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+    ADMISSION_MAX_IN_FLIGHT: int = int(
+        os.getenv("ADMISSION_MAX_IN_FLIGHT", os.getenv("DB_POOL_MAX_SIZE", "20"))
+    )
+    ADMISSION_QUEUE_MAX: int = int(os.getenv("ADMISSION_QUEUE_MAX", "200"))
+    ADMISSION_CLIENT_QUEUE_MAX: int = int(os.getenv("ADMISSION_CLIENT_QUEUE_MAX", "100"))
+    ADMISSION_QUEUE_TIMEOUT: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "5"))
+    ADMISSION_RETRY_AFTER_SECONDS: int = int(
+        os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "2")
+    )
+    # X-Created-By values that get their own admission queue (comma-separated);
+    # any other value shares the caller's per-address queue
+    ADMISSION_CLIENTS: str = os.getenv(
+        "ADMISSION_CLIENTS", "redcap_pipeline,fragment_validator"
+    )
+
     # GSID Service
     GSID_API_KEY: str = os.getenv("GSID_API_KEY", "")
     GSID_SERVICE_URL: str = os.getenv("GSID_SERVICE_URL", "http://gsid-service:8000")
+    # "legacy" (random) or "bucketed" (hour-bucketed prefix, opt-in)
+    GSID_GENERATION_MODE: str = os.getenv("GSID_GENERATION_MODE", "legacy")
+
+    # Reservoir of pre-minted GSIDs claimed by new-subject registrations.
+    # A background thread refills it to TARGET when it drops below LOW_WATER.
+    GSID_RESERVOIR_ENABLED: bool = (
+        os.getenv("GSID_RESERVOIR_ENABLED", "true").lower() == "true"
+    )
+    GSID_RESERVOIR_LOW_WATER: int = int(os.getenv("GSID_RESERVOIR_LOW_WATER", "5000"))
+    GSID_RESERVOIR_TARGET: int = int(os.getenv("GSID_RESERVOIR_TARGET", "20000"))
+    GSID_RESERVOIR_REFILL_INTERVAL: float = float(
+        os.getenv("GSID_RESERVOIR_REFILL_INTERVAL", "5")
+    )
+
+    # Serialize registrations sharing an identifier with per-identifier
+    # transaction-scoped advisory locks (prevents duplicate GSIDs when the
+    # same subject is registered concurrently)
+    IDENTIFIER_LOCKS_ENABLED: bool = (
+        os.getenv("IDENTIFIER_LOCKS_ENABLED", "true").lower() == "true"
+    )
+
+    # Routine link_existing audit rows are queued after commit and written in
+    # bulk every AUDIT_FLUSH_ROWS rows or AUDIT_FLUSH_INTERVAL_MS; conflict and
+    # review rows are always written in the registering transaction
+    AUDIT_ASYNC_ENABLED: bool = os.getenv("AUDIT_ASYNC_ENABLED", "true").lower() == "true"
+    AUDIT_FLUSH_ROWS: int = int(os.getenv("AUDIT_FLUSH_ROWS", "1000"))
+    AUDIT_FLUSH_INTERVAL_MS: int = int(os.getenv("AUDIT_FLUSH_INTERVAL_MS", "200"))
+    AUDIT_QUEUE_MAX: int = int(os.getenv("AUDIT_QUEUE_MAX", "50000"))
+
+    # Subjects registered (and committed) per chunk of POST /register/stream
+    REGISTRATION_STREAM_CHUNK_SIZE: int = int(
+        os.getenv("REGISTRATION_STREAM_CHUNK_SIZE", "1000")
+    )
+
+    # How long a registration's stored Idempotency-Key response is replayed
+    IDEMPOTENCY_TTL_SECONDS: int = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+
+    # Rows fetched from the export's server-side cursor (and encoded) at a time
+    EXPORT_BATCH_ROWS: int = int(os.getenv("EXPORT_BATCH_ROWS", "50000"))
+
+    # GET /changes keeps every change for CHANGE_FEED_RETENTION_DAYS; older
+    # ones are compacted to the latest change per row every
+    # CHANGE_FEED_COMPACT_INTERVAL seconds (0 days: keep everything)
+    CHANGE_FEED_RETENTION_DAYS: int = int(os.getenv("CHANGE_FEED_RETENTION_DAYS", "30"))
+    CHANGE_FEED_COMPACT_INTERVAL: float = float(
+        os.getenv("CHANGE_FEED_COMPACT_INTERVAL", "3600")
+    )
+
+    # In-process identifier -> GSID cache, invalidated by LISTEN/NOTIFY. Only
+    # registrations without identifier locks read it, so it defaults to off
+    # while IDENTIFIER_LOCKS_ENABLED is on. The database's invalidation
+    # triggers only notify with idhub.gsid_cache_notify = on (migration 011).
+    GSID_CACHE_ENABLED: bool = (
+        os.getenv(
+            "GSID_CACHE_ENABLED", "false" if IDENTIFIER_LOCKS_ENABLED else "true"
+        ).lower()
+        == "true"
+    )
+    GSID_CACHE_MAX_ENTRIES: int = int(os.getenv("GSID_CACHE_MAX_ENTRIES", "100000"))
+    GSID_CACHE_TTL_SECONDS: float = float(os.getenv("GSID_CACHE_TTL_SECONDS", "300"))
+    GSID_CACHE_RECONNECT_SECONDS: float = float(
+        os.getenv("GSID_CACHE_RECONNECT_SECONDS", "5")
+    )
 
     # S3
     S3_BUCKET: str = os.getenv("S3_BUCKET", "idhub-curated-fragments")
@@ -1,15 +1,39 @@
 # gsid-service/core/database.py
 import logging
+import threading
+import time
 from contextlib import contextmanager
 
 import psycopg2
+from psycopg2 import extensions, pool
 from psycopg2.extras import RealDictCursor
 
 from .config import settings
+from .metrics import DB_POOL_WAIT_SECONDS
 
 logger = logging.getLogger(__name__)
 
 
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes free within DB_POOL_TIMEOUT"""
+
+
+# Process-wide connection pool, created lazily on first checkout
+_pool = None
+_pool_slots = None
+_pool_lock = threading.Lock()
+_last_used = {}  # id(conn) -> monotonic time the connection was returned
+_stats = {
+    "checkouts": 0,
+    "in_use": 0,
+    "waiting": 0,
+    "timeouts": 0,
+    "discarded": 0,
+    "wait_seconds_total": 0.0,
+    "wait_seconds_max": 0.0,
+}
+
+
 def get_db_connection():
     """Get a new database connection"""
     try:
@@ -52,3 +76,166 @@ def get_db_cursor(conn, cursor_factory=RealDictCursor):
     finally:
         cursor.close()
 
+
+def _get_pool():
+    """Create the process-wide pool on first use"""
+    global _pool, _pool_slots
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pool.ThreadedConnectionPool(
+                    settings.DB_POOL_MIN_SIZE,
+                    settings.DB_POOL_MAX_SIZE,
+                    host=settings.DB_HOST,
+                    database=settings.DB_NAME,
+                    user=settings.DB_USER,
+                    password=settings.DB_PASSWORD,
+                    port=settings.DB_PORT,
+                )
+                # ThreadedConnectionPool raises instead of waiting when
+                # exhausted, so callers queue on this semaphore first
+                _pool_slots = threading.BoundedSemaphore(settings.DB_POOL_MAX_SIZE)
+                logger.info(
+                    f"Database pool created (min={settings.DB_POOL_MIN_SIZE}, "
+                    f"max={settings.DB_POOL_MAX_SIZE})"
+                )
+    return _pool
+
+
+def _checkout(db_pool):
+    """Take a connection from the pool, replacing it if it is no longer usable"""
+    conn = db_pool.getconn()
+    idle_since = _last_used.get(id(conn))
+    stale = (
+        idle_since is not None
+        and time.monotonic() - idle_since > settings.DB_POOL_RECYCLE_SECONDS
+    )
+    if conn.closed or stale:
+        try:
+            if not conn.closed:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+                return conn
+        except psycopg2.Error as e:
+            logger.warning(f"Discarding broken pooled connection: {e}")
+        _last_used.pop(id(conn), None)
+        db_pool.putconn(conn, close=True)
+        with _pool_lock:
+            _stats["discarded"] += 1
+        conn = db_pool.getconn()
+    return conn
+
+
+def _release(db_pool, conn, broken: bool = False):
+    """Return a connection to the pool, discarding it if it cannot be reused"""
+    if not broken and not conn.closed:
+        try:
+            if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except psycopg2.Error:
+            broken = True
+
+    if broken or conn.closed:
+        _last_used.pop(id(conn), None)
+        with _pool_lock:
+            _stats["discarded"] += 1
+        db_pool.putconn(conn, close=True)
+    else:
+        _last_used[id(conn)] = time.monotonic()
+        db_pool.putconn(conn)
+
+
+@contextmanager
+def pooled_connection():
+    """
+    Borrow a connection from the process-wide pool.
+
+    Waits up to DB_POOL_TIMEOUT seconds for a free connection and raises
+    PoolTimeoutError otherwise. Uncommitted work is rolled back when the
+    connection is returned, and connections that hit an OperationalError or
+    InterfaceError are closed instead of being reused.
+
+    Usage:
+        with pooled_connection() as conn:
+            with get_db_cursor(conn) as cursor:
+                cursor.execute("SELECT 1")
+            conn.commit()
+
+    Blocking: call it from a worker thread (sync route handlers run in
+    FastAPI's threadpool), never directly on the event loop.
+    """
+    db_pool = _get_pool()
+
+    with _pool_lock:
+        _stats["waiting"] += 1
+    started = time.perf_counter()
+    acquired = _pool_slots.acquire(timeout=settings.DB_POOL_TIMEOUT)
+    waited = time.perf_counter() - started
+    DB_POOL_WAIT_SECONDS.observe(waited)
+    with _pool_lock:
+        _stats["waiting"] -= 1
+        _stats["wait_seconds_total"] += waited
+        _stats["wait_seconds_max"] = max(_stats["wait_seconds_max"], waited)
+        if not acquired:
+            _stats["timeouts"] += 1
+
+    if not acquired:
+        logger.warning(
+            f"Timed out after {waited:.2f}s waiting for a database connection"
+        )
+        raise PoolTimeoutError(
+            f"No database connection available within {settings.DB_POOL_TIMEOUT}s"
+        )
+
+    try:
+        conn = _checkout(db_pool)
+    except Exception:
+        _pool_slots.release()
+        raise
+
+    with _pool_lock:
+        _stats["checkouts"] += 1
+        _stats["in_use"] += 1
+
+    broken = False
+    try:
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    finally:
+        try:
+            _release(db_pool, conn, broken=broken)
+        finally:
+            with _pool_lock:
+                _stats["in_use"] -= 1
+            _pool_slots.release()
+
+
+def get_pool_stats() -> dict:
+    """Snapshot of pool saturation counters"""
+    with _pool_lock:
+        stats = dict(_stats)
+    stats["max_size"] = settings.DB_POOL_MAX_SIZE
+    stats["min_size"] = settings.DB_POOL_MIN_SIZE
+    stats["open"] = (
+        len(_pool._pool) + len(_pool._used) if _pool is not None and not _pool.closed else 0
+    )
+    stats["idle"] = len(_pool._pool) if _pool is not None and not _pool.closed else 0
+    stats["wait_seconds_avg"] = (
+        stats["wait_seconds_total"] / stats["checkouts"] if stats["checkouts"] else 0.0
+    )
+    return stats
+
+
+def close_pool():
+    """Close every pooled connection (called on application shutdown)"""
+    global _pool, _pool_slots
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            logger.info("Database pool closed")
+        _pool = None
+        _pool_slots = None
+        _last_used.clear()
@@ -0,0 +1,244 @@
+# gsid-service/core/metrics.py
+"""
+Prometheus metrics, served in text format at GET /metrics.
+
+Everything here is in-process and cheap enough to leave on: a histogram
+observation is a lock and a bucket increment, and the component gauges are
+computed only when Prometheus scrapes.
+"""
+
+import time
+from collections import Counter as Tally
+from contextlib import contextmanager
+
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from starlette.routing import Match
+
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "gsid_http_request_duration_seconds",
+    "HTTP request latency (streamed responses: until the last byte is sent)",
+    ["method", "endpoint", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge(
+    "gsid_http_requests_in_flight",
+    "HTTP requests currently being served",
+    ["endpoint"],
+)
+RESOLUTION_PHASE_SECONDS = Histogram(
+    "gsid_resolution_phase_seconds",
+    "Time per identity resolution transaction spent in each phase "
+    "(lock, match, create, link, audit, commit)",
+    ["mode", "phase"],
+    buckets=LATENCY_BUCKETS,
+)
+RESOLUTIONS = Counter(
+    "gsid_resolutions_total",
+    "Committed subject resolutions",
+    ["action", "match_strategy"],
+)
+RESOLUTION_ERRORS = Counter(
+    "gsid_resolution_errors_total",
+    "Identity resolution transactions rolled back on error",
+    ["mode"],
+)
+DB_POOL_WAIT_SECONDS = Histogram(
+    "gsid_db_pool_wait_seconds",
+    "Time spent waiting for a pooled database connection",
+    buckets=LATENCY_BUCKETS,
+)
+
+ADMISSION_WAIT_SECONDS = Histogram(
+    "gsid_admission_queue_wait_seconds",
+    "Time requests spent queued for admission (admitted or not)",
+    buckets=LATENCY_BUCKETS,
+)
+ADMISSION_REJECTIONS = Counter(
+    "gsid_admission_rejections_total",
+    "Requests rejected by admission control "
+    "(client_queue_full: 429; queue_full, queue_timeout: 503)",
+    ["reason"],
+)
+
+
+class PhaseTimer:
+    """
+    Exclusive wall time per phase of one resolution transaction.
+
+    Phases may nest: entering an inner phase pauses the outer one, so every
+    moment is charged to exactly one phase.
+    """
+
+    def __init__(self):
+        self.seconds = {}
+        self._stack = []
+        self._mark = time.perf_counter()
+
+    def _charge(self):
+        now = time.perf_counter()
+        if self._stack:
+            name = self._stack[-1]
+            self.seconds[name] = self.seconds.get(name, 0.0) + now - self._mark
+        self._mark = now
+
+    @contextmanager
+    def phase(self, name: str):
+        self._charge()
+        self._stack.append(name)
+        try:
+            yield
+        finally:
+            self._charge()
+            self._stack.pop()
+
+    def observe(self, mode: str):
+        """Record the accumulated phase times under `mode` ("single" or "batch")"""
+        for name, seconds in self.seconds.items():
+            RESOLUTION_PHASE_SECONDS.labels(mode=mode, phase=name).observe(seconds)
+
+
+def record_resolutions(outcomes):
+    """Count committed resolutions by (action, match_strategy)"""
+    for (action, strategy), count in Tally(outcomes).items():
+        RESOLUTIONS.labels(action=action, match_strategy=strategy).inc(count)
+
+
+def _route_template(scope) -> str:
+    """Route path template of a request, so label values stay bounded"""
+    partial = None
+    for route in getattr(scope.get("app"), "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    Record latency and in-flight requests per endpoint.
+
+    Pure ASGI rather than BaseHTTPMiddleware, so streamed request and
+    response bodies (POST /register/stream) pass through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        endpoint = _route_template(scope)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels(endpoint=endpoint)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight.dec()
+            HTTP_REQUEST_SECONDS.labels(
+                method=scope["method"], endpoint=endpoint, status=str(status)
+            ).observe(time.perf_counter() - started)
+
+
+# Cumulative /health stats per component -> counter name (exported with a
+# _total suffix). The other numeric stats are point-in-time values or
+# maxima and stay gauges.
+COUNTER_STATS = {
+    "db_pool": {
+        "checkouts": "checkouts",
+        "timeouts": "timeouts",
+        "discarded": "discarded",
+        "wait_seconds_total": "checkout_wait_seconds",
+    },
+    "reservoir": {
+        "claims": "claims",
+        "claim_shortfalls": "claim_shortfalls",
+        "claim_seconds_total": "claim_seconds",
+        "refills": "refills",
+        "refilled": "refilled",
+        "refill_seconds_total": "refill_seconds",
+        "refill_errors": "refill_errors",
+    },
+    "identifier_cache": {
+        "hits": "hits",
+        "misses": "misses",
+        "stores": "stores",
+        "stale_stores_skipped": "stale_stores_skipped",
+        "evictions": "evictions",
+        "invalidations": "invalidations",
+        "listener_reconnects": "listener_reconnects",
+    },
+    "audit_writer": {
+        "enqueued": "enqueued",
+        "written": "written",
+        "flushes": "flushes",
+        "flush_failures": "flush_failures",
+    },
+    "admission": {
+        "admitted": "admitted",
+        "queued_total": "enqueued",
+        "rejected_client_queue_full": "rejected_client_queue_full",
+        "rejected_queue_full": "rejected_queue_full",
+        "rejected_queue_timeout": "rejected_queue_timeout",
+    },
+}
+
+
+class _ComponentStatsCollector:
+    """Numeric /health stats (pool, reservoir, cache, audit writer, admission) as counters and gauges"""
+
+    def describe(self):
+        # Names are only known at scrape time; also keeps register() from
+        # calling collect() while core.database is still importing
+        return []
+
+    def collect(self):
+        from core.admission import get_admission_stats
+        from core.database import get_pool_stats
+        from services.audit_writer import get_audit_writer_stats
+        from services.gsid_reservoir import get_reservoir_stats
+        from services.identifier_cache import get_cache_stats
+
+        for component, stats in (
+            ("db_pool", get_pool_stats()),
+            ("reservoir", get_reservoir_stats()),
+            ("identifier_cache", get_cache_stats()),
+            ("audit_writer", get_audit_writer_stats()),
+            ("admission", get_admission_stats()),
+        ):
+            counters = COUNTER_STATS[component]
+            for key, value in stats.items():
+                if not isinstance(value, (bool, int, float)):
+                    continue
+                if key in counters:
+                    yield CounterMetricFamily(
+                        f"gsid_{component}_{counters[key]}",
+                        f"{component} {key} (as in GET /health)",
+                        value=float(value),
+                    )
+                else:
+                    yield GaugeMetricFamily(
+                        f"gsid_{component}_{key}",
+                        f"{component} {key} (as in GET /health)",
+                        value=float(value),
+                    )
+
+
+REGISTRY.register(_ComponentStatsCollector())
@@ -0,0 +1,50 @@
+# gsid-service/export_registry.py
+"""
+Export the full GSID <-> local ID mapping (same output as GET /export/registry).
+
+Usage (uses the service's DB_* environment variables):
+    python export_registry.py --format parquet --output registry.parquet
+    python export_registry.py --format csv > registry.csv.gz
+"""
+
+import argparse
+import logging
+import sys
+import time
+
+from core.config import settings
+from core.database import get_db_connection
+from services.registry_export import EXPORT_FORMATS, export_chunks
+
+logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="parquet")
+    parser.add_argument("--output", "-o", help="output file (default: stdout)")
+    parser.add_argument("--batch-rows", type=int, default=settings.EXPORT_BATCH_ROWS)
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    started = time.perf_counter()
+    written = 0
+    try:
+        for chunk in export_chunks(conn, args.format, args.batch_rows):
+            out.write(chunk)
+            written += len(chunk)
+    finally:
+        if args.output:
+            out.close()
+        conn.close()
+
+    logger.info(
+        f"Wrote {written / 1e6:.1f} MB of {args.format} "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,49 @@
 # gsid-service/main.py
 
 import logging
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 
 from api.routes import router
+from core.admission import AdmissionMiddleware
+from core.database import close_pool
+from core.metrics import MetricsMiddleware
+from services.audit_writer import start_audit_writer, stop_audit_writer
+from services.change_feed import start_compactor, stop_compactor
+from services.gsid_reservoir import start_reservoir, stop_reservoir
+from services.identifier_cache import start_cache_listener, stop_cache_listener
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the reservoir, cache, audit and compaction background tasks; release connections on shutdown"""
+    start_reservoir()
+    start_cache_listener()
+    start_audit_writer()
+    start_compactor()
+    yield
+    stop_compactor()
+    stop_audit_writer()  # writes queued audits, so before close_pool()
+    stop_cache_listener()
+    stop_reservoir()
+    close_pool()
+
+
 app = FastAPI(
     title="GSID Service",
     description="Global Subject ID generation service for IDhub",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+# Added first so it runs inside MetricsMiddleware, which then also records
+# the 429/503 rejections
+app.add_middleware(AdmissionMiddleware)
+app.add_middleware(MetricsMiddleware)
 app.include_router(router)
 
 if __name__ == "__main__":
@@ -1,9 +1,14 @@
 # gsid-service/services/__init__.py
-from .gsid_generator import generate_gsid, generate_unique_gsids
-from .identity_resolution import resolve_subject_with_multiple_ids
+from .gsid_generator import generate_gsid, generate_unique_gsids, iter_unique_gsids
+from .identity_resolution import (
+    resolve_subject_with_multiple_ids,
+    resolve_subjects_batch,
+)
 
 __all__ = [
     "generate_gsid",
     "generate_unique_gsids",
+    "iter_unique_gsids",
     "resolve_subject_with_multiple_ids",
+    "resolve_subjects_batch",
 ]
@@ -0,0 +1,161 @@
+# gsid-service/services/audit_writer.py
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Iterable, Tuple
+
+from core.config import settings
+from core.database import pooled_connection
+
+logger = logging.getLogger(__name__)
+
+# Routine identity_resolutions rows (plain link_existing, nothing to review)
+# of committed registrations, waiting to be written in bulk. Rows that need
+# review are never queued: they are written in the registering transaction.
+_lock = threading.Lock()
+_queue = deque()
+_thread = None
+_stop = threading.Event()
+_wakeup = threading.Event()
+_stats = {
+    "enqueued": 0,
+    "written": 0,
+    "flushes": 0,
+    "flush_failures": 0,
+    "flush_seconds_max": 0.0,
+    "last_flush_rows": 0,
+}
+
+
+def accepting(count: int) -> bool:
+    """
+    Whether `count` more audit rows can be deferred to the writer.
+
+    False when the writer is not running or the queue would exceed
+    AUDIT_QUEUE_MAX; callers then write the rows in their own transaction,
+    which also slows producers down while the writer catches up.
+    """
+    with _lock:
+        return _thread is not None and len(_queue) + count <= settings.AUDIT_QUEUE_MAX
+
+
+def enqueue(rows: Iterable[Tuple]):
+    """
+    Queue audit rows of an already committed transaction.
+
+    Rows are identity_resolutions value tuples without created_at; the
+    enqueue time is recorded so the row keeps the registration's timestamp.
+    """
+    created_at = datetime.now(timezone.utc)
+    with _lock:
+        before = len(_queue)
+        _queue.extend(row + (created_at,) for row in rows)
+        _stats["enqueued"] += len(_queue) - before
+        full = len(_queue) >= settings.AUDIT_FLUSH_ROWS
+    if full:
+        _wakeup.set()
+
+
+def flush() -> int:
+    """
+    Write every queued row, AUDIT_FLUSH_ROWS per transaction.
+
+    Returns:
+        Number of rows written
+
+    Raises:
+        Exception: From the failing batch; its rows are put back at the
+            front of the queue and retried on the next flush
+    """
+    from services.identity_resolution import insert_audits
+
+    written = 0
+    while True:
+        with _lock:
+            rows = [
+                _queue.popleft()
+                for _ in range(min(len(_queue), settings.AUDIT_FLUSH_ROWS))
+            ]
+        if not rows:
+            return written
+
+        started = time.perf_counter()
+        try:
+            with pooled_connection() as conn:
+                cur = conn.cursor()
+                try:
+                    insert_audits(cur, rows, page_size=len(rows))
+                    conn.commit()
+                finally:
+                    cur.close()
+        except Exception:
+            with _lock:
+                _queue.extendleft(reversed(rows))
+                _stats["flush_failures"] += 1
+            raise
+
+        elapsed = time.perf_counter() - started
+        with _lock:
+            _stats["written"] += len(rows)
+            _stats["flushes"] += 1
+            _stats["last_flush_rows"] = len(rows)
+            _stats["flush_seconds_max"] = max(_stats["flush_seconds_max"], elapsed)
+        written += len(rows)
+
+
+def _flush_loop():
+    while not _stop.is_set():
+        _wakeup.wait(settings.AUDIT_FLUSH_INTERVAL_MS / 1000)
+        _wakeup.clear()
+        try:
+            flush()
+        except Exception as e:
+            logger.error(f"Audit flush failed, will retry: {e}")
+            _stop.wait(1)
+
+
+def start_audit_writer():
+    """
+    Start the background flush thread.
+
+    No-op if AUDIT_ASYNC_ENABLED is false or the writer is already running.
+    """
+    global _thread
+    if not settings.AUDIT_ASYNC_ENABLED or _thread is not None:
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_flush_loop, name="gsid-audit-writer", daemon=True)
+    _thread.start()
+
+
+def stop_audit_writer():
+    """Stop deferring audits and write what is still queued"""
+    global _thread
+    if _thread is None:
+        return
+    thread = _thread
+    with _lock:
+        _thread = None  # new audits are written inline from now on
+    _stop.set()
+    _wakeup.set()
+    thread.join(timeout=10)
+    try:
+        flush()
+    except Exception as e:
+        with _lock:
+            lost = len(_queue)
+        logger.error(f"Could not write {lost} queued audit row(s) on shutdown: {e}")
+
+
+def get_audit_writer_stats() -> dict:
+    """Snapshot of queue depth and flush counters"""
+    with _lock:
+        stats = dict(_stats)
+        stats["queued"] = len(_queue)
+        stats["running"] = _thread is not None
+    stats["flush_rows"] = settings.AUDIT_FLUSH_ROWS
+    stats["flush_interval_ms"] = settings.AUDIT_FLUSH_INTERVAL_MS
+    stats["queue_max"] = settings.AUDIT_QUEUE_MAX
+    return stats
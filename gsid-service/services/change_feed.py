@@ -0,0 +1,314 @@
+# gsid-service/services/change_feed.py
+import base64
+import binascii
+import logging
+import threading
+from typing import Any, Dict, Tuple
+
+from core.config import settings
+from core.database import pooled_connection
+from psycopg2.extras import RealDictCursor
+
+logger = logging.getLogger(__name__)
+
+# Position in registry_changes: (writing transaction id, change_id). The
+# start of the feed sorts before every change.
+START = (0, 0)
+
+# Aged changes compacted per transaction
+COMPACT_BATCH = 10_000
+
+_thread = None
+_stop = threading.Event()
+
+
+class InvalidCursorError(ValueError):
+    """Cursor was not issued by this service"""
+
+
+class CursorExpiredError(Exception):
+    """Cursor is older than a compacted delete or truncate; re-read from START"""
+
+    def __init__(self, position: Tuple[int, int], expired: Tuple[int, int]):
+        super().__init__(
+            f"Cursor at {position} is older than compacted changes up to {expired}"
+        )
+        self.position = position
+        self.expired = expired
+
+
+def encode_cursor(position: Tuple[int, int]) -> str:
+    """Opaque, URL-safe cursor for a feed position"""
+    txid, change_id = position
+    return base64.urlsafe_b64encode(f"v1:{txid}:{change_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    """
+    Feed position of a cursor from encode_cursor().
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        version, txid, change_id = raw.split(":")
+        position = (int(txid), int(change_id))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursorError(f"Invalid cursor: {cursor!r}")
+    if version != "v1" or min(position) < 0:
+        raise InvalidCursorError(f"Invalid cursor: {cursor!r}")
+    return position
+
+
+def get_changes(conn, position: Tuple[int, int], limit: int) -> Dict[str, Any]:
+    """
+    Next page of subject / local ID changes after `position`, oldest first.
+
+    Only changes of transactions older than every transaction still running
+    are returned: a change_id is taken before its transaction commits, so
+    paging by change_id alone could step past a change that becomes visible
+    later. Ordered by (txid, change_id), everything a later page can return
+    sorts after this page. Replaying the changes in order, inserts and
+    updates as upserts of `row` and deletes by `key`, reproduces the tables.
+
+    Compaction (compact_changes) may have deleted changes a reader between
+    START and the newest compacted delete/truncate has not seen yet. The
+    retention row is read after the page, so such a reader gets
+    CursorExpiredError even if compaction commits in between.
+
+    Returns:
+        {
+            "changes": [{change_id, table, operation, key, row, changed_at}, ...],
+            "next_position": (txid, change_id) to continue from,
+            "has_more": bool (another page is available right now)
+        }
+
+    Raises:
+        CursorExpiredError: If changes after `position` may have been compacted away
+    """
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    try:
+        cur.execute(
+            """
+            SELECT
+                change_id,
+                txid::text AS txid,
+                table_name,
+                operation,
+                row_key,
+                row_data,
+                changed_at
+            FROM registry_changes
+            WHERE (txid, change_id) > (%s::xid8, %s)  -- idx_registry_changes_position
+              AND txid < pg_snapshot_xmin(pg_current_snapshot())
+            ORDER BY txid, change_id
+            LIMIT %s
+            """,
+            (str(position[0]), position[1], limit + 1),
+        )
+        rows = cur.fetchall()
+        cur.execute(
+            """
+            SELECT expired_txid::text AS txid, expired_change_id AS change_id
+            FROM registry_changes_retention
+            """
+        )
+        retention = cur.fetchone()
+    finally:
+        cur.close()
+        conn.rollback()
+
+    if retention and position != START:
+        expired = (int(retention["txid"]), retention["change_id"])
+        if position < expired:
+            raise CursorExpiredError(position, expired)
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if rows:
+        position = (int(rows[-1]["txid"]), rows[-1]["change_id"])
+
+    return {
+        "changes": [
+            {
+                "change_id": row["change_id"],
+                "table": row["table_name"],
+                "operation": row["operation"],
+                "key": row["row_key"],
+                "row": row["row_data"],
+                "changed_at": row["changed_at"],
+            }
+            for row in rows
+        ],
+        "next_position": position,
+        "has_more": has_more,
+    }
+
+
+def compact_changes(conn, retention_days: int, batch_size: int = COMPACT_BATCH) -> int:
+    """
+    Compact changes older than `retention_days`, one batch per transaction.
+
+    Aged changes are taken in feed order from where the previous run stopped
+    (registry_changes_retention.compacted_*). For each one, the earlier
+    changes of the same row are deleted, as is everything earlier in the
+    table for a truncate; aged deletes and truncates are deleted themselves.
+    What remains is the latest change of every live row, so replaying the
+    feed from START still builds a complete mirror. Cursors before the newest
+    deleted delete/truncate are recorded as expired (see get_changes).
+
+    Only transactions older than every running one are compacted, like
+    get_changes reads them. A worker process that finds the retention row
+    locked by another one leaves the work to it.
+
+    Returns:
+        Number of change rows deleted
+    """
+    deleted = 0
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    try:
+        while True:
+            cur.execute(
+                """
+                SELECT
+                    compacted_txid::text AS compacted_txid,
+                    compacted_change_id,
+                    expired_txid::text AS expired_txid,
+                    expired_change_id
+                FROM registry_changes_retention
+                FOR UPDATE SKIP LOCKED
+                """
+            )
+            state = cur.fetchone()
+            if state is None:
+                break
+            low = (int(state["compacted_txid"]), state["compacted_change_id"])
+            expired = (int(state["expired_txid"]), state["expired_change_id"])
+
+            cur.execute(
+                """
+                SELECT
+                    txid::text AS txid,
+                    change_id,
+                    changed_at < NOW() - make_interval(days => %s) AS aged
+                FROM registry_changes
+                WHERE (txid, change_id) > (%s::xid8, %s)  -- idx_registry_changes_position
+                  AND txid < pg_snapshot_xmin(pg_current_snapshot())
+                ORDER BY txid, change_id
+                LIMIT %s
+                """,
+                (retention_days, str(low[0]), low[1], batch_size),
+            )
+            batch = cur.fetchall()
+            aged = 0
+            while aged < len(batch) and batch[aged]["aged"]:
+                aged += 1
+            if not aged:
+                break
+            high = (int(batch[aged - 1]["txid"]), batch[aged - 1]["change_id"])
+
+            cur.execute(
+                """
+                WITH aged AS (
+                    SELECT txid, change_id, table_name, row_key, operation
+                    FROM registry_changes
+                    WHERE (txid, change_id) > (%(low_txid)s::xid8, %(low_id)s)
+                      AND (txid, change_id) <= (%(high_txid)s::xid8, %(high_id)s)
+                ),
+                doomed AS (
+                    SELECT change_id FROM aged WHERE operation IN ('delete', 'truncate')
+                    UNION
+                    SELECT e.change_id
+                    FROM aged a
+                    JOIN registry_changes e  -- idx_registry_changes_key
+                      ON e.table_name = a.table_name
+                     AND e.row_key = a.row_key
+                     AND (e.txid, e.change_id) < (a.txid, a.change_id)
+                    UNION
+                    SELECT e.change_id
+                    FROM aged a
+                    JOIN registry_changes e
+                      ON e.table_name = a.table_name
+                     AND (e.txid, e.change_id) < (a.txid, a.change_id)
+                    WHERE a.operation = 'truncate'
+                )
+                DELETE FROM registry_changes r
+                USING doomed d
+                WHERE r.change_id = d.change_id
+                RETURNING r.operation, r.txid::text AS txid, r.change_id
+                """,
+                {
+                    "low_txid": str(low[0]),
+                    "low_id": low[1],
+                    "high_txid": str(high[0]),
+                    "high_id": high[1],
+                },
+            )
+            removed = cur.fetchall()
+            for row in removed:
+                if row["operation"] in ("delete", "truncate"):
+                    expired = max(expired, (int(row["txid"]), row["change_id"]))
+
+            cur.execute(
+                """
+                UPDATE registry_changes_retention
+                SET compacted_txid = %s::xid8,
+                    compacted_change_id = %s,
+                    expired_txid = %s::xid8,
+                    expired_change_id = %s,
+                    updated_at = NOW()
+                """,
+                (str(high[0]), high[1], str(expired[0]), expired[1]),
+            )
+            conn.commit()
+            deleted += len(removed)
+
+            if aged < batch_size:
+                break
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    if deleted:
+        logger.info(f"Compacted {deleted} registry change(s)")
+    return deleted
+
+
+def _compact_loop():
+    while not _stop.is_set():
+        try:
+            with pooled_connection() as conn:
+                compact_changes(conn, settings.CHANGE_FEED_RETENTION_DAYS)
+        except Exception as e:
+            logger.error(f"Change feed compaction failed: {e}")
+        _stop.wait(settings.CHANGE_FEED_COMPACT_INTERVAL)
+
+
+def start_compactor():
+    """Start the background compaction thread (no-op if retention is 0 or already running)"""
+    global _thread
+    if settings.CHANGE_FEED_RETENTION_DAYS <= 0 or _thread is not None:
+        return
+    _stop.clear()
+    _thread = threading.Thread(
+        target=_compact_loop, name="change-feed-compactor", daemon=True
+    )
+    _thread.start()
+    logger.info(
+        f"Change feed compaction started "
+        f"(retention={settings.CHANGE_FEED_RETENTION_DAYS} days)"
+    )
+
+
+def stop_compactor():
+    """Stop the background compaction thread"""
+    global _thread
+    if _thread is None:
+        return
+    _stop.set()
+    _thread.join(timeout=settings.DB_POOL_TIMEOUT)
+    _thread = None
+    logger.info("Change feed compaction stopped")
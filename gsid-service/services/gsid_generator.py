@@ -1,16 +1,38 @@
 # gsid-service/services/gsid_generator.py
 import logging
+import re
 import secrets
 import time
-from typing import List
+from typing import Iterator, List, Optional
 
+from core.config import settings
 from core.database import get_db_connection, get_db_cursor
+from psycopg2.extras import execute_values
 
 logger = logging.getLogger(__name__)
 
+# Bulk minting limits
+MAX_GSIDS_PER_REQUEST = 1_000_000
+MINT_CHUNK_SIZE = 10_000
+MAX_MINT_ROUNDS = 10
+
 # Custom Base32 alphabet (Crockford's base32 without confusing characters)
 BASE32_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"  # 32 chars, no I, L, O, U
 
+# GSID layout: "GSID-" + 16 base32 characters
+GSID_PREFIX = "GSID-"
+GSID_BODY_LENGTH = 16
+GSID_PATTERN = re.compile(rf"^{GSID_PREFIX}[{BASE32_ALPHABET}]{{{GSID_BODY_LENGTH}}}$")
+
+LEGACY_TIMESTAMP_CHARS = 5
+BUCKETED_TIMESTAMP_CHARS = 5
+BUCKETED_RANDOM_CHARS = GSID_BODY_LENGTH - BUCKETED_TIMESTAMP_CHARS
+BUCKETED_BUCKET_MS = 3_600_000
+
+# Bucketed GSIDs count hours from this time (2025-01-01 UTC); 32**5 hours
+# last until the year ~5800
+BUCKETED_EPOCH_MS = 1_735_689_600_000
+
 
 def encode_base32(num: int, length: int) -> str:
     """Encode number as base32 string with custom alphabet"""
@@ -29,86 +51,159 @@ def encode_base32(num: int, length: int) -> str:
     return "".join(reversed(result))
 
 
-def generate_gsid() -> str:
+def generate_legacy_gsid() -> str:
     """
-    Generate a single GSID in format: GSID-XXXXXXXXXXXXXXXX (21 characters total)
+    Generate a GSID with the original layout: GSID-TTTTTRRRRRRRRRRR
 
-    Structure:
-    - Prefix: "GSID-" (5 characters)
-    - Timestamp part: 5 base32 characters (milliseconds since epoch)
-      - Provides lexicographic sorting by creation time
-      - ~25 bits = covers timestamps until year ~2084
-    - Random part: 11 base32 characters
-      - ~55 bits of randomness = 36 quadrillion combinations per millisecond
-
-    Total: 16-character ID (80 bits of uniqueness)
-    Format: GSID-TTTTTRRRRRRRRRRR
+    - Timestamp part: 5 base32 characters of (milliseconds since epoch) mod 32**5.
+      The prefix wraps about every 9.3 hours, so IDs do not sort by creation
+      time.
+    - Random part: 11 base32 characters (55 bits of randomness)
     """
     # Get current timestamp in milliseconds
     timestamp_ms = int(time.time() * 1000)
 
     # Encode timestamp as 5 base32 characters
     # Limit to 5 chars by taking modulo 32^5 = 33,554,432
-    timestamp_part = encode_base32(timestamp_ms % (32**5), length=5)
+    timestamp_part = encode_base32(
+        timestamp_ms % (32**LEGACY_TIMESTAMP_CHARS), length=LEGACY_TIMESTAMP_CHARS
+    )
 
     # Generate 11 characters of randomness
     # 11 base32 chars = 55 bits, so generate random number < 32^11
-    max_random = 32**11  # 2^55 = 36,028,797,018,963,968
-    random_int = secrets.randbelow(max_random)
-    random_part = encode_base32(random_int, length=11)
+    random_length = GSID_BODY_LENGTH - LEGACY_TIMESTAMP_CHARS
+    random_int = secrets.randbelow(32**random_length)
+    random_part = encode_base32(random_int, length=random_length)
+
+    return f"{GSID_PREFIX}{timestamp_part}{random_part}"
+
+
+def generate_bucketed_gsid() -> str:
+    """
+    Generate an hour-bucketed GSID: GSID-HHHHHRRRRRRRRRRR
+
+    - Hour part: 5 base32 characters of whole hours since BUCKETED_EPOCH_MS
+      (does not wrap until the year ~5800)
+    - Random part: 11 base32 characters (55 bits of randomness, as in the
+      legacy layout)
+
+    The prefix never decreases, so IDs minted in the same hour share a narrow
+    key range. IDs are not time-ordered: within an hour they are random.
+    """
+    hours = (int(time.time() * 1000) - BUCKETED_EPOCH_MS) // BUCKETED_BUCKET_MS
+    hour_part = encode_base32(max(hours, 0), length=BUCKETED_TIMESTAMP_CHARS)
+    random_part = encode_base32(
+        secrets.randbelow(32**BUCKETED_RANDOM_CHARS), length=BUCKETED_RANDOM_CHARS
+    )
+    return f"{GSID_PREFIX}{hour_part}{random_part}"
+
+
+def generate_gsid() -> str:
+    """
+    Generate a single GSID in format: GSID-XXXXXXXXXXXXXXXX (21 characters total)
+
+    The body layout depends on settings.GSID_GENERATION_MODE:
+    - "legacy" (default): generate_legacy_gsid
+    - "bucketed": generate_bucketed_gsid
+
+    Both layouts use the same 16-character base32 body, so existing IDs
+    remain valid. The body carries no layout marker.
+    """
+    mode = settings.GSID_GENERATION_MODE
+    if mode == "bucketed":
+        return generate_bucketed_gsid()
+    if mode == "legacy":
+        return generate_legacy_gsid()
+    raise ValueError(f"Unknown GSID generation mode: {mode}")
+
 
-    return f"GSID-{timestamp_part}{random_part}"
+def is_valid_gsid(gsid: str) -> bool:
+    """Check that a string is a well-formed GSID (either layout)"""
+    return isinstance(gsid, str) and bool(GSID_PATTERN.match(gsid))
 
 
-def generate_unique_gsids(count: int) -> List[str]:
+def _mint_gsids(cursor, count: int, reserved_by: Optional[str] = None) -> List[str]:
+    """
+    Reserve `count` new GSIDs in gsid_registry using set-based inserts.
+
+    Candidates are generated in memory and written with one multi-row
+    INSERT ... ON CONFLICT DO NOTHING RETURNING per round; only the candidates
+    that collided with existing rows are regenerated in the next round.
+    """
+    gsids = []
+    attempts = 0
+    for _ in range(MAX_MINT_ROUNDS):
+        missing = count - len(gsids)
+        if missing == 0:
+            break
+
+        candidates = set()
+        while len(candidates) < missing:
+            candidates.add(generate_gsid())
+        attempts += missing
+
+        inserted = execute_values(
+            cursor,
+            """
+            INSERT INTO gsid_registry (gsid, status, reserved_by, created_at)
+            VALUES %s
+            ON CONFLICT (gsid) DO NOTHING
+            RETURNING gsid
+            """,
+            [(gsid, reserved_by) for gsid in sorted(candidates)],
+            template="(%s, 'reserved', %s, NOW())",
+            page_size=MINT_CHUNK_SIZE,
+            fetch=True,
+        )
+        gsids.extend(row["gsid"] for row in inserted)
+
+        if len(gsids) < count:
+            logger.debug(f"{count - len(gsids)} GSID collision(s), regenerating")
+
+    if len(gsids) < count:
+        raise Exception(
+            f"Could not generate {count} unique GSIDs after {attempts} attempts"
+        )
+
+    # RETURNING order is not guaranteed; hand callers a deterministic order
+    gsids.sort()
+    return gsids
+
+
+def _validate_count(count: int):
+    if count < 1 or count > MAX_GSIDS_PER_REQUEST:
+        raise ValueError(f"Count must be between 1 and {MAX_GSIDS_PER_REQUEST}")
+
+
+def generate_unique_gsids(
+    count: int, conn=None, reserved_by: Optional[str] = None
+) -> List[str]:
     """
     Generate multiple unique GSIDs and reserve them in database
 
+    All GSIDs are reserved in one transaction. For very large requests use
+    iter_unique_gsids, which commits chunk by chunk.
+
     Args:
         count: Number of GSIDs to generate
+        conn: Optional open connection (a new one is opened and closed if omitted)
+        reserved_by: Optional label stored with the reservation
 
     Returns:
-        List of unique GSID strings (lexicographically sortable by creation time)
+        List of unique GSID strings, sorted
 
     Raises:
         ValueError: If count is invalid
         Exception: If database operations fail
     """
-    if count < 1 or count > 1000:
-        raise ValueError("Count must be between 1 and 1000")
+    _validate_count(count)
 
-    conn = None
+    own_conn = conn is None
     try:
-        conn = get_db_connection()
+        if own_conn:
+            conn = get_db_connection()
         with get_db_cursor(conn) as cursor:
-            gsids = []
-            attempts = 0
-            max_attempts = count * 10  # Prevent infinite loops
-
-            while len(gsids) < count and attempts < max_attempts:
-                gsid = generate_gsid()
-                attempts += 1
-
-                # Check if GSID already exists
-                cursor.execute("SELECT 1 FROM gsid_registry WHERE gsid = %s", (gsid,))
-
-                if cursor.fetchone() is None:
-                    # Reserve the GSID
-                    cursor.execute(
-                        """
-                        INSERT INTO gsid_registry (gsid, status, created_at)
-                        VALUES (%s, 'reserved', NOW())
-                        """,
-                        (gsid,),
-                    )
-                    gsids.append(gsid)
-                    logger.debug(f"Generated and reserved GSID: {gsid}")
-
-            if len(gsids) < count:
-                raise Exception(
-                    f"Could not generate {count} unique GSIDs after {attempts} attempts"
-                )
-
+            gsids = _mint_gsids(cursor, count, reserved_by)
             conn.commit()
             logger.info(f"Successfully generated {count} unique GSIDs")
             return gsids
@@ -119,7 +214,48 @@ def generate_unique_gsids(count: int) -> List[str]:
         logger.error(f"Error generating GSIDs: {e}")
         raise
     finally:
+        if own_conn and conn:
+            conn.close()
+
+
+def iter_unique_gsids(
+    count: int,
+    chunk_size: int = MINT_CHUNK_SIZE,
+    conn=None,
+    reserved_by: Optional[str] = None,
+) -> Iterator[str]:
+    """
+    Stream `count` newly reserved GSIDs, committing every `chunk_size`.
+
+    Memory stays bounded by the chunk size, so this is the path for
+    pre-allocating 100k+ IDs. GSIDs of chunks yielded before an error stay
+    reserved.
+    """
+    _validate_count(count)
+
+    own_conn = conn is None
+    produced = 0
+    try:
+        if own_conn:
+            conn = get_db_connection()
+        while produced < count:
+            size = min(chunk_size, count - produced)
+            with get_db_cursor(conn) as cursor:
+                gsids = _mint_gsids(cursor, size, reserved_by)
+            conn.commit()
+            produced += size
+            logger.debug(f"Reserved {produced}/{count} GSIDs")
+            yield from gsids
+
+        logger.info(f"Successfully generated {count} unique GSIDs")
+
+    except Exception as e:
         if conn:
+            conn.rollback()
+        logger.error(f"Error generating GSIDs after {produced} of {count}: {e}")
+        raise
+    finally:
+        if own_conn and conn:
             conn.close()
 
 
@@ -137,14 +273,17 @@ def reserve_gsids(gsids: List[str]) -> None:
     try:
         conn = get_db_connection()
         with get_db_cursor(conn) as cursor:
-            for gsid in gsids:
-                cursor.execute(
+            if gsids:
+                execute_values(
+                    cursor,
                     """
                     INSERT INTO gsid_registry (gsid, status, created_at)
-                    VALUES (%s, 'reserved', NOW())
+                    VALUES %s
                     ON CONFLICT (gsid) DO NOTHING
                     """,
-                    (gsid,),
+                    [(gsid,) for gsid in gsids],
+                    template="(%s, 'reserved', NOW())",
+                    page_size=MINT_CHUNK_SIZE,
                 )
             conn.commit()
             logger.info(f"Reserved {len(gsids)} GSIDs")
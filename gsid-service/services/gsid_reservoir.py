@@ -0,0 +1,224 @@
+# gsid-service/services/gsid_reservoir.py
+import logging
+import threading
+import time
+from typing import List
+
+from core.config import settings
+from core.database import get_db_cursor, pooled_connection
+
+logger = logging.getLogger(__name__)
+
+# gsid_registry.reserved_by for reservoir rows; IDs reserved for clients via
+# POST /gsids/reserve carry their own label and are never claimed here
+RESERVOIR_OWNER = "gsid-service:reservoir"
+
+# pg_try_advisory_xact_lock key so only one worker process refills at a time
+RESERVOIR_LOCK_KEY = 0x47534944
+
+_thread = None
+_stop = threading.Event()
+_wakeup = threading.Event()
+_stats_lock = threading.Lock()
+_stats = {
+    "depth": 0,
+    "claims": 0,
+    "claimed": 0,
+    "claim_shortfalls": 0,
+    "claim_seconds_total": 0.0,
+    "claim_seconds_max": 0.0,
+    "refills": 0,
+    "refilled": 0,
+    "refill_seconds_total": 0.0,
+    "refill_rate": 0.0,
+    "refill_errors": 0,
+}
+
+
+def claim_gsids(cursor, count: int) -> List[str]:
+    """
+    Claim up to `count` pre-minted GSIDs inside the caller's transaction.
+
+    Rows are flipped to 'assigned' with UPDATE ... RETURNING over a
+    FOR UPDATE SKIP LOCKED subquery, so concurrent registrations never wait
+    on each other; if the caller rolls back, the IDs return to the reservoir.
+    Returns fewer than `count` IDs (possibly none) when the reservoir is
+    short, and none at all when the refill task is not running.
+
+    `cursor` must be a RealDictCursor.
+    """
+    if _thread is None or count < 1:
+        return []
+
+    started = time.perf_counter()
+    cursor.execute(
+        """
+        UPDATE gsid_registry
+        SET status = 'assigned', assigned_at = NOW()
+        WHERE gsid IN (
+            SELECT gsid
+            FROM gsid_registry
+            WHERE status = 'reserved' AND reserved_by = %s  -- idx_gsid_registry_reserved
+            ORDER BY gsid
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING gsid
+        """,
+        (RESERVOIR_OWNER, count),
+    )
+    gsids = sorted(row["gsid"] for row in cursor.fetchall())
+    elapsed = time.perf_counter() - started
+
+    with _stats_lock:
+        _stats["claims"] += 1
+        _stats["claimed"] += len(gsids)
+        _stats["claim_seconds_total"] += elapsed
+        _stats["claim_seconds_max"] = max(_stats["claim_seconds_max"], elapsed)
+        _stats["depth"] = max(_stats["depth"] - len(gsids), 0)
+        if len(gsids) < count:
+            _stats["claim_shortfalls"] += 1
+        low = _stats["depth"] < settings.GSID_RESERVOIR_LOW_WATER
+
+    if len(gsids) < count:
+        logger.warning(
+            f"GSID reservoir short: claimed {len(gsids)} of {count}, "
+            "minting the rest inline"
+        )
+    if low:
+        _wakeup.set()
+
+    return gsids
+
+
+def release_gsids(cursor, gsids: List[str]):
+    """Put claimed but unused GSIDs back into the reservoir"""
+    if not gsids:
+        return
+    cursor.execute(
+        """
+        UPDATE gsid_registry
+        SET status = 'reserved', assigned_at = NULL
+        WHERE gsid = ANY(%s)
+        """,
+        (list(gsids),),
+    )
+    with _stats_lock:
+        _stats["claimed"] -= len(gsids)
+        _stats["depth"] += len(gsids)
+
+
+def refill_reservoir() -> int:
+    """
+    Top the reservoir up to GSID_RESERVOIR_TARGET if it is below the low-water mark.
+
+    Mints in MINT_CHUNK_SIZE transactions. Each one takes a transaction-scoped
+    advisory lock and re-counts the reservoir first, so several worker
+    processes refilling at once neither block each other nor overshoot.
+
+    Returns:
+        Number of GSIDs added
+    """
+    from services.gsid_generator import MINT_CHUNK_SIZE, _mint_gsids
+
+    added = 0
+    started = time.perf_counter()
+    with pooled_connection() as conn:
+        with get_db_cursor(conn) as cursor:
+            while True:
+                cursor.execute(
+                    "SELECT pg_try_advisory_xact_lock(%s) AS locked",
+                    (RESERVOIR_LOCK_KEY,),
+                )
+                if not cursor.fetchone()["locked"]:
+                    logger.debug("GSID reservoir refill already running elsewhere")
+                    break
+
+                cursor.execute(
+                    """
+                    SELECT COUNT(*) AS depth
+                    FROM gsid_registry
+                    WHERE status = 'reserved' AND reserved_by = %s
+                    """,
+                    (RESERVOIR_OWNER,),
+                )
+                depth = cursor.fetchone()["depth"]
+                with _stats_lock:
+                    _stats["depth"] = depth
+
+                if depth >= settings.GSID_RESERVOIR_TARGET or (
+                    added == 0 and depth >= settings.GSID_RESERVOIR_LOW_WATER
+                ):
+                    break
+
+                size = min(MINT_CHUNK_SIZE, settings.GSID_RESERVOIR_TARGET - depth)
+                _mint_gsids(cursor, size, reserved_by=RESERVOIR_OWNER)
+                conn.commit()
+                added += size
+                with _stats_lock:
+                    _stats["depth"] = depth + size
+            conn.commit()
+
+    if added:
+        elapsed = time.perf_counter() - started
+        with _stats_lock:
+            _stats["refills"] += 1
+            _stats["refilled"] += added
+            _stats["refill_seconds_total"] += elapsed
+            _stats["refill_rate"] = added / elapsed if elapsed else 0.0
+        logger.info(f"GSID reservoir refilled with {added} GSIDs in {elapsed:.2f}s")
+
+    return added
+
+
+def _refill_loop():
+    while not _stop.is_set():
+        try:
+            refill_reservoir()
+        except Exception as e:
+            with _stats_lock:
+                _stats["refill_errors"] += 1
+            logger.error(f"GSID reservoir refill failed: {e}")
+        _wakeup.wait(settings.GSID_RESERVOIR_REFILL_INTERVAL)
+        _wakeup.clear()
+
+
+def start_reservoir():
+    """Start the background refill thread (no-op if disabled or already running)"""
+    global _thread
+    if not settings.GSID_RESERVOIR_ENABLED or _thread is not None:
+        return
+    _stop.clear()
+    _thread = threading.Thread(
+        target=_refill_loop, name="gsid-reservoir-refill", daemon=True
+    )
+    _thread.start()
+    logger.info(
+        f"GSID reservoir started (low_water={settings.GSID_RESERVOIR_LOW_WATER}, "
+        f"target={settings.GSID_RESERVOIR_TARGET})"
+    )
+
+
+def stop_reservoir():
+    """Stop the background refill thread; claims fall back to inline minting"""
+    global _thread
+    if _thread is None:
+        return
+    _stop.set()
+    _wakeup.set()
+    _thread.join(timeout=settings.DB_POOL_TIMEOUT)
+    _thread = None
+    logger.info("GSID reservoir stopped")
+
+
+def get_reservoir_stats() -> dict:
+    """Snapshot of reservoir depth, claim latency and refill counters"""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["running"] = _thread is not None
+    stats["low_water"] = settings.GSID_RESERVOIR_LOW_WATER
+    stats["target"] = settings.GSID_RESERVOIR_TARGET
+    stats["claim_seconds_avg"] = (
+        stats["claim_seconds_total"] / stats["claims"] if stats["claims"] else 0.0
+    )
+    return stats
@@ -1,15 +1,34 @@
 # gsid-service/services/id_validator.py
 import logging
 import re
-from typing import Dict, List
+from typing import Any, Dict, List, Sequence, Union
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 
 logger = logging.getLogger(__name__)
 
+# Characters str.strip() removes from ASCII text (Python's whitespace also
+# includes the \x1c-\x1f separators)
+_ASCII_WHITESPACE = " \t\n\v\f\r\x1c\x1d\x1e\x1f"
+
+
+def _re2(pattern: str) -> str:
+    """
+    Python pattern -> the RE2 (Arrow) pattern that matches the same ASCII text.
+
+    RE2's \\s is only [\\t\\n\\f\\r ]; Python's also matches \\v and \\x1c-\\x1f.
+    """
+    return pattern.replace(r"\s", r"[\t\n\v\f\r \x1c-\x1f]")
+
 
 class IDValidator:
     """Validates subject IDs and provides warnings for suspicious patterns"""
 
-    # Error patterns that should fail validation
+    # Error patterns that should fail validation (case-insensitive). All are
+    # anchored at the start, so they are matched as one alternation whose
+    # first matching branch is the first matching pattern in list order.
     ERROR_PATTERNS = [
         r"^test",  # Test IDs
         r"^demo",  # Demo IDs
@@ -27,6 +46,14 @@ class IDValidator:
         r"[^a-zA-Z0-9_-]",  # Special characters (except underscore/hyphen)
     ]
 
+    # Warning per pattern; {n} is the length of the stripped ID
+    WARNING_MESSAGES = {
+        r"^\d{1,3}$": "ID is very short ({n} digits)",
+        r"^[a-z]{1,2}$": "ID is very short ({n} characters)",
+        r"\s": "ID contains whitespace",
+        r"[^a-zA-Z0-9_-]": "ID contains special characters",
+    }
+
     # Identifier types that allow numeric-only IDs
     NUMERIC_ALLOWED_TYPES = {
         "niddk_no",
@@ -34,10 +61,28 @@ class IDValidator:
         "record_id",
     }
 
+    @classmethod
+    def _compile(cls):
+        """Precompile the pattern lists (once, at import)"""
+        unanchored = [p for p in cls.ERROR_PATTERNS if not p.startswith("^")]
+        if unanchored:
+            raise ValueError(f"ERROR_PATTERNS must start with '^': {unanchored}")
+        cls._error_regex = re.compile(
+            "|".join(f"(?P<e{i}>{p})" for i, p in enumerate(cls.ERROR_PATTERNS)),
+            re.IGNORECASE,
+        )
+        cls._warning_checks = [
+            (re.compile(p), cls.WARNING_MESSAGES[p]) for p in cls.WARNING_PATTERNS
+        ]
+
+    @staticmethod
+    def _error(message: str) -> Dict[str, Any]:
+        return {"valid": False, "severity": "error", "warnings": [message]}
+
     @classmethod
     def validate_id(
         cls, local_id: str, identifier_type: str = "primary"
-    ) -> Dict[str, any]:
+    ) -> Dict[str, Any]:
         """
         Validate a single ID
 
@@ -48,68 +93,154 @@ class IDValidator:
                 "warnings": List[str]
             }
         """
-        warnings = []
-        severity = "info"
-
         if not local_id or not local_id.strip():
-            return {
-                "valid": False,
-                "severity": "error",
-                "warnings": ["ID is empty or whitespace"],
-            }
+            return cls._error("ID is empty or whitespace")
 
         local_id_stripped = local_id.strip()
 
-        # Check error patterns
-        for pattern in cls.ERROR_PATTERNS:
-            if re.search(pattern, local_id_stripped, re.IGNORECASE):
-                return {
-                    "valid": False,
-                    "severity": "error",
-                    "warnings": [f"ID matches error pattern: {pattern}"],
-                }
-
-        # Check warning patterns
-        for pattern in cls.WARNING_PATTERNS:
-            if re.search(pattern, local_id_stripped):
-                if pattern == r"^\d{1,3}$":
-                    warnings.append(
-                        f"ID is very short ({len(local_id_stripped)} digits)"
-                    )
-                    severity = "warning"
-                elif pattern == r"^[a-z]{1,2}$":
-                    warnings.append(
-                        f"ID is very short ({len(local_id_stripped)} characters)"
-                    )
-                    severity = "warning"
-                elif pattern == r"\s":
-                    warnings.append("ID contains whitespace")
-                    severity = "warning"
-                elif pattern == r"[^a-zA-Z0-9_-]":
-                    warnings.append("ID contains special characters")
-                    severity = "warning"
-
-        # Check if purely numeric (unless allowed for this type)
-        if (
-            local_id_stripped.isdigit()
-            and identifier_type not in cls.NUMERIC_ALLOWED_TYPES
-        ):
+        match = cls._error_regex.search(local_id_stripped)
+        if match:
+            pattern = cls.ERROR_PATTERNS[int(match.lastgroup[1:])]
+            return cls._error(f"ID matches error pattern: {pattern}")
+
+        return cls._warnings_result(
+            cls._warnings(
+                [bool(regex.search(local_id_stripped)) for regex, _ in cls._warning_checks],
+                len(local_id_stripped),
+                # Purely numeric (unless allowed for this type)
+                local_id_stripped.isdigit()
+                and identifier_type not in cls.NUMERIC_ALLOWED_TYPES,
+                identifier_type,
+            )
+        )
+
+    @classmethod
+    def _warnings(
+        cls, pattern_hits: Sequence[bool], n: int, numeric: bool, identifier_type: str
+    ) -> List[str]:
+        """
+        Warnings of a valid ID of length n, given which WARNING_PATTERNS it
+        matches and whether it is numeric where its type does not allow that
+        """
+        warnings = [
+            message.format(n=n)
+            for hit, (_, message) in zip(pattern_hits, cls._warning_checks)
+            if hit
+        ]
+        if numeric:
             warnings.append(
                 f"ID is purely numeric for type '{identifier_type}' (may be ambiguous)"
             )
-            severity = "warning"
-
-        # Check length
-        if len(local_id_stripped) < 3:
-            warnings.append(f"ID is very short ({len(local_id_stripped)} characters)")
-            severity = "warning"
+        if n < 3:
+            warnings.append(f"ID is very short ({n} characters)")
+        return warnings
 
+    @staticmethod
+    def _warnings_result(warnings: List[str]) -> Dict[str, Any]:
         return {
             "valid": True,
-            "severity": severity,
+            "severity": "warning" if warnings else "info",
             "warnings": warnings,
         }
 
+    @classmethod
+    def validate_array(
+        cls, ids, identifier_types: Union[str, Sequence[str]] = "primary"
+    ) -> pa.Table:
+        """
+        Validate many IDs at once, with the same result per ID as validate_id.
+
+        ASCII IDs (practically all of them) are checked column-wise with Arrow
+        compute kernels, one pass per pattern; only IDs that get a warning are
+        touched in Python, to format their messages. Null and non-ASCII IDs
+        go through validate_id.
+
+        Args:
+            ids: pandas Series, pyarrow (Chunked)Array or list of str/None
+            identifier_types: One type for every ID, or one per ID
+
+        Returns:
+            Table with columns valid (bool), severity (str) and
+            warnings (list<str>), one row per ID in input order
+        """
+        if isinstance(ids, pa.ChunkedArray):
+            ids = ids.combine_chunks()
+        ids = ids.cast(pa.string()) if isinstance(ids, pa.Array) else pa.array(ids, pa.string())
+        count = len(ids)
+        if isinstance(identifier_types, str):
+            types = [identifier_types] * count
+        else:
+            types = list(identifier_types)
+            if len(types) != count:
+                raise ValueError(
+                    f"Got {len(types)} identifier types for {count} IDs"
+                )
+
+        def mask(values) -> np.ndarray:
+            return pc.fill_null(values, False).to_numpy(zero_copy_only=False)
+
+        vectorized = mask(pc.string_is_ascii(ids))
+        stripped = pc.utf8_trim(ids, characters=_ASCII_WHITESPACE)
+        lengths = pc.fill_null(pc.utf8_length(stripped), 0).to_numpy(zero_copy_only=False)
+
+        error_index = np.full(count, -1, dtype=np.int16)
+        for i in reversed(range(len(cls.ERROR_PATTERNS))):  # first match wins
+            hits = mask(
+                pc.match_substring_regex(
+                    stripped, _re2(cls.ERROR_PATTERNS[i]), ignore_case=True
+                )
+            )
+            error_index[hits] = i
+
+        pattern_hits = np.column_stack(
+            [mask(pc.match_substring_regex(stripped, _re2(p))) for p in cls.WARNING_PATTERNS]
+        )
+        numeric = mask(pc.match_substring_regex(stripped, "^[0-9]+$")) & ~np.isin(
+            np.array(types, dtype=object), list(cls.NUMERIC_ALLOWED_TYPES)
+        )
+        empty = lengths == 0
+        valid = vectorized & ~empty & (error_index < 0)
+        flagged = valid & (pattern_hits.any(axis=1) | numeric | (lengths < 3))
+
+        severity = np.where(valid, np.where(flagged, "warning", "info"), "error").astype(object)
+        warnings = [[]] * count
+
+        # Messages depend only on the pattern hits, the length and (numeric
+        # IDs) the type, so repeated combinations share one list
+        messages = {}
+        for row, hits, n, is_numeric in zip(
+            np.flatnonzero(flagged).tolist(),
+            pattern_hits[flagged].tolist(),
+            lengths[flagged].tolist(),
+            numeric[flagged].tolist(),
+        ):
+            key = (tuple(hits), n, is_numeric, types[row] if is_numeric else None)
+            if key not in messages:
+                messages[key] = cls._warnings(hits, n, is_numeric, types[row])
+            warnings[row] = messages[key]
+
+        error_messages = [[f"ID matches error pattern: {p}"] for p in cls.ERROR_PATTERNS]
+        errors = vectorized & ~empty & (error_index >= 0)
+        for row, index in zip(np.flatnonzero(errors).tolist(), error_index[errors].tolist()):
+            warnings[row] = error_messages[index]
+        empty_message = ["ID is empty or whitespace"]
+        for row in np.flatnonzero(vectorized & empty).tolist():
+            warnings[row] = empty_message
+
+        for row in np.flatnonzero(~vectorized).tolist():
+            result = cls.validate_id(ids[row].as_py(), types[row])
+            valid[row] = result["valid"]
+            severity[row] = result["severity"]
+            warnings[row] = result["warnings"]
+
+        return pa.table(
+            {
+                "valid": pa.array(valid, pa.bool_()),
+                "severity": pa.array(severity, pa.string()),
+                "warnings": pa.array(warnings, pa.list_(pa.string())),
+            }
+        )
+
     @classmethod
     def validate_batch(cls, ids: List[Dict[str, str]]) -> Dict[str, Dict]:
         """
@@ -121,13 +252,9 @@ class IDValidator:
         Returns:
             Dict mapping ID to validation result
         """
-        results = {}
-        for item in ids:
-            local_id = item.get("id")
-            id_type = item.get("type", "primary")
-            results[local_id] = cls.validate_id(local_id, id_type)
-
-        return results
+        local_ids = [item.get("id") for item in ids]
+        table = cls.validate_array(local_ids, [item.get("type", "primary") for item in ids])
+        return dict(zip(local_ids, table.to_pylist()))
 
     @classmethod
     def validate_candidate_ids(cls, candidate_ids: List[Dict]) -> List[str]:
@@ -158,3 +285,6 @@ class IDValidator:
                 )
 
         return all_warnings
+
+
+IDValidator._compile()
@@ -0,0 +1,121 @@
+# gsid-service/services/idempotency.py
+"""
+Idempotency-Key support for the registration endpoints.
+
+A request with an Idempotency-Key claims (endpoint, key) with an insert at
+the start of its registration transaction and stores its response in the
+same transaction, right before the commit. So a key either has a stored
+response (the registration committed) or no row at all (it rolled back and
+may run again):
+
+- a retry after a committed request gets the stored response back without
+  resolving again, so no second identity_resolutions row is written;
+- a retry arriving while the original is still running waits on the claimed
+  row and then gets the original's response;
+- a retry after a failed request runs normally.
+
+Keys expire after IDEMPOTENCY_TTL_SECONDS.
+"""
+
+import hashlib
+import json
+import logging
+from typing import Any, Dict, Optional
+
+from core.config import settings
+from psycopg2.extras import Json, RealDictCursor
+
+logger = logging.getLogger(__name__)
+
+# Expired keys deleted per new claim, so the table stays short-lived without
+# a separate cleanup job
+PURGE_BATCH = 100
+
+
+class IdempotencyKeyReusedError(ValueError):
+    """Raised when a key comes back with a different request body"""
+
+
+def request_fingerprint(payload: Any) -> str:
+    """SHA-256 of the canonical JSON of a request body"""
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def claim(conn, endpoint: str, key: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+    """
+    Claim `key` for `endpoint` inside the caller's (open) transaction.
+
+    Returns None when the key is new (or expired): the caller goes on with
+    the request on the same transaction and calls store() before committing.
+    Otherwise returns the stored response and rolls back; blocks first while
+    another transaction holding the same key is still open.
+
+    Raises:
+        IdempotencyKeyReusedError: If the key was used for a different body
+    """
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    try:
+        cur.execute(
+            """
+            DELETE FROM idempotency_keys
+            WHERE ctid = ANY (ARRAY(
+                SELECT ctid FROM idempotency_keys
+                WHERE expires_at < NOW()  -- idx_idempotency_keys_expires
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            ))
+            """,
+            (PURGE_BATCH,),
+        )
+        cur.execute(
+            """
+            INSERT INTO idempotency_keys (endpoint, idempotency_key, request_hash, expires_at)
+            VALUES (%s, %s, %s, NOW() + make_interval(secs => %s))
+            ON CONFLICT (endpoint, idempotency_key) DO UPDATE
+                SET request_hash = EXCLUDED.request_hash,
+                    response = NULL,
+                    created_at = NOW(),
+                    expires_at = EXCLUDED.expires_at
+                WHERE idempotency_keys.expires_at < NOW()
+            RETURNING idempotency_key
+            """,
+            (endpoint, key, fingerprint, settings.IDEMPOTENCY_TTL_SECONDS),
+        )
+        if cur.fetchone() is not None:
+            return None
+
+        cur.execute(
+            """
+            SELECT request_hash, response
+            FROM idempotency_keys
+            WHERE endpoint = %s AND idempotency_key = %s
+            """,
+            (endpoint, key),
+        )
+        stored = cur.fetchone()
+        conn.rollback()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    if stored["request_hash"] != fingerprint:
+        raise IdempotencyKeyReusedError(
+            f"Idempotency-Key {key!r} was already used with a different request"
+        )
+    logger.info(f"Replaying stored response for {endpoint} Idempotency-Key {key!r}")
+    return stored["response"]
+
+
+def store(cursor, endpoint: str, key: str, response: Dict[str, Any]):
+    """Save the response of a claimed key; call in the claiming transaction"""
+    cursor.execute(
+        """
+        UPDATE idempotency_keys
+        SET response = %s
+        WHERE endpoint = %s AND idempotency_key = %s
+        """,
+        (Json(response), endpoint, key),
+    )
@@ -0,0 +1,250 @@
+# gsid-service/services/identifier_cache.py
+import copy
+import logging
+import select
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Tuple
+
+import psycopg2
+from core.config import settings
+from core.database import get_db_connection
+from psycopg2 import extensions
+
+logger = logging.getLogger(__name__)
+
+# Channel the invalidation triggers on local_subject_ids and subjects notify.
+# Payloads are "id:<lower(local_subject_id)>", "gsid:<global_subject_id>" or
+# "all" (TRUNCATE).
+INVALIDATION_CHANNEL = "gsid_cache_invalidate"
+
+# Database setting the invalidation triggers check; they do not notify (and
+# writers do not queue notifications) unless it is 'on'
+NOTIFY_SETTING = "idhub.gsid_cache_notify"
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # lower(local_subject_id) -> (expires_at, links, subjects)
+_keys_by_gsid = {}  # gsid -> {lower(local_subject_id), ...}
+_generation = 0  # bumped on every invalidation
+_listening = False
+_thread = None
+_stop = threading.Event()
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "stores": 0,
+    "stale_stores_skipped": 0,
+    "evictions": 0,
+    "invalidations": 0,
+    "listener_reconnects": 0,
+}
+
+
+def lookup(keys: Iterable[str]) -> Tuple[int, Dict[str, Dict[str, Any]], List[str]]:
+    """
+    Look up normalized identifiers.
+
+    Returns:
+        (generation, hits, misses): `generation` must be passed back to store()
+        for the rows fetched for `misses`; each hit is a private copy
+        {"links": [...], "subjects": {gsid: {...}}} the caller may mutate
+    """
+    keys = list(keys)
+    with _lock:
+        if not _listening:
+            return _generation, {}, keys
+
+        now = time.monotonic()
+        hits = {}
+        misses = []
+        for key in keys:
+            entry = _entries.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    _drop(key)
+                misses.append(key)
+                continue
+            _entries.move_to_end(key)
+            hits[key] = {"links": entry[1], "subjects": entry[2]}
+
+        _stats["hits"] += len(hits)
+        _stats["misses"] += len(misses)
+        generation = _generation
+
+    return generation, copy.deepcopy(hits), misses
+
+
+def store(generation: int, entries: Dict[str, Dict[str, Any]]):
+    """
+    Cache freshly read entries ({"links": [...], "subjects": {...}} per key).
+
+    Skipped when anything was invalidated since the matching lookup(), because
+    the rows may predate a write whose notification has already been applied.
+    """
+    with _lock:
+        if not _listening or not entries:
+            return
+        if generation != _generation:
+            _stats["stale_stores_skipped"] += 1
+            return
+
+        expires_at = time.monotonic() + settings.GSID_CACHE_TTL_SECONDS
+        for key, entry in entries.items():
+            _drop(key)
+            _entries[key] = (
+                expires_at,
+                copy.deepcopy(entry["links"]),
+                copy.deepcopy(entry["subjects"]),
+            )
+            for gsid in entry["subjects"]:
+                _keys_by_gsid.setdefault(gsid, set()).add(key)
+            _stats["stores"] += 1
+
+        while len(_entries) > settings.GSID_CACHE_MAX_ENTRIES:
+            _drop(next(iter(_entries)))
+            _stats["evictions"] += 1
+
+
+def invalidate(keys: Iterable[str] = (), gsids: Iterable[str] = ()):
+    """Drop entries for normalized identifiers and for every identifier of the given GSIDs"""
+    global _generation
+    with _lock:
+        _generation += 1
+        for key in keys:
+            _drop(key)
+        for gsid in gsids:
+            for key in list(_keys_by_gsid.get(gsid, ())):
+                _drop(key)
+        _stats["invalidations"] += 1
+
+
+def clear():
+    """Drop every entry"""
+    global _generation
+    with _lock:
+        _generation += 1
+        _entries.clear()
+        _keys_by_gsid.clear()
+
+
+def _drop(key: str):
+    # Caller holds _lock
+    entry = _entries.pop(key, None)
+    if entry is None:
+        return
+    for gsid in entry[2]:
+        keys = _keys_by_gsid.get(gsid)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del _keys_by_gsid[gsid]
+
+
+def _handle_notification(payload: str):
+    kind, _, value = payload.partition(":")
+    if kind == "all":
+        clear()
+    elif kind == "id":
+        invalidate(keys=[value])
+    elif kind == "gsid":
+        invalidate(gsids=[value])
+    else:
+        logger.warning(f"Ignoring unknown cache invalidation payload: {payload!r}")
+
+
+def _set_listening(listening: bool):
+    global _listening
+    # Notifications may have been missed while not listening
+    clear()
+    with _lock:
+        _listening = listening
+
+
+def _listen_loop():
+    conn = None
+    while not _stop.is_set():
+        try:
+            if conn is None:
+                conn = get_db_connection()
+                conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    cur.execute("SELECT current_setting(%s, true)", (NOTIFY_SETTING,))
+                    if cur.fetchone()[0] != "on":
+                        logger.error(
+                            f"Identifier cache disabled: {NOTIFY_SETTING} is not 'on' "
+                            f"in the database, so writes would not invalidate it"
+                        )
+                        break
+                    cur.execute(f"LISTEN {INVALIDATION_CHANNEL}")
+                _set_listening(True)
+                logger.info(f"Identifier cache listening on {INVALIDATION_CHANNEL}")
+
+            if select.select([conn], [], [], 1.0)[0]:
+                conn.poll()
+                while conn.notifies:
+                    _handle_notification(conn.notifies.pop(0).payload)
+
+        except (psycopg2.Error, OSError) as e:
+            logger.error(f"Identifier cache listener lost its connection: {e}")
+            _set_listening(False)
+            with _lock:
+                _stats["listener_reconnects"] += 1
+            if conn is not None:
+                try:
+                    conn.close()
+                except psycopg2.Error:
+                    pass
+                conn = None
+            _stop.wait(settings.GSID_CACHE_RECONNECT_SECONDS)
+
+    _set_listening(False)
+    if conn is not None:
+        conn.close()
+
+
+def start_cache_listener():
+    """
+    Start the LISTEN thread; the cache only serves hits while it is connected.
+
+    No-op if GSID_CACHE_ENABLED is false or the listener is already running,
+    and with IDENTIFIER_LOCKS_ENABLED, because registrations under the locks
+    never read the cache.
+    """
+    global _thread
+    if not settings.GSID_CACHE_ENABLED or _thread is not None:
+        return
+    if settings.IDENTIFIER_LOCKS_ENABLED:
+        logger.warning(
+            "GSID_CACHE_ENABLED is ignored while IDENTIFIER_LOCKS_ENABLED is on"
+        )
+        return
+    _stop.clear()
+    _thread = threading.Thread(
+        target=_listen_loop, name="gsid-cache-listener", daemon=True
+    )
+    _thread.start()
+
+
+def stop_cache_listener():
+    """Stop the LISTEN thread and empty the cache"""
+    global _thread
+    if _thread is None:
+        return
+    _stop.set()
+    _thread.join(timeout=settings.GSID_CACHE_RECONNECT_SECONDS + 2)
+    _thread = None
+    _set_listening(False)
+
+
+def get_cache_stats() -> dict:
+    """Snapshot of cache size and hit/miss/invalidation counters"""
+    with _lock:
+        stats = dict(_stats)
+        stats["entries"] = len(_entries)
+        stats["listening"] = _listening
+    stats["max_entries"] = settings.GSID_CACHE_MAX_ENTRIES
+    stats["ttl_seconds"] = settings.GSID_CACHE_TTL_SECONDS
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
@@ -1,13 +1,23 @@
 # gsid-service/services/identity_resolution.py
+import hashlib
 import json
 import logging
+from collections import OrderedDict
 from datetime import date
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
-from psycopg2.extras import RealDictCursor
+from core.config import settings
+from core.metrics import RESOLUTION_ERRORS, PhaseTimer, record_resolutions
+from psycopg2.extras import RealDictCursor, execute_values
+from services import audit_writer, identifier_cache
 
 logger = logging.getLogger(__name__)
 
+# First key of the two-key pg_advisory_xact_lock(int, int) taken per
+# normalized identifier ("IDLK"). Two-key locks never collide with
+# single-bigint ones such as the reservoir's.
+IDENTIFIER_LOCK_CLASS = 0x49444C4B
+
 
 def resolve_subject_with_multiple_ids(
     conn,
@@ -16,6 +26,7 @@ def resolve_subject_with_multiple_ids(
     registration_year: Optional[date] = None,
     control: bool = False,
     created_by: str = "system",
+    before_commit: Optional[Callable[[Any, Dict[str, Any]], None]] = None,
 ) -> Dict[str, Any]:
     """
     Core identity resolution for a subject with multiple identifiers.
@@ -26,12 +37,18 @@ def resolve_subject_with_multiple_ids(
     - Center ID represents recruitment site (should be consistent per subject)
 
     Steps:
-    1. Query local_subject_ids for ALL identifiers (ignore center_id in matching)
+    1. Query local_subject_ids for ALL identifiers in one round trip
+       (ignore center_id in matching)
     2. Collect all matched GSIDs
     3. If 0 matches → create new GSID
     4. If 1 match → use that GSID, check for center conflicts
     5. If 2+ matches → MULTI-GSID CONFLICT (flag all, use oldest)
-    6. Link ALL identifiers to the chosen GSID
+    6. Link ALL identifiers to the chosen GSID (one multi-row upsert)
+
+    Writes are applied with one statement per table (subject insert, subject
+    flag update, review event, identifier upsert, audit row), then committed.
+    `before_commit(cursor, result)` runs right before the commit, as for
+    resolve_subjects_batch.
 
     Returns:
         {
@@ -44,262 +61,554 @@ def resolve_subject_with_multiple_ids(
         }
     """
     cur = conn.cursor(cursor_factory=RealDictCursor)
-    warnings = []
 
     try:
-        # Step 1: Find all existing GSIDs for these identifiers
-        # CRITICAL: Match on local_subject_id ONLY (center-agnostic)
-        matched_gsids = {}  # gsid -> {created_at, center_id, withdrawn}
-        center_conflicts = []
+        writes = _new_writes()
+        timer = writes["timer"]
 
-        for identifier in identifiers:
-            cur.execute(
-                """
-                SELECT 
-                    s.global_subject_id, 
-                    s.created_at, 
-                    s.center_id as subject_center_id,
-                    s.withdrawn,
-                    l.center_id as identifier_center_id
-                FROM local_subject_ids l
-                JOIN subjects s ON l.global_subject_id = s.global_subject_id
-                WHERE lower(l.local_subject_id) = lower(%s)
-                """,
-                (identifier["local_subject_id"],),
+        with timer.phase("match"):
+            # Step 1: one query for every identifier (center-agnostic)
+            state = _load_registry_state(
+                cur, {identifier["local_subject_id"] for identifier in identifiers}, timer
             )
 
-            results = cur.fetchall()
-
-            for result in results:
-                gsid = result["global_subject_id"]
-
-                # Track this GSID
-                if gsid not in matched_gsids:
-                    matched_gsids[gsid] = {
-                        "created_at": result["created_at"],
-                        "center_id": result["subject_center_id"],
-                        "withdrawn": result["withdrawn"],
-                    }
-
-                # Check for center conflicts
-                existing_center = result["identifier_center_id"]
-                if existing_center != center_id:
-                    # Center mismatch detected
-                    if existing_center == 0:
-                        # Existing is unknown, incoming has real center → UPDATE
-                        warnings.append(
-                            f"Updating unknown center (0) to known center ({center_id}) "
-                            f"for {identifier['identifier_type']}={identifier['local_subject_id']}"
-                        )
-                    elif center_id == 0:
-                        # Incoming is unknown, existing has real center → KEEP existing
-                        warnings.append(
-                            f"Ignoring unknown center (0) - keeping existing center ({existing_center}) "
-                            f"for {identifier['identifier_type']}={identifier['local_subject_id']}"
-                        )
-                    else:
-                        # Both are real centers but different → CONFLICT
-                        center_conflicts.append(
-                            f"{identifier['identifier_type']}={identifier['local_subject_id']}: "
-                            f"existing center={existing_center}, incoming center={center_id}"
-                        )
-
-        # Step 2: Determine action based on matches
-        if len(matched_gsids) == 0:
-            # No matches → create new GSID
-            from services.gsid_generator import generate_gsid
-
-            gsid = generate_gsid()
-            action = "create_new"
-            conflicts = None
-            conflict_resolution = None
-
-            # Create subject record
-            cur.execute(
-                """
-                INSERT INTO subjects (
-                    global_subject_id, center_id, registration_year, 
-                    control, created_by
-                )
-                VALUES (%s, %s, %s, %s, %s)
-                """,
-                (gsid, center_id, registration_year, control, created_by),
+            # Steps 2-4: resolve in memory, queue subject/link/audit writes
+            result = _resolve_subject(
+                cur,
+                state,
+                writes,
+                {
+                    "center_id": center_id,
+                    "identifiers": identifiers,
+                    "registration_year": registration_year,
+                    "control": control,
+                    "created_by": created_by,
+                },
             )
 
-            logger.info(f"Created new GSID: {gsid} for center_id={center_id}")
-
-        elif len(matched_gsids) == 1:
-            # Single match → use that GSID
-            gsid = list(matched_gsids.keys())[0]
-            gsid_data = matched_gsids[gsid]
-            action = "link_existing"
-            conflicts = None
-            conflict_resolution = None
-
-            # Check if we need to update subject's center_id
-            existing_center = gsid_data["center_id"]
-            if existing_center == 0 and center_id != 0:
-                # Update from unknown to known center
-                cur.execute(
-                    """
-                    UPDATE subjects
-                    SET center_id = %s,
-                        review_notes = COALESCE(review_notes || E'\n', '') ||
-                                      'Updated center from 0 (unknown) to ' || %s || 
-                                      ' on ' || CURRENT_TIMESTAMP::TEXT
-                    WHERE global_subject_id = %s
-                    """,
-                    (center_id, center_id, gsid),
-                )
-                logger.info(f"Updated GSID {gsid} center from 0 to {center_id}")
-
-            # Flag center conflicts
-            if center_conflicts:
-                conflict_resolution = "center_mismatch"
-                cur.execute(
-                    """
-                    UPDATE subjects
-                    SET flagged_for_review = TRUE,
-                        review_notes = COALESCE(review_notes || E'\n', '') ||
-                                      'CENTER CONFLICT detected on ' || CURRENT_TIMESTAMP::TEXT || E'\n' ||
-                                      %s
-                    WHERE global_subject_id = %s
-                    """,
-                    ("\n".join(center_conflicts), gsid),
-                )
-                warnings.extend(center_conflicts)
-                logger.warning(
-                    f"Center conflict flagged for GSID {gsid}: {center_conflicts}"
-                )
+        # One statement per table touched
+        _apply_writes(cur, writes)
+        if before_commit is not None:
+            before_commit(cur, result)
+        with timer.phase("commit"):
+            conn.commit()
+        _invalidate_cached(writes)
+        _enqueue_deferred_audits(writes)
+        _record_metrics(writes, "single")
 
-            logger.info(f"Linked to existing GSID: {gsid}")
+        logger.info(
+            f"Resolution complete: gsid={result['gsid']}, action={result['action']}, "
+            f"identifiers={len(identifiers)}, "
+            f"conflicts={len(result['conflicts']) if result['conflicts'] else 0}, "
+            f"warnings={len(result['warnings'])}"
+        )
 
-        else:
-            # Multiple GSIDs matched → MULTI-GSID CONFLICT
-            # This means the SAME identifier is linked to DIFFERENT GSIDs (data error)
-            sorted_gsids = sorted(
-                matched_gsids.items(), key=lambda x: (x[1]["created_at"], x[0])
-            )
-            gsid = sorted_gsids[0][0]  # Use oldest
-            action = "conflict_resolved"
-            conflicts = [g[0] for g in sorted_gsids]
-            conflict_resolution = "used_oldest"
-
-            logger.error(
-                f"MULTI-GSID CONFLICT! Same identifier linked to {len(conflicts)} GSIDs: {conflicts}. "
-                f"Using oldest: {gsid}"
-            )
+        return result
 
-            # Flag ALL conflicting GSIDs for review
-            for gsid_tuple in sorted_gsids:
-                conflict_gsid = gsid_tuple[0]
-                cur.execute(
-                    """
-                    UPDATE subjects
-                    SET flagged_for_review = TRUE,
-                        review_notes = COALESCE(review_notes || E'\n', '') ||
-                                      'MULTI-GSID CONFLICT detected on ' || CURRENT_TIMESTAMP::TEXT || E'\n' ||
-                                      'Conflicting GSIDs: ' || %s || E'\n' ||
-                                      'Resolution: Using oldest GSID ' || %s
-                    WHERE global_subject_id = %s
-                    """,
-                    (", ".join(conflicts), gsid, conflict_gsid),
-                )
+    except Exception as e:
+        conn.rollback()
+        RESOLUTION_ERRORS.labels(mode="single").inc()
+        logger.error(f"Error resolving subject: {e}", exc_info=True)
+        raise
+    finally:
+        cur.close()
 
-            warnings.append(
-                f"Multi-GSID conflict: {len(conflicts)} GSIDs found for same identifier"
-            )
 
-        # Step 3: Link ALL identifiers to the chosen GSID
-        identifiers_linked = 0
-        for identifier in identifiers:
-            # Determine which center_id to use for this identifier
-            identifier_center = center_id
+def resolve_subjects_batch(
+    conn,
+    subjects: List[Dict[str, Any]],
+    before_commit: Optional[Callable[[Any, List[Dict[str, Any]]], None]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Set-based identity resolution for many subjects in ONE transaction.
 
-            # Check if this identifier already exists with a different center
-            cur.execute(
-                """
-                SELECT center_id, global_subject_id
-                FROM local_subject_ids
-                WHERE local_subject_id = %s
-                  AND identifier_type = %s
-                LIMIT 1
-                """,
-                (identifier["local_subject_id"], identifier["identifier_type"]),
+    Each entry of `subjects` carries the same fields as the arguments of
+    resolve_subject_with_multiple_ids (center_id, identifiers,
+    registration_year, control, created_by).
+
+    Steps:
+    1. Fetch every local_subject_ids row matching ANY identifier in the batch
+       (one query, center-agnostic, case-insensitive)
+    2. Resolve subjects in input order against an in-memory view of those rows,
+       so a subject sees identifiers linked by earlier subjects of the same
+       batch exactly as consecutive single registrations would
+    3. Apply all writes with multi-row statements: new subjects, subject
+       updates (center/flags), review events, identifier upserts, audit rows
+    4. Commit once
+
+    `before_commit(cursor, results)`, if given, runs inside the same
+    transaction right before the commit (e.g. to record import progress
+    atomically with the registrations); raising from it rolls everything back.
+
+    Returns:
+        One result per subject, in input order, shaped like the return value
+        of resolve_subject_with_multiple_ids
+    """
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+
+    try:
+        writes = _new_writes(len(subjects))
+        timer = writes["timer"]
+
+        with timer.phase("match"):
+            state = _load_registry_state(
+                cur,
+                {
+                    identifier["local_subject_id"]
+                    for subject in subjects
+                    for identifier in subject["identifiers"]
+                },
+                timer,
             )
-            existing = cur.fetchone()
-
-            if existing:
-                existing_center = existing["center_id"]
-                if existing_center != 0 and center_id == 0:
-                    # Keep existing real center, don't overwrite with unknown
-                    identifier_center = existing_center
-                elif existing_center == 0 and center_id != 0:
-                    # Update from unknown to known
-                    identifier_center = center_id
-                elif (
-                    existing_center != center_id
-                    and existing_center != 0
-                    and center_id != 0
-                ):
-                    # Real conflict - use incoming but flag
-                    identifier_center = center_id
-
-            cur.execute(
-                """
-                INSERT INTO local_subject_ids (
-                    center_id, local_subject_id, identifier_type, 
-                    global_subject_id, created_by
-                )
-                VALUES (%s, %s, %s, %s, %s)
-                ON CONFLICT (center_id, local_subject_id, identifier_type) 
-                DO UPDATE SET
-                    global_subject_id = EXCLUDED.global_subject_id,
-                    updated_at = CURRENT_TIMESTAMP
-                """,
-                (
-                    identifier_center,
-                    identifier["local_subject_id"],
-                    identifier["identifier_type"],
-                    gsid,
-                    created_by,
-                ),
+            results = [_resolve_subject(cur, state, writes, subject) for subject in subjects]
+
+        _apply_writes(cur, writes)
+        if before_commit is not None:
+            before_commit(cur, results)
+        with timer.phase("commit"):
+            conn.commit()
+        _invalidate_cached(writes)
+        _enqueue_deferred_audits(writes)
+        _record_metrics(writes, "batch")
+
+        actions = {}
+        for result in results:
+            actions[result["action"]] = actions.get(result["action"], 0) + 1
+        logger.info(
+            f"Batch resolution complete: {len(subjects)} subject(s), "
+            f"actions={actions}, new_subjects={len(writes['new_subjects'])}, "
+            f"identifiers_upserted={len(writes['links'])}"
+        )
+
+        return results
+
+    except Exception as e:
+        conn.rollback()
+        RESOLUTION_ERRORS.labels(mode="batch").inc()
+        logger.error(f"Error resolving subject batch: {e}", exc_info=True)
+        raise
+    finally:
+        cur.close()
+
+
+def _new_writes(subject_count: int = 1) -> Dict[str, Any]:
+    """Empty queue of pending writes for one resolution transaction"""
+    return {
+        "new_subjects": [],
+        "subject_updates": OrderedDict(),
+        "review_events": [],
+        "links": OrderedDict(),
+        "audits": [],  # (routine, row): routine rows may be written after commit
+        "deferred_audits": [],  # routine rows handed to the audit writer
+        "unresolved": subject_count,
+        "claimed_gsids": [],  # claimed from the reservoir, not yet used
+        "claim_size": 0,
+        "reservoir_short": False,
+        "timer": PhaseTimer(),
+    }
+
+
+def _new_gsid(cur, writes: Dict[str, Any]) -> str:
+    """
+    GSID for a new subject: claimed from the reservoir, else minted inline.
+
+    Claims are made in blocks that double in size (bounded by the number of
+    subjects still to resolve), so a batch of N new subjects costs about
+    log2(N) claim statements and never claims more than twice what it uses.
+    Unused claims are released in _apply_writes.
+    """
+    with writes["timer"].phase("create"):
+        if not writes["claimed_gsids"] and not writes["reservoir_short"]:
+            from services.gsid_reservoir import claim_gsids
+
+            size = min(max(1, 2 * writes["claim_size"]), writes["unresolved"] + 1)
+            writes["claimed_gsids"] = claim_gsids(cur, size)
+            writes["claim_size"] = size
+            writes["reservoir_short"] = len(writes["claimed_gsids"]) < size
+
+        if writes["claimed_gsids"]:
+            return writes["claimed_gsids"].pop(0)
+
+        from services.gsid_generator import generate_gsid
+
+        return generate_gsid()
+
+
+def identifier_lock_keys(local_ids) -> List[int]:
+    """Distinct advisory lock keys (signed 32-bit hashes) of normalized identifiers, sorted"""
+    return sorted(
+        {
+            int.from_bytes(
+                hashlib.blake2b(local_id.lower().encode(), digest_size=4).digest(),
+                "big",
+                signed=True,
             )
-            identifiers_linked += 1
+            for local_id in local_ids
+        }
+    )
 
-        logger.info(f"Linked {identifiers_linked} identifier(s) to {gsid}")
 
-        # Step 4: Log resolution in identity_resolutions table
-        candidate_ids_json = json.dumps(
-            [
-                {
-                    "local_subject_id": i["local_subject_id"],
-                    "identifier_type": i["identifier_type"],
-                }
-                for i in identifiers
-            ]
+def _lock_identifiers(cur, local_ids) -> bool:
+    """
+    Take a transaction-scoped advisory lock per normalized identifier.
+
+    Returns whether the locks were taken.
+
+    Registrations sharing an identifier serialize here, so the second one
+    reads the first one's committed links instead of also seeing no match
+    and minting a second GSID; unrelated registrations lock disjoint keys
+    and run in parallel. Keys are taken in ascending order, so transactions
+    locking overlapping sets cannot deadlock. A hash collision only costs
+    some unnecessary waiting.
+    """
+    if not settings.IDENTIFIER_LOCKS_ENABLED:
+        return False
+    cur.execute(
+        """
+        SELECT pg_advisory_xact_lock(%s, k)
+        FROM unnest(%s::int[]) WITH ORDINALITY AS t(k, i)
+        ORDER BY i
+        """,
+        (IDENTIFIER_LOCK_CLASS, identifier_lock_keys(local_ids)),
+    )
+    return True
+
+
+def _load_registry_state(cur, local_ids, timer: PhaseTimer) -> Dict[str, Any]:
+    """
+    Fetch existing links for all given identifiers in one query.
+
+    The identifiers are locked first (see _lock_identifiers) and then read
+    from the database only, so the rows read here cannot be changed by
+    another registration before commit. A cache entry may predate a
+    registration that committed while this one waited for its lock, so the
+    identifier cache is not consulted under the locks.
+
+    With IDENTIFIER_LOCKS_ENABLED=false, identifiers held by the identifier
+    cache are served from memory; only the rest are queried, and what the
+    query returns is cached for next time.
+    """
+    state = {
+        "links": {},  # lower(local_subject_id) -> [link, ...]
+        "subjects": {},  # gsid -> {created_at, center_id, withdrawn}
+        "clock": None,
+    }
+    if not local_ids:
+        return state
+
+    with timer.phase("lock"):
+        locked = _lock_identifiers(cur, local_ids)
+
+    keys = sorted({local_id.lower() for local_id in local_ids})
+    if locked:
+        generation, cached, missing = None, {}, keys
+    else:
+        generation, cached, missing = identifier_cache.lookup(keys)
+    for key, entry in cached.items():
+        state["links"][key] = entry["links"]
+        for gsid, subject in entry["subjects"].items():
+            state["subjects"].setdefault(gsid, subject)
+    if not missing:
+        return state
+
+    cur.execute(
+        """
+        SELECT
+            l.local_subject_id,
+            l.identifier_type,
+            l.center_id AS identifier_center_id,
+            s.global_subject_id,
+            s.created_at,
+            s.center_id AS subject_center_id,
+            s.withdrawn
+        FROM local_subject_ids l
+        LEFT JOIN subjects s ON l.global_subject_id = s.global_subject_id
+        WHERE lower(l.local_subject_id) = ANY(%s)  -- idx_local_ids_lower
+        """,
+        (missing,),
+    )
+
+    fetched = {}
+    for row in cur.fetchall():
+        key = row["local_subject_id"].lower()
+        gsid = row["global_subject_id"]
+        link = {
+            "local_subject_id": row["local_subject_id"],
+            "identifier_type": row["identifier_type"],
+            "center_id": row["identifier_center_id"],
+            "gsid": gsid,
+        }
+        entry = fetched.setdefault(key, {"links": [], "subjects": {}})
+        entry["links"].append(dict(link))
+        state["links"].setdefault(key, []).append(link)
+        if gsid:
+            subject = {
+                "created_at": row["created_at"],
+                "center_id": row["subject_center_id"],
+                "withdrawn": row["withdrawn"],
+            }
+            entry["subjects"][gsid] = dict(subject)
+            state["subjects"].setdefault(gsid, subject)
+
+    # Unknown identifiers are not cached: registering them writes anyway
+    if not locked:
+        identifier_cache.store(generation, fetched)
+    return state
+
+
+def _invalidate_cached(writes: Dict[str, Any]):
+    """
+    Drop cache entries this transaction changed.
+
+    The database triggers notify every process; this covers the window
+    before this process's own notification arrives.
+    """
+    if writes["links"] or writes["subject_updates"]:
+        identifier_cache.invalidate(
+            keys={local_id.lower() for _, local_id, _ in writes["links"]},
+            gsids=writes["subject_updates"].keys(),
         )
-        matched_gsids_json = json.dumps(conflicts) if conflicts else None
-
-        cur.execute(
-            """
-            INSERT INTO identity_resolutions (
-                local_subject_id,
-                identifier_type,
-                input_center_id,
+
+
+def _enqueue_deferred_audits(writes: Dict[str, Any]):
+    """Hand the committed transaction's routine audit rows to the audit writer"""
+    if writes["deferred_audits"]:
+        audit_writer.enqueue(writes["deferred_audits"])
+
+
+def _record_metrics(writes: Dict[str, Any], mode: str):
+    """Phase timings and (action, match_strategy) counts of a committed transaction"""
+    writes["timer"].observe(mode)
+    record_resolutions((row[5], row[6]) for _, row in writes["audits"])
+
+
+def _transaction_clock(cur, state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Transaction timestamps, fetched at most once per transaction.
+
+    CURRENT_TIMESTAMP is fixed for the whole transaction, so review notes built
+    from it match the ones the single-subject path writes in SQL, and
+    LOCALTIMESTAMP is what the subjects.created_at default stores.
+    """
+    if state["clock"] is None:
+        cur.execute("SELECT CURRENT_TIMESTAMP::TEXT AS now_text, LOCALTIMESTAMP AS now")
+        state["clock"] = cur.fetchone()
+    return state["clock"]
+
+
+def _add_subject_update(
+    writes: Dict[str, Any],
+    gsid: str,
+    event_type: str,
+    note: str,
+    created_by: str,
+    center_id: Optional[int] = None,
+    flag: bool = False,
+):
+    """
+    Merge a subject update into the pending writes.
+
+    The note becomes a subject_review_events row (queued in order); the
+    subjects row only gets the center/flag change.
+    """
+    update = writes["subject_updates"].setdefault(
+        gsid, {"center_id": None, "flag": False}
+    )
+    if center_id is not None:
+        update["center_id"] = center_id
+    update["flag"] = update["flag"] or flag
+    writes["review_events"].append((gsid, event_type, note, created_by))
+
+
+def _resolve_subject(
+    cur, state: Dict[str, Any], writes: Dict[str, Any], subject: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Resolve one subject against the in-memory registry view.
+
+    Implements the matching rules documented on
+    resolve_subject_with_multiple_ids; writes are queued in `writes` and the
+    registry view is updated so later subjects of the same batch see them.
+    """
+    writes["unresolved"] -= 1
+    center_id = subject["center_id"]
+    identifiers = subject["identifiers"]
+    registration_year = subject.get("registration_year")
+    control = subject.get("control", False)
+    created_by = subject.get("created_by", "system")
+    warnings = []
+
+    # Step 1: Find all existing GSIDs for these identifiers (center-agnostic)
+    matched_gsids = {}
+    center_conflicts = []
+
+    for identifier in identifiers:
+        for link in state["links"].get(identifier["local_subject_id"].lower(), []):
+            gsid = link["gsid"]
+            if not gsid:
+                continue
+
+            if gsid not in matched_gsids:
+                matched_gsids[gsid] = dict(state["subjects"][gsid])
+
+            existing_center = link["center_id"]
+            if existing_center != center_id:
+                if existing_center == 0:
+                    warnings.append(
+                        f"Updating unknown center (0) to known center ({center_id}) "
+                        f"for {identifier['identifier_type']}={identifier['local_subject_id']}"
+                    )
+                elif center_id == 0:
+                    warnings.append(
+                        f"Ignoring unknown center (0) - keeping existing center ({existing_center}) "
+                        f"for {identifier['identifier_type']}={identifier['local_subject_id']}"
+                    )
+                else:
+                    center_conflicts.append(
+                        f"{identifier['identifier_type']}={identifier['local_subject_id']}: "
+                        f"existing center={existing_center}, incoming center={center_id}"
+                    )
+
+    # Step 2: Determine action based on matches
+    if len(matched_gsids) == 0:
+        gsid = _new_gsid(cur, writes)
+        action = "create_new"
+        conflicts = None
+        conflict_resolution = None
+
+        writes["new_subjects"].append(
+            (gsid, center_id, registration_year, control, created_by)
+        )
+        state["subjects"][gsid] = {
+            "created_at": None,  # filled from the clock only if ever compared
+            "center_id": center_id,
+            "withdrawn": False,
+        }
+        logger.debug(f"Created new GSID: {gsid} for center_id={center_id}")
+
+    elif len(matched_gsids) == 1:
+        gsid = list(matched_gsids.keys())[0]
+        action = "link_existing"
+        conflicts = None
+        conflict_resolution = None
+
+        if matched_gsids[gsid]["center_id"] == 0 and center_id != 0:
+            _add_subject_update(
+                writes,
                 gsid,
-                matched_gsid,
-                action,
-                match_strategy,
-                confidence,
-                candidate_ids,
-                matched_gsids,
-                requires_review,
-                review_reason,
-                created_by
+                "center_update",
+                f"Updated center from 0 (unknown) to {center_id} "
+                f"on {_transaction_clock(cur, state)['now_text']}",
+                created_by,
+                center_id=center_id,
+            )
+            state["subjects"][gsid]["center_id"] = center_id
+
+        if center_conflicts:
+            conflict_resolution = "center_mismatch"
+            _add_subject_update(
+                writes,
+                gsid,
+                "center_conflict",
+                f"CENTER CONFLICT detected on {_transaction_clock(cur, state)['now_text']}\n"
+                + "\n".join(center_conflicts),
+                created_by,
+                flag=True,
+            )
+            warnings.extend(center_conflicts)
+            logger.warning(
+                f"Center conflict flagged for GSID {gsid}: {center_conflicts}"
+            )
+
+    else:
+        for matched_gsid, gsid_data in matched_gsids.items():
+            if gsid_data["created_at"] is None:
+                # Created earlier in this transaction (subjects.created_at default)
+                gsid_data["created_at"] = _transaction_clock(cur, state)["now"]
+                state["subjects"][matched_gsid]["created_at"] = gsid_data["created_at"]
+        sorted_gsids = sorted(
+            matched_gsids.items(), key=lambda x: (x[1]["created_at"], x[0])
+        )
+        gsid = sorted_gsids[0][0]
+        action = "conflict_resolved"
+        conflicts = [g[0] for g in sorted_gsids]
+        conflict_resolution = "used_oldest"
+
+        logger.error(
+            f"MULTI-GSID CONFLICT! Same identifier linked to {len(conflicts)} GSIDs: {conflicts}. "
+            f"Using oldest: {gsid}"
+        )
+
+        for conflict_gsid in conflicts:
+            _add_subject_update(
+                writes,
+                conflict_gsid,
+                "multi_gsid_conflict",
+                f"MULTI-GSID CONFLICT detected on {_transaction_clock(cur, state)['now_text']}\n"
+                f"Conflicting GSIDs: {', '.join(conflicts)}\n"
+                f"Resolution: Using oldest GSID {gsid}",
+                created_by,
+                flag=True,
             )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s::jsonb, %s::jsonb, %s, %s, %s)
-            """,
+
+        warnings.append(
+            f"Multi-GSID conflict: {len(conflicts)} GSIDs found for same identifier"
+        )
+
+    # Step 3: Link ALL identifiers to the chosen GSID
+    identifiers_linked = 0
+    for identifier in identifiers:
+        local_id = identifier["local_subject_id"]
+        id_type = identifier["identifier_type"]
+        links = state["links"].setdefault(local_id.lower(), [])
+
+        identifier_center = center_id
+        existing = [
+            link
+            for link in links
+            if link["local_subject_id"] == local_id and link["identifier_type"] == id_type
+        ]
+        known_centers = [link["center_id"] for link in existing if link["center_id"] != 0]
+        if known_centers and center_id == 0:
+            # Keep existing real center, don't overwrite with unknown. If the
+            # identifier is registered at several centers, reuse the first one
+            identifier_center = known_centers[0]
+
+        key = (identifier_center, local_id, id_type)
+        if key in writes["links"]:
+            writes["links"][key]["gsid"] = gsid
+        elif any(
+            link["center_id"] == identifier_center and link["gsid"] == gsid
+            for link in existing
+        ):
+            # Already linked exactly like this: nothing to write
+            identifiers_linked += 1
+            continue
+        else:
+            writes["links"][key] = {"gsid": gsid, "created_by": created_by}
+
+        # An upserted row is written as a new tuple, so later lookups see it
+        # after the untouched rows, as they would in the table
+        for index, link in enumerate(links):
+            if (link["center_id"], link["local_subject_id"], link["identifier_type"]) == key:
+                links.pop(index)
+                break
+        links.append(
+            {
+                "local_subject_id": local_id,
+                "identifier_type": id_type,
+                "center_id": identifier_center,
+                "gsid": gsid,
+            }
+        )
+        identifiers_linked += 1
+
+    # Step 4: Queue resolution audit row. Conflict and review rows are
+    # always written in this transaction; plain links may be deferred.
+    requires_review = (conflicts is not None) or (len(center_conflicts) > 0)
+    writes["audits"].append(
+        (
+            action == "link_existing" and not requires_review,
             (
                 identifiers[0]["local_subject_id"],
                 identifiers[0]["identifier_type"],
@@ -317,9 +626,17 @@ def resolve_subject_with_multiple_ids(
                 else 0.7
                 if center_conflicts
                 else 0.5,
-                candidate_ids_json,
-                matched_gsids_json,
-                (conflicts is not None) or (len(center_conflicts) > 0),
+                json.dumps(
+                    [
+                        {
+                            "local_subject_id": i["local_subject_id"],
+                            "identifier_type": i["identifier_type"],
+                        }
+                        for i in identifiers
+                    ]
+                ),
+                json.dumps(conflicts) if conflicts else None,
+                requires_review,
                 f"Multi-GSID conflict: {conflicts}"
                 if conflicts
                 else f"Center conflicts: {center_conflicts}"
@@ -328,27 +645,145 @@ def resolve_subject_with_multiple_ids(
                 created_by,
             ),
         )
+    )
 
-        conn.commit()
+    return {
+        "gsid": gsid,
+        "action": action,
+        "identifiers_linked": identifiers_linked,
+        "conflicts": conflicts,
+        "conflict_resolution": conflict_resolution,
+        "warnings": warnings,
+    }
 
-        logger.info(
-            f"Resolution complete: gsid={gsid}, action={action}, "
-            f"identifiers={len(identifiers)}, conflicts={len(conflicts) if conflicts else 0}, "
-            f"warnings={len(warnings)}"
-        )
 
-        return {
-            "gsid": gsid,
-            "action": action,
-            "identifiers_linked": identifiers_linked,
-            "conflicts": conflicts,
-            "conflict_resolution": conflict_resolution,
-            "warnings": warnings,
-        }
+def _apply_writes(cur, writes: Dict[str, Any], page_size: int = 1000):
+    """Execute the queued writes with multi-row statements"""
+    timer = writes["timer"]
 
-    except Exception as e:
-        conn.rollback()
-        logger.error(f"Error resolving subject: {e}", exc_info=True)
-        raise
-    finally:
-        cur.close()
+    with timer.phase("create"):
+        if writes["claimed_gsids"]:
+            from services.gsid_reservoir import release_gsids
+
+            release_gsids(cur, writes["claimed_gsids"])
+            writes["claimed_gsids"] = []
+
+        if writes["new_subjects"]:
+            execute_values(
+                cur,
+                """
+                INSERT INTO subjects (
+                    global_subject_id, center_id, registration_year,
+                    control, created_by
+                )
+                VALUES %s
+                """,
+                writes["new_subjects"],
+                page_size=page_size,
+            )
+
+    with timer.phase("link"):
+        if writes["subject_updates"]:
+            # Fixed-size column changes only, and only on rows that change;
+            # the notes go to subject_review_events below
+            execute_values(
+                cur,
+                """
+                UPDATE subjects AS s
+                SET center_id = COALESCE(v.center_id, s.center_id),
+                    flagged_for_review = s.flagged_for_review OR v.flag
+                FROM (VALUES %s) AS v(global_subject_id, center_id, flag)
+                WHERE s.global_subject_id = v.global_subject_id
+                  AND (
+                      (v.center_id IS NOT NULL AND v.center_id <> s.center_id)
+                      OR (v.flag AND s.flagged_for_review IS NOT TRUE)
+                  )
+                """,
+                [
+                    (gsid, update["center_id"], update["flag"])
+                    for gsid, update in writes["subject_updates"].items()
+                ],
+                template="(%s, %s::int, %s::boolean)",
+                page_size=page_size,
+            )
+
+        if writes["review_events"]:
+            execute_values(
+                cur,
+                """
+                INSERT INTO subject_review_events (
+                    global_subject_id, event_type, note, created_by
+                )
+                VALUES %s
+                """,
+                writes["review_events"],
+                page_size=page_size,
+            )
+
+        if writes["links"]:
+            execute_values(
+                cur,
+                """
+                INSERT INTO local_subject_ids (
+                    center_id, local_subject_id, identifier_type,
+                    global_subject_id, created_by
+                )
+                VALUES %s
+                ON CONFLICT (center_id, local_subject_id, identifier_type)
+                DO UPDATE SET
+                    global_subject_id = EXCLUDED.global_subject_id,
+                    updated_at = CURRENT_TIMESTAMP
+                """,
+                [
+                    (center, local_id, id_type, link["gsid"], link["created_by"])
+                    for (center, local_id, id_type), link in writes["links"].items()
+                ],
+                page_size=page_size,
+            )
+
+    with timer.phase("audit"):
+        if writes["audits"]:
+            routine = [row for is_routine, row in writes["audits"] if is_routine]
+            if routine and audit_writer.accepting(len(routine)):
+                writes["deferred_audits"] = routine
+                rows = [row for is_routine, row in writes["audits"] if not is_routine]
+            else:
+                rows = [row for _, row in writes["audits"]]
+            if rows:
+                insert_audits(cur, [row + (None,) for row in rows], page_size=page_size)
+
+
+def insert_audits(cur, rows: List[tuple], page_size: int = 1000):
+    """
+    Insert identity_resolutions rows with one multi-row statement.
+
+    Each row ends with created_at; None stores the transaction timestamp.
+    """
+    execute_values(
+        cur,
+        """
+        INSERT INTO identity_resolutions (
+            local_subject_id,
+            identifier_type,
+            input_center_id,
+            gsid,
+            matched_gsid,
+            action,
+            match_strategy,
+            confidence,
+            candidate_ids,
+            matched_gsids,
+            requires_review,
+            review_reason,
+            created_by,
+            created_at
+        )
+        VALUES %s
+        """,
+        rows,
+        template=(
+            "(%s, %s, %s, %s, %s, %s, %s, %s, %s::jsonb, %s::jsonb, %s, %s, %s, "
+            "COALESCE(%s::timestamptz, CURRENT_TIMESTAMP))"
+        ),
+        page_size=page_size,
+    )
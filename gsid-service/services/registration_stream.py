@@ -0,0 +1,129 @@
+# gsid-service/services/registration_stream.py
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from psycopg2.extras import RealDictCursor
+
+logger = logging.getLogger(__name__)
+
+
+class ImportConflictError(Exception):
+    """Raised when a stream does not continue where its import left off"""
+
+
+def get_import(conn, import_id: str) -> Optional[Dict[str, Any]]:
+    """Progress of a streamed import, or None if it does not exist"""
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    try:
+        cur.execute(
+            """
+            SELECT import_id, created_by, committed_lines, summary, created_at, updated_at
+            FROM registration_imports
+            WHERE import_id = %s
+            """,
+            (import_id,),
+        )
+        row = cur.fetchone()
+        conn.rollback()
+        return dict(row) if row else None
+    finally:
+        cur.close()
+
+
+def start_import(conn, import_id: str, created_by: str, offset: int) -> Dict[str, Any]:
+    """
+    Create the import record if needed and return its progress.
+
+    Raises:
+        ImportConflictError: If `offset` (the absolute line number of the
+            first line in the new stream) is past the last committed line,
+            which would leave a gap
+    """
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    try:
+        cur.execute(
+            """
+            INSERT INTO registration_imports (import_id, created_by)
+            VALUES (%s, %s)
+            ON CONFLICT (import_id) DO NOTHING
+            """,
+            (import_id, created_by),
+        )
+        cur.execute(
+            """
+            SELECT import_id, committed_lines, summary
+            FROM registration_imports
+            WHERE import_id = %s
+            """,
+            (import_id,),
+        )
+        progress = dict(cur.fetchone())
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    if offset > progress["committed_lines"]:
+        raise ImportConflictError(
+            f"Import {import_id} has committed {progress['committed_lines']} line(s); "
+            f"a stream starting at line {offset} would skip lines"
+        )
+    return progress
+
+
+def commit_chunk(
+    conn,
+    import_id: str,
+    subjects: List[Dict[str, Any]],
+    first_line: int,
+    end_line: int,
+    summary: Dict[str, int],
+    invalid_lines: int = 0,
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Register one chunk and advance the import to `end_line` in the same transaction.
+
+    `first_line` must equal the import's committed_lines; if another stream
+    for the same import got there first, the chunk is rolled back.
+
+    Args:
+        subjects: Valid registrations among lines first_line..end_line-1
+        summary: Per-action totals before this chunk
+        invalid_lines: Lines of the chunk rejected before registration; they
+            count as processed and are not retried on resume
+
+    Returns:
+        (results, summary): one result per subject, and the totals after this chunk
+
+    Raises:
+        ImportConflictError: If the import moved on concurrently
+    """
+    from services.identity_resolution import resolve_subjects_batch
+
+    updated = dict(summary)
+
+    def record_progress(cur, results):
+        for result in results:
+            updated[result["action"]] = updated.get(result["action"], 0) + 1
+        if invalid_lines:
+            updated["invalid"] = updated.get("invalid", 0) + invalid_lines
+        cur.execute(
+            """
+            UPDATE registration_imports
+            SET committed_lines = %s, summary = %s::jsonb, updated_at = NOW()
+            WHERE import_id = %s AND committed_lines = %s
+            """,
+            (end_line, json.dumps(updated), import_id, first_line),
+        )
+        if cur.rowcount != 1:
+            raise ImportConflictError(
+                f"Import {import_id} is no longer at line {first_line} "
+                "(another stream is running?)"
+            )
+
+    results = resolve_subjects_batch(conn, subjects, before_commit=record_progress)
+    logger.info(f"Import {import_id}: committed lines {first_line}-{end_line - 1}")
+    return results, updated
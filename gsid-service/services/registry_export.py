@@ -0,0 +1,251 @@
+# gsid-service/services/registry_export.py
+"""
+Full GSID <-> local ID export, streamed in constant memory.
+
+Rows come from a server-side (named) cursor EXPORT_BATCH_ROWS at a time and
+each batch is encoded and compressed before the next one is fetched, so
+memory use does not grow with the registry.
+"""
+
+import io
+import logging
+import queue
+import threading
+import uuid
+import zlib
+from typing import Iterator, List, Tuple
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+# One row per local ID; subjects without local IDs appear once with the
+# local_* columns empty. Dates and timestamps are fetched as ISO text: making
+# Python date/datetime objects dominates the fetch, and Arrow parses the text
+# in one vectorized cast per column.
+EXPORT_QUERY = """
+    SELECT
+        s.global_subject_id,
+        s.center_id,
+        s.registration_year::text,
+        s.control,
+        s.withdrawn,
+        s.flagged_for_review,
+        s.family_id,
+        s.created_at::text,
+        l.center_id,
+        l.local_subject_id,
+        l.identifier_type,
+        l.created_at::text
+    FROM subjects s
+    LEFT JOIN local_subject_ids l ON l.global_subject_id = s.global_subject_id
+"""
+
+SCHEMA = pa.schema(
+    [
+        ("gsid", pa.string()),
+        ("center_id", pa.int32()),
+        ("registration_year", pa.date32()),
+        ("control", pa.bool_()),
+        ("withdrawn", pa.bool_()),
+        ("flagged_for_review", pa.bool_()),
+        ("family_id", pa.string()),
+        ("created_at", pa.timestamp("us")),
+        ("local_center_id", pa.int32()),
+        ("local_subject_id", pa.string()),
+        ("identifier_type", pa.string()),
+        ("linked_at", pa.timestamp("us")),
+    ]
+)
+
+# format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "csv": ("application/gzip", "csv.gz"),
+}
+
+
+def iter_row_batches(conn, batch_rows: int) -> Iterator[List[Tuple]]:
+    """
+    Export rows, batch_rows at a time, from one consistent snapshot.
+
+    Runs in a REPEATABLE READ, READ ONLY transaction, so a long export sees
+    the registry as of its start. The transaction is rolled back at the end.
+    """
+    cur = None
+    try:
+        with conn.cursor() as setup:
+            setup.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+        cur = conn.cursor(name=f"registry_export_{uuid.uuid4().hex[:12]}")
+        cur.itersize = batch_rows
+        cur.execute(EXPORT_QUERY)
+        while True:
+            rows = cur.fetchmany(batch_rows)
+            if not rows:
+                return
+            yield rows
+    finally:
+        if cur is not None and not conn.closed:
+            cur.close()
+        if not conn.closed:
+            conn.rollback()
+
+
+def _prefetched(batches: Iterator, depth: int = 2) -> Iterator:
+    """
+    Pull `batches` on a background thread, up to `depth` ahead, so the next
+    fetch overlaps encoding the current batch.
+
+    `batches` is advanced and closed only on that thread; when the consumer
+    stops early the thread closes it (ending the export transaction) before
+    this generator returns.
+    """
+    buffer = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    end = object()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for batch in batches:
+                if not put(batch):
+                    return
+            put(end)
+        except Exception as e:
+            put(e)
+        finally:
+            batches.close()
+
+    thread = threading.Thread(target=produce, name="gsid-export-fetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is end:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def _column(values, field: pa.Field) -> pa.Array:
+    if pa.types.is_temporal(field.type):
+        return pa.array(values, type=pa.string()).cast(field.type)
+    return pa.array(values, type=field.type)
+
+
+def _record_batch(rows: List[Tuple]) -> pa.RecordBatch:
+    columns = list(zip(*rows))
+    return pa.RecordBatch.from_arrays(
+        [_column(values, field) for values, field in zip(columns, SCHEMA)],
+        schema=SCHEMA,
+    )
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands back what was written since the last drain"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _parquet_chunks(batches) -> Iterator[bytes]:
+    """Parquet (zstd), one row group per batch"""
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, SCHEMA, compression="zstd")
+    try:
+        for rows in batches:
+            writer.write_batch(_record_batch(rows))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def _arrow_chunks(batches) -> Iterator[bytes]:
+    """Arrow IPC stream format (zstd-compressed record batches)"""
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(
+        sink, SCHEMA, options=pa.ipc.IpcWriteOptions(compression="zstd")
+    )
+    try:
+        for rows in batches:
+            writer.write_batch(_record_batch(rows))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def _csv_chunks(batches) -> Iterator[bytes]:
+    """Gzip-compressed CSV with a header row"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    sink = _ChunkSink()
+    writer = pa_csv.CSVWriter(sink, SCHEMA)
+    try:
+        for rows in batches:
+            writer.write_batch(_record_batch(rows))
+            yield compressor.compress(sink.drain())
+    finally:
+        writer.close()
+    yield compressor.compress(sink.drain()) + compressor.flush()
+
+
+def export_chunks(conn, export_format: str, batch_rows: int) -> Iterator[bytes]:
+    """
+    Encoded export, as a stream of byte chunks (about one per batch).
+
+    Args:
+        export_format: "parquet", "arrow" or "csv" (see EXPORT_FORMATS)
+
+    Raises:
+        ValueError: For an unknown format
+    """
+    encoders = {"parquet": _parquet_chunks, "arrow": _arrow_chunks, "csv": _csv_chunks}
+    if export_format not in encoders:
+        raise ValueError(f"Unknown export format: {export_format}")
+
+    batches = _prefetched(iter_row_batches(conn, batch_rows))
+    for chunk in encoders[export_format](_counted(batches)):
+        if chunk:
+            yield chunk
+
+
+def _counted(batches):
+    rows = 0
+    for batch in batches:
+        rows += len(batch)
+        yield batch
+    logger.info(f"Registry export read {rows} rows")
@@ -0,0 +1,305 @@
+# gsid-service/services/subject_lookup.py
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional
+
+from psycopg2.extras import RealDictCursor
+
+logger = logging.getLogger(__name__)
+
+
+def lookup_identifiers(
+    conn, identifiers: List[Dict[str, Optional[str]]]
+) -> List[Dict[str, Any]]:
+    """
+    Find the links of many identifiers with ONE query, writing nothing.
+
+    Matching follows registration: local_subject_id is compared
+    case-insensitively and center-agnostically. An identifier_type of None
+    matches every type.
+
+    Args:
+        identifiers: [{"local_subject_id": str, "identifier_type": str | None}, ...]
+
+    Returns:
+        One entry per input identifier, in input order:
+        {
+            "local_subject_id": str,
+            "identifier_type": str | None,
+            "found": bool,
+            "gsids": [distinct GSIDs, sorted],
+            "matches": [{local_subject_id, identifier_type, center_id, gsid,
+                         subject_center_id, withdrawn, flagged_for_review}, ...]
+        }
+    """
+    rows_by_key = {}
+    keys = sorted({identifier["local_subject_id"].lower() for identifier in identifiers})
+    if keys:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        try:
+            cur.execute(
+                """
+                SELECT
+                    l.local_subject_id,
+                    l.identifier_type,
+                    l.center_id,
+                    l.global_subject_id AS gsid,
+                    s.center_id AS subject_center_id,
+                    s.withdrawn,
+                    s.flagged_for_review
+                FROM local_subject_ids l
+                LEFT JOIN subjects s ON l.global_subject_id = s.global_subject_id
+                WHERE lower(l.local_subject_id) = ANY(%s)  -- idx_local_ids_lower
+                ORDER BY l.local_subject_id, l.identifier_type, l.center_id
+                """,
+                (keys,),
+            )
+            for row in cur.fetchall():
+                rows_by_key.setdefault(row["local_subject_id"].lower(), []).append(dict(row))
+        finally:
+            cur.close()
+            conn.rollback()
+
+    results = []
+    for identifier in identifiers:
+        id_type = identifier.get("identifier_type")
+        matches = [
+            row
+            for row in rows_by_key.get(identifier["local_subject_id"].lower(), [])
+            if id_type is None or row["identifier_type"] == id_type
+        ]
+        results.append(
+            {
+                "local_subject_id": identifier["local_subject_id"],
+                "identifier_type": id_type,
+                "found": bool(matches),
+                "gsids": sorted({row["gsid"] for row in matches if row["gsid"]}),
+                "matches": matches,
+            }
+        )
+
+    logger.info(
+        f"Looked up {len(identifiers)} identifier(s): "
+        f"{sum(1 for r in results if r['found'])} found"
+    )
+    return results
+
+
+def lookup_gsids(conn, gsids: List[str]) -> List[Dict[str, Any]]:
+    """
+    Fetch many subjects with their local IDs in ONE query, writing nothing.
+
+    Returns:
+        One entry per input GSID, in input order:
+        {"gsid": str, "found": bool, ...subject columns..., "local_ids": [...]}
+        (subject columns and local_ids are omitted when not found)
+    """
+    subjects = {}
+    unique_gsids = sorted(set(gsids))
+    if unique_gsids:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        try:
+            cur.execute(
+                """
+                SELECT
+                    s.global_subject_id AS gsid,
+                    s.center_id,
+                    s.registration_year,
+                    s.control,
+                    s.withdrawn,
+                    s.flagged_for_review,
+                    s.created_at,
+                    COALESCE(
+                        json_agg(
+                            json_build_object(
+                                'center_id', l.center_id,
+                                'local_subject_id', l.local_subject_id,
+                                'identifier_type', l.identifier_type
+                            )
+                            ORDER BY l.created_at, l.center_id, l.local_subject_id
+                        ) FILTER (WHERE l.local_subject_id IS NOT NULL),
+                        '[]'
+                    ) AS local_ids
+                FROM subjects s
+                LEFT JOIN local_subject_ids l ON l.global_subject_id = s.global_subject_id
+                WHERE s.global_subject_id = ANY(%s)
+                GROUP BY s.global_subject_id
+                """,
+                (unique_gsids,),
+            )
+            for row in cur.fetchall():
+                subjects[row["gsid"]] = {
+                    **row,
+                    "registration_year": row["registration_year"].isoformat()
+                    if row["registration_year"]
+                    else None,
+                    "created_at": row["created_at"].isoformat()
+                    if row["created_at"]
+                    else None,
+                }
+        finally:
+            cur.close()
+            conn.rollback()
+
+    results = [
+        {**subjects[gsid], "found": True} if gsid in subjects else {"gsid": gsid, "found": False}
+        for gsid in gsids
+    ]
+    logger.info(f"Looked up {len(gsids)} GSID(s): {len(subjects)} found")
+    return results
+
+
+def _subject_version(row: Dict[str, Any]) -> str:
+    """
+    Pop the version columns off a row and fold them into an opaque tag.
+
+    The tag changes whenever the subject row is updated, a review event is
+    appended, or a local ID is added, changed or removed.
+    """
+    parts = (
+        row.pop("updated_at"),
+        row.pop("last_event_id"),
+        row.pop("local_id_count"),
+        row.pop("local_ids_updated_at"),
+    )
+    return hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+
+
+def get_subject_versions(conn, gsids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Cheap revalidation: the version and last-modified time of subjects, read
+    from subjects.updated_at, the latest review event and the local ID
+    index without building any detail.
+
+    Returns:
+        {gsid: {"version": str, "last_modified": datetime | None}} for the
+        GSIDs found. The version equals the one get_subject_details returns
+        for the same state.
+    """
+    versions = {}
+    unique_gsids = sorted(set(gsids))
+    if unique_gsids:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        try:
+            cur.execute(
+                """
+                SELECT
+                    s.global_subject_id AS gsid,
+                    s.updated_at,
+                    e.last_event_id,
+                    l.local_id_count,
+                    l.local_ids_updated_at,
+                    GREATEST(
+                        s.updated_at, l.local_ids_updated_at, e.last_event_at
+                    )::timestamptz AS last_modified
+                FROM subjects s
+                CROSS JOIN LATERAL (
+                    SELECT MAX(event_id) AS last_event_id, MAX(created_at) AS last_event_at
+                    FROM subject_review_events
+                    WHERE global_subject_id = s.global_subject_id
+                ) e
+                CROSS JOIN LATERAL (
+                    SELECT COUNT(*) AS local_id_count, MAX(updated_at) AS local_ids_updated_at
+                    FROM local_subject_ids
+                    WHERE global_subject_id = s.global_subject_id
+                ) l
+                WHERE s.global_subject_id = ANY(%s)
+                """,
+                (unique_gsids,),
+            )
+            for row in cur.fetchall():
+                row = dict(row)
+                versions[row["gsid"]] = {
+                    "version": _subject_version(row),
+                    "last_modified": row["last_modified"],
+                }
+        finally:
+            cur.close()
+            conn.rollback()
+
+    return versions
+
+
+def get_subject_details(conn, gsids: List[str]) -> List[Dict[str, Any]]:
+    """
+    Full detail of subjects (center name, review fields, local IDs) in ONE query.
+
+    Returns:
+        One entry per distinct GSID found, in input order. Each carries
+        `version` (see get_subject_versions) and `last_modified`, the latest
+        change to the subject, its local IDs or its review events as an
+        aware datetime, for HTTP caching headers.
+    """
+    subjects = {}
+    unique_gsids = sorted(set(gsids))
+    if unique_gsids:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        try:
+            cur.execute(
+                """
+                SELECT
+                    s.global_subject_id AS gsid,
+                    s.center_id,
+                    c.name AS center_name,
+                    s.registration_year,
+                    s.control,
+                    s.withdrawn,
+                    s.flagged_for_review,
+                    n.review_notes,
+                    s.created_by,
+                    s.created_at,
+                    s.updated_at,
+                    n.last_event_id,
+                    COUNT(l.local_subject_id) AS local_id_count,
+                    MAX(l.updated_at) AS local_ids_updated_at,
+                    GREATEST(
+                        s.updated_at, MAX(l.updated_at), n.last_review_event_at
+                    )::timestamptz AS last_modified,
+                    COALESCE(
+                        json_agg(
+                            json_build_object(
+                                'center_id', l.center_id,
+                                'local_subject_id', l.local_subject_id,
+                                'identifier_type', l.identifier_type,
+                                'created_by', l.created_by,
+                                'created_at', l.created_at
+                            )
+                            ORDER BY l.created_at, l.center_id, l.local_subject_id
+                        ) FILTER (WHERE l.local_subject_id IS NOT NULL),
+                        '[]'
+                    ) AS local_ids
+                FROM subjects s
+                JOIN centers c ON c.center_id = s.center_id
+                LEFT JOIN local_subject_ids l ON l.global_subject_id = s.global_subject_id
+                LEFT JOIN LATERAL (
+                    SELECT
+                        string_agg(e.note, E'\n' ORDER BY e.event_id) AS review_notes,
+                        MAX(e.event_id) AS last_event_id,
+                        MAX(e.created_at) AS last_review_event_at
+                    FROM subject_review_events e
+                    WHERE e.global_subject_id = s.global_subject_id
+                ) n ON TRUE
+                WHERE s.global_subject_id = ANY(%s)
+                GROUP BY s.global_subject_id, c.name, n.review_notes, n.last_event_id,
+                         n.last_review_event_at
+                """,
+                (unique_gsids,),
+            )
+            for row in cur.fetchall():
+                row = dict(row)
+                version = _subject_version(row)
+                subjects[row["gsid"]] = {
+                    **row,
+                    "version": version,
+                    "registration_year": row["registration_year"].isoformat()
+                    if row["registration_year"]
+                    else None,
+                    "created_at": row["created_at"].isoformat()
+                    if row["created_at"]
+                    else None,
+                }
+        finally:
+            cur.close()
+            conn.rollback()
+
+    return [subjects[gsid] for gsid in dict.fromkeys(gsids) if gsid in subjects]
@@ -0,0 +1,180 @@
+# gsid-service/tests/test_admission.py
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from core.admission import (
+    AdmissionController,
+    AdmissionMiddleware,
+    AdmissionRejected,
+    client_name,
+    get_admission_stats,
+)
+from fastapi.testclient import TestClient
+from starlette.responses import PlainTextResponse
+
+
+def _controller(**overrides):
+    options = {"max_in_flight": 1, "queue_max": 10, "client_queue_max": 5, "queue_timeout": 1.0}
+    options.update(overrides)
+    return AdmissionController(**options)
+
+
+class TestAdmissionController:
+    """Test the in-flight budget and per-client fair queue"""
+
+    @pytest.mark.asyncio
+    async def test_admits_within_budget(self):
+        """Test requests under the budget are admitted without queuing"""
+        controller = _controller(max_in_flight=2)
+
+        await controller.acquire("a")
+        await controller.acquire("a")
+
+        assert controller.in_flight == 2
+        assert controller.stats()["queued_total"] == 0
+
+    @pytest.mark.asyncio
+    async def test_round_robin_between_clients(self):
+        """Test a client's backlog does not delay another client's request"""
+        controller = _controller()
+        await controller.acquire("bulk")
+        order = []
+
+        async def request(client, name):
+            await controller.acquire(client)
+            order.append(name)
+
+        waiters = [asyncio.create_task(request("bulk", f"bulk{i}")) for i in range(3)]
+        await asyncio.sleep(0)
+        waiters.append(asyncio.create_task(request("pipeline", "pipeline")))
+        await asyncio.sleep(0)
+        assert controller.queued == 4
+
+        for _ in range(4):
+            controller.release()
+            await asyncio.sleep(0)
+        await asyncio.gather(*waiters)
+
+        assert order == ["bulk0", "pipeline", "bulk1", "bulk2"]
+        assert controller.in_flight == 1
+
+    @pytest.mark.asyncio
+    async def test_client_queue_full_is_429(self):
+        """Test a client over its queue share is told to slow down"""
+        controller = _controller(client_queue_max=1)
+        await controller.acquire("bulk")
+        waiter = asyncio.create_task(controller.acquire("bulk"))
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("bulk")
+        assert rejected.value.status_code == 429
+
+        # Other clients still queue
+        other = asyncio.create_task(controller.acquire("pipeline"))
+        await asyncio.sleep(0)
+        assert controller.queued == 2
+        waiter.cancel()
+        other.cancel()
+        await asyncio.gather(waiter, other, return_exceptions=True)
+        assert controller.queued == 0
+
+    @pytest.mark.asyncio
+    async def test_queue_full_is_503(self):
+        """Test a full queue rejects immediately"""
+        controller = _controller(queue_max=1)
+        await controller.acquire("a")
+        waiter = asyncio.create_task(controller.acquire("b"))
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("c")
+
+        assert rejected.value.status_code == 503
+        assert rejected.value.reason == "queue_full"
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+    @pytest.mark.asyncio
+    async def test_queue_timeout_is_503(self):
+        """Test a request that waits too long is rejected and dequeued"""
+        controller = _controller(queue_timeout=0.01)
+        await controller.acquire("a")
+
+        with pytest.raises(AdmissionRejected) as rejected:
+            await controller.acquire("b")
+
+        assert rejected.value.status_code == 503
+        assert rejected.value.reason == "queue_timeout"
+        assert controller.queued == 0
+        assert controller.stats()["rejected_queue_timeout"] == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_after_admission_releases_slot(self):
+        """Test a slot granted to a request cancelled meanwhile is given back"""
+        controller = _controller()
+        await controller.acquire("a")
+        waiter = asyncio.create_task(controller.acquire("b"))
+        await asyncio.sleep(0)
+
+        controller.release()  # grants the slot to "b"
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+
+        assert controller.in_flight == 0
+
+
+class TestAdmissionMiddleware:
+    """Test rejections over HTTP"""
+
+    def test_rejection_has_retry_after(self):
+        """Test a saturated service answers 503 with Retry-After at once"""
+
+        async def app(scope, receive, send):
+            await PlainTextResponse("ok")(scope, receive, send)
+
+        with (
+            patch("core.admission.settings.ADMISSION_MAX_IN_FLIGHT", 0),
+            patch("core.admission.settings.ADMISSION_QUEUE_MAX", 0),
+        ):
+            client = TestClient(AdmissionMiddleware(app))
+            response = client.get("/subjects/GSID-1", headers={"X-Created-By": "bulk"})
+            health = client.get("/health")
+
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "2"
+        assert health.status_code == 200
+        assert get_admission_stats()["rejected_queue_full"] == 1
+
+    def test_disabled(self):
+        """Test ADMISSION_ENABLED=false passes everything through"""
+
+        async def app(scope, receive, send):
+            await PlainTextResponse("ok")(scope, receive, send)
+
+        with (
+            patch("core.admission.settings.ADMISSION_ENABLED", False),
+            patch("core.admission.settings.ADMISSION_MAX_IN_FLIGHT", 0),
+        ):
+            response = TestClient(AdmissionMiddleware(app)).get("/lookup")
+
+        assert response.status_code == 200
+
+    def test_client_name(self):
+        """Test clients are told apart by X-Created-By, else by address"""
+        assert client_name({"headers": [(b"x-created-by", b" redcap_pipeline ")]}) == "redcap_pipeline"
+        assert client_name({"headers": [], "client": ("10.0.0.5", 4711)}) == "10.0.0.5"
+
+    def test_unknown_client_name_shares_address_queue(self):
+        """Test made-up X-Created-By values cannot open new queues"""
+        names = {
+            client_name(
+                {"headers": [(b"x-created-by", f"bulk-{i}".encode())], "client": ("10.0.0.5", 4711)}
+            )
+            for i in range(10)
+        }
+        assert names == {"10.0.0.5"}
+
+        with patch("core.admission.settings.ADMISSION_CLIENTS", "bulk-1, bulk-2"):
+            assert client_name({"headers": [(b"x-created-by", b"bulk-2")]}) == "bulk-2"
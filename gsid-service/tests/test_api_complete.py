@@ -1,7 +1,10 @@
 # gsid-service/tests/test_api_complete.py
+import json
+from datetime import datetime, timezone
 from unittest.mock import Mock, patch
 
 import pytest
+from core.config import settings
 from core.security import verify_api_key
 from fastapi.testclient import TestClient
 from main import app
@@ -36,14 +39,13 @@ class TestHealthEndpoint:
 
     def test_health_endpoint_healthy(self, client):
         """Test health endpoint when database is connected"""
-        with patch("api.routes.get_db_connection") as mock_conn:
+        with patch("api.routes.pooled_connection") as mock_conn:
             mock_cursor = Mock()
             mock_cursor.execute = Mock()
 
             conn = Mock()
             conn.cursor = Mock(return_value=mock_cursor)
-            conn.close = Mock()
-            mock_conn.return_value = conn
+            mock_conn.return_value.__enter__.return_value = conn
 
             response = client.get("/health")
 
@@ -51,10 +53,12 @@ class TestHealthEndpoint:
             result = response.json()
             assert result["status"] == "healthy"
             assert result["database"] == "connected"
+            assert "in_use" in result["pool"]
+            mock_cursor.execute.assert_called_once_with("SELECT 1")
 
     def test_health_endpoint_unhealthy(self, client):
         """Test health endpoint when database is disconnected"""
-        with patch("api.routes.get_db_connection") as mock_conn:
+        with patch("api.routes.pooled_connection") as mock_conn:
             mock_conn.side_effect = Exception("Database connection failed")
 
             response = client.get("/health")
@@ -63,9 +67,20 @@ class TestHealthEndpoint:
             result = response.json()
             assert result["detail"] == "Database connection failed"
 
+    def test_health_endpoint_pool_exhausted(self, client):
+        """Test health endpoint when no pooled connection is available"""
+        from core.database import PoolTimeoutError
+
+        with patch("api.routes.pooled_connection") as mock_conn:
+            mock_conn.side_effect = PoolTimeoutError("No database connection available")
+
+            response = client.get("/health")
+
+            assert response.status_code == 503
+
     def test_health_check_format(self, client):
         """Test health check response format"""
-        with patch("api.routes.get_db_connection"):
+        with patch("api.routes.pooled_connection"):
             response = client.get("/health")
             assert response.status_code == 200
             data = response.json()
@@ -102,7 +117,7 @@ class TestAuthentication:
     def test_api_key_validation_valid(self, client):
         """Test API endpoint with valid API key"""
         with (
-            patch("api.routes.get_db_connection"),
+            patch("api.routes.pooled_connection"),
             patch("services.identity_resolution.resolve_subject_with_multiple_ids") as mock_resolve,
         ):
             mock_resolve.return_value = {
@@ -131,7 +146,7 @@ class TestRegisterSubject:
     def test_register_subject_create_new(self, client):
         """Test registering a new subject"""
         with (
-            patch("api.routes.get_db_connection"),
+            patch("api.routes.pooled_connection"),
             patch("services.identity_resolution.resolve_subject_with_multiple_ids") as mock_resolve,
         ):
             mock_resolve.return_value = {
@@ -156,7 +171,7 @@ class TestRegisterSubject:
     def test_register_subject_link_existing(self, client):
         """Test linking to existing subject"""
         with (
-            patch("api.routes.get_db_connection"),
+            patch("api.routes.pooled_connection"),
             patch("services.identity_resolution.resolve_subject_with_multiple_ids") as mock_resolve,
         ):
             mock_resolve.return_value = {
@@ -182,3 +197,826 @@ class TestRegisterSubject:
         """Test validation error handling"""
         response = client.post("/register/subject", json={"center_id": "invalid"})
         assert response.status_code == 422
+
+    def test_idempotency_key_stores_response(self, client):
+        """Test a keyed registration stores its response before committing"""
+        result = {
+            "gsid": "GSID-NEW123456",
+            "action": "create_new",
+            "identifiers_linked": 1,
+            "conflicts": None,
+            "conflict_resolution": None,
+            "warnings": [],
+        }
+
+        def resolve(**kwargs):
+            kwargs["before_commit"]("cursor", result)
+            return result
+
+        with (
+            patch("api.routes.pooled_connection"),
+            patch("services.idempotency.claim", return_value=None) as mock_claim,
+            patch("services.idempotency.store") as mock_store,
+            patch(
+                "services.identity_resolution.resolve_subject_with_multiple_ids",
+                side_effect=resolve,
+            ),
+        ):
+            response = client.post(
+                "/register/subject",
+                json={"center_id": 1, "identifiers": [{"local_subject_id": "TEST001"}]},
+                headers={"Idempotency-Key": "retry-1"},
+            )
+
+        assert response.status_code == 200
+        assert "idempotent-replayed" not in response.headers
+        assert mock_claim.call_args.args[1:3] == ("/register/subject", "retry-1")
+        assert mock_store.call_args.args[:3] == ("cursor", "/register/subject", "retry-1")
+        assert mock_store.call_args.args[3] == response.json()
+
+    def test_idempotency_key_replays_response(self, client):
+        """Test a repeated key returns the stored response without resolving"""
+        stored = {"gsid": "GSID-NEW123456", "action": "create_new", "identifiers_linked": 1}
+        with (
+            patch("api.routes.pooled_connection"),
+            patch("services.idempotency.claim", return_value=stored),
+            patch("services.identity_resolution.resolve_subject_with_multiple_ids") as mock_resolve,
+        ):
+            response = client.post(
+                "/register/subject",
+                json={"center_id": 1, "identifiers": [{"local_subject_id": "TEST001"}]},
+                headers={"Idempotency-Key": "retry-1"},
+            )
+
+        assert response.status_code == 200
+        assert response.json() == stored
+        assert response.headers["idempotent-replayed"] == "true"
+        mock_resolve.assert_not_called()
+
+    def test_idempotency_key_reused(self, client):
+        """Test a key reused with another body is a 422"""
+        from services.idempotency import IdempotencyKeyReusedError
+
+        with (
+            patch("api.routes.pooled_connection"),
+            patch("services.idempotency.claim", side_effect=IdempotencyKeyReusedError("used")),
+        ):
+            response = client.post(
+                "/register/subject",
+                json={"center_id": 1, "identifiers": [{"local_subject_id": "TEST001"}]},
+                headers={"Idempotency-Key": "retry-1"},
+            )
+
+        assert response.status_code == 422
+
+
+# ============================================================================
+# BULK REGISTRATION TESTS
+# ============================================================================
+
+
+class TestRegisterSubjects:
+    """Test bulk subject registration endpoint"""
+
+    def test_register_subjects_results_in_order(self, client):
+        """Test bulk registration returns one result per subject in input order"""
+        with (
+            patch("api.routes.pooled_connection"),
+            patch("services.identity_resolution.resolve_subjects_batch") as mock_resolve,
+        ):
+            mock_resolve.return_value = [
+                {
+                    "gsid": "GSID-NEW123456",
+                    "action": "create_new",
+                    "identifiers_linked": 1,
+                    "conflicts": None,
+                    "conflict_resolution": None,
+                    "warnings": [],
+                },
+                {
+                    "gsid": "GSID-EXISTING123",
+                    "action": "link_existing",
+                    "identifiers_linked": 2,
+                    "conflicts": None,
+                    "conflict_resolution": "center_mismatch",
+                    "warnings": ["primary=TEST002: existing center=2, incoming center=1"],
+                },
+            ]
+
+            response = client.post(
+                "/register/subjects",
+                json={
+                    "subjects": [
+                        {"center_id": 1, "identifiers": [{"local_subject_id": "TEST001"}]},
+                        {
+                            "center_id": 1,
+                            "identifiers": [
+                                {"local_subject_id": "TEST002"},
+                                {"local_subject_id": "ALT002", "identifier_type": "alias"},
+                            ],
+                        },
+                    ]
+                },
+            )
+
+            assert response.status_code == 200
+            result = response.json()
+            assert [r["gsid"] for r in result["results"]] == [
+                "GSID-NEW123456",
+                "GSID-EXISTING123",
+            ]
+            assert result["results"][1]["warnings"]
+            assert result["summary"] == {"total": 2, "create_new": 1, "link_existing": 1}
+
+            subjects = mock_resolve.call_args.kwargs["subjects"]
+            assert len(subjects) == 2
+            assert subjects[1]["identifiers"][1] == {
+                "local_subject_id": "ALT002",
+                "identifier_type": "alias",
+            }
+
+    def test_register_subjects_empty_rejected(self, client):
+        """Test bulk registration requires at least one subject"""
+        response = client.post("/register/subjects", json={"subjects": []})
+        assert response.status_code == 422
+
+    def test_register_subjects_error(self, client):
+        """Test bulk registration surfaces resolution failures as 500"""
+        with (
+            patch("api.routes.pooled_connection"),
+            patch(
+                "services.identity_resolution.resolve_subjects_batch",
+                side_effect=Exception("DB error"),
+            ),
+        ):
+            response = client.post(
+                "/register/subjects",
+                json={"subjects": [{"center_id": 1, "identifiers": [{"local_subject_id": "X1"}]}]},
+            )
+            assert response.status_code == 500
+
+    def test_register_subjects_idempotency_key(self, client):
+        """Test a repeated bulk request is answered from its stored response"""
+        stored = {"results": [{"gsid": "GSID-1", "action": "create_new", "identifiers_linked": 1}], "summary": {"total": 1}}
+        with (
+            patch("api.routes.pooled_connection"),
+            patch("services.idempotency.claim", return_value=stored) as mock_claim,
+            patch("services.identity_resolution.resolve_subjects_batch") as mock_resolve,
+        ):
+            response = client.post(
+                "/register/subjects",
+                json={"subjects": [{"center_id": 1, "identifiers": [{"local_subject_id": "X1"}]}]},
+                headers={"Idempotency-Key": "chunk-0"},
+            )
+
+        assert response.json() == stored
+        assert mock_claim.call_args.args[1:3] == ("/register/subjects", "chunk-0")
+        mock_resolve.assert_not_called()
+
+
+# ============================================================================
+# GSID RESERVATION TESTS
+# ============================================================================
+
+
+class TestReserveGSIDsEndpoint:
+    """Test POST /gsids/reserve"""
+
+    def test_reserve_streams_one_gsid_per_line(self, client):
+        """Test reserved GSIDs are streamed as text lines"""
+        gsids = [f"GSID-{i:016d}" for i in range(1500)]
+        with (
+            patch("api.routes.pooled_connection"),
+            patch("services.gsid_generator.iter_unique_gsids", return_value=iter(gsids)) as mock_iter,
+        ):
+            response = client.post("/gsids/reserve", json={"count": 1500, "reserved_by": "import"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert response.text.splitlines() == gsids
+        assert mock_iter.call_args.args[0] == 1500
+        assert mock_iter.call_args.kwargs["reserved_by"] == "import"
+
+    def test_reserve_rejects_invalid_count(self, client):
+        """Test count outside the allowed range is rejected"""
+        response = client.post("/gsids/reserve", json={"count": 0})
+        assert response.status_code == 422
+
+
+# ============================================================================
+# STREAMED REGISTRATION TESTS
+# ============================================================================
+
+
+class TestRegisterStream:
+    """Test POST /register/stream"""
+
+    @staticmethod
+    def _body(count, bad_lines=()):
+        lines = []
+        for i in range(count):
+            if i in bad_lines:
+                lines.append("{not json")
+            else:
+                lines.append(
+                    json.dumps({"center_id": 1, "identifiers": [{"local_subject_id": f"S{i}"}]})
+                )
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _fake_commit(calls):
+        def commit(conn, import_id, subjects, first_line, end_line, summary, invalid_lines=0):
+            calls.append((first_line, end_line, len(subjects), invalid_lines))
+            results = [
+                {
+                    "gsid": f"GSID-{s['identifiers'][0]['local_subject_id']}",
+                    "action": "create_new",
+                    "identifiers_linked": 1,
+                    "conflicts": None,
+                    "conflict_resolution": None,
+                    "warnings": [],
+                }
+                for s in subjects
+            ]
+            return results, {**summary, "create_new": summary.get("create_new", 0) + len(results)}
+
+        return commit
+
+    def _post(self, client, body, committed_lines=0, chunk_size=2, **params):
+        calls = []
+        with (
+            patch("api.routes.pooled_connection"),
+            patch.object(settings, "REGISTRATION_STREAM_CHUNK_SIZE", chunk_size),
+            patch(
+                "services.registration_stream.start_import",
+                return_value={"committed_lines": committed_lines, "summary": {}},
+            ),
+            patch(
+                "services.registration_stream.commit_chunk",
+                side_effect=self._fake_commit(calls),
+            ),
+        ):
+            response = client.post(
+                "/register/stream",
+                params={"import_id": "imp-1", **params},
+                content=body,
+                headers={"Content-Type": "application/x-ndjson"},
+            )
+        events = [json.loads(line) for line in response.text.splitlines()]
+        return response, events, calls
+
+    def test_streams_results_per_chunk(self, client):
+        """Test lines are committed in chunks and results stream in line order"""
+        response, events, calls = self._post(client, self._body(5, bad_lines={3}))
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert response.headers["x-import-id"] == "imp-1"
+        assert calls == [(0, 2, 2, 0), (2, 4, 1, 1), (4, 5, 1, 0)]
+        assert events[0] == {"event": "start", "import_id": "imp-1", "resume_from": 0}
+        assert [e.get("line") for e in events if "line" in e] == [0, 1, 2, 3, 4]
+        assert [e["line"] for e in events if "error" in e] == [3]
+        assert [e["committed_lines"] for e in events if e.get("event") == "chunk_committed"] == [
+            2,
+            4,
+            5,
+        ]
+        assert events[-1]["event"] == "complete"
+        assert events[-1]["committed_lines"] == 5
+
+    def test_resume_skips_committed_lines(self, client):
+        """Test re-sending the whole stream only registers uncommitted lines"""
+        _, events, calls = self._post(client, self._body(5), committed_lines=4)
+
+        assert calls == [(4, 5, 1, 0)]
+        assert events[0]["resume_from"] == 4
+        assert [e["line"] for e in events if "gsid" in e] == [4]
+
+    def test_resume_from_offset(self, client):
+        """Test a stream of the remaining lines numbers them from offset"""
+        _, events, calls = self._post(client, self._body(3), committed_lines=4, offset=3)
+
+        assert calls == [(4, 6, 2, 0)]
+        assert [e["line"] for e in events if "gsid" in e] == [4, 5]
+
+    def test_offset_gap_rejected(self, client):
+        """Test a stream that would skip uncommitted lines is rejected"""
+        from services.registration_stream import ImportConflictError
+
+        with (
+            patch("api.routes.pooled_connection"),
+            patch(
+                "services.registration_stream.start_import",
+                side_effect=ImportConflictError("gap"),
+            ),
+        ):
+            response = client.post(
+                "/register/stream", params={"import_id": "imp-1", "offset": 10}, content=""
+            )
+
+        assert response.status_code == 409
+
+    def test_chunk_failure_reports_committed_lines(self, client):
+        """Test a failed chunk ends the stream with the line to resume from"""
+        with (
+            patch("api.routes.pooled_connection"),
+            patch.object(settings, "REGISTRATION_STREAM_CHUNK_SIZE", 2),
+            patch(
+                "services.registration_stream.start_import",
+                return_value={"committed_lines": 0, "summary": {}},
+            ),
+            patch(
+                "services.registration_stream.commit_chunk",
+                side_effect=[
+                    ([{"gsid": "GSID-A", "action": "create_new"}] * 2, {"create_new": 2}),
+                    Exception("Database error"),
+                ],
+            ),
+        ):
+            response = client.post(
+                "/register/stream", params={"import_id": "imp-1"}, content=self._body(4)
+            )
+
+        events = [json.loads(line) for line in response.text.splitlines()]
+        assert events[-1] == {
+            "event": "error",
+            "detail": "Database error",
+            "committed_lines": 2,
+        }
+
+    def test_progress_endpoint(self, client):
+        """Test GET /register/stream/{import_id} reports progress or 404"""
+        with (
+            patch("api.routes.pooled_connection"),
+            patch(
+                "services.registration_stream.get_import",
+                side_effect=[{"import_id": "imp-1", "committed_lines": 7, "summary": {}}, None],
+            ),
+        ):
+            assert client.get("/register/stream/imp-1").json()["committed_lines"] == 7
+            assert client.get("/register/stream/missing").status_code == 404
+
+
+# ============================================================================
+# SUBJECT DETAIL TESTS
+# ============================================================================
+
+
+class TestSubjectDetailEndpoint:
+    """Test GET /subjects/{gsid} and GET /subjects?gsid=..."""
+
+    MODIFIED = datetime(2024, 6, 1, 12, 30, 15, 250000, tzinfo=timezone.utc)
+
+    def _subject(self, gsid="GSID-A"):
+        return {
+            "gsid": gsid,
+            "center_id": 1,
+            "center_name": "MSSM",
+            "registration_year": None,
+            "control": False,
+            "withdrawn": False,
+            "flagged_for_review": False,
+            "review_notes": None,
+            "created_by": "system",
+            "created_at": "2024-01-01T00:00:00",
+            "version": "v1",
+            "last_modified": self.MODIFIED,
+            "local_ids": [{"center_id": 1, "local_subject_id": "ID-1"}],
+        }
+
+    def _versions(self, subjects):
+        return {
+            s["gsid"]: {"version": s["version"], "last_modified": s["last_modified"]}
+            for s in subjects
+        }
+
+    def _get(self, client, url, subjects, **headers):
+        with (
+            patch("api.routes.pooled_connection"),
+            patch(
+                "services.subject_lookup.get_subject_versions",
+                return_value=self._versions(subjects),
+            ),
+            patch(
+                "services.subject_lookup.get_subject_details",
+                return_value=[dict(s) for s in subjects],
+            ),
+        ):
+            return client.get(url, headers=headers)
+
+    def test_detail_with_validators(self, client):
+        """Test the detail carries ETag, Last-Modified and revalidation headers"""
+        response = self._get(client, "/subjects/GSID-A", [self._subject()])
+
+        assert response.status_code == 200
+        assert response.json()["center_name"] == "MSSM"
+        assert "last_modified" not in response.json()
+        assert "version" not in response.json()
+        assert response.headers["etag"] == '"v1"'
+        assert response.headers["last-modified"] == "Sat, 01 Jun 2024 12:30:15 GMT"
+        assert response.headers["cache-control"] == "private, no-cache"
+
+    def test_not_found(self, client):
+        """Test unknown GSIDs return 404"""
+        assert self._get(client, "/subjects/GSID-X", []).status_code == 404
+
+    def test_if_none_match_returns_304(self, client):
+        """Test a matching (or gzip-weakened) ETag gets an empty 304"""
+        etag = self._get(client, "/subjects/GSID-A", [self._subject()]).headers["etag"]
+
+        for tag in (etag, f"W/{etag}", f'"other", {etag}'):
+            response = self._get(
+                client, "/subjects/GSID-A", [self._subject()], **{"If-None-Match": tag}
+            )
+            assert response.status_code == 304
+            assert response.content == b""
+            assert response.headers["etag"] == etag
+
+    def test_304_skips_detail_query(self, client):
+        """Test an unchanged subject is revalidated from the version query alone"""
+        subject = self._subject()
+        with (
+            patch("api.routes.pooled_connection"),
+            patch(
+                "services.subject_lookup.get_subject_versions",
+                return_value=self._versions([subject]),
+            ) as mock_versions,
+            patch("services.subject_lookup.get_subject_details") as mock_details,
+        ):
+            response = client.get("/subjects/GSID-A", headers={"If-None-Match": '"v1"'})
+
+        assert response.status_code == 304
+        mock_versions.assert_called_once()
+        mock_details.assert_not_called()
+
+    def test_unconditional_request_skips_version_query(self, client):
+        """Test a plain GET reads the detail (and its version) in one query"""
+        subject = self._subject()
+        with (
+            patch("api.routes.pooled_connection"),
+            patch("services.subject_lookup.get_subject_versions") as mock_versions,
+            patch(
+                "services.subject_lookup.get_subject_details", return_value=[subject]
+            ),
+        ):
+            response = client.get("/subjects/GSID-A")
+
+        assert response.status_code == 200
+        mock_versions.assert_not_called()
+
+    def test_changed_subject_returns_200(self, client):
+        """Test a stale ETag gets the new representation"""
+        etag = self._get(client, "/subjects/GSID-A", [self._subject()]).headers["etag"]
+        changed = {**self._subject(), "withdrawn": True, "version": "v2"}
+
+        response = self._get(client, "/subjects/GSID-A", [changed], **{"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+    def test_if_modified_since(self, client):
+        """Test If-Modified-Since at second precision"""
+        current = self._get(
+            client,
+            "/subjects/GSID-A",
+            [self._subject()],
+            **{"If-Modified-Since": "Sat, 01 Jun 2024 12:30:15 GMT"},
+        )
+        stale = self._get(
+            client,
+            "/subjects/GSID-A",
+            [self._subject()],
+            **{"If-Modified-Since": "Sat, 01 Jun 2024 12:30:14 GMT"},
+        )
+
+        assert current.status_code == 304
+        assert stale.status_code == 200
+
+    def test_multi_gsid(self, client):
+        """Test several subjects in request order with missing ones listed"""
+        response = self._get(
+            client,
+            "/subjects?gsid=GSID-B&gsid=GSID-X&gsid=GSID-A",
+            [self._subject("GSID-B"), self._subject("GSID-A")],
+        )
+
+        assert response.status_code == 200
+        body = response.json()
+        assert [s["gsid"] for s in body["subjects"]] == ["GSID-B", "GSID-A"]
+        assert body["missing"] == ["GSID-X"]
+        assert "etag" in response.headers
+
+        repeat = self._get(
+            client,
+            "/subjects?gsid=GSID-B&gsid=GSID-X&gsid=GSID-A",
+            [self._subject("GSID-B"), self._subject("GSID-A")],
+            **{"If-None-Match": response.headers["etag"]},
+        )
+        assert repeat.status_code == 304
+
+        changed = self._get(
+            client,
+            "/subjects?gsid=GSID-B&gsid=GSID-X&gsid=GSID-A",
+            [self._subject("GSID-B"), {**self._subject("GSID-A"), "version": "v2"}],
+            **{"If-None-Match": response.headers["etag"]},
+        )
+        assert changed.status_code == 200
+
+    def test_multi_gsid_requires_gsid(self, client):
+        """Test GET /subjects without gsid parameters, or with too many, is rejected"""
+        assert client.get("/subjects").status_code == 422
+        too_many = "&".join(f"gsid=GSID-{i}" for i in range(501))
+        assert client.get(f"/subjects?{too_many}").status_code == 422
+
+
+class TestWithdrawEndpoint:
+    """Test POST /subjects/{gsid}/withdraw"""
+
+    def test_withdraw_appends_review_event(self, client):
+        """Test withdrawal flags the subject and appends a review event"""
+        with patch("api.routes.pooled_connection") as mock_pool:
+            conn = mock_pool.return_value.__enter__.return_value
+            cursor = conn.cursor.return_value
+            cursor.fetchone.return_value = ("GSID-A",)
+            response = client.post("/subjects/GSID-A/withdraw", params={"reason": "consent"})
+
+        assert response.status_code == 200
+        assert response.json() == {"status": "withdrawn", "gsid": "GSID-A"}
+        sql, params = cursor.execute.call_args.args
+        assert "INSERT INTO subject_review_events" in sql
+        assert "review_notes" not in sql
+        assert params == ("GSID-A", "consent", "consent", "system")
+        conn.commit.assert_called_once()
+
+    def test_withdraw_records_actor(self, client):
+        """Test the review event names who withdrew, from created_by or X-Created-By"""
+        for kwargs, actor in (
+            ({"params": {"created_by": "curator"}}, "curator"),
+            ({"headers": {"X-Created-By": "redcap_pipeline"}}, "redcap_pipeline"),
+            (
+                {"params": {"created_by": "curator"}, "headers": {"X-Created-By": "x"}},
+                "curator",
+            ),
+        ):
+            with patch("api.routes.pooled_connection") as mock_pool:
+                cursor = mock_pool.return_value.__enter__.return_value.cursor.return_value
+                cursor.fetchone.return_value = ("GSID-A",)
+                response = client.post("/subjects/GSID-A/withdraw", **kwargs)
+
+            assert response.status_code == 200
+            assert cursor.execute.call_args.args[1][-1] == actor
+
+    def test_withdraw_unknown_subject(self, client):
+        """Test an unknown GSID is 404"""
+        with patch("api.routes.pooled_connection") as mock_pool:
+            conn = mock_pool.return_value.__enter__.return_value
+            conn.cursor.return_value.fetchone.return_value = None
+            response = client.post("/subjects/GSID-X/withdraw")
+
+        assert response.status_code == 404
+        conn.commit.assert_not_called()
+
+
+# ============================================================================
+# LOOKUP TESTS
+# ============================================================================
+
+
+class TestChangeFeedEndpoint:
+    """Test GET /changes"""
+
+    def _get(self, client, url, page=None, **kwargs):
+        page = page or {"changes": [], "next_position": (0, 0), "has_more": False}
+        with (
+            patch("api.routes.pooled_connection"),
+            patch("services.change_feed.get_changes", return_value=page, **kwargs) as mock_get,
+        ):
+            return client.get(url), mock_get
+
+    def test_from_start(self, client):
+        """Test no cursor reads from the start and returns the next cursor"""
+        from services.change_feed import decode_cursor
+
+        change = {
+            "change_id": 5,
+            "table": "local_subject_ids",
+            "operation": "update",
+            "key": {"center_id": 1, "local_subject_id": "ID-1", "identifier_type": "primary"},
+            "row": {"global_subject_id": "GSID-A"},
+            "changed_at": "2024-06-01T00:00:00",
+        }
+        response, mock_get = self._get(
+            client,
+            "/changes?limit=1",
+            {"changes": [change], "next_position": (901, 5), "has_more": True},
+        )
+
+        assert response.status_code == 200
+        assert mock_get.call_args.args[1:] == ((0, 0), 1)
+        body = response.json()
+        assert body["changes"] == [change]
+        assert body["has_more"] is True
+        assert decode_cursor(body["next_cursor"]) == (901, 5)
+
+    def test_since_cursor(self, client):
+        """Test the cursor is passed through as a feed position"""
+        from services.change_feed import encode_cursor
+
+        response, mock_get = self._get(client, f"/changes?since={encode_cursor((901, 5))}")
+
+        assert response.status_code == 200
+        assert mock_get.call_args.args[1:] == ((901, 5), 1000)
+
+    def test_invalid_cursor(self, client):
+        """Test a malformed cursor is a 400, not a read from the start"""
+        response, mock_get = self._get(client, "/changes?since=bogus")
+
+        assert response.status_code == 400
+        mock_get.assert_not_called()
+
+    def test_expired_cursor(self, client):
+        """Test a cursor older than the compacted feed is a 410"""
+        from services.change_feed import CursorExpiredError, encode_cursor
+
+        response, _ = self._get(
+            client,
+            f"/changes?since={encode_cursor((901, 5))}",
+            side_effect=CursorExpiredError((901, 5), (950, 1)),
+        )
+
+        assert response.status_code == 410
+        assert "without `since`" in response.json()["detail"]
+
+    def test_limit_bounds(self, client):
+        """Test page sizes outside 1..MAX_CHANGE_FEED_PAGE are rejected"""
+        assert self._get(client, "/changes?limit=0")[0].status_code == 422
+        assert self._get(client, "/changes?limit=10001")[0].status_code == 422
+
+
+class TestExportRegistryEndpoint:
+    """Test GET /export/registry"""
+
+    def test_streams_attachment(self, client):
+        """Test the export streams every chunk with a download filename"""
+        with (
+            patch("api.routes.pooled_connection"),
+            patch(
+                "services.registry_export.export_chunks", return_value=iter([b"PAR1", b"..."])
+            ) as mock_export,
+        ):
+            response = client.get("/export/registry?format=parquet")
+
+        assert response.status_code == 200
+        assert response.content == b"PAR1..."
+        assert response.headers["content-type"] == "application/vnd.apache.parquet"
+        assert response.headers["content-disposition"].endswith('.parquet"')
+        assert mock_export.call_args.args[1] == "parquet"
+
+    def test_csv_is_gzipped_file(self, client):
+        """Test CSV is offered as a .csv.gz download"""
+        with (
+            patch("api.routes.pooled_connection"),
+            patch("services.registry_export.export_chunks", return_value=iter([b"\x1f\x8b"])),
+        ):
+            response = client.get("/export/registry?format=csv")
+
+        assert response.headers["content-type"] == "application/gzip"
+        assert response.headers["content-disposition"].endswith('.csv.gz"')
+
+    def test_unknown_format(self, client):
+        """Test unsupported formats are a 422"""
+        assert client.get("/export/registry?format=xlsx").status_code == 422
+
+    def test_pool_timeout_before_streaming(self, client):
+        """Test pool exhaustion is reported as 503 rather than a truncated body"""
+        from core.database import PoolTimeoutError
+
+        with patch("api.routes.pooled_connection", side_effect=PoolTimeoutError("busy")):
+            response = client.get("/export/registry")
+
+        assert response.status_code == 503
+
+
+class TestValidateIDsEndpoint:
+    """Test POST /validate/ids"""
+
+    def test_reports_only_flagged_ids(self, client):
+        """Test clean IDs are only counted; flagged IDs keep their input index"""
+        response = client.post(
+            "/validate/ids",
+            json={"local_subject_ids": ["IBDGC000123", "test1", "ab", None, "IBDGC000124"]},
+        )
+
+        assert response.status_code == 200
+        body = response.json()
+        assert [r["index"] for r in body["results"]] == [1, 2, 3]
+        assert body["results"][0] == {
+            "index": 1,
+            "local_subject_id": "test1",
+            "identifier_type": "primary",
+            "valid": False,
+            "severity": "error",
+            "warnings": ["ID matches error pattern: ^test"],
+        }
+        assert body["results"][2]["warnings"] == ["ID is empty or whitespace"]
+        assert body["summary"] == {"total": 5, "valid": 3, "invalid": 2, "warnings": 1}
+
+    def test_per_id_types(self, client):
+        """Test numeric IDs are only flagged for types that do not allow them"""
+        response = client.post(
+            "/validate/ids",
+            json={
+                "local_subject_ids": ["123456", "123456"],
+                "identifier_types": ["niddk_no", "consortium_id"],
+            },
+        )
+
+        results = response.json()["results"]
+        assert [(r["index"], r["identifier_type"]) for r in results] == [(1, "consortium_id")]
+        assert "purely numeric" in results[0]["warnings"][0]
+
+    def test_empty_request(self, client):
+        """Test an empty ID list validates to an empty summary"""
+        response = client.post("/validate/ids", json={"local_subject_ids": []})
+
+        assert response.status_code == 200
+        assert response.json()["summary"]["total"] == 0
+
+    def test_type_count_mismatch(self, client):
+        """Test identifier_types must line up with local_subject_ids"""
+        response = client.post(
+            "/validate/ids",
+            json={"local_subject_ids": ["A1", "A2"], "identifier_types": ["primary"]},
+        )
+
+        assert response.status_code == 422
+
+
+class TestLookupEndpoint:
+    """Test POST /lookup"""
+
+    def test_lookup_identifiers_and_gsids(self, client):
+        """Test both lists are answered in input order with a summary"""
+        with (
+            patch("api.routes.pooled_connection"),
+            patch("services.subject_lookup.lookup_identifiers") as mock_ids,
+            patch("services.subject_lookup.lookup_gsids") as mock_gsids,
+        ):
+            mock_ids.return_value = [
+                {
+                    "local_subject_id": "TEST001",
+                    "identifier_type": None,
+                    "found": True,
+                    "gsids": ["GSID-A", "GSID-B"],
+                    "matches": [],
+                },
+                {
+                    "local_subject_id": "TEST002",
+                    "identifier_type": "primary",
+                    "found": False,
+                    "gsids": [],
+                    "matches": [],
+                },
+            ]
+            mock_gsids.return_value = [{"gsid": "GSID-A", "found": True, "local_ids": []}]
+
+            response = client.post(
+                "/lookup",
+                json={
+                    "identifiers": [
+                        {"local_subject_id": " TEST001 "},
+                        {"local_subject_id": "TEST002", "identifier_type": "primary"},
+                    ],
+                    "gsids": ["GSID-A"],
+                },
+            )
+
+        assert response.status_code == 200
+        result = response.json()
+        assert [r["local_subject_id"] for r in result["identifiers"]] == ["TEST001", "TEST002"]
+        assert result["summary"] == {
+            "identifiers_requested": 2,
+            "identifiers_found": 1,
+            "identifiers_multi_gsid": 1,
+            "gsids_requested": 1,
+            "gsids_found": 1,
+        }
+        assert mock_ids.call_args.args[1] == [
+            {"local_subject_id": "TEST001", "identifier_type": None},
+            {"local_subject_id": "TEST002", "identifier_type": "primary"},
+        ]
+
+    def test_lookup_requires_input(self, client):
+        """Test an empty lookup is rejected"""
+        response = client.post("/lookup", json={})
+        assert response.status_code == 422
+
+    def test_lookup_pool_exhausted(self, client):
+        """Test pool exhaustion maps to 503"""
+        from core.database import PoolTimeoutError
+
+        with patch("api.routes.pooled_connection") as mock_pool:
+            mock_pool.return_value.__enter__.side_effect = PoolTimeoutError("busy")
+            response = client.post("/lookup", json={"gsids": ["GSID-A"]})
+
+        assert response.status_code == 503
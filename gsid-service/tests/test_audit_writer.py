@@ -0,0 +1,117 @@
+# gsid-service/tests/test_audit_writer.py
+from unittest.mock import MagicMock, patch
+
+import pytest
+from services import audit_writer
+from services.audit_writer import (
+    accepting,
+    enqueue,
+    flush,
+    get_audit_writer_stats,
+    start_audit_writer,
+    stop_audit_writer,
+)
+
+
+@pytest.fixture(autouse=True)
+def empty_queue():
+    audit_writer._queue.clear()
+    yield
+    audit_writer._queue.clear()
+    audit_writer._wakeup.clear()
+
+
+@pytest.fixture
+def running():
+    """Pretend the flush thread is running without starting it"""
+    with patch.object(audit_writer, "_thread", MagicMock()):
+        yield
+
+
+@pytest.fixture
+def db():
+    conn = MagicMock()
+    with patch("services.audit_writer.pooled_connection") as mock_pooled, patch(
+        "services.identity_resolution.insert_audits"
+    ) as mock_insert:
+        mock_pooled.return_value.__enter__.return_value = conn
+        yield conn, mock_insert
+
+
+class TestAcceptingAndEnqueue:
+    """Test deciding whether audits may be deferred"""
+
+    def test_not_running_does_not_accept(self):
+        """Test audits stay in the transaction without a flush thread"""
+        assert accepting(1) is False
+
+    def test_bounded_queue(self, running):
+        """Test a full queue pushes audits back into the transaction"""
+        with patch.object(audit_writer.settings, "AUDIT_QUEUE_MAX", 3):
+            assert accepting(3) is True
+            enqueue([("a",), ("b",)])
+            assert accepting(1) is True
+            assert accepting(2) is False
+
+    def test_enqueue_stamps_created_at_and_wakes_when_full(self, running):
+        """Test queued rows carry their enqueue time and a full batch triggers a flush"""
+        with patch.object(audit_writer.settings, "AUDIT_FLUSH_ROWS", 2):
+            enqueue([("a",)])
+            assert not audit_writer._wakeup.is_set()
+            enqueue([("b",)])
+
+        assert audit_writer._wakeup.is_set()
+        assert [row[0] for row in audit_writer._queue] == ["a", "b"]
+        assert audit_writer._queue[0][1] is not None
+
+
+class TestFlush:
+    """Test writing queued audits"""
+
+    def test_flush_in_batches(self, db):
+        """Test every queued row is written, AUDIT_FLUSH_ROWS per transaction"""
+        conn, mock_insert = db
+        enqueue([(i,) for i in range(5)])
+
+        with patch.object(audit_writer.settings, "AUDIT_FLUSH_ROWS", 2):
+            assert flush() == 5
+
+        assert [len(c.args[1]) for c in mock_insert.call_args_list] == [2, 2, 1]
+        assert conn.commit.call_count == 3
+        assert get_audit_writer_stats()["queued"] == 0
+
+    def test_failed_batch_is_requeued_in_order(self, db):
+        """Test rows of a failed flush stay queued for the next attempt"""
+        _, mock_insert = db
+        mock_insert.side_effect = Exception("database down")
+        enqueue([(i,) for i in range(3)])
+        before = get_audit_writer_stats()["flush_failures"]
+
+        with pytest.raises(Exception, match="database down"):
+            flush()
+
+        assert [row[0] for row in audit_writer._queue] == [0, 1, 2]
+        assert get_audit_writer_stats()["flush_failures"] == before + 1
+
+
+class TestAuditWriterLifecycle:
+    """Test starting and stopping the flush thread"""
+
+    def test_disabled_does_not_start(self):
+        """Test AUDIT_ASYNC_ENABLED=false keeps every audit in its transaction"""
+        with patch.object(audit_writer.settings, "AUDIT_ASYNC_ENABLED", False):
+            start_audit_writer()
+        assert get_audit_writer_stats()["running"] is False
+
+    def test_stop_writes_remaining_rows(self, db):
+        """Test shutdown flushes what is still queued"""
+        _, mock_insert = db
+        with patch.object(audit_writer.settings, "AUDIT_FLUSH_INTERVAL_MS", 60_000):
+            start_audit_writer()
+            assert accepting(1) is True
+            enqueue([("a",)])
+            stop_audit_writer()
+
+        assert get_audit_writer_stats()["running"] is False
+        assert sum(len(c.args[1]) for c in mock_insert.call_args_list) == 1
+        assert get_audit_writer_stats()["queued"] == 0
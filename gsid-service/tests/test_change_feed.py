@@ -0,0 +1,163 @@
+# gsid-service/tests/test_change_feed.py
+from datetime import datetime
+
+import pytest
+from services.change_feed import (
+    START,
+    CursorExpiredError,
+    InvalidCursorError,
+    compact_changes,
+    decode_cursor,
+    encode_cursor,
+    get_changes,
+)
+
+
+def _change(change_id, txid="900", operation="insert"):
+    return {
+        "change_id": change_id,
+        "txid": txid,
+        "table_name": "subjects",
+        "operation": operation,
+        "row_key": {"global_subject_id": f"GSID-{change_id}"},
+        "row_data": None if operation == "delete" else {"global_subject_id": f"GSID-{change_id}"},
+        "changed_at": datetime(2024, 6, 1),
+    }
+
+
+class TestCursor:
+    """Test opaque cursor encoding"""
+
+    def test_round_trip(self):
+        """Test a cursor decodes to the position it was made from"""
+        cursor = encode_cursor((123456789012, 42))
+
+        assert "=" not in cursor
+        assert decode_cursor(cursor) == (123456789012, 42)
+
+    @pytest.mark.parametrize("cursor", ["", "not-a-cursor", "djI6MTox", "djE6LTE6MQ"])
+    def test_rejects_foreign_cursors(self, cursor):
+        """Test garbage, other versions and negative positions are rejected"""
+        with pytest.raises(InvalidCursorError):
+            decode_cursor(cursor)
+
+
+class TestGetChanges:
+    """Test reading one page of the feed"""
+
+    def test_keyset_page(self, mock_db_connection):
+        """Test one query after the position, limit + 1 rows to detect more"""
+        cursor = mock_db_connection.cursor.return_value
+        cursor.fetchall.return_value = [_change(7), _change(8, operation="delete"), _change(9)]
+
+        page = get_changes(mock_db_connection, (900, 6), limit=2)
+
+        assert cursor.execute.call_count == 2  # page, then retention row
+        sql, params = cursor.execute.call_args_list[0].args
+        assert "pg_snapshot_xmin(pg_current_snapshot())" in sql
+        assert params == ("900", 6, 3)
+        assert [c["change_id"] for c in page["changes"]] == [7, 8]
+        assert page["changes"][1] == {
+            "change_id": 8,
+            "table": "subjects",
+            "operation": "delete",
+            "key": {"global_subject_id": "GSID-8"},
+            "row": None,
+            "changed_at": datetime(2024, 6, 1),
+        }
+        assert page["next_position"] == (900, 8)
+        assert page["has_more"] is True
+        mock_db_connection.rollback.assert_called_once()
+        mock_db_connection.commit.assert_not_called()
+
+    def test_caught_up_keeps_position(self, mock_db_connection):
+        """Test an empty page hands back the position it was asked for"""
+        mock_db_connection.cursor.return_value.fetchall.return_value = []
+
+        page = get_changes(mock_db_connection, START, limit=100)
+
+        assert page == {"changes": [], "next_position": START, "has_more": False}
+
+    def test_cursor_before_compacted_delete_expires(self, mock_db_connection):
+        """Test a cursor older than a compacted delete is refused"""
+        cursor = mock_db_connection.cursor.return_value
+        cursor.fetchall.return_value = [_change(7)]
+        cursor.fetchone.return_value = {"txid": "900", "change_id": 5}
+
+        with pytest.raises(CursorExpiredError) as expired:
+            get_changes(mock_db_connection, (900, 4), limit=10)
+        assert expired.value.expired == (900, 5)
+
+        page = get_changes(mock_db_connection, (900, 5), limit=10)
+        assert [c["change_id"] for c in page["changes"]] == [7]
+
+    def test_start_never_expires(self, mock_db_connection):
+        """Test reading from the start works after compaction"""
+        cursor = mock_db_connection.cursor.return_value
+        cursor.fetchone.return_value = {"txid": "900", "change_id": 5}
+
+        assert get_changes(mock_db_connection, START, limit=10)["changes"] == []
+
+
+class TestCompactChanges:
+    """Test compaction of aged changes"""
+
+    @staticmethod
+    def _aged(change_id, aged=True, txid="900"):
+        return {"txid": txid, "change_id": change_id, "aged": aged}
+
+    def test_compacts_aged_prefix(self, mock_db_connection):
+        """Test only the aged prefix is compacted and expiry follows deleted deletes"""
+        cursor = mock_db_connection.cursor.return_value
+        cursor.fetchone.return_value = {
+            "compacted_txid": "900",
+            "compacted_change_id": 1,
+            "expired_txid": "0",
+            "expired_change_id": 0,
+        }
+        cursor.fetchall.side_effect = [
+            [self._aged(2), self._aged(3), self._aged(4, aged=False), self._aged(5)],
+            [
+                {"operation": "insert", "txid": "900", "change_id": 1},
+                {"operation": "delete", "txid": "900", "change_id": 3},
+            ],
+        ]
+
+        deleted = compact_changes(mock_db_connection, retention_days=30, batch_size=4)
+
+        assert deleted == 2
+        statements = [c.args for c in cursor.execute.call_args_list]
+        assert "FOR UPDATE SKIP LOCKED" in statements[0][0]
+        assert statements[1][1] == (30, "900", 1, 4)
+        assert statements[2][1] == {
+            "low_txid": "900",
+            "low_id": 1,
+            "high_txid": "900",
+            "high_id": 3,
+        }
+        assert "UPDATE registry_changes_retention" in statements[3][0]
+        assert statements[3][1] == ("900", 3, "900", 3)
+        mock_db_connection.commit.assert_called_once()
+
+    def test_nothing_aged(self, mock_db_connection):
+        """Test a run with no aged changes writes nothing"""
+        cursor = mock_db_connection.cursor.return_value
+        cursor.fetchone.return_value = {
+            "compacted_txid": "0",
+            "compacted_change_id": 0,
+            "expired_txid": "0",
+            "expired_change_id": 0,
+        }
+        cursor.fetchall.return_value = [self._aged(1, aged=False)]
+
+        assert compact_changes(mock_db_connection, retention_days=30) == 0
+        assert cursor.execute.call_count == 2
+        mock_db_connection.commit.assert_not_called()
+
+    def test_other_worker_compacting(self, mock_db_connection):
+        """Test a locked retention row leaves the work to the other worker"""
+        cursor = mock_db_connection.cursor.return_value
+        cursor.fetchone.return_value = None
+
+        assert compact_changes(mock_db_connection, retention_days=30) == 0
+        assert cursor.execute.call_count == 1
@@ -78,3 +78,79 @@ class TestDatabaseService:
             assert "user" in call_kwargs
             assert "password" in call_kwargs
             assert "port" in call_kwargs
+
+
+class TestPooledConnection:
+    """Test the process-wide connection pool"""
+
+    @pytest.fixture
+    def pool(self):
+        """Fresh pool backed by a mocked ThreadedConnectionPool"""
+        from core import database
+
+        database.close_pool()
+        with patch("core.database.pool.ThreadedConnectionPool") as mock_pool_cls:
+            conn = MagicMock()
+            conn.closed = 0
+            conn.get_transaction_status.return_value = 0  # TRANSACTION_STATUS_IDLE
+            mock_pool_cls.return_value.getconn.return_value = conn
+            mock_pool_cls.return_value.closed = False
+            mock_pool_cls.return_value._pool = []
+            mock_pool_cls.return_value._used = {}
+            yield mock_pool_cls.return_value, conn
+        database.close_pool()
+
+    def test_connection_returned_to_pool(self, pool):
+        """Test connection is borrowed and put back"""
+        from core.database import get_pool_stats, pooled_connection
+
+        db_pool, conn = pool
+        with pooled_connection() as borrowed:
+            assert borrowed is conn
+            assert get_pool_stats()["in_use"] == 1
+
+        db_pool.putconn.assert_called_once_with(conn)
+        stats = get_pool_stats()
+        assert stats["in_use"] == 0
+        assert stats["checkouts"] == 1
+
+    def test_open_transaction_rolled_back_on_release(self, pool):
+        """Test uncommitted work is rolled back before reuse"""
+        from core.database import pooled_connection
+
+        db_pool, conn = pool
+        conn.get_transaction_status.return_value = 2  # TRANSACTION_STATUS_INTRANS
+
+        with pooled_connection():
+            pass
+
+        conn.rollback.assert_called_once()
+        db_pool.putconn.assert_called_once_with(conn)
+
+    def test_broken_connection_discarded(self, pool):
+        """Test connections that hit an OperationalError are closed"""
+        import psycopg2
+        from core.database import get_pool_stats, pooled_connection
+
+        db_pool, conn = pool
+        with pytest.raises(psycopg2.OperationalError):
+            with pooled_connection():
+                raise psycopg2.OperationalError("server closed the connection")
+
+        db_pool.putconn.assert_called_once_with(conn, close=True)
+        assert get_pool_stats()["discarded"] == 1
+
+    def test_timeout_when_pool_saturated(self, pool):
+        """Test PoolTimeoutError is raised when every connection is busy"""
+        from core import database
+        from core.database import PoolTimeoutError, get_pool_stats, pooled_connection
+
+        with patch.object(database.settings, "DB_POOL_TIMEOUT", 0.01), patch.object(
+            database.settings, "DB_POOL_MAX_SIZE", 1
+        ):
+            with pooled_connection():
+                with pytest.raises(PoolTimeoutError):
+                    with pooled_connection():
+                        pass
+
+            assert get_pool_stats()["timeouts"] == 1
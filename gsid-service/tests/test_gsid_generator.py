@@ -6,9 +6,15 @@ from unittest.mock import MagicMock, Mock, patch
 import pytest
 from services.gsid_generator import (
     BASE32_ALPHABET,
+    BUCKETED_RANDOM_CHARS,
     encode_base32,
+    generate_bucketed_gsid,
     generate_gsid,
+    generate_legacy_gsid,
+    is_valid_gsid,
+    MAX_GSIDS_PER_REQUEST,
     generate_unique_gsids,
+    iter_unique_gsids,
     reserve_gsids,
 )
 
@@ -157,6 +163,83 @@ class TestGenerateGSID:
         assert all(c in BASE32_ALPHABET for c in random_part)
 
 
+def _insert_all(cursor, sql, argslist, template=None, page_size=100, fetch=False):
+    """execute_values stand-in: every candidate is new"""
+    return [{"gsid": args[0]} for args in argslist] if fetch else None
+
+
+class TestBucketedGSID:
+    """Test the hour-bucketed GSID layout"""
+
+    def test_same_hour_shares_prefix(self):
+        """Test IDs minted in the same hour share the prefix but not the body"""
+        with patch(
+            "services.gsid_generator.time.time",
+            side_effect=[1_800_000_000.0 + i for i in range(100)],
+        ):
+            gsids = [generate_bucketed_gsid() for _ in range(100)]
+        assert len(set(gsids)) == 100
+        assert len({g[5:10] for g in gsids}) == 1
+
+    def test_keeps_legacy_entropy(self):
+        """Test the random part is as wide as the legacy layout's"""
+        assert BUCKETED_RANDOM_CHARS == 11
+        with patch(
+            "services.gsid_generator.secrets.randbelow", return_value=0
+        ) as mock_randbelow:
+            generate_bucketed_gsid()
+        mock_randbelow.assert_called_once_with(32**11)
+
+    def test_prefix_does_not_wrap(self):
+        """Test IDs from different hours, years apart, sort by hour"""
+        times = [1_800_000_000.0, 1_800_000_000.0 + 10 * 3600, 2_500_000_000.0]
+        gsids = []
+        for t in times:
+            with patch("services.gsid_generator.time.time", return_value=t):
+                gsids.append(generate_bucketed_gsid())
+        assert gsids == sorted(gsids)
+
+    def test_legacy_is_default(self):
+        """Test GSID_GENERATION_MODE defaults to the legacy layout"""
+        from core.config import Settings
+
+        assert Settings().GSID_GENERATION_MODE == "legacy"
+
+    def test_generate_gsid_uses_configured_mode(self):
+        """Test generate_gsid dispatches on GSID_GENERATION_MODE"""
+        with patch("services.gsid_generator.settings") as mock_settings:
+            mock_settings.GSID_GENERATION_MODE = "bucketed"
+            with patch(
+                "services.gsid_generator.generate_bucketed_gsid",
+                return_value="GSID-BUCKETED",
+            ):
+                assert generate_gsid() == "GSID-BUCKETED"
+
+            mock_settings.GSID_GENERATION_MODE = "legacy"
+            with patch(
+                "services.gsid_generator.generate_legacy_gsid",
+                return_value="GSID-LEGACY",
+            ):
+                assert generate_gsid() == "GSID-LEGACY"
+
+            mock_settings.GSID_GENERATION_MODE = "bogus"
+            with pytest.raises(ValueError, match="Unknown GSID generation mode"):
+                generate_gsid()
+
+
+class TestIsValidGSID:
+    """Test GSID validation"""
+
+    def test_is_valid_gsid(self):
+        """Test well-formed and malformed GSIDs"""
+        assert is_valid_gsid(generate_bucketed_gsid())
+        assert is_valid_gsid(generate_legacy_gsid())
+        assert not is_valid_gsid("GSID-123")
+        assert not is_valid_gsid("GSID-ILOU000000000000")
+        assert not is_valid_gsid("XXXX-0000000000000000")
+        assert not is_valid_gsid(None)
+
+
 class TestGenerateUniqueGSIDs:
     """Test generate_unique_gsids function"""
 
@@ -164,221 +247,163 @@ class TestGenerateUniqueGSIDs:
     def mock_db_connection(self):
         """Mock database connection"""
         conn = Mock()
-        cursor = Mock()
-        cursor.__enter__ = Mock(return_value=cursor)
-        cursor.__exit__ = Mock(return_value=False)
-        cursor.fetchone = Mock(return_value=None)  # No duplicates
-        cursor.execute = Mock()
-        conn.cursor = Mock(return_value=cursor)
         conn.commit = Mock()
         conn.rollback = Mock()
         conn.close = Mock()
         return conn
 
-    def test_generate_single_gsid(self, mock_db_connection):
-        """Test generating single GSID"""
+    @pytest.fixture
+    def db(self, mock_db_connection):
+        """Patch connection, cursor and execute_values; yields execute_values mock"""
         with patch(
             "services.gsid_generator.get_db_connection", return_value=mock_db_connection
-        ):
-            with patch("services.gsid_generator.get_db_cursor") as mock_cursor:
-                cursor = Mock()
-                cursor.fetchone = Mock(return_value=None)
-                cursor.execute = Mock()
-                mock_cursor.return_value.__enter__.return_value = cursor
-                mock_cursor.return_value.__exit__.return_value = False
-
-                gsids = generate_unique_gsids(1)
+        ), patch("services.gsid_generator.get_db_cursor") as mock_cursor, patch(
+            "services.gsid_generator.execute_values", side_effect=_insert_all
+        ) as mock_execute_values:
+            mock_cursor.return_value.__enter__.return_value = Mock()
+            mock_cursor.return_value.__exit__.return_value = False
+            yield mock_execute_values
+
+    def test_generate_single_gsid(self, mock_db_connection, db):
+        """Test generating single GSID"""
+        gsids = generate_unique_gsids(1)
 
-                assert len(gsids) == 1
-                assert gsids[0].startswith("GSID-")
-                mock_db_connection.commit.assert_called_once()
+        assert len(gsids) == 1
+        assert gsids[0].startswith("GSID-")
+        mock_db_connection.commit.assert_called_once()
 
-    def test_generate_multiple_gsids(self, mock_db_connection):
+    def test_generate_multiple_gsids(self, mock_db_connection, db):
         """Test generating multiple GSIDs"""
-        with patch(
-            "services.gsid_generator.get_db_connection", return_value=mock_db_connection
-        ):
-            with patch("services.gsid_generator.get_db_cursor") as mock_cursor:
-                cursor = Mock()
-                cursor.fetchone = Mock(return_value=None)
-                cursor.execute = Mock()
-                mock_cursor.return_value.__enter__.return_value = cursor
-                mock_cursor.return_value.__exit__.return_value = False
+        gsids = generate_unique_gsids(10)
 
-                gsids = generate_unique_gsids(10)
+        assert len(gsids) == 10
+        assert len(set(gsids)) == 10  # All unique
+        mock_db_connection.commit.assert_called_once()
 
-                assert len(gsids) == 10
-                assert len(set(gsids)) == 10  # All unique
-                mock_db_connection.commit.assert_called_once()
+    def test_generate_many_gsids_in_one_insert(self, mock_db_connection, db):
+        """Test candidates are inserted with one multi-row statement"""
+        gsids = generate_unique_gsids(5000)
 
-    def test_generate_max_gsids(self, mock_db_connection):
-        """Test generating maximum allowed GSIDs"""
-        with patch(
-            "services.gsid_generator.get_db_connection", return_value=mock_db_connection
-        ):
-            with patch("services.gsid_generator.get_db_cursor") as mock_cursor:
-                cursor = Mock()
-                cursor.fetchone = Mock(return_value=None)
-                cursor.execute = Mock()
-                mock_cursor.return_value.__enter__.return_value = cursor
-                mock_cursor.return_value.__exit__.return_value = False
-
-                gsids = generate_unique_gsids(1000)
-
-                assert len(gsids) == 1000
-                mock_db_connection.commit.assert_called_once()
+        assert len(gsids) == 5000
+        assert len(set(gsids)) == 5000
+        assert gsids == sorted(gsids)
+        db.assert_called_once()
+        assert len(db.call_args.args[2]) == 5000
+        mock_db_connection.commit.assert_called_once()
 
     def test_invalid_count_zero(self):
         """Test that count=0 raises ValueError"""
-        with pytest.raises(ValueError, match="Count must be between 1 and 1000"):
+        with pytest.raises(ValueError, match="Count must be between 1 and"):
             generate_unique_gsids(0)
 
     def test_invalid_count_negative(self):
         """Test that negative count raises ValueError"""
-        with pytest.raises(ValueError, match="Count must be between 1 and 1000"):
+        with pytest.raises(ValueError, match="Count must be between 1 and"):
             generate_unique_gsids(-5)
 
     def test_invalid_count_too_large(self):
-        """Test that count > 1000 raises ValueError"""
-        with pytest.raises(ValueError, match="Count must be between 1 and 1000"):
-            generate_unique_gsids(1001)
+        """Test that count above the limit raises ValueError"""
+        with pytest.raises(ValueError, match="Count must be between 1 and"):
+            generate_unique_gsids(MAX_GSIDS_PER_REQUEST + 1)
 
-    def test_handles_duplicate_collision(self, mock_db_connection):
-        """Test handling of duplicate GSID collision"""
-        with patch(
-            "services.gsid_generator.get_db_connection", return_value=mock_db_connection
-        ):
-            with patch("services.gsid_generator.get_db_cursor") as mock_cursor:
-                cursor = Mock()
-                # First call returns duplicate, second returns None
-                cursor.fetchone = Mock(side_effect=[{"gsid": "exists"}, None, None])
-                cursor.execute = Mock()
-                mock_cursor.return_value.__enter__.return_value = cursor
-                mock_cursor.return_value.__exit__.return_value = False
+    def test_handles_duplicate_collision(self, mock_db_connection, db):
+        """Test that only collided candidates are regenerated"""
+
+        def first_collides(cursor, sql, argslist, **kwargs):
+            rows = _insert_all(cursor, sql, argslist, **kwargs)
+            return rows[1:] if db.call_count == 1 else rows
 
-                gsids = generate_unique_gsids(2)
+        db.side_effect = first_collides
 
-                assert len(gsids) == 2
-                # Should have made extra attempts due to collision
-                assert cursor.execute.call_count > 2
+        gsids = generate_unique_gsids(2)
 
-    def test_database_error_rollback(self, mock_db_connection):
+        assert len(gsids) == 2
+        assert db.call_count == 2
+        assert len(db.call_args_list[1].args[2]) == 1
+
+    def test_database_error_rollback(self, mock_db_connection, db):
         """Test that database errors trigger rollback"""
         mock_db_connection.commit.side_effect = Exception("Database error")
 
-        with patch(
-            "services.gsid_generator.get_db_connection", return_value=mock_db_connection
-        ):
-            with patch("services.gsid_generator.get_db_cursor") as mock_cursor:
-                cursor = Mock()
-                cursor.fetchone = Mock(return_value=None)
-                cursor.execute = Mock()
-                mock_cursor.return_value.__enter__.return_value = cursor
-                mock_cursor.return_value.__exit__.return_value = False
-
-                with pytest.raises(Exception, match="Database error"):
-                    generate_unique_gsids(5)
+        with pytest.raises(Exception, match="Database error"):
+            generate_unique_gsids(5)
 
-                mock_db_connection.rollback.assert_called_once()
+        mock_db_connection.rollback.assert_called_once()
 
-    def test_connection_closed_on_success(self, mock_db_connection):
+    def test_connection_closed_on_success(self, mock_db_connection, db):
         """Test that connection is closed after success"""
-        with patch(
-            "services.gsid_generator.get_db_connection", return_value=mock_db_connection
-        ):
-            with patch("services.gsid_generator.get_db_cursor") as mock_cursor:
-                cursor = Mock()
-                cursor.fetchone = Mock(return_value=None)
-                cursor.execute = Mock()
-                mock_cursor.return_value.__enter__.return_value = cursor
-                mock_cursor.return_value.__exit__.return_value = False
-
-                generate_unique_gsids(3)
+        generate_unique_gsids(3)
 
-                mock_db_connection.close.assert_called_once()
+        mock_db_connection.close.assert_called_once()
 
-    def test_connection_closed_on_error(self, mock_db_connection):
+    def test_connection_closed_on_error(self, mock_db_connection, db):
         """Test that connection is closed even on error"""
         mock_db_connection.commit.side_effect = Exception("Error")
 
-        with patch(
-            "services.gsid_generator.get_db_connection", return_value=mock_db_connection
-        ):
-            with patch("services.gsid_generator.get_db_cursor") as mock_cursor:
-                cursor = Mock()
-                cursor.fetchone = Mock(return_value=None)
-                cursor.execute = Mock()
-                mock_cursor.return_value.__enter__.return_value = cursor
-                mock_cursor.return_value.__exit__.return_value = False
+        with pytest.raises(Exception):
+            generate_unique_gsids(1)
 
-                with pytest.raises(Exception):
-                    generate_unique_gsids(1)
+        mock_db_connection.close.assert_called_once()
 
-                mock_db_connection.close.assert_called_once()
+    def test_caller_connection_not_closed(self, mock_db_connection, db):
+        """Test that a connection passed by the caller is left open"""
+        caller_conn = Mock()
 
-    def test_inserts_into_gsid_registry(self, mock_db_connection):
+        generate_unique_gsids(3, conn=caller_conn)
+
+        caller_conn.commit.assert_called_once()
+        caller_conn.close.assert_not_called()
+        mock_db_connection.close.assert_not_called()
+
+    def test_inserts_into_gsid_registry(self, mock_db_connection, db):
         """Test that GSIDs are inserted into gsid_registry table"""
-        with patch(
-            "services.gsid_generator.get_db_connection", return_value=mock_db_connection
-        ):
-            with patch("services.gsid_generator.get_db_cursor") as mock_cursor:
-                cursor = Mock()
-                cursor.fetchone = Mock(return_value=None)
-                cursor.execute = Mock()
-                mock_cursor.return_value.__enter__.return_value = cursor
-                mock_cursor.return_value.__exit__.return_value = False
-
-                generate_unique_gsids(2)
-
-                # Check that INSERT was called
-                insert_calls = [
-                    call
-                    for call in cursor.execute.call_args_list
-                    if "INSERT INTO gsid_registry" in str(call)
-                ]
-                assert len(insert_calls) == 2
-
-    def test_sets_status_reserved(self, mock_db_connection):
+        generate_unique_gsids(2)
+
+        query = db.call_args.args[1]
+        assert "INSERT INTO gsid_registry" in query
+        assert "ON CONFLICT (gsid) DO NOTHING" in query
+        assert "RETURNING gsid" in query
+
+    def test_sets_status_reserved(self, mock_db_connection, db):
         """Test that generated GSIDs have status='reserved'"""
-        with patch(
-            "services.gsid_generator.get_db_connection", return_value=mock_db_connection
-        ):
-            with patch("services.gsid_generator.get_db_cursor") as mock_cursor:
-                cursor = Mock()
-                cursor.fetchone = Mock(return_value=None)
-                cursor.execute = Mock()
-                mock_cursor.return_value.__enter__.return_value = cursor
-                mock_cursor.return_value.__exit__.return_value = False
-
-                generate_unique_gsids(1)
-
-                # Check that status='reserved' was used
-                insert_call = [
-                    call
-                    for call in cursor.execute.call_args_list
-                    if "INSERT INTO gsid_registry" in str(call)
-                ][0]
-                assert "'reserved'" in str(insert_call) or "reserved" in str(
-                    insert_call
-                )
-
-    def test_max_attempts_exceeded(self, mock_db_connection):
+        generate_unique_gsids(1, reserved_by="legacy_import")
+
+        assert "'reserved'" in db.call_args.kwargs["template"]
+        assert db.call_args.args[2][0][1] == "legacy_import"
+
+    def test_max_attempts_exceeded(self, mock_db_connection, db):
         """Test that max attempts prevents infinite loop"""
-        with patch(
-            "services.gsid_generator.get_db_connection", return_value=mock_db_connection
-        ):
-            with patch("services.gsid_generator.get_db_cursor") as mock_cursor:
-                cursor = Mock()
-                # Always return duplicate
-                cursor.fetchone = Mock(return_value={"gsid": "exists"})
-                cursor.execute = Mock()
-                mock_cursor.return_value.__enter__.return_value = cursor
-                mock_cursor.return_value.__exit__.return_value = False
+        # Always collide
+        db.side_effect = lambda *args, **kwargs: []
+
+        with pytest.raises(Exception, match="Could not generate .* unique GSIDs"):
+            generate_unique_gsids(5)
+
+
+class TestIterUniqueGSIDs:
+    """Test iter_unique_gsids streaming generator"""
+
+    def test_commits_per_chunk(self):
+        """Test GSIDs are minted and committed chunk by chunk"""
+        conn = Mock()
+        with patch("services.gsid_generator.get_db_cursor") as mock_cursor, patch(
+            "services.gsid_generator.execute_values", side_effect=_insert_all
+        ) as mock_execute_values:
+            mock_cursor.return_value.__enter__.return_value = Mock()
+            mock_cursor.return_value.__exit__.return_value = False
+
+            gsids = list(iter_unique_gsids(25, chunk_size=10, conn=conn))
+
+        assert len(gsids) == 25
+        assert len(set(gsids)) == 25
+        assert [len(c.args[2]) for c in mock_execute_values.call_args_list] == [10, 10, 5]
+        assert conn.commit.call_count == 3
+        conn.close.assert_not_called()
 
-                with pytest.raises(
-                    Exception, match="Could not generate .* unique GSIDs"
-                ):
-                    generate_unique_gsids(5)
+    def test_invalid_count(self):
+        """Test count is validated before any database work"""
+        with pytest.raises(ValueError):
+            list(iter_unique_gsids(0))
 
 
 class TestReserveGSIDs:
@@ -388,170 +413,91 @@ class TestReserveGSIDs:
     def mock_db_connection(self):
         """Mock database connection"""
         conn = Mock()
-        cursor = Mock()
-        cursor.__enter__ = Mock(return_value=cursor)
-        cursor.__exit__ = Mock(return_value=False)
-        cursor.execute = Mock()
-        conn.cursor = Mock(return_value=cursor)
         conn.commit = Mock()
         conn.rollback = Mock()
         conn.close = Mock()
         return conn
 
-    def test_reserve_single_gsid(self, mock_db_connection):
-        """Test reserving single GSID"""
+    @pytest.fixture
+    def db(self, mock_db_connection):
+        """Patch connection, cursor and execute_values; yields execute_values mock"""
         with patch(
             "services.gsid_generator.get_db_connection", return_value=mock_db_connection
-        ):
-            with patch("services.gsid_generator.get_db_cursor") as mock_cursor:
-                cursor = Mock()
-                cursor.execute = Mock()
-                mock_cursor.return_value.__enter__.return_value = cursor
-                mock_cursor.return_value.__exit__.return_value = False
+        ), patch("services.gsid_generator.get_db_cursor") as mock_cursor, patch(
+            "services.gsid_generator.execute_values"
+        ) as mock_execute_values:
+            mock_cursor.return_value.__enter__.return_value = Mock()
+            mock_cursor.return_value.__exit__.return_value = False
+            yield mock_execute_values
+
+    def test_reserve_single_gsid(self, mock_db_connection, db):
+        """Test reserving single GSID"""
+        reserve_gsids(["GSID-0000000000000001"])
 
-                reserve_gsids(["GSID-0000000000000001"])
+        db.assert_called_once()
+        mock_db_connection.commit.assert_called_once()
 
-                cursor.execute.assert_called_once()
-                mock_db_connection.commit.assert_called_once()
+    def test_reserve_multiple_gsids(self, mock_db_connection, db):
+        """Test reserving multiple GSIDs with one multi-row insert"""
+        gsids = [
+            "GSID-0000000000000001",
+            "GSID-0000000000000002",
+            "GSID-0000000000000003",
+        ]
+        reserve_gsids(gsids)
 
-    def test_reserve_multiple_gsids(self, mock_db_connection):
-        """Test reserving multiple GSIDs"""
-        with patch(
-            "services.gsid_generator.get_db_connection", return_value=mock_db_connection
-        ):
-            with patch("services.gsid_generator.get_db_cursor") as mock_cursor:
-                cursor = Mock()
-                cursor.execute = Mock()
-                mock_cursor.return_value.__enter__.return_value = cursor
-                mock_cursor.return_value.__exit__.return_value = False
-
-                gsids = [
-                    "GSID-0000000000000001",
-                    "GSID-0000000000000002",
-                    "GSID-0000000000000003",
-                ]
-                reserve_gsids(gsids)
-
-                assert cursor.execute.call_count == 3
-                mock_db_connection.commit.assert_called_once()
-
-    def test_reserve_empty_list(self, mock_db_connection):
-        """Test reserving empty list"""
-        with patch(
-            "services.gsid_generator.get_db_connection", return_value=mock_db_connection
-        ):
-            with patch("services.gsid_generator.get_db_cursor") as mock_cursor:
-                cursor = Mock()
-                cursor.execute = Mock()
-                mock_cursor.return_value.__enter__.return_value = cursor
-                mock_cursor.return_value.__exit__.return_value = False
+        db.assert_called_once()
+        assert db.call_args.args[2] == [(gsid,) for gsid in gsids]
+        mock_db_connection.commit.assert_called_once()
 
-                reserve_gsids([])
+    def test_reserve_empty_list(self, mock_db_connection, db):
+        """Test reserving empty list"""
+        reserve_gsids([])
 
-                cursor.execute.assert_not_called()
-                mock_db_connection.commit.assert_called_once()
+        db.assert_not_called()
+        mock_db_connection.commit.assert_called_once()
 
-    def test_reserve_uses_on_conflict(self, mock_db_connection):
+    def test_reserve_uses_on_conflict(self, mock_db_connection, db):
         """Test that reserve uses ON CONFLICT DO NOTHING"""
-        with patch(
-            "services.gsid_generator.get_db_connection", return_value=mock_db_connection
-        ):
-            with patch("services.gsid_generator.get_db_cursor") as mock_cursor:
-                cursor = Mock()
-                cursor.execute = Mock()
-                mock_cursor.return_value.__enter__.return_value = cursor
-                mock_cursor.return_value.__exit__.return_value = False
+        reserve_gsids(["GSID-0000000000000001"])
 
-                reserve_gsids(["GSID-0000000000000001"])
+        query = db.call_args.args[1]
+        assert "ON CONFLICT" in query
+        assert "DO NOTHING" in query
 
-                # Check that ON CONFLICT was used
-                call_args = cursor.execute.call_args[0]
-                query = call_args[0]
-                assert "ON CONFLICT" in query
-                assert "DO NOTHING" in query
-
-    def test_reserve_database_error_rollback(self, mock_db_connection):
+    def test_reserve_database_error_rollback(self, mock_db_connection, db):
         """Test that database errors trigger rollback"""
         mock_db_connection.commit.side_effect = Exception("Database error")
 
-        with patch(
-            "services.gsid_generator.get_db_connection", return_value=mock_db_connection
-        ):
-            with patch("services.gsid_generator.get_db_cursor") as mock_cursor:
-                cursor = Mock()
-                cursor.execute = Mock()
-                mock_cursor.return_value.__enter__.return_value = cursor
-                mock_cursor.return_value.__exit__.return_value = False
-
-                with pytest.raises(Exception, match="Database error"):
-                    reserve_gsids(["GSID-0000000000000001"])
+        with pytest.raises(Exception, match="Database error"):
+            reserve_gsids(["GSID-0000000000000001"])
 
-                mock_db_connection.rollback.assert_called_once()
+        mock_db_connection.rollback.assert_called_once()
 
-    def test_reserve_connection_closed_on_success(self, mock_db_connection):
+    def test_reserve_connection_closed_on_success(self, mock_db_connection, db):
         """Test that connection is closed after success"""
-        with patch(
-            "services.gsid_generator.get_db_connection", return_value=mock_db_connection
-        ):
-            with patch("services.gsid_generator.get_db_cursor") as mock_cursor:
-                cursor = Mock()
-                cursor.execute = Mock()
-                mock_cursor.return_value.__enter__.return_value = cursor
-                mock_cursor.return_value.__exit__.return_value = False
-
-                reserve_gsids(["GSID-0000000000000001"])
+        reserve_gsids(["GSID-0000000000000001"])
 
-                mock_db_connection.close.assert_called_once()
+        mock_db_connection.close.assert_called_once()
 
-    def test_reserve_connection_closed_on_error(self, mock_db_connection):
+    def test_reserve_connection_closed_on_error(self, mock_db_connection, db):
         """Test that connection is closed even on error"""
         mock_db_connection.commit.side_effect = Exception("Error")
 
-        with patch(
-            "services.gsid_generator.get_db_connection", return_value=mock_db_connection
-        ):
-            with patch("services.gsid_generator.get_db_cursor") as mock_cursor:
-                cursor = Mock()
-                cursor.execute = Mock()
-                mock_cursor.return_value.__enter__.return_value = cursor
-                mock_cursor.return_value.__exit__.return_value = False
+        with pytest.raises(Exception):
+            reserve_gsids(["GSID-0000000000000001"])
 
-                with pytest.raises(Exception):
-                    reserve_gsids(["GSID-0000000000000001"])
+        mock_db_connection.close.assert_called_once()
 
-                mock_db_connection.close.assert_called_once()
-
-    def test_reserve_inserts_with_reserved_status(self, mock_db_connection):
+    def test_reserve_inserts_with_reserved_status(self, mock_db_connection, db):
         """Test that reserved GSIDs have status='reserved'"""
-        with patch(
-            "services.gsid_generator.get_db_connection", return_value=mock_db_connection
-        ):
-            with patch("services.gsid_generator.get_db_cursor") as mock_cursor:
-                cursor = Mock()
-                cursor.execute = Mock()
-                mock_cursor.return_value.__enter__.return_value = cursor
-                mock_cursor.return_value.__exit__.return_value = False
-
-                reserve_gsids(["GSID-0000000000000001"])
+        reserve_gsids(["GSID-0000000000000001"])
 
-                call_args = cursor.execute.call_args[0]
-                query = call_args[0]
-                assert "'reserved'" in query or "reserved" in str(call_args)
+        assert "'reserved'" in db.call_args.kwargs["template"]
 
-    def test_reserve_sets_created_at(self, mock_db_connection):
+    def test_reserve_sets_created_at(self, mock_db_connection, db):
         """Test that reserved GSIDs have created_at timestamp"""
-        with patch(
-            "services.gsid_generator.get_db_connection", return_value=mock_db_connection
-        ):
-            with patch("services.gsid_generator.get_db_cursor") as mock_cursor:
-                cursor = Mock()
-                cursor.execute = Mock()
-                mock_cursor.return_value.__enter__.return_value = cursor
-                mock_cursor.return_value.__exit__.return_value = False
-
-                reserve_gsids(["GSID-0000000000000001"])
-
-                call_args = cursor.execute.call_args[0]
-                query = call_args[0]
-                assert "created_at" in query
-                assert "NOW()" in query
+        reserve_gsids(["GSID-0000000000000001"])
+
+        assert "created_at" in db.call_args.args[1]
+        assert "NOW()" in db.call_args.kwargs["template"]
@@ -0,0 +1,148 @@
+# gsid-service/tests/test_gsid_reservoir.py
+from unittest.mock import MagicMock, patch
+
+import pytest
+from services import gsid_reservoir
+from services.gsid_reservoir import (
+    RESERVOIR_OWNER,
+    claim_gsids,
+    get_reservoir_stats,
+    refill_reservoir,
+    release_gsids,
+    start_reservoir,
+    stop_reservoir,
+)
+
+
+@pytest.fixture
+def running():
+    """Pretend the refill thread is running without starting it"""
+    with patch.object(gsid_reservoir, "_thread", MagicMock()):
+        yield
+    gsid_reservoir._wakeup.clear()
+
+
+class TestClaimGSIDs:
+    """Test claiming pre-minted GSIDs"""
+
+    def test_not_running_claims_nothing(self):
+        """Test claims are skipped when the refill task is not running"""
+        cursor = MagicMock()
+        assert claim_gsids(cursor, 5) == []
+        cursor.execute.assert_not_called()
+
+    def test_claim_uses_skip_locked_update(self, running):
+        """Test reserved rows are flipped to assigned and returned in order"""
+        cursor = MagicMock()
+        cursor.fetchall.return_value = [{"gsid": "GSID-B"}, {"gsid": "GSID-A"}]
+
+        assert claim_gsids(cursor, 2) == ["GSID-A", "GSID-B"]
+
+        sql, params = cursor.execute.call_args.args
+        assert "SET status = 'assigned'" in sql
+        assert "FOR UPDATE SKIP LOCKED" in sql
+        assert params == (RESERVOIR_OWNER, 2)
+
+    def test_claim_updates_stats_and_wakes_refill(self, running):
+        """Test claim latency is recorded and a low reservoir triggers a refill"""
+        cursor = MagicMock()
+        cursor.fetchall.return_value = []
+        before = get_reservoir_stats()
+
+        assert claim_gsids(cursor, 3) == []
+
+        stats = get_reservoir_stats()
+        assert stats["claims"] == before["claims"] + 1
+        assert stats["claim_shortfalls"] == before["claim_shortfalls"] + 1
+        assert stats["claim_seconds_max"] >= 0
+        assert gsid_reservoir._wakeup.is_set()
+
+    def test_release_returns_gsids(self):
+        """Test unused claims go back to reserved"""
+        cursor = MagicMock()
+        release_gsids(cursor, ["GSID-A"])
+
+        sql, params = cursor.execute.call_args.args
+        assert "SET status = 'reserved'" in sql
+        assert params == (["GSID-A"],)
+
+    def test_release_nothing_is_noop(self):
+        """Test releasing an empty list does not touch the database"""
+        cursor = MagicMock()
+        release_gsids(cursor, [])
+        cursor.execute.assert_not_called()
+
+
+class TestRefillReservoir:
+    """Test topping the reservoir up"""
+
+    @pytest.fixture
+    def db(self):
+        cursor = MagicMock()
+        conn = MagicMock()
+        conn.cursor.return_value = cursor
+        with patch("services.gsid_reservoir.pooled_connection") as mock_pooled, patch(
+            "services.gsid_generator._mint_gsids"
+        ) as mock_mint, patch.object(
+            gsid_reservoir.settings, "GSID_RESERVOIR_LOW_WATER", 100
+        ), patch.object(
+            gsid_reservoir.settings, "GSID_RESERVOIR_TARGET", 25_000
+        ):
+            mock_pooled.return_value.__enter__.return_value = conn
+            yield conn, cursor, mock_mint
+
+    def test_refills_to_target_in_chunks(self, db):
+        """Test minting stops at the target, one chunk per transaction"""
+        conn, cursor, mock_mint = db
+        cursor.fetchone.side_effect = [
+            {"locked": True},
+            {"depth": 50},
+            {"locked": True},
+            {"depth": 10_050},
+            {"locked": True},
+            {"depth": 20_050},
+            {"locked": True},
+            {"depth": 25_000},
+        ]
+
+        assert refill_reservoir() == 24_950
+        sizes = [c.args[1] for c in mock_mint.call_args_list]
+        assert sizes == [10_000, 10_000, 4_950]
+        assert all(c.kwargs["reserved_by"] == RESERVOIR_OWNER for c in mock_mint.call_args_list)
+        assert get_reservoir_stats()["depth"] == 25_000
+
+    def test_above_low_water_does_nothing(self, db):
+        """Test a healthy reservoir is left alone"""
+        _, cursor, mock_mint = db
+        cursor.fetchone.side_effect = [{"locked": True}, {"depth": 500}]
+
+        assert refill_reservoir() == 0
+        mock_mint.assert_not_called()
+
+    def test_skips_when_another_worker_holds_lock(self, db):
+        """Test concurrent refills from other processes are not duplicated"""
+        _, cursor, mock_mint = db
+        cursor.fetchone.side_effect = [{"locked": False}]
+
+        assert refill_reservoir() == 0
+        mock_mint.assert_not_called()
+
+
+class TestReservoirLifecycle:
+    """Test starting and stopping the refill thread"""
+
+    def test_disabled_does_not_start(self):
+        """Test GSID_RESERVOIR_ENABLED=false leaves claims inline"""
+        with patch.object(gsid_reservoir.settings, "GSID_RESERVOIR_ENABLED", False):
+            start_reservoir()
+        assert get_reservoir_stats()["running"] is False
+
+    def test_start_and_stop(self):
+        """Test the refill thread runs until stopped"""
+        with patch("services.gsid_reservoir.refill_reservoir", return_value=0) as mock_refill:
+            start_reservoir()
+            assert get_reservoir_stats()["running"] is True
+            stop_reservoir()
+
+        assert get_reservoir_stats()["running"] is False
+        mock_refill.assert_called()
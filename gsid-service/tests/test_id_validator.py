@@ -1,6 +1,7 @@
 # gsid-service/tests/test_id_validator.py
 from unittest.mock import Mock, patch
 
+import pyarrow as pa
 import pytest
 from services.id_validator import IDValidator
 
@@ -78,3 +79,54 @@ class TestIDValidator:
         assert results["IBDGC123"]["valid"] is True
         assert results["test"]["valid"] is False
         assert results["456"]["valid"] is True
+
+    def test_unanchored_error_pattern_rejected(self):
+        """Test error patterns must be anchored (they are matched as one alternation)"""
+        with patch.object(IDValidator, "ERROR_PATTERNS", [r"^test", r"demo"]):
+            with pytest.raises(ValueError, match="must start with"):
+                IDValidator._compile()
+        IDValidator._compile()
+
+
+# Edge cases where Arrow's RE2 and Python's re could disagree
+TRICKY_IDS = (
+    [chr(c) for c in range(128)]
+    + [f"A{chr(c)}B" for c in range(128)]
+    + [f"{chr(c)}IBDGC1{chr(c)}" for c in (9, 10, 11, 12, 13, 28, 31, 32)]
+    + ["", "   ", None, "TEST-1", "Demo", "eXample9", "000", "0001", "999", "XXX", "xy"]
+    + ["ab", "AB", "a", "12", "123", "1234", "12 3", "IBDGC_12-3", "IBDGC#1"]
+    + ["Müller", "١٢٣", " IBDGC1 ", "ＴＥＳＴ", "ǅx", " "]
+)
+
+
+class TestValidateArray:
+    """Test the vectorized engine against validate_id"""
+
+    @pytest.mark.parametrize("id_type", ["primary", "niddk_no", None])
+    def test_matches_validate_id(self, id_type):
+        """Test every ID gets exactly the validate_id result"""
+        table = IDValidator.validate_array(TRICKY_IDS, id_type if id_type else [None] * len(TRICKY_IDS))
+
+        expected = [IDValidator.validate_id(i, id_type) for i in TRICKY_IDS]
+        assert table.to_pylist() == expected
+
+    def test_per_id_types(self):
+        """Test identifier types can differ per ID"""
+        table = IDValidator.validate_array(["12345", "12345"], ["primary", "record_id"])
+
+        assert table.column("severity").to_pylist() == ["warning", "info"]
+
+    def test_accepts_pandas_and_arrow(self):
+        """Test pandas Series (NaN = missing) and chunked Arrow arrays"""
+        pd = pytest.importorskip("pandas")
+        series = pd.Series(["IBDGC1", float("nan"), "test"])
+        chunked = pa.chunked_array([["IBDGC1"], [None, "test"]])
+
+        for ids in (series, chunked):
+            table = IDValidator.validate_array(ids)
+            assert table.column("valid").to_pylist() == [True, False, False]
+
+    def test_type_count_mismatch(self):
+        """Test a types list of the wrong length is rejected"""
+        with pytest.raises(ValueError, match="identifier types"):
+            IDValidator.validate_array(["A1", "B2"], ["primary"])
@@ -0,0 +1,59 @@
+# gsid-service/tests/test_idempotency.py
+import pytest
+from services.idempotency import (
+    IdempotencyKeyReusedError,
+    claim,
+    request_fingerprint,
+    store,
+)
+
+
+class TestRequestFingerprint:
+    """Test request body hashing"""
+
+    def test_key_order_does_not_matter(self):
+        """Test the same body in any key order has one fingerprint"""
+        assert request_fingerprint({"a": 1, "b": [1, 2]}) == request_fingerprint({"b": [1, 2], "a": 1})
+        assert request_fingerprint({"a": 1}) != request_fingerprint({"a": 2})
+
+
+class TestClaim:
+    """Test claiming a key inside the registration transaction"""
+
+    def test_new_key_is_claimed(self, mock_db_connection):
+        """Test a new key is inserted and the transaction left open"""
+        cursor = mock_db_connection.cursor.return_value
+        cursor.fetchone.return_value = {"idempotency_key": "k1"}
+
+        assert claim(mock_db_connection, "/register/subject", "k1", "f" * 64) is None
+
+        insert_sql, params = cursor.execute.call_args.args
+        assert "ON CONFLICT (endpoint, idempotency_key) DO UPDATE" in insert_sql
+        assert params[:3] == ("/register/subject", "k1", "f" * 64)
+        mock_db_connection.rollback.assert_not_called()
+        mock_db_connection.commit.assert_not_called()
+
+    def test_used_key_replays_response(self, mock_db_connection):
+        """Test a completed key returns its stored response and rolls back"""
+        cursor = mock_db_connection.cursor.return_value
+        stored = {"gsid": "GSID-1", "action": "create_new"}
+        cursor.fetchone.side_effect = [None, {"request_hash": "f" * 64, "response": stored}]
+
+        assert claim(mock_db_connection, "/register/subject", "k1", "f" * 64) == stored
+        mock_db_connection.rollback.assert_called_once()
+
+    def test_key_reused_for_other_request(self, mock_db_connection):
+        """Test a key sent with a different body is refused"""
+        cursor = mock_db_connection.cursor.return_value
+        cursor.fetchone.side_effect = [None, {"request_hash": "a" * 64, "response": {}}]
+
+        with pytest.raises(IdempotencyKeyReusedError):
+            claim(mock_db_connection, "/register/subject", "k1", "f" * 64)
+
+    def test_store_updates_claimed_row(self, mock_db_cursor):
+        """Test the response is saved on the claimed key"""
+        store(mock_db_cursor, "/register/subjects", "k1", {"results": []})
+
+        sql, params = mock_db_cursor.execute.call_args.args
+        assert sql.strip().startswith("UPDATE idempotency_keys")
+        assert params[1:] == ("/register/subjects", "k1")
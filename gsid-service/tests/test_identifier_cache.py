@@ -0,0 +1,144 @@
+# gsid-service/tests/test_identifier_cache.py
+from unittest.mock import MagicMock, patch
+
+import pytest
+from services import identifier_cache
+from services.identifier_cache import (
+    _handle_notification,
+    get_cache_stats,
+    invalidate,
+    lookup,
+    store,
+)
+
+
+def _entry(gsid, local_id="ID-1", center_id=1):
+    return {
+        "links": [
+            {
+                "local_subject_id": local_id,
+                "identifier_type": "primary",
+                "center_id": center_id,
+                "gsid": gsid,
+            }
+        ],
+        "subjects": {
+            gsid: {"created_at": "2024-01-01", "center_id": center_id, "withdrawn": False}
+        },
+    }
+
+
+@pytest.fixture
+def listening():
+    """Cache as it behaves while the LISTEN connection is up"""
+    identifier_cache._set_listening(True)
+    yield
+    identifier_cache._set_listening(False)
+
+
+class TestIdentifierCache:
+    """Test the LRU/TTL identifier cache"""
+
+    def test_not_listening_always_misses(self):
+        """Test nothing is served or stored without invalidation feed"""
+        generation, hits, misses = lookup(["id-1"])
+        store(generation, {"id-1": _entry("GSID-A")})
+
+        assert lookup(["id-1"])[1:] == ({}, ["id-1"])
+
+    def test_store_and_hit(self, listening):
+        """Test stored entries are served as private copies"""
+        generation, hits, misses = lookup(["id-1", "id-2"])
+        assert hits == {} and misses == ["id-1", "id-2"]
+        store(generation, {"id-1": _entry("GSID-A")})
+
+        _, hits, misses = lookup(["id-1", "id-2"])
+        assert misses == ["id-2"]
+        assert hits["id-1"]["links"][0]["gsid"] == "GSID-A"
+
+        hits["id-1"]["links"].clear()
+        assert lookup(["id-1"])[1]["id-1"]["links"]
+
+    def test_store_after_invalidation_is_skipped(self, listening):
+        """Test rows read before a concurrent write are not cached"""
+        generation, _, _ = lookup(["id-1"])
+        invalidate(keys=["id-9"])
+        store(generation, {"id-1": _entry("GSID-A")})
+
+        assert lookup(["id-1"])[2] == ["id-1"]
+        assert get_cache_stats()["stale_stores_skipped"] >= 1
+
+    def test_ttl_expiry(self, listening):
+        """Test entries expire after GSID_CACHE_TTL_SECONDS"""
+        with patch.object(identifier_cache.settings, "GSID_CACHE_TTL_SECONDS", -1):
+            generation, _, _ = lookup(["id-1"])
+            store(generation, {"id-1": _entry("GSID-A")})
+
+        assert lookup(["id-1"])[2] == ["id-1"]
+
+    def test_lru_eviction(self, listening):
+        """Test the least recently used entry is evicted at the size limit"""
+        with patch.object(identifier_cache.settings, "GSID_CACHE_MAX_ENTRIES", 2):
+            generation, _, _ = lookup([])
+            store(generation, {"id-1": _entry("GSID-A", "ID-1")})
+            store(generation, {"id-2": _entry("GSID-B", "ID-2")})
+            lookup(["id-1"])  # id-2 is now least recently used
+            generation, _, _ = lookup([])
+            store(generation, {"id-3": _entry("GSID-C", "ID-3")})
+
+        _, hits, misses = lookup(["id-1", "id-2", "id-3"])
+        assert sorted(hits) == ["id-1", "id-3"]
+        assert misses == ["id-2"]
+
+    def test_notifications_invalidate(self, listening):
+        """Test trigger payloads drop identifier, subject and all entries"""
+        generation, _, _ = lookup([])
+        store(
+            generation,
+            {
+                "id-1": _entry("GSID-A", "ID-1"),
+                "alt-1": _entry("GSID-A", "ALT-1"),
+                "id-2": _entry("GSID-B", "ID-2"),
+                "id-3": _entry("GSID-C", "ID-3"),
+            },
+        )
+
+        _handle_notification("id:id-2")
+        assert lookup(["id-2"])[2] == ["id-2"]
+
+        _handle_notification("gsid:GSID-A")
+        assert lookup(["id-1", "alt-1"])[2] == ["id-1", "alt-1"]
+        assert "id-3" in lookup(["id-3"])[1]
+
+        _handle_notification("all")
+        assert get_cache_stats()["entries"] == 0
+
+
+class TestCacheListener:
+    """Test when the LISTEN thread runs"""
+
+    def test_not_started_under_identifier_locks(self):
+        """Test the cache costs nothing while registrations cannot read it"""
+        with (
+            patch.object(identifier_cache.settings, "GSID_CACHE_ENABLED", True),
+            patch.object(identifier_cache.settings, "IDENTIFIER_LOCKS_ENABLED", True),
+            patch("services.identifier_cache.threading.Thread") as mock_thread,
+        ):
+            identifier_cache.start_cache_listener()
+
+        mock_thread.assert_not_called()
+        assert identifier_cache._thread is None
+
+    def test_requires_notify_setting(self):
+        """Test the cache stays disabled when the database triggers do not notify"""
+        conn = MagicMock()
+        cursor = conn.cursor.return_value.__enter__.return_value
+        cursor.fetchone.return_value = (None,)
+
+        with patch("services.identifier_cache.get_db_connection", return_value=conn):
+            identifier_cache._listen_loop()
+
+        statements = [c.args[0] for c in cursor.execute.call_args_list]
+        assert not any(sql.startswith("LISTEN") for sql in statements)
+        assert get_cache_stats()["listening"] is False
+        conn.close.assert_called_once()
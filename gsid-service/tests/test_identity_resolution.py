@@ -1,7 +1,13 @@
 # gsid-service/tests/test_identity_resolution.py
+from datetime import datetime
 from unittest.mock import Mock, patch
 import pytest
-from services.identity_resolution import resolve_subject_with_multiple_ids
+from services.identity_resolution import (
+    IDENTIFIER_LOCK_CLASS,
+    identifier_lock_keys,
+    resolve_subject_with_multiple_ids,
+    resolve_subjects_batch,
+)
 
 
 @pytest.fixture
@@ -22,6 +28,23 @@ def mock_conn():
 class TestResolveSubjectWithMultipleIds:
     """Test resolve_subject_with_multiple_ids function"""
 
+    @pytest.fixture(autouse=True)
+    def mock_execute_values(self):
+        with patch("services.identity_resolution.execute_values") as mock_ev:
+            yield mock_ev
+
+    @staticmethod
+    def _link_row(local_id, gsid, created_at, center_id=1, subject_center_id=None):
+        return {
+            "local_subject_id": local_id,
+            "identifier_type": "primary",
+            "identifier_center_id": center_id,
+            "global_subject_id": gsid,
+            "created_at": created_at,
+            "subject_center_id": center_id if subject_center_id is None else subject_center_id,
+            "withdrawn": False,
+        }
+
     def test_create_new_subject(self, mock_conn):
         """Test creating a new subject when no identifiers match"""
         with patch("services.gsid_generator.generate_gsid") as mock_gen_gsid:
@@ -39,13 +62,7 @@ class TestResolveSubjectWithMultipleIds:
         """Test linking to an existing subject"""
         cursor = mock_conn.cursor.return_value
         cursor.fetchall.return_value = [
-            {
-                "global_subject_id": "GSID-EXISTING",
-                "created_at": "2023-01-01",
-                "subject_center_id": 1,
-                "withdrawn": False,
-                "identifier_center_id": 1,
-            }
+            self._link_row("EXISTING-ID", "GSID-EXISTING", "2023-01-01")
         ]
 
         result = resolve_subject_with_multiple_ids(
@@ -61,14 +78,10 @@ class TestResolveSubjectWithMultipleIds:
     def test_center_conflict(self, mock_conn):
         """Test scenario with a center conflict"""
         cursor = mock_conn.cursor.return_value
+        cursor.fetchone.return_value = {"now_text": "2024-06-01 12:00:00+00", "now": None}
         cursor.fetchall.return_value = [
-            {
-                "global_subject_id": "GSID-CONFLICT",
-                "created_at": "2023-01-01",
-                "subject_center_id": 2,  # Different center
-                "withdrawn": False,
-                "identifier_center_id": 2,
-            }
+            # Different center
+            self._link_row("CONFLICT-ID", "GSID-CONFLICT", "2023-01-01", center_id=2)
         ]
 
         result = resolve_subject_with_multiple_ids(
@@ -82,27 +95,17 @@ class TestResolveSubjectWithMultipleIds:
         assert "warnings" in result
         assert len(result["warnings"]) > 0
 
-    def test_multi_gsid_conflict(self, mock_conn):
+    def test_multi_gsid_conflict(self, mock_conn, mock_execute_values):
         """Test scenario with multiple GSIDs matching"""
         cursor = mock_conn.cursor.return_value
+        cursor.fetchone.return_value = {"now_text": "2024-06-01 12:00:00+00", "now": None}
 
-        # Simulate finding one GSID for the first identifier, and another for the second
-        def fetchall_side_effect(*args, **kwargs):
-            if "ID-1" in args[0]:
-                return [{"global_subject_id": "GSID-1", "created_at": "2023-01-01", "subject_center_id": 1, "withdrawn": False, "identifier_center_id": 1}]
-            if "ID-2" in args[0]:
-                return [{"global_subject_id": "GSID-2", "created_at": "2023-02-01", "subject_center_id": 1, "withdrawn": False, "identifier_center_id": 1}]
-            return []
-        cursor.execute.side_effect = fetchall_side_effect
-        
-        # We need to mock two calls to fetchall, one for each identifier.
-        # This is a simplified mock. A more robust mock would inspect the query.
-        cursor.fetchall.side_effect = [
-            [{"global_subject_id": "GSID-1", "created_at": "2023-01-01", "subject_center_id": 1, "withdrawn": False, "identifier_center_id": 1}],
-            [{"global_subject_id": "GSID-2", "created_at": "2023-02-01", "subject_center_id": 1, "withdrawn": False, "identifier_center_id": 1}]
+        # One GSID for the first identifier, another for the second
+        cursor.fetchall.return_value = [
+            self._link_row("ID-1", "GSID-1", "2023-01-01"),
+            self._link_row("ID-2", "GSID-2", "2023-02-01"),
         ]
 
-
         result = resolve_subject_with_multiple_ids(
             conn=mock_conn,
             center_id=1,
@@ -117,3 +120,487 @@ class TestResolveSubjectWithMultipleIds:
         assert result["gsid"] == "GSID-1"
         assert "GSID-1" in result["conflicts"]
         assert "GSID-2" in result["conflicts"]
+
+        # Both conflicting GSIDs are flagged by a single UPDATE
+        updates = [
+            c.args[2]
+            for c in mock_execute_values.call_args_list
+            if "UPDATE subjects" in c.args[1]
+        ]
+        assert len(updates) == 1
+        assert {row[0] for row in updates[0]} == {"GSID-1", "GSID-2"}
+
+    def test_round_trips_independent_of_identifier_count(self, mock_conn, mock_execute_values):
+        """Test matching is one query and linking one upsert for all identifiers"""
+        cursor = mock_conn.cursor.return_value
+        cursor.fetchall.return_value = [
+            self._link_row("ID-1", "GSID-EXISTING", "2023-01-01")
+        ]
+        identifiers = [
+            {"local_subject_id": f"ID-{i}", "identifier_type": "primary"} for i in range(1, 5)
+        ]
+
+        result = resolve_subject_with_multiple_ids(
+            conn=mock_conn, center_id=1, identifiers=identifiers
+        )
+
+        assert result["identifiers_linked"] == 4
+        # identifier locks, then one match query
+        assert cursor.execute.call_count == 2
+        assert "pg_advisory_xact_lock" in cursor.execute.call_args_list[0].args[0]
+        assert cursor.execute.call_args.args[1] == (["id-1", "id-2", "id-3", "id-4"],)
+        upserts = [
+            c.args[2]
+            for c in mock_execute_values.call_args_list
+            if "INSERT INTO local_subject_ids" in c.args[1]
+        ]
+        assert len(upserts) == 1
+        # ID-1 is already linked exactly like this, so only the new ones are written
+        assert [row[1] for row in upserts[0]] == ["ID-2", "ID-3", "ID-4"]
+        mock_conn.commit.assert_called_once()
+
+
+    def test_cached_subject_resolves_without_queries(self, mock_conn, mock_execute_values):
+        """Test a fully cached link_existing only writes its audit row (locks off)"""
+        cursor = mock_conn.cursor.return_value
+        cached = {
+            "links": [
+                {
+                    "local_subject_id": "ID-1",
+                    "identifier_type": "primary",
+                    "center_id": 1,
+                    "gsid": "GSID-CACHED",
+                }
+            ],
+            "subjects": {
+                "GSID-CACHED": {"created_at": "2023-01-01", "center_id": 1, "withdrawn": False}
+            },
+        }
+
+        with patch(
+            "services.identity_resolution.settings.IDENTIFIER_LOCKS_ENABLED", False
+        ), patch(
+            "services.identity_resolution.identifier_cache.lookup",
+            return_value=(0, {"id-1": cached}, []),
+        ), patch("services.identity_resolution.identifier_cache.invalidate") as mock_inv:
+            result = resolve_subject_with_multiple_ids(
+                conn=mock_conn,
+                center_id=1,
+                identifiers=[{"local_subject_id": "id-1", "identifier_type": "primary"}],
+            )
+
+        assert result["gsid"] == "GSID-CACHED"
+        assert result["action"] == "link_existing"
+        # No match query
+        assert cursor.execute.call_count == 0
+        statements = [c.args[1] for c in mock_execute_values.call_args_list]
+        assert len(statements) == 2  # case-variant link upsert + audit row
+        assert "INSERT INTO identity_resolutions" in statements[-1]
+        mock_inv.assert_called_once()
+
+    def test_exact_cached_link_writes_only_audit(self, mock_conn, mock_execute_values):
+        """Test an identical registration of a cached subject writes just the audit row"""
+        cursor = mock_conn.cursor.return_value
+        cached = {
+            "links": [
+                {
+                    "local_subject_id": "ID-1",
+                    "identifier_type": "primary",
+                    "center_id": 1,
+                    "gsid": "GSID-CACHED",
+                }
+            ],
+            "subjects": {
+                "GSID-CACHED": {"created_at": "2023-01-01", "center_id": 1, "withdrawn": False}
+            },
+        }
+
+        with patch(
+            "services.identity_resolution.settings.IDENTIFIER_LOCKS_ENABLED", False
+        ), patch(
+            "services.identity_resolution.identifier_cache.lookup",
+            return_value=(0, {"id-1": cached}, []),
+        ), patch("services.identity_resolution.identifier_cache.invalidate") as mock_inv:
+            result = resolve_subject_with_multiple_ids(
+                conn=mock_conn,
+                center_id=1,
+                identifiers=[{"local_subject_id": "ID-1", "identifier_type": "primary"}],
+            )
+
+        assert result["action"] == "link_existing"
+        assert cursor.execute.call_count == 0
+        statements = [c.args[1] for c in mock_execute_values.call_args_list]
+        assert len(statements) == 1
+        assert "INSERT INTO identity_resolutions" in statements[0]
+        mock_inv.assert_not_called()
+
+
+class TestIdentifierLocks:
+    """Test per-identifier advisory locking"""
+
+    def test_keys_normalized_distinct_and_sorted(self):
+        """Test case variants share a key and keys come out in lock order"""
+        keys = identifier_lock_keys(["ID-2", "id-1", "Id-1", "ID-3"])
+
+        assert len(keys) == 3
+        assert keys == sorted(keys)
+        assert identifier_lock_keys(["ID-1"]) == identifier_lock_keys(["id-1"])
+        assert all(-(2**31) <= key < 2**31 for key in keys)
+
+    def test_locks_taken_before_matching(self, mock_conn):
+        """Test the lock statement precedes the match query, keys in ascending order"""
+        cursor = mock_conn.cursor.return_value
+        with patch("services.identity_resolution.execute_values"), patch(
+            "services.gsid_generator.generate_gsid", return_value="GSID-NEW"
+        ):
+            resolve_subject_with_multiple_ids(
+                conn=mock_conn,
+                center_id=1,
+                identifiers=[
+                    {"local_subject_id": "B-1", "identifier_type": "primary"},
+                    {"local_subject_id": "A-1", "identifier_type": "alias"},
+                ],
+            )
+
+        lock_sql, lock_params = cursor.execute.call_args_list[0].args
+        assert "pg_advisory_xact_lock" in lock_sql
+        assert lock_params == (IDENTIFIER_LOCK_CLASS, identifier_lock_keys(["A-1", "B-1"]))
+        assert "FROM local_subject_ids" in cursor.execute.call_args_list[1].args[0]
+
+    def test_batch_locks_every_identifier_once(self, mock_conn):
+        """Test a batch takes one sorted lock set covering all its subjects"""
+        cursor = mock_conn.cursor.return_value
+        subjects = [
+            {"center_id": 1, "identifiers": [{"local_subject_id": f"S-{i}", "identifier_type": "primary"}]}
+            for i in (3, 1, 2, 1)
+        ]
+        with patch("services.identity_resolution.execute_values"), patch(
+            "services.gsid_generator.generate_gsid", side_effect=["G1", "G2", "G3"]
+        ):
+            resolve_subjects_batch(mock_conn, subjects)
+
+        lock_calls = [
+            c for c in cursor.execute.call_args_list if "pg_advisory_xact_lock" in c.args[0]
+        ]
+        assert len(lock_calls) == 1
+        assert lock_calls[0].args[1][1] == identifier_lock_keys(["S-1", "S-2", "S-3"])
+
+    def test_cache_not_consulted_under_locks(self, mock_conn):
+        """Test locked registrations read links from the database, not the cache"""
+        cursor = mock_conn.cursor.return_value
+        with patch(
+            "services.identity_resolution.identifier_cache.lookup"
+        ) as mock_lookup, patch(
+            "services.identity_resolution.identifier_cache.store"
+        ) as mock_store, patch(
+            "services.identity_resolution.execute_values"
+        ), patch(
+            "services.gsid_generator.generate_gsid", return_value="GSID-NEW"
+        ):
+            resolve_subject_with_multiple_ids(
+                conn=mock_conn,
+                center_id=1,
+                identifiers=[{"local_subject_id": "A-1", "identifier_type": "primary"}],
+            )
+
+        mock_lookup.assert_not_called()
+        mock_store.assert_not_called()
+        match_sql, match_params = cursor.execute.call_args_list[1].args
+        assert "FROM local_subject_ids" in match_sql
+        assert match_params == (["a-1"],)
+
+    def test_disabled(self, mock_conn):
+        """Test IDENTIFIER_LOCKS_ENABLED=false skips the lock statement"""
+        cursor = mock_conn.cursor.return_value
+        with patch(
+            "services.identity_resolution.settings.IDENTIFIER_LOCKS_ENABLED", False
+        ), patch("services.identity_resolution.execute_values"), patch(
+            "services.gsid_generator.generate_gsid", return_value="GSID-NEW"
+        ):
+            resolve_subject_with_multiple_ids(
+                conn=mock_conn,
+                center_id=1,
+                identifiers=[{"local_subject_id": "A-1", "identifier_type": "primary"}],
+            )
+
+        assert not any(
+            "pg_advisory_xact_lock" in c.args[0] for c in cursor.execute.call_args_list
+        )
+
+
+class TestResolveSubjectsBatch:
+    """Test resolve_subjects_batch function"""
+
+    @pytest.fixture
+    def batch_conn(self, mock_conn):
+        cursor = mock_conn.cursor.return_value
+        cursor.fetchone = Mock(
+            return_value={
+                "now_text": "2024-06-01 12:00:00+00",
+                "now": datetime(2024, 6, 1, 12, 0, 0),
+            }
+        )
+        return mock_conn
+
+    @staticmethod
+    def _link_row(local_id, gsid, created_at, center_id=1, id_type="primary"):
+        return {
+            "local_subject_id": local_id,
+            "identifier_type": id_type,
+            "identifier_center_id": center_id,
+            "global_subject_id": gsid,
+            "created_at": created_at,
+            "subject_center_id": center_id,
+            "withdrawn": False,
+        }
+
+    @staticmethod
+    def _subject(center_id, *local_ids):
+        return {
+            "center_id": center_id,
+            "identifiers": [
+                {"local_subject_id": local_id, "identifier_type": "primary"}
+                for local_id in local_ids
+            ],
+            "created_by": "test",
+        }
+
+    @staticmethod
+    def _writes(mock_execute_values, statement):
+        return [
+            c.args[2] for c in mock_execute_values.call_args_list if statement in c.args[1]
+        ]
+
+    def test_new_subjects_claim_reservoir_gsids(self, batch_conn):
+        """New subjects take reservoir GSIDs in growing blocks; unused ones are released"""
+        cursor = batch_conn.cursor.return_value
+        claims = iter([["GSID-R1"], ["GSID-R2", "GSID-R3"]])
+
+        with patch("services.identity_resolution.execute_values"), patch(
+            "services.gsid_reservoir.claim_gsids", side_effect=lambda cur, n: next(claims)
+        ) as mock_claim, patch(
+            "services.gsid_reservoir.release_gsids"
+        ) as mock_release, patch(
+            "services.gsid_generator.generate_gsid"
+        ) as mock_generate:
+            results = resolve_subjects_batch(
+                batch_conn,
+                [self._subject(1, "ID-1"), self._subject(1, "ID-2"), self._subject(1, "ID-1")],
+            )
+
+        assert [r["gsid"] for r in results] == ["GSID-R1", "GSID-R2", "GSID-R1"]
+        assert [c.args[1] for c in mock_claim.call_args_list] == [1, 2]
+        mock_release.assert_called_once_with(cursor, ["GSID-R3"])
+        mock_generate.assert_not_called()
+
+    def test_short_reservoir_falls_back_to_inline_minting(self, batch_conn):
+        """An empty reservoir is asked once; remaining GSIDs are minted inline"""
+        with patch("services.identity_resolution.execute_values"), patch(
+            "services.gsid_reservoir.claim_gsids", return_value=[]
+        ) as mock_claim, patch(
+            "services.gsid_generator.generate_gsid", side_effect=["GSID-A", "GSID-B"]
+        ):
+            results = resolve_subjects_batch(
+                batch_conn, [self._subject(1, "ID-1"), self._subject(1, "ID-2")]
+            )
+
+        assert [r["gsid"] for r in results] == ["GSID-A", "GSID-B"]
+        mock_claim.assert_called_once()
+
+    def test_single_match_query_and_commit(self, batch_conn):
+        """All identifiers are matched with one query and committed once"""
+        cursor = batch_conn.cursor.return_value
+
+        with patch("services.identity_resolution.execute_values"), patch(
+            "services.gsid_generator.generate_gsid", side_effect=["GSID-A", "GSID-B"]
+        ):
+            results = resolve_subjects_batch(
+                batch_conn, [self._subject(1, "ID-1", "ALT-1"), self._subject(1, "ID-2")]
+            )
+
+        match_calls = [
+            c for c in cursor.execute.call_args_list if "FROM local_subject_ids" in c.args[0]
+        ]
+        assert len(match_calls) == 1
+        assert match_calls[0].args[1] == (["alt-1", "id-1", "id-2"],)
+        assert [r["gsid"] for r in results] == ["GSID-A", "GSID-B"]
+        assert all(r["action"] == "create_new" for r in results)
+        batch_conn.commit.assert_called_once()
+
+    def test_new_subjects_inserted_in_one_statement(self, batch_conn):
+        """New subjects, links and audits are written with multi-row statements"""
+        with patch("services.identity_resolution.execute_values") as mock_ev, patch(
+            "services.gsid_generator.generate_gsid", side_effect=["GSID-A", "GSID-B"]
+        ):
+            resolve_subjects_batch(
+                batch_conn, [self._subject(1, "ID-1"), self._subject(1, "ID-2")]
+            )
+
+        assert len(self._writes(mock_ev, "INSERT INTO subjects")[0]) == 2
+        assert len(self._writes(mock_ev, "INSERT INTO local_subject_ids")[0]) == 2
+        assert len(self._writes(mock_ev, "INSERT INTO identity_resolutions")[0]) == 2
+        assert self._writes(mock_ev, "UPDATE subjects") == []
+
+    def test_later_subject_sees_earlier_subject_in_batch(self, batch_conn):
+        """A subject sharing an identifier with an earlier one links to its GSID"""
+        with patch("services.identity_resolution.execute_values") as mock_ev, patch(
+            "services.gsid_generator.generate_gsid", side_effect=["GSID-A", "GSID-B"]
+        ):
+            results = resolve_subjects_batch(
+                batch_conn,
+                [self._subject(1, "ID-1"), self._subject(1, "id-1", "ID-9")],
+            )
+
+        assert results[0]["action"] == "create_new"
+        assert results[1]["action"] == "link_existing"
+        assert results[1]["gsid"] == "GSID-A"
+        assert len(self._writes(mock_ev, "INSERT INTO subjects")[0]) == 1
+
+    def test_link_existing_from_database(self, batch_conn):
+        """Identifiers already in the registry link to the stored GSID"""
+        cursor = batch_conn.cursor.return_value
+        cursor.fetchall.return_value = [
+            self._link_row("EXISTING-ID", "GSID-OLD", datetime(2023, 1, 1))
+        ]
+
+        with patch("services.identity_resolution.execute_values") as mock_ev:
+            results = resolve_subjects_batch(
+                batch_conn, [self._subject(1, "existing-id")]
+            )
+
+        assert results[0]["gsid"] == "GSID-OLD"
+        assert results[0]["action"] == "link_existing"
+        assert self._writes(mock_ev, "INSERT INTO subjects") == []
+
+    def test_multi_gsid_conflict_flags_all(self, batch_conn):
+        """Multiple matched GSIDs resolve to the oldest and flag every GSID"""
+        cursor = batch_conn.cursor.return_value
+        cursor.fetchall.return_value = [
+            self._link_row("ID-2", "GSID-2", datetime(2023, 2, 1)),
+            self._link_row("ID-1", "GSID-1", datetime(2023, 1, 1)),
+        ]
+
+        with patch("services.identity_resolution.execute_values") as mock_ev:
+            results = resolve_subjects_batch(
+                batch_conn, [self._subject(1, "ID-1", "ID-2")]
+            )
+
+        assert results[0]["action"] == "conflict_resolved"
+        assert results[0]["gsid"] == "GSID-1"
+        assert results[0]["conflicts"] == ["GSID-1", "GSID-2"]
+
+        updates = self._writes(mock_ev, "UPDATE subjects")[0]
+        assert [u[0] for u in updates] == ["GSID-1", "GSID-2"]
+        assert all(u[2] is True for u in updates)
+        events = self._writes(mock_ev, "INSERT INTO subject_review_events")[0]
+        assert [e[:2] for e in events] == [
+            ("GSID-1", "multi_gsid_conflict"),
+            ("GSID-2", "multi_gsid_conflict"),
+        ]
+        assert "MULTI-GSID CONFLICT detected on 2024-06-01 12:00:00+00" in events[0][2]
+
+    def test_unknown_center_promoted(self, batch_conn):
+        """A subject registered at center 0 is moved to the incoming real center"""
+        cursor = batch_conn.cursor.return_value
+        cursor.fetchall.return_value = [
+            self._link_row("ID-1", "GSID-1", datetime(2023, 1, 1), center_id=0)
+        ]
+
+        with patch("services.identity_resolution.execute_values") as mock_ev:
+            results = resolve_subjects_batch(batch_conn, [self._subject(5, "ID-1")])
+
+        assert results[0]["action"] == "link_existing"
+        assert any("Updating unknown center" in w for w in results[0]["warnings"])
+        updates = self._writes(mock_ev, "UPDATE subjects")[0]
+        assert updates == [("GSID-1", 5, False)]
+        events = self._writes(mock_ev, "INSERT INTO subject_review_events")[0]
+        assert events[0][:2] == ("GSID-1", "center_update")
+
+    def test_review_notes_not_written_to_subjects(self, batch_conn):
+        """Notes are appended as events; the subjects update stays fixed-size"""
+        cursor = batch_conn.cursor.return_value
+        cursor.fetchall.return_value = [
+            self._link_row("ID-1", "GSID-1", datetime(2023, 1, 1), center_id=2)
+        ]
+
+        with patch("services.identity_resolution.execute_values") as mock_ev:
+            resolve_subjects_batch(
+                batch_conn, [self._subject(1, "ID-1"), self._subject(3, "ID-1")]
+            )
+
+        statements = [c.args[1] for c in mock_ev.call_args_list]
+        update = next(s for s in statements if "UPDATE subjects" in s)
+        assert "review_notes" not in update
+        assert "s.flagged_for_review IS NOT TRUE" in update
+        assert self._writes(mock_ev, "UPDATE subjects")[0] == [("GSID-1", None, True)]
+        events = self._writes(mock_ev, "INSERT INTO subject_review_events")[0]
+        assert [e[1] for e in events] == ["center_conflict", "center_conflict"]
+
+    def test_rollback_on_error(self, batch_conn):
+        """Any failure rolls back the whole batch"""
+        with patch(
+            "services.identity_resolution.execute_values",
+            side_effect=Exception("DB error"),
+        ), patch("services.gsid_generator.generate_gsid", return_value="GSID-A"):
+            with pytest.raises(Exception, match="DB error"):
+                resolve_subjects_batch(batch_conn, [self._subject(1, "ID-1")])
+
+        batch_conn.rollback.assert_called_once()
+        batch_conn.commit.assert_not_called()
+
+    def test_routine_audits_deferred_after_commit(self, batch_conn):
+        """Plain link_existing audits go to the audit writer; review rows stay in the transaction"""
+        cursor = batch_conn.cursor.return_value
+        cursor.fetchall.return_value = [
+            self._link_row("ID-1", "GSID-1", datetime(2023, 1, 1)),
+            self._link_row("ID-2", "GSID-2", datetime(2023, 2, 1)),
+        ]
+        order = []
+        batch_conn.commit.side_effect = lambda: order.append("commit")
+
+        with patch("services.identity_resolution.execute_values") as mock_ev, patch(
+            "services.identity_resolution.audit_writer.accepting", return_value=True
+        ), patch(
+            "services.identity_resolution.audit_writer.enqueue",
+            side_effect=lambda rows: order.append(("enqueue", rows)),
+        ):
+            resolve_subjects_batch(
+                batch_conn,
+                [self._subject(1, "ID-1"), self._subject(1, "ID-1", "ID-2")],
+            )
+
+        audits = self._writes(mock_ev, "INSERT INTO identity_resolutions")
+        assert len(audits) == 1
+        assert [row[5] for row in audits[0]] == ["conflict_resolved"]
+        assert audits[0][0][10] is True  # requires_review
+        assert order[0] == "commit"
+        assert [row[5] for row in order[1][1]] == ["link_existing"]
+
+    def test_routine_audits_inline_when_writer_not_accepting(self, batch_conn):
+        """Without room in the audit writer every audit is written in the transaction"""
+        cursor = batch_conn.cursor.return_value
+        cursor.fetchall.return_value = [self._link_row("ID-1", "GSID-1", datetime(2023, 1, 1))]
+
+        with patch("services.identity_resolution.execute_values") as mock_ev, patch(
+            "services.identity_resolution.audit_writer.accepting", return_value=False
+        ), patch("services.identity_resolution.audit_writer.enqueue") as mock_enqueue:
+            resolve_subjects_batch(batch_conn, [self._subject(1, "ID-1")])
+
+        audits = self._writes(mock_ev, "INSERT INTO identity_resolutions")
+        assert [row[5] for row in audits[0]] == ["link_existing"]
+        assert audits[0][0][-1] is None  # created_at defaults to the transaction time
+        mock_enqueue.assert_not_called()
+
+    def test_deferred_audits_dropped_on_rollback(self, batch_conn):
+        """Audits of a rolled-back transaction never reach the audit writer"""
+        cursor = batch_conn.cursor.return_value
+        cursor.fetchall.return_value = [self._link_row("ID-1", "GSID-1", datetime(2023, 1, 1))]
+        batch_conn.commit.side_effect = Exception("commit failed")
+
+        with patch("services.identity_resolution.execute_values"), patch(
+            "services.identity_resolution.audit_writer.accepting", return_value=True
+        ), patch("services.identity_resolution.audit_writer.enqueue") as mock_enqueue:
+            with pytest.raises(Exception, match="commit failed"):
+                resolve_subjects_batch(batch_conn, [self._subject(1, "ID-1")])
+
+        mock_enqueue.assert_not_called()
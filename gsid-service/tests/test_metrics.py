@@ -0,0 +1,114 @@
+# gsid-service/tests/test_metrics.py
+from unittest.mock import patch
+
+import pytest
+from core.metrics import PhaseTimer, record_resolutions
+from fastapi.testclient import TestClient
+from main import app
+from prometheus_client import REGISTRY
+
+
+def _sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+class TestPhaseTimer:
+    """Test exclusive per-phase timing"""
+
+    def test_nested_phase_pauses_outer(self):
+        """Test time in an inner phase is not also charged to the outer one"""
+        clock = iter([0.0, 1.0, 3.0, 4.0, 10.0])
+        with patch("core.metrics.time.perf_counter", side_effect=lambda: next(clock)):
+            timer = PhaseTimer()  # 0.0
+            with timer.phase("match"):  # 1.0
+                with timer.phase("create"):  # 3.0
+                    pass  # 4.0
+            # 10.0
+
+        assert timer.seconds == {"match": 8.0, "create": 1.0}
+
+    def test_observe_records_histograms(self):
+        """Test every accumulated phase becomes one histogram observation"""
+        before = _sample("gsid_resolution_phase_seconds_count", mode="batch", phase="commit")
+        timer = PhaseTimer()
+        with timer.phase("commit"):
+            pass
+        timer.observe("batch")
+
+        after = _sample("gsid_resolution_phase_seconds_count", mode="batch", phase="commit")
+        assert after == before + 1
+
+    def test_record_resolutions_counts_outcomes(self):
+        """Test outcomes are tallied by action and match strategy"""
+        labels = {"action": "link_existing", "match_strategy": "center_agnostic_match"}
+        before = _sample("gsid_resolutions_total", **labels)
+
+        record_resolutions(
+            [
+                ("link_existing", "center_agnostic_match"),
+                ("link_existing", "center_agnostic_match"),
+                ("create_new", "no_match"),
+            ]
+        )
+
+        assert _sample("gsid_resolutions_total", **labels) == before + 2
+
+
+class TestMetricsEndpoint:
+    """Test GET /metrics and the request middleware"""
+
+    def test_metrics_exposition(self, client):
+        """Test /metrics is public and in Prometheus text format"""
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "gsid_http_request_duration_seconds" in response.text
+        assert "gsid_db_pool_wait_seconds" in response.text
+        assert "gsid_db_pool_in_use" in response.text
+        assert "gsid_audit_writer_queued" in response.text
+        assert "# TYPE gsid_db_pool_in_use gauge" in response.text
+
+    def test_health_counters_exposition(self, client):
+        """Test every cumulative /health stat is a counter named with _total"""
+        from core.metrics import COUNTER_STATS
+
+        lines = client.get("/metrics").text.splitlines()
+        types = {
+            line.split()[2]: line.split()[3] for line in lines if line.startswith("# TYPE ")
+        }
+        samples = {line.split()[0] for line in lines if not line.startswith("#")}
+
+        for component, counters in COUNTER_STATS.items():
+            for name in counters.values():
+                assert types.get(f"gsid_{component}_{name}_total") == "counter"
+                assert f"gsid_{component}_{name}_total" in samples
+        assert "gsid_db_pool_wait_seconds_total" not in samples
+        assert "gsid_admission_queued_total" not in samples
+
+    def test_requests_labeled_by_route_template(self, client):
+        """Test endpoints are labeled with their path template, not the raw path"""
+        status = client.get("/subjects/GSID-ABCDEFGHJKMNPQRS").status_code  # no API key
+        labels = {"method": "GET", "endpoint": "/subjects/{gsid}", "status": str(status)}
+        before = _sample("gsid_http_request_duration_seconds_count", **labels)
+
+        client.get("/subjects/GSID-ABCDEFGHJKMNPQRS")
+        client.get("/subjects/GSID-ZZZZZZZZZZZZZZZZ")
+
+        assert _sample("gsid_http_request_duration_seconds_count", **labels) == before + 2
+        assert _sample("gsid_http_requests_in_flight", endpoint="/subjects/{gsid}") == 0
+
+    def test_unknown_paths_share_one_label(self, client):
+        """Test 404s do not create a label per path"""
+        labels = {"method": "GET", "endpoint": "unmatched", "status": "404"}
+        before = _sample("gsid_http_request_duration_seconds_count", **labels)
+
+        client.get("/no-such-path/1")
+        client.get("/no-such-path/2")
+
+        assert _sample("gsid_http_request_duration_seconds_count", **labels) == before + 2
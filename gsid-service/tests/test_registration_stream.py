@@ -0,0 +1,107 @@
+# gsid-service/tests/test_registration_stream.py
+import json
+from unittest.mock import patch
+
+import pytest
+from services.registration_stream import (
+    ImportConflictError,
+    commit_chunk,
+    get_import,
+    start_import,
+)
+
+
+class TestStartImport:
+    """Test creating and resuming streamed imports"""
+
+    def test_new_import(self, mock_db_connection):
+        """Test a new import starts at line 0 and is committed"""
+        cursor = mock_db_connection.cursor.return_value
+        cursor.fetchone.return_value = {
+            "import_id": "imp-1",
+            "committed_lines": 0,
+            "summary": {},
+        }
+
+        progress = start_import(mock_db_connection, "imp-1", "pipeline", 0)
+
+        assert progress["committed_lines"] == 0
+        assert "ON CONFLICT (import_id) DO NOTHING" in cursor.execute.call_args_list[0].args[0]
+        mock_db_connection.commit.assert_called_once()
+
+    def test_resume_from_earlier_offset(self, mock_db_connection):
+        """Test re-sending from an offset at or before committed_lines is allowed"""
+        mock_db_connection.cursor.return_value.fetchone.return_value = {
+            "import_id": "imp-1",
+            "committed_lines": 2000,
+            "summary": {"create_new": 2000},
+        }
+
+        assert start_import(mock_db_connection, "imp-1", "pipeline", 1500)["committed_lines"] == 2000
+
+    def test_offset_past_committed_conflicts(self, mock_db_connection):
+        """Test a stream that would leave a gap is rejected"""
+        mock_db_connection.cursor.return_value.fetchone.return_value = {
+            "import_id": "imp-1",
+            "committed_lines": 1000,
+            "summary": {},
+        }
+
+        with pytest.raises(ImportConflictError):
+            start_import(mock_db_connection, "imp-1", "pipeline", 2000)
+
+    def test_get_missing_import(self, mock_db_connection):
+        """Test unknown imports return None"""
+        assert get_import(mock_db_connection, "nope") is None
+
+
+class TestCommitChunk:
+    """Test registering a chunk together with its progress update"""
+
+    @staticmethod
+    def _fake_batch(results):
+        def resolve(conn, subjects, before_commit=None):
+            before_commit(conn.cursor.return_value, results)
+            return results
+
+        return resolve
+
+    def test_progress_written_before_commit(self, mock_db_connection):
+        """Test committed_lines and summary advance inside the chunk's transaction"""
+        cursor = mock_db_connection.cursor.return_value
+        cursor.rowcount = 1
+        results = [
+            {"gsid": "GSID-A", "action": "create_new"},
+            {"gsid": "GSID-A", "action": "link_existing"},
+        ]
+
+        with patch(
+            "services.identity_resolution.resolve_subjects_batch",
+            side_effect=self._fake_batch(results),
+        ):
+            returned, summary = commit_chunk(
+                mock_db_connection,
+                "imp-1",
+                [{}, {}],
+                first_line=1000,
+                end_line=2003,
+                summary={"create_new": 5},
+                invalid_lines=1,
+            )
+
+        assert returned == results
+        assert summary == {"create_new": 6, "link_existing": 1, "invalid": 1}
+        sql, params = cursor.execute.call_args.args
+        assert "WHERE import_id = %s AND committed_lines = %s" in sql
+        assert params == (2003, json.dumps(summary), "imp-1", 1000)
+
+    def test_concurrent_stream_conflicts(self, mock_db_connection):
+        """Test the chunk fails if the import already moved past first_line"""
+        mock_db_connection.cursor.return_value.rowcount = 0
+
+        with patch(
+            "services.identity_resolution.resolve_subjects_batch",
+            side_effect=self._fake_batch([]),
+        ):
+            with pytest.raises(ImportConflictError):
+                commit_chunk(mock_db_connection, "imp-1", [], 0, 10, {}, invalid_lines=10)
@@ -0,0 +1,110 @@
+# gsid-service/tests/test_registry_export.py
+import csv
+import gzip
+import io
+from datetime import date, datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from services.registry_export import SCHEMA, export_chunks, iter_row_batches
+
+# As fetched: dates and timestamps arrive as PostgreSQL text
+ROWS = [
+    ("GSID-A", 1, "2020-01-01", False, False, False, None, "2024-01-01 00:00:00",
+     1, "ID-1", "primary", "2024-01-02 08:30:00.123456"),
+    ("GSID-A", 1, "2020-01-01", False, False, False, None, "2024-01-01 00:00:00",
+     2, "ID-1b", "alias", "2024-01-03 00:00:00"),
+    ("GSID-B", 2, None, True, True, False, "FAM-1", "2024-02-01 00:00:00",
+     None, None, None, None),
+]
+
+
+@pytest.fixture
+def export_db(mock_db_connection):
+    """Connection whose named cursor returns ROWS two at a time"""
+    mock_db_connection.closed = False
+    cursor = mock_db_connection.cursor.return_value
+    cursor.fetchmany.side_effect = [ROWS[:2], ROWS[2:], []]
+    return mock_db_connection
+
+
+class TestIterRowBatches:
+    """Test reading the export through a server-side cursor"""
+
+    def test_named_cursor_in_snapshot(self, export_db):
+        """Test batches come from a named cursor in a read-only snapshot"""
+        batches = list(iter_row_batches(export_db, 2))
+
+        assert batches == [ROWS[:2], ROWS[2:]]
+        cursor = export_db.cursor.return_value
+        assert cursor.execute.call_args_list[0].args[0] == (
+            "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY"
+        )
+        assert export_db.cursor.call_args_list[1].kwargs["name"].startswith("registry_export_")
+        assert cursor.itersize == 2
+        export_db.rollback.assert_called_once()
+
+    def test_abandoned_export_rolls_back(self, export_db):
+        """Test closing the export early still ends the transaction"""
+        batches = iter_row_batches(export_db, 2)
+        next(batches)
+        batches.close()
+
+        export_db.cursor.return_value.close.assert_called()
+        export_db.rollback.assert_called_once()
+
+
+class TestExportFormats:
+    """Test encoding the export"""
+
+    def test_parquet(self, export_db):
+        """Test Parquet output has the schema, every row and one row group per batch"""
+        data = b"".join(export_chunks(export_db, "parquet", 2))
+
+        parquet = pq.ParquetFile(io.BytesIO(data))
+        assert parquet.schema_arrow == SCHEMA
+        assert parquet.num_row_groups == 2
+        table = parquet.read()
+        assert table.column("local_subject_id").to_pylist() == ["ID-1", "ID-1b", None]
+        assert table.column("registration_year").to_pylist()[0] == date(2020, 1, 1)
+        assert table.column("linked_at").to_pylist()[0] == datetime(2024, 1, 2, 8, 30, 0, 123456)
+
+    def test_arrow_stream(self, export_db):
+        """Test Arrow IPC stream output reads back as the same rows"""
+        data = b"".join(export_chunks(export_db, "arrow", 2))
+
+        table = pa.ipc.open_stream(data).read_all()
+        assert table.num_rows == 3
+        assert table.column("gsid").to_pylist() == ["GSID-A", "GSID-A", "GSID-B"]
+
+    def test_csv_gzip(self, export_db):
+        """Test CSV output is gzipped with a header row"""
+        chunks = list(export_chunks(export_db, "csv", 2))
+
+        rows = list(csv.reader(io.StringIO(gzip.decompress(b"".join(chunks)).decode())))
+        assert rows[0] == SCHEMA.names
+        assert rows[1][:2] == ["GSID-A", "1"]
+        assert rows[3][8:] == ["", "", "", ""]
+        assert len(chunks) > 1  # streamed, not buffered
+
+    def test_abandoned_download_ends_transaction(self, export_db):
+        """Test closing the stream early stops the prefetch and rolls back"""
+        chunks = export_chunks(export_db, "arrow", 2)
+        next(chunks)
+        chunks.close()
+
+        export_db.rollback.assert_called_once()
+
+    def test_query_error_propagates(self, export_db):
+        """Test a failing fetch surfaces to the consumer"""
+        export_db.cursor.return_value.fetchmany.side_effect = Exception("canceling statement")
+
+        with pytest.raises(Exception, match="canceling statement"):
+            list(export_chunks(export_db, "parquet", 2))
+        export_db.rollback.assert_called_once()
+
+    def test_unknown_format(self, export_db):
+        """Test unsupported formats are rejected"""
+        with pytest.raises(ValueError, match="Unknown export format"):
+            list(export_chunks(export_db, "xlsx", 2))
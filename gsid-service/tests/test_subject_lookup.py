@@ -0,0 +1,184 @@
+# gsid-service/tests/test_subject_lookup.py
+from datetime import date, datetime, timezone
+
+from services.subject_lookup import (
+    get_subject_details,
+    get_subject_versions,
+    lookup_gsids,
+    lookup_identifiers,
+)
+
+
+def _row(local_id, id_type, gsid, center_id=1):
+    return {
+        "local_subject_id": local_id,
+        "identifier_type": id_type,
+        "center_id": center_id,
+        "gsid": gsid,
+        "subject_center_id": center_id,
+        "withdrawn": False,
+        "flagged_for_review": False,
+    }
+
+
+class TestLookupIdentifiers:
+    """Test read-only identifier lookup"""
+
+    def test_one_query_case_insensitive(self, mock_db_connection):
+        """Test all identifiers are matched with one query and nothing is committed"""
+        cursor = mock_db_connection.cursor.return_value
+        cursor.fetchall.return_value = [
+            _row("ID-1", "primary", "GSID-A"),
+            _row("ID-1", "alias", "GSID-B", center_id=2),
+        ]
+
+        results = lookup_identifiers(
+            mock_db_connection,
+            [
+                {"local_subject_id": "id-1", "identifier_type": None},
+                {"local_subject_id": "ID-1", "identifier_type": "alias"},
+                {"local_subject_id": "ID-2", "identifier_type": "primary"},
+            ],
+        )
+
+        assert cursor.execute.call_count == 1
+        assert cursor.execute.call_args.args[1] == (["id-1", "id-2"],)
+        assert results[0]["gsids"] == ["GSID-A", "GSID-B"]
+        assert results[1]["gsids"] == ["GSID-B"]
+        assert results[2] == {
+            "local_subject_id": "ID-2",
+            "identifier_type": "primary",
+            "found": False,
+            "gsids": [],
+            "matches": [],
+        }
+        mock_db_connection.commit.assert_not_called()
+        mock_db_connection.rollback.assert_called_once()
+
+    def test_empty_input_skips_query(self, mock_db_connection):
+        """Test no query is issued for an empty list"""
+        assert lookup_identifiers(mock_db_connection, []) == []
+        mock_db_connection.cursor.assert_not_called()
+
+
+class TestLookupGSIDs:
+    """Test read-only GSID lookup"""
+
+    def test_found_and_missing_in_input_order(self, mock_db_connection):
+        """Test subjects come back in input order with local IDs"""
+        cursor = mock_db_connection.cursor.return_value
+        cursor.fetchall.return_value = [
+            {
+                "gsid": "GSID-A",
+                "center_id": 1,
+                "registration_year": date(2020, 1, 1),
+                "control": False,
+                "withdrawn": False,
+                "flagged_for_review": True,
+                "created_at": datetime(2024, 1, 1, 12, 0),
+                "local_ids": [
+                    {"center_id": 1, "local_subject_id": "ID-1", "identifier_type": "primary"}
+                ],
+            }
+        ]
+
+        results = lookup_gsids(mock_db_connection, ["GSID-X", "GSID-A", "GSID-A"])
+
+        assert cursor.execute.call_count == 1
+        assert cursor.execute.call_args.args[1] == (["GSID-A", "GSID-X"],)
+        assert results[0] == {"gsid": "GSID-X", "found": False}
+        assert results[1]["found"] is True
+        assert results[1]["registration_year"] == "2020-01-01"
+        assert results[1]["local_ids"][0]["local_subject_id"] == "ID-1"
+        assert results[2] == results[1]
+        mock_db_connection.commit.assert_not_called()
+
+
+class TestGetSubjectDetails:
+    """Test the single-query subject detail read"""
+
+    def test_one_query_input_order_without_duplicates(self, mock_db_connection):
+        """Test details come back in request order, once per GSID, missing ones omitted"""
+        cursor = mock_db_connection.cursor.return_value
+        modified = datetime(2024, 6, 1, 12, 0, tzinfo=timezone.utc)
+        cursor.fetchall.return_value = [
+            {
+                "gsid": gsid,
+                "center_id": 1,
+                "center_name": "MSSM",
+                "registration_year": date(2020, 1, 1),
+                "control": False,
+                "withdrawn": False,
+                "flagged_for_review": False,
+                "review_notes": None,
+                "created_by": "system",
+                "created_at": datetime(2024, 1, 1),
+                "updated_at": datetime(2024, 6, 1, 12, 0),
+                "last_event_id": None,
+                "local_id_count": 0,
+                "local_ids_updated_at": None,
+                "last_modified": modified,
+                "local_ids": [],
+            }
+            for gsid in ("GSID-A", "GSID-B")
+        ]
+
+        details = get_subject_details(
+            mock_db_connection, ["GSID-B", "GSID-X", "GSID-A", "GSID-B"]
+        )
+
+        assert [d["gsid"] for d in details] == ["GSID-B", "GSID-A"]
+        assert details[0]["registration_year"] == "2020-01-01"
+        assert details[0]["last_modified"] == modified
+        assert "updated_at" not in details[0]
+        assert "last_event_id" not in details[0]
+        assert cursor.execute.call_count == 1
+        assert cursor.execute.call_args.args[1] == (["GSID-A", "GSID-B", "GSID-X"],)
+        mock_db_connection.rollback.assert_called_once()
+
+    def _version_row(self, gsid="GSID-A", **overrides):
+        return {
+            "gsid": gsid,
+            "updated_at": datetime(2024, 6, 1, 12, 0),
+            "last_event_id": 7,
+            "local_id_count": 2,
+            "local_ids_updated_at": datetime(2024, 5, 1),
+            "last_modified": datetime(2024, 6, 1, 12, 0, tzinfo=timezone.utc),
+            **overrides,
+        }
+
+    def test_versions_match_details(self, mock_db_connection):
+        """Test the cheap version query yields the same version as the detail"""
+        cursor = mock_db_connection.cursor.return_value
+        cursor.fetchall.return_value = [self._version_row()]
+        versions = get_subject_versions(mock_db_connection, ["GSID-A", "GSID-X"])
+
+        cursor.fetchall.return_value = [
+            {
+                **self._version_row(),
+                "center_id": 1,
+                "center_name": "MSSM",
+                "registration_year": None,
+                "created_at": None,
+                "local_ids": [],
+            }
+        ]
+        details = get_subject_details(mock_db_connection, ["GSID-A"])
+
+        assert set(versions) == {"GSID-A"}
+        assert versions["GSID-A"]["version"] == details[0]["version"]
+        assert versions["GSID-A"]["last_modified"] == details[0]["last_modified"]
+
+    def test_version_changes_with_events_and_local_ids(self, mock_db_connection):
+        """Test a new review event or a removed local ID changes the version"""
+        cursor = mock_db_connection.cursor.return_value
+        cursor.fetchall.return_value = [
+            self._version_row("GSID-A"),
+            self._version_row("GSID-B", last_event_id=8),
+            self._version_row("GSID-C", local_id_count=1),
+        ]
+
+        versions = get_subject_versions(mock_db_connection, ["GSID-A", "GSID-B", "GSID-C"])
+
+        assert len({v["version"] for v in versions.values()}) == 3
+        assert cursor.execute.call_count == 1
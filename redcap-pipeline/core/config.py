@@ -13,6 +13,21 @@ class Settings:
     REDCAP_API_TOKEN = os.getenv("REDCAP_API_TOKEN")
     REDCAP_PROJECT_ID = os.getenv("REDCAP_PROJECT_ID")
 
+    # Incremental sync: REDCap interprets dateRangeBegin/End in its server's
+    # local time zone. Each incremental run starts SYNC_OVERLAP_MINUTES before
+    # the previous watermark to cover clock skew and saves in flight during
+    # the last export (re-processing a record is harmless). A full export
+    # runs at least every FULL_SYNC_INTERVAL_DAYS (0 = every run) to pick up
+    # anything an incremental run missed.
+    REDCAP_TIMEZONE = os.getenv("REDCAP_TIMEZONE", "America/New_York")
+    SYNC_OVERLAP_MINUTES = int(os.getenv("SYNC_OVERLAP_MINUTES", "15"))
+    FULL_SYNC_INTERVAL_DAYS = int(os.getenv("FULL_SYNC_INTERVAL_DAYS", "7"))
+
+    # Records of a batch processed at once (1 = one after another). Records of
+    # the same subject are always processed in order by one worker. Keep it
+    # within the GSID service's capacity and the database pool (50 connections).
+    RECORD_WORKERS = int(os.getenv("RECORD_WORKERS", "1"))
+
     # GSID Service
     GSID_SERVICE_URL = os.getenv("GSID_SERVICE_URL", "http://gsid-service:8000")
     GSID_API_KEY = os.getenv("GSID_API_KEY")
@@ -8,10 +8,16 @@ Provides:
     • close_db_pool()         – closes all connections
     • db_connection()         – context-manager that gives a conn and always
                                 returns it to the pool
+
+The pool is a ThreadedConnectionPool, so records processed on worker threads
+(RECORD_WORKERS) can share it. It holds at most DB_POOL_MAX connections;
+ThreadedConnectionPool raises PoolError instead of waiting when they are all
+in use, so get_db_connection() waits on a semaphore for a free one first.
 """
 
 import logging
 import os
+import threading
 from contextlib import contextmanager
 from typing import Optional
 
@@ -20,52 +26,78 @@ from psycopg2 import pool
 
 logger = logging.getLogger(__name__)
 
-db_pool: Optional[pool.SimpleConnectionPool] = None  # singleton
+DB_POOL_MIN = 10
+DB_POOL_MAX = 50
+
+db_pool: Optional[pool.ThreadedConnectionPool] = None  # singleton
+_db_pool_lock = threading.Lock()
+_db_pool_slots = threading.BoundedSemaphore(DB_POOL_MAX)
+_checked_out = set()  # id() of connections holding a slot
 
 
 # ──────────────────────────────────────────────────────────────────────────
 # Pool helpers
 # ──────────────────────────────────────────────────────────────────────────
-def get_db_pool() -> pool.SimpleConnectionPool:
+def get_db_pool() -> pool.ThreadedConnectionPool:
     """Create (lazily) and return the global connection-pool."""
     global db_pool
     if db_pool is None:
-        logger.info("Initializing database connection pool...")
-        try:
-            db_pool = psycopg2.pool.SimpleConnectionPool(
-                minconn=10,
-                maxconn=50,
-                host=os.getenv("DB_HOST"),
-                database=os.getenv("DB_NAME"),
-                user=os.getenv("DB_USER"),
-                password=os.getenv("DB_PASSWORD"),
-            )
-            logger.info("✓ Database connection pool initialized (max connections: 20)")
-        except Exception as e:
-            logger.error(f"Failed to create connection pool: {e}")
-            raise
+        with _db_pool_lock:
+            if db_pool is None:  # another thread may have created it meanwhile
+                logger.info("Initializing database connection pool...")
+                try:
+                    db_pool = psycopg2.pool.ThreadedConnectionPool(
+                        minconn=DB_POOL_MIN,
+                        maxconn=DB_POOL_MAX,
+                        host=os.getenv("DB_HOST"),
+                        database=os.getenv("DB_NAME"),
+                        user=os.getenv("DB_USER"),
+                        password=os.getenv("DB_PASSWORD"),
+                    )
+                    logger.info(
+                        f"✓ Database connection pool initialized "
+                        f"(max connections: {DB_POOL_MAX})"
+                    )
+                except Exception as e:
+                    logger.error(f"Failed to create connection pool: {e}")
+                    raise
     return db_pool
 
 
 def get_db_connection():
-    """Borrow a connection from the pool (caller *must* put it back)."""
+    """
+    Borrow a connection from the pool (caller *must* put it back).
+
+    Blocks while all DB_POOL_MAX connections are checked out.
+    """
+    _db_pool_slots.acquire()
     try:
         conn = get_db_pool().getconn()
         if conn:
+            with _db_pool_lock:
+                _checked_out.add(id(conn))
             return conn
         raise Exception("Could not get connection from pool")
     except Exception as e:
+        _db_pool_slots.release()
         logger.error(f"Error getting connection from pool: {e}")
         raise
 
 
 def return_db_connection(conn):
     """Return a connection to the pool."""
+    if not conn:
+        return
     try:
-        if conn:
-            get_db_pool().putconn(conn)
+        get_db_pool().putconn(conn)
     except Exception as e:
         logger.error(f"Error returning connection to pool: {e}")
+    finally:
+        with _db_pool_lock:
+            held_slot = id(conn) in _checked_out
+            _checked_out.discard(id(conn))
+        if held_slot:
+            _db_pool_slots.release()
 
 
 def close_db_pool():
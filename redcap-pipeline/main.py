@@ -56,7 +56,7 @@ def get_project_config(projects: dict, project_key: str) -> dict:
     return project
 
 
-def run_project(project_key: str, project_config: dict) -> dict:
+def run_project(project_key: str, project_config: dict, full: bool = False) -> dict:
     """Run pipeline for a single project with improved error handling"""
     try:
         logger.info(f"\n{'=' * 60}")
@@ -75,7 +75,7 @@ def run_project(project_key: str, project_config: dict) -> dict:
         # Initialize and run pipeline
         pipeline = REDCapPipeline(project_config)
         batch_size = project_config.get("batch_size", 50)
-        result = pipeline.run(batch_size=batch_size)
+        result = pipeline.run(batch_size=batch_size, full=full)
 
         # Handle different result statuses
         if result.get("status") == "partial_success":
@@ -153,6 +153,11 @@ def main():
         action="store_true",
         help="Run pipeline for all enabled projects",
     )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Export every record instead of only those modified since the last run",
+    )
 
     args = parser.parse_args()
 
@@ -171,7 +176,7 @@ def main():
         if args.project:
             # Run specific project
             project_config = get_project_config(projects, args.project)
-            result = run_project(args.project, project_config)
+            result = run_project(args.project, project_config, full=args.full)
             results.append(result)
 
         elif args.all:
@@ -180,7 +185,7 @@ def main():
 
             for project_key in projects.keys():
                 project_config = get_project_config(projects, project_key)
-                result = run_project(project_key, project_config)
+                result = run_project(project_key, project_config, full=args.full)
                 results.append(result)
 
         else:
@@ -190,7 +195,7 @@ def main():
             if project_key:
                 logger.info(f"Using PROJECT_KEY from environment: {project_key}")
                 project_config = get_project_config(projects, project_key)
-                result = run_project(project_key, project_config)
+                result = run_project(project_key, project_config, full=args.full)
                 results.append(result)
             else:
                 logger.info(
@@ -198,7 +203,7 @@ def main():
                 )
                 for project_key in projects.keys():
                     project_config = get_project_config(projects, project_key)
-                    result = run_project(project_key, project_config)
+                    result = run_project(project_key, project_config, full=args.full)
                     results.append(result)
 
         # Print summary
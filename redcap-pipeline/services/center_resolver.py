@@ -1,4 +1,5 @@
 import logging
+import threading
 from difflib import SequenceMatcher
 from typing import Optional
 
@@ -15,6 +16,8 @@ class CenterResolver:
         self.center_cache = {}
         self.alias_map = settings.CENTER_ALIASES
         self.fuzzy_threshold = settings.FUZZY_MATCH_THRESHOLD
+        # Serialises center creation between pipeline worker threads
+        self._create_lock = threading.Lock()
         self._load_centers()
 
     # ──────────────────────────────────────────────────────────────────────
@@ -67,7 +70,8 @@ class CenterResolver:
         best_score = 0.0
         normalized_input = self.normalize_name(center_name)
 
-        center_names = [v for v in self.center_cache.values() if isinstance(v, str)]
+        # list() copies the values at once: other threads may add centers
+        center_names = [v for v in list(self.center_cache.values()) if isinstance(v, str)]
         for existing in center_names:
             score = SequenceMatcher(
                 None, normalized_input, self.normalize_name(existing)
@@ -116,9 +120,12 @@ class CenterResolver:
         if fuzzy:
             return self.center_cache[fuzzy.lower()]
 
-        # 4) create
-        logger.warning(f"Creating new center: '{center_name}'")
-        return self._create_center(center_name)
+        # 4) create, unless another thread just did
+        with self._create_lock:
+            if center_name.lower() in self.center_cache:
+                return self.center_cache[center_name.lower()]
+            logger.warning(f"Creating new center: '{center_name}'")
+            return self._create_center(center_name)
 
     # ------------------------------------------------------------------
     # Internal creator
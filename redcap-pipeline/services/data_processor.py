@@ -16,6 +16,18 @@ logger = logging.getLogger(__name__)
 
 
 class DataProcessor:
+    # Fields read from records besides the mapped source fields; exported
+    # only when the project has them
+    OPTIONAL_FIELDS = [
+        "record_id",
+        "family_id",
+        "year_collected",
+        "batch",
+        "sequencing_batch",
+        "vcf_sample_id",
+        "vcf_id",
+    ]
+
     def __init__(self, project_config: dict):
         """Initialize DataProcessor with project configuration"""
         self.project_config = project_config
@@ -65,6 +77,59 @@ class DataProcessor:
         ]
         return id_fields
 
+    def get_export_fields(self, metadata: List[Dict]) -> Optional[List[str]]:
+        """
+        Fields to request from REDCap: the project's record ID field, the
+        mapped source fields and the OPTIONAL_FIELDS it has.
+
+        Mapped fields missing from the data dictionary (`metadata`) are
+        reported and left out, since REDCap rejects exports asking for
+        unknown fields. REDCap pseudo-fields (redcap_data_access_group,
+        redcap_event_name) come with every export and are never requested;
+        checkbox options (field___code) are requested by their field name.
+
+        Returns:
+            Field names in request order, or None (export every field) when
+            the project has no mappings
+        """
+        mapped = [
+            m["source_field"]
+            for m in self.field_mappings.get("mappings", [])
+            if m.get("source_field")
+        ]
+        if not mapped:
+            return None
+
+        known = [m["field_name"] for m in metadata]
+        known_set = set(known)
+        fields = {}  # insertion-ordered set
+        if known:
+            fields[known[0]] = None  # the record ID field is always first
+
+        missing = []
+        for source_field in mapped:
+            if source_field.startswith("redcap_"):
+                continue
+            field = source_field.split("___")[0]
+            if field in known_set:
+                fields[field] = None
+            elif source_field not in missing:
+                missing.append(source_field)
+
+        for field in self.OPTIONAL_FIELDS:
+            if field in known_set:
+                fields[field] = None
+
+        if missing:
+            logger.warning(
+                f"[{self.project_key}] {len(missing)} mapped fields are not in the "
+                f"REDCap data dictionary and will not be exported: {', '.join(missing)}"
+            )
+        logger.info(
+            f"[{self.project_key}] Exporting {len(fields)} of {len(known)} REDCap fields"
+        )
+        return list(fields)
+
     def transform_value(self, field_name: str, value: Any) -> Any:
         """Apply transformations to field values"""
         transformations = self.field_mappings.get("transformations", {})
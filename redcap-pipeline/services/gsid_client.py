@@ -1,5 +1,7 @@
 # redcap-pipeline/services/gsid_client.py
 import logging
+import time
+import uuid
 from datetime import date
 from typing import Any, Dict, List, Optional
 
@@ -8,24 +10,36 @@ from core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Times a request the service turned away (429/503 with Retry-After) is resent
+ADMISSION_RETRIES = 5
+
 
 class GSIDClient:
     def __init__(self, service_url: str, api_key: str):
         self.base_url = service_url.rstrip("/")
         self.api_key = api_key
 
-        # Create session with connection pooling for better performance
+        # Create session with connection pooling for better performance.
+        # Registrations carry an Idempotency-Key, so POSTs are retried too: a
+        # retry after a slow commit replays the stored response. 429/503 with
+        # Retry-After are waited out by _post instead.
         self.session = requests.Session()
         adapter = requests.adapters.HTTPAdapter(
             pool_connections=20,
             pool_maxsize=50,
             max_retries=requests.adapters.Retry(
-                total=3, backoff_factor=0.3, status_forcelist=[500, 502, 503, 504]
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=[500, 502, 504],
+                allowed_methods=requests.adapters.Retry.DEFAULT_ALLOWED_METHODS | {"POST"},
             ),
         )
         self.session.mount("http://", adapter)
         self.session.mount("https://", adapter)
-        self.session.headers.update({"X-API-Key": self.api_key})
+        # X-Created-By is the client the service queues this one's requests under
+        self.session.headers.update(
+            {"X-API-Key": self.api_key, "X-Created-By": "redcap_pipeline"}
+        )
 
         logger.info(
             f"GSID client initialized with connection pooling (base_url={self.base_url})"
@@ -72,8 +86,11 @@ class GSIDClient:
                 f"for center_id={center_id}"
             )
 
-            response = self.session.post(
-                f"{self.base_url}/register/subject", json=payload, timeout=30
+            response = self._post(
+                "/register/subject",
+                payload,
+                timeout=30,
+                idempotency_key=str(uuid.uuid4()),
             )
             response.raise_for_status()
             result = response.json()
@@ -96,3 +113,40 @@ class GSIDClient:
             if hasattr(e, "response") and e.response is not None:
                 logger.error(f"Response: {e.response.text}")
             raise
+
+    def _post(
+        self,
+        path: str,
+        payload: Dict[str, Any],
+        timeout: int,
+        idempotency_key: Optional[str] = None,
+    ):
+        """
+        POST to the service, waiting out admission control rejections.
+
+        A 429 or 503 with Retry-After means the service did not start on the
+        request, so it is resent after the advised delay. Every attempt
+        carries the same Idempotency-Key, if given.
+        """
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
+        for attempt in range(ADMISSION_RETRIES + 1):
+            response = self.session.post(
+                f"{self.base_url}{path}", json=payload, timeout=timeout, headers=headers
+            )
+            retry_after = _retry_after(response)
+            if retry_after is None or attempt == ADMISSION_RETRIES:
+                return response
+            logger.warning(
+                f"GSID service busy ({response.status_code}), retrying {path} in {retry_after:g}s"
+            )
+            time.sleep(retry_after)
+
+
+def _retry_after(response) -> Optional[float]:
+    """Seconds to wait before resending, if the service turned the request away"""
+    if response.status_code not in (429, 503):
+        return None
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, TypeError, ValueError):
+        return None
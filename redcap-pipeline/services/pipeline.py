@@ -1,7 +1,8 @@
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 
 import requests
 from core.config import settings
@@ -11,6 +12,7 @@ from services.data_processor import DataProcessor
 from services.gsid_client import GSIDClient
 from services.redcap_client import REDCapClient
 from services.s3_uploader import S3Uploader
+from services.sync_state import plan_sync, save_sync_state
 
 logger = logging.getLogger(__name__)
 
@@ -28,45 +30,75 @@ class REDCapPipeline:
         )
         self.center_resolver = CenterResolver()
         self.data_processor = DataProcessor(project_config)
-        self.s3_uploader = S3Uploader()
+        self.record_workers = max(
+            1, int(project_config.get("record_workers", settings.RECORD_WORKERS))
+        )
+        self.s3_uploader = S3Uploader(max_connections=self.record_workers)
+
+    def run(self, batch_size: int = 200, full: bool = False):
+        """
+        Execute the pipeline with batch processing.
 
-    def run(self, batch_size: int = 200):
-        """Execute the full pipeline with batch processing"""
+        Exports only records modified since the last clean run, unless `full`
+        is set or a periodic full reconciliation is due (see sync_state).
+        """
         logger.info(f"[{self.project_key}] Starting REDCap pipeline...")
 
+        fields = self.get_export_fields()
+        events = self.project_config.get("events")
+
+        plan = plan_sync(
+            self.project_key,
+            full=full,
+            full_sync_interval_days=self.project_config.get("full_sync_interval_days"),
+        )
+
         offset = 0
         total_success = 0
         total_errors = 0
         max_consecutive_failures = 3
         consecutive_failures = 0
 
+        executor = None
+        if self.record_workers > 1:
+            logger.info(
+                f"[{self.project_key}] Processing up to {self.record_workers} records at once"
+            )
+            executor = ThreadPoolExecutor(
+                max_workers=self.record_workers,
+                thread_name_prefix=f"{self.project_key}-record",
+            )
+
         try:
             while True:
                 try:
-                    records = self.redcap_client.fetch_records_batch(batch_size, offset)
-                    consecutive_failures = 0  # Reset on success
-
-                    if not records:
-                        logger.info(f"[{self.project_key}] No more records to process")
-                        break
-
-                    # Process each record in the batch
-                    for record in records:
-                        try:
-                            self.process_record(record)
-                            total_success += 1
-                        except Exception as e:
-                            total_errors += 1
-                            logger.error(
-                                f"[{self.project_key}] Error processing record "
-                                f"{record.get('record_id', 'unknown')}: {e}"
+                    # One export per attempt; batches come from the local copy.
+                    # A new export need not return the same records in the same
+                    # order (records change in REDCap meanwhile), so after a
+                    # failed attempt the whole export is processed again;
+                    # registration is idempotent. Counts are the last attempt's.
+                    with self.redcap_client.export_records(
+                        date_range_begin=plan["date_range_begin"],
+                        date_range_end=plan["date_range_end"],
+                        fields=fields,
+                        events=events,
+                    ) as export:
+                        consecutive_failures = 0  # Reset on success
+                        offset = total_success = total_errors = 0
+
+                        for records in export.batches(batch_size):
+                            success, errors = self.process_batch(records, executor)
+                            total_success += success
+                            total_errors += errors
+
+                            offset += len(records)
+                            logger.info(
+                                f"[{self.project_key}] Batch complete. "
+                                f"Total: {total_success} success, {total_errors} errors"
                             )
 
-                    offset += len(records)
-                    logger.info(
-                        f"[{self.project_key}] Batch complete. "
-                        f"Total: {total_success} success, {total_errors} errors"
-                    )
+                    logger.info(f"[{self.project_key}] No more records to process")
+                    break
 
                 except (
                     requests.exceptions.RetryError,
@@ -74,7 +106,7 @@ class REDCapPipeline:
                 ) as e:
                     consecutive_failures += 1
                     logger.error(
-                        f"[{self.project_key}] Batch fetch failed "
+                        f"[{self.project_key}] Record export failed "
                         f"(attempt {consecutive_failures}/{max_consecutive_failures}): {e}"
                     )
 
@@ -89,6 +121,7 @@ class REDCapPipeline:
                             "total_success": total_success,
                             "total_errors": total_errors,
                             "last_offset": offset,
+                            "mode": plan["mode"],
                             "error": str(e),
                         }
 
@@ -102,14 +135,24 @@ class REDCapPipeline:
 
             # Successful completion
             logger.info(
-                f"[{self.project_key}] Pipeline complete: "
+                f"[{self.project_key}] Pipeline complete ({plan['mode']}): "
                 f"{total_success} success, {total_errors} errors"
             )
 
+            # Records that failed are exported again by the next run
+            if total_errors:
+                logger.warning(
+                    f"[{self.project_key}] Keeping the previous sync watermark "
+                    f"({total_errors} records failed)"
+                )
+            else:
+                save_sync_state(self.project_key, plan, total_success)
+
             return {
                 "status": "success",
                 "total_success": total_success,
                 "total_errors": total_errors,
+                "mode": plan["mode"],
             }
 
         except Exception as e:
@@ -120,6 +163,105 @@ class REDCapPipeline:
                 "total_errors": total_errors,
                 "error": str(e),
             }
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+
+    def process_batch(
+        self, records: List[Dict], executor: Optional[ThreadPoolExecutor] = None
+    ) -> Tuple[int, int]:
+        """
+        Process a batch of records; returns (success, errors).
+
+        With an executor, each group from group_by_subject() runs as one task,
+        so records of different subjects are processed at once while records
+        of the same subject keep their export order. Returns once the whole
+        batch is done.
+        """
+        if executor is None:
+            return self._process_records(records)
+
+        success = errors = 0
+        for group_success, group_errors in executor.map(
+            self._process_records, self.group_by_subject(records)
+        ):
+            success += group_success
+            errors += group_errors
+        return success, errors
+
+    def group_by_subject(self, records: List[Dict]) -> List[List[Dict]]:
+        """
+        Split a batch into groups that can be processed independently.
+
+        Records sharing a record ID (events of a longitudinal project) or a
+        local subject ID (compared case-insensitively, like the GSID service
+        does) end up in the same group, transitively. Groups come in order of
+        their first record and keep the records' order.
+        """
+        parent = list(range(len(records)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        first_seen = {}
+        for i, record in enumerate(records):
+            for key in self._subject_keys(record):
+                if key in first_seen:
+                    parent[find(i)] = find(first_seen[key])
+                else:
+                    first_seen[key] = i
+
+        groups = {}
+        for i, record in enumerate(records):
+            groups.setdefault(find(i), []).append(record)
+        return list(groups.values())
+
+    def _subject_keys(self, record: Dict) -> List[Tuple[str, str]]:
+        keys = []
+        if record.get("record_id"):
+            keys.append(("record", str(record["record_id"])))
+        try:
+            subject_ids = self.data_processor.extract_subject_ids(record)
+        except Exception:
+            # process_record fails on it again and counts the error
+            subject_ids = []
+        for subject_id in subject_ids:
+            keys.append(("subject", str(subject_id["local_subject_id"]).strip().lower()))
+        return keys
+
+    def _process_records(self, records: List[Dict]) -> Tuple[int, int]:
+        """Process records one after another; returns (success, errors)"""
+        success = errors = 0
+        for record in records:
+            try:
+                self.process_record(record)
+                success += 1
+            except Exception as e:
+                errors += 1
+                logger.error(
+                    f"[{self.project_key}] Error processing record "
+                    f"{record.get('record_id', 'unknown')}: {e}"
+                )
+        return success, errors
+
+    def get_export_fields(self) -> Optional[List[str]]:
+        """
+        The mapped fields to export, checked against the data dictionary.
+
+        None (export every field) if the data dictionary cannot be fetched.
+        """
+        try:
+            metadata = self.redcap_client.get_metadata()
+        except requests.exceptions.RequestException as e:
+            logger.warning(
+                f"[{self.project_key}] Could not fetch the data dictionary, "
+                f"exporting all fields: {e}"
+            )
+            return None
+        return self.data_processor.get_export_fields(metadata)
 
     def process_record(self, record: Dict):
         """Process a single REDCap record"""
@@ -1,7 +1,12 @@
+import csv
+import io
+import itertools
 import logging
 import os
+import tempfile
 import time
-from typing import Dict, List
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
 
 import requests
 from requests.adapters import HTTPAdapter
@@ -27,6 +32,77 @@ def resolve_api_token(token_template: str) -> str:
     return resolved
 
 
+# dateRangeBegin/dateRangeEnd format of the REDCap API
+REDCAP_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Bytes read from the HTTP body per write to the spool file
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+
+class RecordExport:
+    """
+    One record export of a project (CSV), kept in a local temporary file.
+
+    Records are parsed from the file as they are read, so memory use depends
+    on the batch size, not on the size of the project. The file is removed on
+    close(); use the export as a context manager.
+    """
+
+    def __init__(self, spool, project_key: str):
+        self._spool = spool
+        self.project_key = project_key
+        self.size_bytes = spool.tell() if spool is not None else 0
+
+    @classmethod
+    def spool(cls, response, project_key: str) -> "RecordExport":
+        """Copy a (streamed) export response body to a temporary file"""
+        if response is None:
+            return cls(None, project_key)
+        spool = tempfile.TemporaryFile(prefix=f"redcap_{project_key}_")
+        try:
+            for chunk in response.iter_content(chunk_size=SPOOL_CHUNK_SIZE):
+                spool.write(chunk)
+        except BaseException:
+            spool.close()
+            raise
+        finally:
+            response.close()
+        return cls(spool, project_key)
+
+    def records(self, offset: int = 0) -> Iterator[Dict]:
+        """Records one at a time in export order, skipping the first `offset`"""
+        if self._spool is None or not self.size_bytes:
+            return
+        self._spool.seek(0)
+        # utf-8-sig: REDCap may start CSV exports with a byte order mark
+        text = io.TextIOWrapper(self._spool, encoding="utf-8-sig", newline="")
+        try:
+            yield from itertools.islice(csv.DictReader(text), offset, None)
+        finally:
+            if not text.buffer.closed:
+                text.detach()  # keep the spool open for another pass
+
+    def batches(self, batch_size: int, offset: int = 0) -> Iterator[List[Dict]]:
+        """Records in export order, batch_size at a time, skipping the first `offset`"""
+        records = self.records(offset)
+        while True:
+            batch = list(itertools.islice(records, batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def close(self):
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
 class REDCapClient:
     def __init__(self, project_config: dict):
         """Initialize REDCap client for a specific project"""
@@ -70,14 +146,29 @@ class REDCapClient:
             f"Token: {self.api_token[:4]}...{self.api_token[-4:]})"
         )
 
-    def fetch_records_batch(
-        self, batch_size: int, offset: int, timeout: int = 120
-    ) -> List[Dict]:
-        """Fetch a batch of records from REDCap with pagination"""
+    def export_records(
+        self,
+        timeout: int = 120,
+        date_range_begin: Optional[datetime] = None,
+        date_range_end: Optional[datetime] = None,
+        fields: Optional[List[str]] = None,
+        events: Optional[List[str]] = None,
+    ) -> "RecordExport":
+        """
+        Export the project's records ONCE, spooled to a local temporary file.
+
+        REDCap has no offset/limit on record exports, so batches are read
+        from the returned RecordExport instead of exporting again per batch:
+        a run downloads the project once, whatever the batch size.
+
+        date_range_begin/end (REDCap server time) limit the export to records
+        created or modified in that window; fields/events to those fields
+        and (longitudinal projects) events. None exports everything.
+        """
         payload = {
             "token": self.api_token,
             "content": "record",
-            "format": "json",
+            "format": "csv",  # parsed row by row from the spool file
             "type": "flat",
             "rawOrLabel": "raw",
             "rawOrLabelHeaders": "raw",
@@ -86,6 +177,14 @@ class REDCapClient:
             "exportDataAccessGroups": "true",  # Important for center resolution
             "returnFormat": "json",
         }
+        if date_range_begin is not None:
+            payload["dateRangeBegin"] = date_range_begin.strftime(REDCAP_DATETIME_FORMAT)
+        if date_range_end is not None:
+            payload["dateRangeEnd"] = date_range_end.strftime(REDCAP_DATETIME_FORMAT)
+        for i, field in enumerate(fields or []):
+            payload[f"fields[{i}]"] = field
+        for i, event in enumerate(events or []):
+            payload[f"events[{i}]"] = event
 
         max_retries = 5
         retry_delay = 5  # Start with 5 seconds
@@ -94,13 +193,12 @@ class REDCapClient:
         for attempt in range(max_retries):
             try:
                 logger.debug(
-                    f"[{self.project_key}] Fetching records "
-                    f"(batch_size={batch_size}, offset={offset}, timeout={timeout}s, "
-                    f"attempt={attempt + 1}/{max_retries})"
+                    f"[{self.project_key}] Exporting records "
+                    f"(timeout={timeout}s, attempt={attempt + 1}/{max_retries})"
                 )
 
                 response = self.session.post(
-                    self.api_url, data=payload, timeout=timeout
+                    self.api_url, data=payload, timeout=timeout, stream=True
                 )
 
                 # Check for specific error codes that need special handling
@@ -110,6 +208,7 @@ class REDCapClient:
                         f"attempt {attempt + 1}/{max_retries}"
                     )
                     if attempt < max_retries - 1:
+                        response.close()
                         wait_time = retry_delay * (2**attempt)  # Exponential backoff
                         logger.info(f"[{self.project_key}] Retrying in {wait_time}s...")
                         time.sleep(wait_time)
@@ -118,17 +217,14 @@ class REDCapClient:
                         response.raise_for_status()
 
                 response.raise_for_status()
-                all_records = response.json()
-
-                # Manual pagination (REDCap doesn't support offset/limit in API)
-                paginated_records = all_records[offset : offset + batch_size]
+                export = RecordExport.spool(response, self.project_key)
 
                 logger.info(
-                    f"[{self.project_key}] Fetched {len(paginated_records)} records "
-                    f"(offset={offset}, total={len(all_records)})"
+                    f"[{self.project_key}] Exported records "
+                    f"({export.size_bytes / 1e6:.1f} MB)"
                 )
 
-                return paginated_records
+                return export
 
             except requests.exceptions.Timeout as e:
                 last_exception = e
@@ -143,7 +239,7 @@ class REDCapClient:
                     timeout = min(timeout * 1.5, 300)  # Increase timeout, max 5 min
                 else:
                     logger.error(
-                        f"[{self.project_key}] Failed to fetch records "
+                        f"[{self.project_key}] Failed to export records "
                         f"after {max_retries} attempts: {e}"
                     )
                     raise
@@ -167,7 +263,7 @@ class REDCapClient:
         if last_exception:
             raise last_exception
 
-        return []
+        return RecordExport.spool(None, self.project_key)
 
     def get_project_info(self) -> Dict:
         """Get project metadata"""
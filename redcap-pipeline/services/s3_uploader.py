@@ -4,6 +4,7 @@ from datetime import datetime
 from typing import Dict
 
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 from core.config import settings
 
@@ -11,8 +12,11 @@ logger = logging.getLogger(__name__)
 
 
 class S3Uploader:
-    def __init__(self):
-        self.s3_client = boto3.client("s3")
+    def __init__(self, max_connections: int = 10):
+        # One connection per concurrent upload (boto3 clients are thread-safe)
+        self.s3_client = boto3.client(
+            "s3", config=Config(max_pool_connections=max(10, max_connections))
+        )
         self.bucket = settings.S3_BUCKET
 
     def upload_fragment(self, fragment: Dict, project_key: str, gsid: str):
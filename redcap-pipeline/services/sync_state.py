@@ -0,0 +1,141 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from zoneinfo import ZoneInfo
+
+import psycopg2.extras
+from core.config import settings
+from core.database import get_db_connection, return_db_connection
+
+logger = logging.getLogger(__name__)
+
+
+def redcap_now() -> datetime:
+    """Current REDCap server time (naive, whole seconds), for date-range filters"""
+    return (
+        datetime.now(ZoneInfo(settings.REDCAP_TIMEZONE))
+        .replace(tzinfo=None, microsecond=0)
+    )
+
+
+def load_sync_state(project_key: str) -> Optional[Dict]:
+    """
+    Watermarks of the project's last clean run, or None.
+
+    None also when the state cannot be read (e.g. the redcap_sync_state
+    migration has not been applied), so the caller falls back to a full sync.
+    """
+    conn = None
+    try:
+        conn = get_db_connection()
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(
+                """
+                SELECT last_synced_at, last_full_sync_at, last_mode
+                FROM redcap_sync_state
+                WHERE project_key = %s
+                """,
+                (project_key,),
+            )
+            state = cur.fetchone()
+        conn.rollback()
+        return dict(state) if state else None
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        logger.warning(f"[{project_key}] Could not read sync state, running a full sync: {e}")
+        return None
+    finally:
+        if conn:
+            return_db_connection(conn)
+
+
+def plan_sync(
+    project_key: str,
+    full: bool = False,
+    full_sync_interval_days: Optional[int] = None,
+) -> Dict:
+    """
+    Decide between a full and an incremental export for this run.
+
+    Returns:
+        {"mode": "full" | "incremental",
+         "date_range_begin": datetime or None,
+         "date_range_end": datetime}   # REDCap server time
+    """
+    now = redcap_now()
+    interval = (
+        settings.FULL_SYNC_INTERVAL_DAYS
+        if full_sync_interval_days is None
+        else full_sync_interval_days
+    )
+    state = None if full else load_sync_state(project_key)
+
+    if full:
+        reason = "--full requested"
+    elif state is None:
+        reason = "no previous sync"
+    elif state["last_full_sync_at"] is None or (
+        now - state["last_full_sync_at"] >= timedelta(days=interval)
+    ):
+        reason = f"periodic full reconciliation (every {interval} days)"
+    else:
+        begin = state["last_synced_at"] - timedelta(minutes=settings.SYNC_OVERLAP_MINUTES)
+        logger.info(
+            f"[{project_key}] Incremental sync of records modified "
+            f"{begin:%Y-%m-%d %H:%M:%S} - {now:%Y-%m-%d %H:%M:%S}"
+        )
+        return {"mode": "incremental", "date_range_begin": begin, "date_range_end": now}
+
+    logger.info(f"[{project_key}] Full sync: {reason}")
+    return {"mode": "full", "date_range_begin": None, "date_range_end": now}
+
+
+def save_sync_state(project_key: str, plan: Dict, record_count: int):
+    """
+    Advance the project's watermark to the end of this run's export window.
+
+    Failures are logged, not raised: the records are already processed, and
+    the next run just starts from the previous watermark.
+    """
+    synced_at = plan["date_range_end"]
+    conn = None
+    try:
+        conn = get_db_connection()
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO redcap_sync_state (
+                    project_key, last_synced_at, last_full_sync_at,
+                    last_mode, last_record_count
+                )
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (project_key) DO UPDATE SET
+                    last_synced_at = EXCLUDED.last_synced_at,
+                    last_full_sync_at = COALESCE(
+                        EXCLUDED.last_full_sync_at,
+                        redcap_sync_state.last_full_sync_at
+                    ),
+                    last_mode = EXCLUDED.last_mode,
+                    last_record_count = EXCLUDED.last_record_count,
+                    updated_at = CURRENT_TIMESTAMP
+                """,
+                (
+                    project_key,
+                    synced_at,
+                    synced_at if plan["mode"] == "full" else None,
+                    plan["mode"],
+                    record_count,
+                ),
+            )
+        conn.commit()
+        logger.info(
+            f"[{project_key}] Sync watermark advanced to {synced_at:%Y-%m-%d %H:%M:%S}"
+        )
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        logger.error(f"[{project_key}] Failed to save sync state: {e}")
+    finally:
+        if conn:
+            return_db_connection(conn)
@@ -260,6 +260,47 @@ class TestDataProcessor:
         assert hasattr(data_processor, "process_record")
         assert callable(data_processor.process_record)
 
+    def test_get_export_fields(self, data_processor):
+        """Test the export asks for the record ID, mapped and optional fields only"""
+        metadata = [
+            {"field_name": name}
+            for name in [
+                "record_id", "subject_id", "alternate_id", "registration_date",
+                "control", "blood_sample_id", "dna_sample_id", "wgs_sample_id",
+                "family_id", "consent_notes", "diagnosis_text",
+            ]
+        ]
+
+        fields = data_processor.get_export_fields(metadata)
+
+        assert fields == [
+            "record_id", "subject_id", "alternate_id", "registration_date",
+            "control", "blood_sample_id", "dna_sample_id", "wgs_sample_id",
+            "family_id",
+        ]
+
+    def test_get_export_fields_reports_missing(self, data_processor, caplog):
+        """Test mapped fields missing from the data dictionary are reported and skipped"""
+        data_processor.field_mappings["mappings"].extend(
+            [
+                {"source_field": "redcap_data_access_group", "target_field": "center"},
+                {"source_field": "diagnosis___2", "target_field": "uc"},
+            ]
+        )
+        metadata = [{"field_name": "study_id"}, {"field_name": "subject_id"}, {"field_name": "diagnosis"}]
+
+        fields = data_processor.get_export_fields(metadata)
+
+        assert fields == ["study_id", "subject_id", "diagnosis"]
+        assert "alternate_id" in caplog.text
+        assert "redcap_data_access_group" not in caplog.text
+
+    def test_get_export_fields_without_mappings(self, data_processor):
+        """Test a project without mappings exports every field"""
+        data_processor.field_mappings = {"mappings": []}
+
+        assert data_processor.get_export_fields([{"field_name": "record_id"}]) is None
+
 
 class TestDataProcessorIntegration:
     """Integration tests for DataProcessor"""
@@ -16,7 +16,7 @@ class TestDatabase:
         # Reset pool
         db_module.db_pool = None
 
-        with patch("psycopg2.pool.SimpleConnectionPool") as mock_pool_class:
+        with patch("psycopg2.pool.ThreadedConnectionPool") as mock_pool_class:
             mock_pool = MagicMock()
             mock_pool_class.return_value = mock_pool
 
@@ -66,6 +66,47 @@ class TestDatabase:
 
             mock_pool.putconn.assert_called_once_with(mock_conn)
 
+    def test_get_db_connection_waits_for_free_slot(self):
+        """Test an exhausted pool blocks the caller until a connection is returned"""
+        import threading
+
+        import core.database as db_module
+        from core.database import get_db_connection, return_db_connection
+
+        mock_pool = MagicMock()
+        mock_pool.getconn.side_effect = lambda: MagicMock()
+        with patch("core.database.get_db_pool", return_value=mock_pool), patch.object(
+            db_module, "_db_pool_slots", threading.BoundedSemaphore(1)
+        ):
+            first = get_db_connection()
+            got = []
+            waiter = threading.Thread(target=lambda: got.append(get_db_connection()))
+            waiter.start()
+            waiter.join(timeout=0.2)
+            assert waiter.is_alive()
+            assert mock_pool.getconn.call_count == 1
+
+            return_db_connection(first)
+            waiter.join(timeout=5)
+            assert not waiter.is_alive()
+            assert len(got) == 1
+            return_db_connection(got[0])
+
+    def test_return_unknown_connection_keeps_slots(self):
+        """Test returning a connection not checked out here does not free a slot"""
+        import threading
+
+        import core.database as db_module
+        from core.database import return_db_connection
+
+        slots = threading.BoundedSemaphore(1)
+        with patch("core.database.get_db_pool"), patch.object(
+            db_module, "_db_pool_slots", slots
+        ):
+            return_db_connection(MagicMock())
+            assert slots.acquire(blocking=False)
+            assert not slots.acquire(blocking=False)
+
     def test_close_db_pool(self):
         """Test closing the database pool"""
         import core.database as db_module
@@ -133,7 +174,7 @@ class TestDatabase:
                     "DB_PORT": "5433",
                 },
             ),
-            patch("psycopg2.pool.SimpleConnectionPool") as mock_pool_class,
+            patch("psycopg2.pool.ThreadedConnectionPool") as mock_pool_class,
         ):
             mock_pool = MagicMock()
             mock_pool_class.return_value = mock_pool
@@ -64,3 +64,35 @@ class TestGSIDClient:
             mock_adapter.assert_called_once()
             # Check that max_retries is set
             assert "max_retries" in mock_adapter.call_args[1]
+
+    def test_waits_out_admission_rejection(self, client):
+        """Test a 503 with Retry-After is resent after the advised delay"""
+        busy = Mock(status_code=503, headers={"Retry-After": "2"})
+        ok = Mock(status_code=200, headers={})
+        ok.json.return_value = {
+            "gsid": "GSID-TEST001",
+            "action": "link_existing",
+            "identifiers_linked": 1,
+        }
+        with (
+            patch("requests.Session.post", side_effect=[busy, ok]) as mock_post,
+            patch("services.gsid_client.time.sleep") as mock_sleep,
+        ):
+            result = client.register_subject_with_identifiers(
+                center_id=1,
+                identifiers=[{"local_subject_id": "LOCAL123", "identifier_type": "primary"}],
+            )
+
+        assert result["gsid"] == "GSID-TEST001"
+        assert mock_post.call_count == 2
+        mock_sleep.assert_called_once_with(2.0)
+        assert client.session.headers["X-Created-By"] == "redcap_pipeline"
+        # The resend is the same request as far as the service is concerned
+        keys = {c.kwargs["headers"]["Idempotency-Key"] for c in mock_post.call_args_list}
+        assert len(keys) == 1
+
+    def test_retries_cover_registrations(self, client):
+        """Test POSTs are retried now that they carry an Idempotency-Key"""
+        retry = client.session.get_adapter("http://test-gsid-service").max_retries
+        assert "POST" in retry.allowed_methods
+        assert 503 not in retry.status_forcelist
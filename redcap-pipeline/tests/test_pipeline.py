@@ -1,4 +1,7 @@
 # redcap-pipeline/tests/test_pipeline.py
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -24,6 +27,22 @@ def mock_dependencies():
         }
 
 
+def _export(mock_redcap_instance, *batches):
+    """Make export_records() return one export holding `batches`"""
+    export = mock_redcap_instance.export_records.return_value.__enter__.return_value
+    export.batches.return_value = list(batches)
+    return export
+
+
+@pytest.fixture(autouse=True)
+def sync_state():
+    """Full-sync plan without touching the state table"""
+    plan = {"mode": "full", "date_range_begin": None, "date_range_end": None}
+    with patch("services.pipeline.plan_sync", return_value=plan) as mock_plan, \
+         patch("services.pipeline.save_sync_state") as mock_save:
+        yield {"plan": mock_plan, "save": mock_save}
+
+
 @pytest.fixture
 def pipeline_config():
     """Sample pipeline configuration"""
@@ -53,7 +72,7 @@ class TestREDCapPipeline:
             with patch("services.pipeline.REDCapClient") as mock_redcap:
                 
                 mock_redcap_instance = mock_redcap.return_value
-                mock_redcap_instance.fetch_records_batch.side_effect = [[{"record_id": "1"}, {"record_id": "2"}], []]
+                _export(mock_redcap_instance, [{"record_id": "1"}, {"record_id": "2"}])
                 
                 pipeline = REDCapPipeline(pipeline_config)
                 pipeline.redcap_client = mock_redcap_instance
@@ -62,7 +81,7 @@ class TestREDCapPipeline:
                 result = pipeline.run()
 
                 # Assert
-                assert mock_redcap_instance.fetch_records_batch.call_count == 2
+                assert mock_redcap_instance.export_records.call_count == 1
                 assert mock_process_record.call_count == 2
                 assert result["status"] == "success"
                 assert result["total_success"] == 2
@@ -74,18 +93,20 @@ class TestREDCapPipeline:
             with patch("services.pipeline.REDCapClient") as mock_redcap:
 
                 mock_redcap_instance = mock_redcap.return_value
-                mock_redcap_instance.fetch_records_batch.side_effect = [
+                export = _export(
+                    mock_redcap_instance,
                     [{"record_id": "1"}],
                     [{"record_id": "2"}],
-                    [],
-                ]
+                )
                 
                 pipeline = REDCapPipeline(pipeline_config)
                 pipeline.redcap_client = mock_redcap_instance
 
                 result = pipeline.run(batch_size=1)
 
-                assert mock_redcap_instance.fetch_records_batch.call_count == 3
+                # The project is exported once, whatever the number of batches
+                assert mock_redcap_instance.export_records.call_count == 1
+                export.batches.assert_called_once_with(1)
                 assert mock_process_record.call_count == 2
                 assert result["status"] == "success"
 
@@ -95,7 +116,7 @@ class TestREDCapPipeline:
             with patch("services.pipeline.REDCapClient") as mock_redcap:
 
                 mock_redcap_instance = mock_redcap.return_value
-                mock_redcap_instance.fetch_records_batch.side_effect = [[{"record_id": "1"}, {"record_id": "2"}], []]
+                _export(mock_redcap_instance, [{"record_id": "1"}, {"record_id": "2"}])
                 
                 mock_process_record.side_effect = [Exception("Test error"), None]
                 
@@ -112,13 +133,211 @@ class TestREDCapPipeline:
         """Test that the pipeline stops after multiple consecutive fetch errors"""
         with patch("services.pipeline.REDCapClient") as mock_redcap:
             mock_redcap_instance = mock_redcap.return_value
-            mock_redcap_instance.fetch_records_batch.side_effect = requests.exceptions.RequestException("API Error")
+            mock_redcap_instance.export_records.side_effect = requests.exceptions.RequestException("API Error")
             
             pipeline = REDCapPipeline(pipeline_config)
             pipeline.redcap_client = mock_redcap_instance
 
-            result = pipeline.run()
+            with patch("services.pipeline.time.sleep"):
+                result = pipeline.run()
 
-            assert mock_redcap_instance.fetch_records_batch.call_count == 3
+            assert mock_redcap_instance.export_records.call_count == 3
             assert result["status"] == "partial_success"
             assert result["error"] == "API Error"
+
+    def test_pipeline_reprocesses_export_after_failure(self, pipeline_config):
+        """Test a new export after a failure is processed from its first record"""
+        with patch("services.pipeline.REDCapPipeline.process_record") as mock_process_record, \
+             patch("services.pipeline.REDCapClient") as mock_redcap, \
+             patch("services.pipeline.time.sleep"):
+            mock_redcap_instance = mock_redcap.return_value
+
+            def batches(batch_size):
+                yield [{"record_id": "1"}, {"record_id": "2"}]
+                raise requests.exceptions.ChunkedEncodingError("cut")
+
+            first = MagicMock()
+            first.__enter__.return_value.batches.side_effect = batches
+            # The source changed meanwhile: record 1 is gone, 3 is new
+            second = MagicMock()
+            second.__enter__.return_value.batches.return_value = [
+                [{"record_id": "2"}, {"record_id": "3"}]
+            ]
+            mock_redcap_instance.export_records.side_effect = [first, second]
+
+            pipeline = REDCapPipeline(pipeline_config)
+            result = pipeline.run(batch_size=2)
+
+            second.__enter__.return_value.batches.assert_called_once_with(2)
+            first.__exit__.assert_called_once()
+            processed = [c.args[0]["record_id"] for c in mock_process_record.call_args_list]
+            assert processed == ["1", "2", "2", "3"]
+            assert result["status"] == "success"
+            assert result["total_success"] == 2
+
+    def test_pipeline_incremental_run_advances_watermark(self, pipeline_config, sync_state):
+        """Test the planned date range is exported and saved after a clean run"""
+        plan = {
+            "mode": "incremental",
+            "date_range_begin": "2024-06-01 11:45:00",
+            "date_range_end": "2024-06-01 13:00:00",
+        }
+        sync_state["plan"].return_value = plan
+
+        with patch("services.pipeline.REDCapPipeline.process_record"), \
+             patch("services.pipeline.REDCapClient") as mock_redcap:
+            mock_redcap_instance = mock_redcap.return_value
+            _export(mock_redcap_instance, [{"record_id": "1"}])
+
+            pipeline = REDCapPipeline(pipeline_config)
+            pipeline.get_export_fields = MagicMock(return_value=None)
+            result = pipeline.run(full=False)
+
+        sync_state["plan"].assert_called_once_with(
+            "test_project", full=False, full_sync_interval_days=None
+        )
+        mock_redcap_instance.export_records.assert_called_once_with(
+            date_range_begin="2024-06-01 11:45:00",
+            date_range_end="2024-06-01 13:00:00",
+            fields=None,
+            events=None,
+        )
+        sync_state["save"].assert_called_once_with("test_project", plan, 1)
+        assert result["mode"] == "incremental"
+
+    def test_pipeline_exports_mapped_fields(self, pipeline_config, mock_dependencies):
+        """Test the export asks only for the fields the mappings use"""
+        pipeline_config["events"] = ["baseline_arm_1"]
+        mock_redcap_instance = mock_dependencies["redcap"].return_value
+        _export(mock_redcap_instance)
+        mock_redcap_instance.get_metadata.return_value = [{"field_name": "record_id"}]
+        mock_processor = mock_dependencies["processor"].return_value
+        mock_processor.get_export_fields.return_value = ["record_id", "subject_id"]
+
+        pipeline = REDCapPipeline(pipeline_config)
+        pipeline.run()
+
+        mock_processor.get_export_fields.assert_called_once_with([{"field_name": "record_id"}])
+        kwargs = mock_redcap_instance.export_records.call_args.kwargs
+        assert kwargs["fields"] == ["record_id", "subject_id"]
+        assert kwargs["events"] == ["baseline_arm_1"]
+
+    def test_pipeline_exports_all_fields_without_metadata(self, pipeline_config, mock_dependencies):
+        """Test a failed data dictionary fetch falls back to exporting every field"""
+        mock_redcap_instance = mock_dependencies["redcap"].return_value
+        _export(mock_redcap_instance)
+        mock_redcap_instance.get_metadata.side_effect = requests.exceptions.RequestException("down")
+
+        pipeline = REDCapPipeline(pipeline_config)
+        pipeline.run()
+
+        assert mock_redcap_instance.export_records.call_args.kwargs["fields"] is None
+
+    def test_pipeline_keeps_watermark_after_record_errors(self, pipeline_config, sync_state):
+        """Test failed records are picked up again by the next run"""
+        with patch("services.pipeline.REDCapPipeline.process_record") as mock_process_record, \
+             patch("services.pipeline.REDCapClient") as mock_redcap:
+            _export(mock_redcap.return_value, [{"record_id": "1"}])
+            mock_process_record.side_effect = Exception("GSID down")
+
+            pipeline = REDCapPipeline(pipeline_config)
+            result = pipeline.run()
+
+        assert result["total_errors"] == 1
+        sync_state["save"].assert_not_called()
+
+
+class TestConcurrentRecords:
+    """Test processing a batch's records on worker threads"""
+
+    @pytest.fixture
+    def pipeline(self, pipeline_config, mock_dependencies):
+        pipeline_config["record_workers"] = 4
+        # Subject IDs are the records' subject_id field
+        mock_dependencies["processor"].return_value.extract_subject_ids.side_effect = (
+            lambda record: [{"identifier_type": "primary", "local_subject_id": record["subject_id"]}]
+            if record.get("subject_id")
+            else []
+        )
+        return REDCapPipeline(pipeline_config)
+
+    def test_group_by_subject(self, pipeline):
+        """Test records sharing a record ID or subject ID are grouped, in order"""
+        records = [
+            {"record_id": "1", "subject_id": "S1"},
+            {"record_id": "2", "subject_id": "S2"},
+            {"record_id": "3", "subject_id": "s1 "},  # same subject as record 1
+            {"record_id": "2", "subject_id": "S4"},  # same record as record 2
+            {"record_id": "5", "subject_id": ""},
+        ]
+
+        groups = pipeline.group_by_subject(records)
+
+        assert [[r["record_id"] for r in group] for group in groups] == [
+            ["1", "3"],
+            ["2", "2"],
+            ["5"],
+        ]
+
+    def test_same_subject_never_runs_at_once(self, pipeline):
+        """Test a subject's records are processed in order while others run alongside"""
+        records = [{"record_id": str(i), "subject_id": f"S{i % 3}"} for i in range(12)]
+        lock = threading.Lock()
+        running = set()
+        order = []
+        overlaps = []
+
+        def process_record(record):
+            with lock:
+                assert record["subject_id"] not in running
+                running.add(record["subject_id"])
+                overlaps.append(len(running))
+            time.sleep(0.01)
+            with lock:
+                running.discard(record["subject_id"])
+                order.append(record["record_id"])
+
+        pipeline.process_record = process_record
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            result = pipeline.process_batch(records, executor)
+
+        assert result == (12, 0)
+        assert max(overlaps) > 1
+        for subject in range(3):
+            ids = [r for r in order if int(r) % 3 == subject]
+            assert ids == sorted(ids, key=int)
+
+    def test_counts_match_sequential(self, pipeline):
+        """Test success and error counts are the same as one record at a time"""
+        records = [{"record_id": str(i), "subject_id": f"S{i}"} for i in range(10)]
+
+        def process_record(record):
+            if int(record["record_id"]) % 4 == 0:
+                raise Exception("GSID down")
+
+        pipeline.process_record = process_record
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            concurrent = pipeline.process_batch(records, executor)
+
+        assert concurrent == pipeline.process_batch(records) == (7, 3)
+
+    def test_run_uses_workers(self, pipeline, mock_dependencies):
+        """Test run() aggregates worker results across batches"""
+        _export(
+            mock_dependencies["redcap"].return_value,
+            [{"record_id": "1", "subject_id": "S1"}, {"record_id": "2", "subject_id": "S2"}],
+            [{"record_id": "3", "subject_id": "S1"}],
+        )
+        threads = set()
+
+        def process_record(record):
+            threads.add(threading.current_thread().name)
+            if record["record_id"] == "2":
+                raise Exception("GSID down")
+
+        pipeline.process_record = process_record
+        result = pipeline.run()
+
+        assert result["total_success"] == 2
+        assert result["total_errors"] == 1
+        assert all(name.startswith("test_project-record") for name in threads)
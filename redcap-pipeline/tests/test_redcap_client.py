@@ -1,4 +1,6 @@
 # redcap-pipeline/tests/test_redcap_client.py
+import csv
+import io
 import os
 from unittest.mock import MagicMock, patch
 
@@ -49,8 +51,22 @@ class TestREDCapClient:
         with pytest.raises(ValueError, match="api_token is required"):
             REDCapClient(config)
 
-    def test_fetch_records_batch_success(self, sample_project_config):
-        """Test successful batch record fetch"""
+    @staticmethod
+    def _export_response(records, status_code=200):
+        """Streamed export response whose body is `records` as CSV"""
+        text = io.StringIO()
+        if records:
+            writer = csv.DictWriter(text, fieldnames=list(records[0]))
+            writer.writeheader()
+            writer.writerows(records)
+        body = text.getvalue().encode()
+        response = MagicMock()
+        response.status_code = status_code
+        response.iter_content.return_value = [body[:7], body[7:]]
+        return response
+
+    def test_export_records_success(self, sample_project_config):
+        """Test a record export is streamed to a local file and read back"""
         from services.redcap_client import REDCapClient
 
         test_records = [
@@ -59,50 +75,136 @@ class TestREDCapClient:
         ]
 
         with patch("requests.Session") as mock_session:
-            mock_response = MagicMock()
-            mock_response.json.return_value = test_records
-            mock_response.status_code = 200
-            mock_session.return_value.post.return_value = mock_response
+            mock_session.return_value.post.return_value = self._export_response(test_records)
 
             client = REDCapClient(sample_project_config)
-            records = client.fetch_records_batch(batch_size=2, offset=0)
+            with client.export_records() as export:
+                batches = list(export.batches(batch_size=2))
 
-        assert len(records) == 2
-        assert records[0]["record_id"] == "1"
+        assert batches == [test_records]
+        assert mock_session.return_value.post.call_args.kwargs["stream"] is True
 
-    def test_fetch_records_batch_pagination(self, sample_project_config):
-        """Test batch fetch with pagination"""
+    def test_export_records_batches_from_one_export(self, sample_project_config):
+        """Test every batch comes from the same, single export"""
         from services.redcap_client import REDCapClient
 
-        # Create 75 records - REDCap returns ALL records, then we paginate manually
         all_records = [{"record_id": str(i)} for i in range(1, 76)]
 
         with patch("requests.Session") as mock_session:
-            mock_response = MagicMock()
-            mock_response.status_code = 200
-            # REDCap always returns all records
-            mock_response.json.return_value = all_records
-            mock_session.return_value.post.return_value = mock_response
+            mock_session.return_value.post.return_value = self._export_response(all_records)
+
+            client = REDCapClient(sample_project_config)
+            with client.export_records() as export:
+                batches = list(export.batches(batch_size=50))
+                resumed = list(export.batches(batch_size=50, offset=70))
+
+        assert mock_session.return_value.post.call_count == 1
+        assert [len(b) for b in batches] == [50, 25]
+        assert batches[0][0]["record_id"] == "1"
+        assert batches[1][24]["record_id"] == "75"
+        assert [r["record_id"] for r in resumed[0]] == ["71", "72", "73", "74", "75"]
+
+    def test_export_records_parses_csv_rows(self, sample_project_config):
+        """Test quoted values, embedded newlines and a byte order mark survive parsing"""
+        from services.redcap_client import REDCapClient
+
+        body = (
+            "\ufeffrecord_id,redcap_event_name,notes\r\n"
+            '1,baseline_arm_1,"line one\r\nline, two"\r\n'
+            "2,follow_up_arm_1,\r\n"
+        ).encode()
+        response = MagicMock(status_code=200)
+        response.iter_content.return_value = [body[:5], body[5:]]
+
+        with patch("requests.Session") as mock_session:
+            mock_session.return_value.post.return_value = response
 
             client = REDCapClient(sample_project_config)
+            with client.export_records() as export:
+                records = list(export.records())
+
+        payload = mock_session.return_value.post.call_args.kwargs["data"]
+        assert payload["format"] == "csv"
+        assert records == [
+            {"record_id": "1", "redcap_event_name": "baseline_arm_1", "notes": "line one\r\nline, two"},
+            {"record_id": "2", "redcap_event_name": "follow_up_arm_1", "notes": ""},
+        ]
 
-            # Fetch first batch (offset=0, batch_size=50)
-            # Should return records[0:50] = 50 records
-            batch1 = client.fetch_records_batch(batch_size=50, offset=0)
+    def test_export_records_are_parsed_lazily(self, sample_project_config):
+        """Test batches are parsed as they are read, not all up front"""
+        from services.redcap_client import REDCapClient
 
-            # Fetch second batch (offset=50, batch_size=50)
-            # Should return records[50:100] = 25 records (only 75 total)
-            batch2 = client.fetch_records_batch(batch_size=50, offset=50)
+        all_records = [{"record_id": str(i)} for i in range(1, 1001)]
 
-        assert len(batch1) == 50
-        assert batch1[0]["record_id"] == "1"
-        assert batch1[49]["record_id"] == "50"
+        with patch("requests.Session") as mock_session:
+            mock_session.return_value.post.return_value = self._export_response(all_records)
 
-        assert len(batch2) == 25
-        assert batch2[0]["record_id"] == "51"
-        assert batch2[24]["record_id"] == "75"
+            client = REDCapClient(sample_project_config)
+            readers = []
+            dict_reader = csv.DictReader
 
-    def test_fetch_records_batch_timeout_retry(self, sample_project_config):
+            def reader(*args, **kwargs):
+                readers.append(dict_reader(*args, **kwargs))
+                return readers[-1]
+
+            with (
+                client.export_records() as export,
+                patch("services.redcap_client.csv.DictReader", side_effect=reader),
+            ):
+                batches = export.batches(batch_size=10)
+                first = next(batches)
+                rows_read = readers[0].line_num
+
+        assert [r["record_id"] for r in first] == [str(i) for i in range(1, 11)]
+        assert rows_read < 20
+
+    def test_export_records_date_range(self, sample_project_config):
+        """Test an incremental export sends REDCap's date-range filters"""
+        from datetime import datetime
+
+        from services.redcap_client import REDCapClient
+
+        with patch("requests.Session") as mock_session:
+            mock_session.return_value.post.return_value = self._export_response([])
+
+            client = REDCapClient(sample_project_config)
+            client.export_records(
+                date_range_begin=datetime(2024, 6, 1, 11, 45),
+                date_range_end=datetime(2024, 6, 1, 13, 0, 5),
+            )
+
+        payload = mock_session.return_value.post.call_args.kwargs["data"]
+        assert payload["dateRangeBegin"] == "2024-06-01 11:45:00"
+        assert payload["dateRangeEnd"] == "2024-06-01 13:00:05"
+
+    def test_export_records_fields_and_events(self, sample_project_config):
+        """Test fields and events are sent as REDCap array parameters"""
+        from services.redcap_client import REDCapClient
+
+        with patch("requests.Session") as mock_session:
+            mock_session.return_value.post.return_value = self._export_response([])
+
+            client = REDCapClient(sample_project_config)
+            client.export_records(fields=["record_id", "subject_id"], events=["baseline_arm_1"])
+
+        payload = mock_session.return_value.post.call_args.kwargs["data"]
+        assert payload["fields[0]"] == "record_id"
+        assert payload["fields[1]"] == "subject_id"
+        assert payload["events[0]"] == "baseline_arm_1"
+        assert "fields[2]" not in payload
+
+    def test_export_records_empty(self, sample_project_config):
+        """Test an empty project yields no batches"""
+        from services.redcap_client import REDCapClient
+
+        with patch("requests.Session") as mock_session:
+            mock_session.return_value.post.return_value = self._export_response([])
+
+            client = REDCapClient(sample_project_config)
+            with client.export_records() as export:
+                assert list(export.batches(batch_size=50)) == []
+
+    def test_export_records_timeout_retry(self, sample_project_config):
         """Test retry on timeout"""
         import requests
         from services.redcap_client import REDCapClient
@@ -112,21 +214,39 @@ class TestREDCapClient:
             patch("time.sleep"),
         ):  # Mock sleep to speed up test
             # First call times out, second succeeds
-            mock_success = MagicMock()
-            mock_success.json.return_value = [{"record_id": "1"}]
-            mock_success.status_code = 200
-
             mock_session.return_value.post.side_effect = [
                 requests.exceptions.Timeout("Timeout"),
-                mock_success,
+                self._export_response([{"record_id": "1"}]),
+            ]
+
+            client = REDCapClient(sample_project_config)
+            export = client.export_records()
+
+        assert list(export.records()) == [{"record_id": "1"}]
+
+    def test_export_records_retries_broken_stream(self, sample_project_config):
+        """Test a body cut off mid-download is exported again"""
+        from services.redcap_client import REDCapClient
+
+        broken = self._export_response([])
+        broken.iter_content.side_effect = requests.exceptions.ChunkedEncodingError("cut")
+
+        with (
+            patch("requests.Session") as mock_session,
+            patch("time.sleep"),
+        ):
+            mock_session.return_value.post.side_effect = [
+                broken,
+                self._export_response([{"record_id": "1"}]),
             ]
 
             client = REDCapClient(sample_project_config)
-            records = client.fetch_records_batch(batch_size=1, offset=0)
+            export = client.export_records()
 
-        assert len(records) == 1
+        assert list(export.records()) == [{"record_id": "1"}]
+        broken.close.assert_called_once()
 
-    def test_fetch_records_batch_timeout_failure(self, sample_project_config):
+    def test_export_records_timeout_failure(self, sample_project_config):
         """Test failure after max retries"""
         import requests
         from services.redcap_client import REDCapClient
@@ -143,14 +263,17 @@ class TestREDCapClient:
             client = REDCapClient(sample_project_config)
 
             with pytest.raises(requests.exceptions.Timeout):
-                client.fetch_records_batch(batch_size=1, offset=0)
+                client.export_records()
 
-    def test_fetch_records_batch_request_error(self, sample_project_config):
+    def test_export_records_request_error(self, sample_project_config):
         """Test handling of request errors"""
         import requests
         from services.redcap_client import REDCapClient
 
-        with patch("requests.Session") as mock_session:
+        with (
+            patch("requests.Session") as mock_session,
+            patch("time.sleep"),
+        ):
             mock_session.return_value.post.side_effect = (
                 requests.exceptions.RequestException("Error")
             )
@@ -158,7 +281,7 @@ class TestREDCapClient:
             client = REDCapClient(sample_project_config)
 
             with pytest.raises(requests.exceptions.RequestException):
-                client.fetch_records_batch(batch_size=1, offset=0)
+                client.export_records()
 
     def test_get_project_info_success(self, sample_project_config):
         """Test getting project info"""
@@ -305,7 +428,7 @@ class TestREDCapClient:
             result = resolve_api_token("${REDCAP_API_TOKEN_GAP}")
             assert result == ""  # Should replace with empty string
 
-    def test_fetch_records_batch_exponential_backoff(self, sample_project_config):
+    def test_export_records_exponential_backoff(self, sample_project_config):
         """Test exponential backoff on timeout"""
         from services.redcap_client import REDCapClient
 
@@ -314,20 +437,16 @@ class TestREDCapClient:
             patch("time.sleep") as mock_sleep,
         ):
             # Simulate 2 timeouts, then success
-            mock_response_success = MagicMock()
-            mock_response_success.json.return_value = [{"record_id": "1"}]
-            mock_response_success.status_code = 200
-
             mock_session.return_value.post.side_effect = [
                 requests.exceptions.Timeout("Timeout 1"),
                 requests.exceptions.Timeout("Timeout 2"),
-                mock_response_success,
+                self._export_response([{"record_id": "1"}]),
             ]
 
             client = REDCapClient(sample_project_config)
-            result = client.fetch_records_batch(batch_size=10, offset=0)
+            result = client.export_records()
 
-            assert len(result) == 1
+            assert list(result.records()) == [{"record_id": "1"}]
             assert mock_sleep.call_count == 2
             # Verify exponential backoff: 5s, then 10s
             mock_sleep.assert_any_call(5)
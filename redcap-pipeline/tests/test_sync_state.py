@@ -0,0 +1,125 @@
+# redcap-pipeline/tests/test_sync_state.py
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from services.sync_state import load_sync_state, plan_sync, save_sync_state
+
+NOW = datetime(2024, 6, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def db(mock_db_connection):
+    """Patch the pool helpers with the mock connection"""
+    conn, cursor = mock_db_connection
+    with patch("services.sync_state.get_db_connection", return_value=conn), \
+         patch("services.sync_state.return_db_connection") as mock_return:
+        yield conn, cursor, mock_return
+
+
+class TestPlanSync:
+    """Test the choice between full and incremental exports"""
+
+    @pytest.fixture(autouse=True)
+    def clock(self):
+        with patch("services.sync_state.redcap_now", return_value=NOW):
+            yield
+
+    def _plan(self, state, **kwargs):
+        with patch("services.sync_state.load_sync_state", return_value=state):
+            return plan_sync("gap", **kwargs)
+
+    def test_first_run_is_full(self):
+        """Test a project without a watermark gets a full export"""
+        plan = self._plan(None)
+
+        assert plan == {"mode": "full", "date_range_begin": None, "date_range_end": NOW}
+
+    def test_incremental_since_watermark(self):
+        """Test a recent watermark gives an incremental export with overlap"""
+        state = {
+            "last_synced_at": NOW - timedelta(hours=1),
+            "last_full_sync_at": NOW - timedelta(days=1),
+        }
+
+        with patch("services.sync_state.settings.SYNC_OVERLAP_MINUTES", 15):
+            plan = self._plan(state)
+
+        assert plan["mode"] == "incremental"
+        assert plan["date_range_begin"] == NOW - timedelta(hours=1, minutes=15)
+        assert plan["date_range_end"] == NOW
+
+    def test_periodic_full_reconciliation(self):
+        """Test an old full sync forces a full export"""
+        state = {
+            "last_synced_at": NOW - timedelta(hours=1),
+            "last_full_sync_at": NOW - timedelta(days=7),
+        }
+
+        assert self._plan(state, full_sync_interval_days=7)["mode"] == "full"
+        assert self._plan(state, full_sync_interval_days=8)["mode"] == "incremental"
+
+    def test_full_override_skips_state(self):
+        """Test --full exports everything without reading the watermark"""
+        with patch("services.sync_state.load_sync_state") as mock_load:
+            plan = plan_sync("gap", full=True)
+
+        assert plan["mode"] == "full"
+        mock_load.assert_not_called()
+
+
+class TestSyncStateStorage:
+    """Test reading and writing redcap_sync_state"""
+
+    def test_load_state(self, db):
+        """Test the stored watermark is returned"""
+        conn, cursor, mock_return = db
+        cursor.fetchone.return_value = {"last_synced_at": NOW, "last_full_sync_at": NOW}
+
+        state = load_sync_state("gap")
+
+        assert state["last_synced_at"] == NOW
+        assert cursor.execute.call_args.args[1] == ("gap",)
+        mock_return.assert_called_once_with(conn)
+
+    def test_load_state_failure_means_full_sync(self, db):
+        """Test an unreadable state table falls back to no watermark"""
+        conn, cursor, mock_return = db
+        cursor.execute.side_effect = Exception('relation "redcap_sync_state" does not exist')
+
+        assert load_sync_state("gap") is None
+        conn.rollback.assert_called()
+        mock_return.assert_called_once_with(conn)
+
+    def test_save_full_sync(self, db):
+        """Test a full run records both watermarks"""
+        conn, cursor, _ = db
+        plan = {"mode": "full", "date_range_begin": None, "date_range_end": NOW}
+
+        save_sync_state("gap", plan, 120)
+
+        assert cursor.execute.call_args.args[1] == ("gap", NOW, NOW, "full", 120)
+        conn.commit.assert_called_once()
+
+    def test_save_incremental_keeps_full_watermark(self, db):
+        """Test an incremental run leaves last_full_sync_at unchanged"""
+        conn, cursor, _ = db
+        plan = {"mode": "incremental", "date_range_begin": NOW, "date_range_end": NOW}
+
+        save_sync_state("gap", plan, 3)
+
+        sql, params = cursor.execute.call_args.args
+        assert params == ("gap", NOW, None, "incremental", 3)
+        assert "COALESCE" in sql
+
+    def test_save_failure_is_not_raised(self, db):
+        """Test a failed save is logged and rolled back"""
+        conn, cursor, _ = db
+        cursor.execute.side_effect = Exception("DB down")
+        plan = {"mode": "full", "date_range_begin": None, "date_range_end": NOW}
+
+        save_sync_state("gap", plan, 1)
+
+        conn.rollback.assert_called_once()
+        conn.commit.assert_not_called()
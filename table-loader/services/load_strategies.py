@@ -204,7 +204,9 @@ class UniversalUpsertStrategy(LoadStrategy):
         Special handling for local_subject_ids with center_id changes
 
         Process:
-        1. Find existing records by (local_subject_id, identifier_type) only
+        1. Find existing records by (local_subject_id, identifier_type) only,
+           matching local_subject_id case-insensitively like identity
+           resolution does (served by idx_local_ids_lower)
         2. If center_id differs: DELETE old + INSERT new + LOG change
         3. If center_id same: Standard upsert
         4. Sync all changes to NocoDB
@@ -224,9 +226,10 @@ class UniversalUpsertStrategy(LoadStrategy):
                 # Find existing record(s) by local_subject_id + identifier_type
                 cursor.execute(
                     """
-                    SELECT center_id, global_subject_id, created_by, created_at, updated_at
+                    SELECT center_id, global_subject_id, created_by, created_at,
+                           updated_at, local_subject_id
                     FROM local_subject_ids
-                    WHERE local_subject_id = %s AND identifier_type = %s
+                    WHERE lower(local_subject_id) = lower(%s) AND identifier_type = %s
                     """,
                     (local_id, id_type),
                 )
@@ -248,7 +251,7 @@ class UniversalUpsertStrategy(LoadStrategy):
                     cursor.execute(
                         """
                         DELETE FROM local_subject_ids
-                        WHERE local_subject_id = %s AND identifier_type = %s
+                        WHERE lower(local_subject_id) = lower(%s) AND identifier_type = %s
                         """,
                         (local_id, id_type),
                     )
@@ -272,9 +275,14 @@ class UniversalUpsertStrategy(LoadStrategy):
 
                 else:
                     # Single existing record
-                    old_center, old_gsid, created_by, created_at, updated_at = existing[
-                        0
-                    ]
+                    (
+                        old_center,
+                        old_gsid,
+                        created_by,
+                        created_at,
+                        updated_at,
+                        old_local_id,
+                    ) = existing[0]
 
                     if old_center != new_center:
                         # Center mismatch - delete old + insert new
@@ -288,7 +296,7 @@ class UniversalUpsertStrategy(LoadStrategy):
                             DELETE FROM local_subject_ids
                             WHERE center_id = %s AND local_subject_id = %s AND identifier_type = %s
                             """,
-                            (old_center, local_id, id_type),
+                            (old_center, old_local_id, id_type),
                         )
                         rows_deleted += cursor.rowcount
 
@@ -314,7 +322,7 @@ class UniversalUpsertStrategy(LoadStrategy):
                             SET global_subject_id = %s, updated_at = CURRENT_TIMESTAMP
                             WHERE center_id = %s AND local_subject_id = %s AND identifier_type = %s
                             """,
-                            (new_gsid, new_center, local_id, id_type),
+                            (new_gsid, new_center, old_local_id, id_type),
                         )
                         rows_updated += cursor.rowcount
 
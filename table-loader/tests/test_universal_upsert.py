@@ -105,3 +105,54 @@ class TestUniversalUpsertStrategy:
         assert result["inserted"] == 0
         assert result["updated"] == 0
         assert result["rows_unchanged"] == 1
+
+
+@patch("services.load_strategies.UniversalUpsertStrategy._sync_to_nocodb_single")
+class TestLocalSubjectIdsCenterHandling:
+    """Test local_subject_ids loading with case-insensitive matching"""
+
+    @staticmethod
+    def _record(local_id="ibdgc-001", center_id=1, gsid="GSID-NEW"):
+        return {
+            "local_subject_id": local_id,
+            "identifier_type": "consortium_id",
+            "center_id": center_id,
+            "global_subject_id": gsid,
+        }
+
+    def test_lookup_uses_lower_key(self, mock_sync, mock_db_connection):
+        """Test existing rows are matched on lower(local_subject_id)"""
+        conn, cursor = mock_db_connection
+        strategy = UniversalUpsertStrategy(
+            table_name="local_subject_ids",
+            natural_key=["center_id", "local_subject_id", "identifier_type"],
+        )
+
+        strategy.load(conn, [self._record()], "batch_001", "source")
+
+        query, params = cursor.execute.call_args_list[0].args
+        assert "lower(local_subject_id) = lower(%s)" in query
+        assert params == ("ibdgc-001", "consortium_id")
+
+    def test_gsid_change_updates_stored_spelling(self, mock_sync, mock_db_connection):
+        """Test a case variant updates the existing row instead of adding one"""
+        conn, cursor = mock_db_connection
+        strategy = UniversalUpsertStrategy(
+            table_name="local_subject_ids",
+            natural_key=["center_id", "local_subject_id", "identifier_type"],
+        )
+        cursor.fetchall.return_value = [
+            (1, "GSID-OLD", "system", None, None, "IBDGC-001"),
+        ]
+
+        result = strategy.load(conn, [self._record()], "batch_001", "source")
+
+        update_calls = [
+            c for c in cursor.execute.call_args_list if "UPDATE local_subject_ids" in c.args[0]
+        ]
+        assert len(update_calls) == 1
+        assert update_calls[0].args[1] == ("GSID-NEW", 1, "IBDGC-001", "consortium_id")
+        assert not any(
+            "INSERT INTO local_subject_ids" in c.args[0] for c in cursor.execute.call_args_list
+        )
+        assert result["rows_deleted"] == 0